@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Benchmark the WhatsApp conversation optimizer
+Compares the previous per-phrase re.sub passes with the single-pass
+compiled rewriter on realistic CAVA replies, and checks both produce the
+same messages (same random draws for emoji placement).
+
+Usage: python benchmark_conversation_optimizer.py [iterations]
+"""
+import logging
+import random
+import re
+import sys
+import time
+
+from modules.cava.conversation_optimizer import WhatsAppOptimizer
+
+REPLIES = [
+    "Based on the analysis of your soil samples, it is recommended that you apply nitrogen at "
+    "approximately 120 kilograms per hectare prior to sowing. Furthermore, ensure that the soil "
+    "temperature is above 10 degrees Celsius. However, if rain is forecast, wait 2 days.",
+
+    "Your mango trees need careful attention this week! The temperature will drop to 4 degrees "
+    "Celsius at night, which is critical for young trees.\n\nIt would be advisable to cover them "
+    "and water them in the morning. In the event that frost appears, utilize frost cloth.",
+
+    "It appears that your vineyard has early signs of downy mildew. In order to protect the "
+    "grapes, implement a copper spray within 48 hours. Additionally, remove infected leaves and "
+    "improve air circulation. Subsequent to spraying, check the leaves every 3 days. With regard "
+    "to the harvest, the optimal timing is still late September, when sugar levels peak. "
+    "Therefore, the 4 hectares in the valley plot should be picked first. Wind is currently 15 "
+    "kilometers per hour, so spraying is fine today.",
+
+    "When should I harvest my wheat?",
+
+    "Due to the fact that precipitation was 35 millimeters last week, irrigation is not needed. "
+    "At this point in time your corn has the ability to use the stored moisture. In conclusion, "
+    "keep monitoring and check the price of fertilizer before ordering.",
+]
+
+class LegacyWhatsAppOptimizer(WhatsAppOptimizer):
+    """The pre-compilation rewriting passes, kept here only for comparison"""
+
+    def _make_conversational(self, text):
+        replacements = {
+            "Based on the analysis": "Looking at your situation",
+            "It is recommended that": "You should",
+            "It would be advisable to": "Better to",
+            "In accordance with": "Following",
+            "Furthermore": "Also",
+            "However": "But",
+            "Therefore": "So",
+            "Approximately": "About",
+            "Utilize": "Use",
+            "Implement": "Start",
+            "Optimal": "Best",
+            "Ensure that": "Make sure",
+            "It appears that": "Looks like",
+            "In conclusion": "So",
+            "Additionally": "Plus",
+            "Prior to": "Before",
+            "Subsequent to": "After",
+            "With regard to": "About",
+            "In order to": "To",
+            "Due to the fact that": "Because",
+            "At this point in time": "Now",
+            "In the event that": "If",
+            "Has the ability to": "Can",
+            "Is able to": "Can"
+        }
+        result = text
+        for formal, casual in replacements.items():
+            result = re.sub(formal, casual, result, flags=re.IGNORECASE)
+        result = re.sub(r'(\d+) degrees Celsius', r'\1°C', result)
+        result = re.sub(r'(\d+) kilometers per hour', r'\1 km/h', result)
+        result = re.sub(r'(\d+) kilograms per hectare', r'\1 kg/ha', result)
+        result = re.sub(r'(\d+) millimeters', r'\1mm', result)
+        result = re.sub(r'(\d+) hectares', r'\1ha', result)
+        return result
+
+    def _add_natural_emojis(self, text, context=None):
+        emoji_rules = [
+            (r'\b(plant|seed|sow)\b', '🌱', 0.7),
+            (r'\b(water|irrigat|moisture)\b', '💧', 0.6),
+            (r'\b(sun|sunny|solar)\b', '☀️', 0.8),
+            (r'\b(rain|precipitat)\b', '🌧️', 0.8),
+            (r'\b(harvest|pick|collect)\b', '🌾', 0.7),
+            (r'\b(mango)\b', '🥭', 1.0),
+            (r'\b(grape|vineyard)\b', '🍇', 0.9),
+            (r'\b(warning|caution|careful)\b', '⚠️', 0.9),
+            (r'\b(perfect|excellent|great)\b', '✅', 0.5),
+            (r'\b(timing|schedule|when)\b', '⏰', 0.4),
+            (r'\b(important|critical|essential)\b', '❗', 0.6),
+            (r'\b(temperature|degrees|°C)\b', '🌡️', 0.5),
+            (r'\b(profit|cost|price|money)\b', '💰', 0.6),
+        ]
+        result = text
+        emojis_added = 0
+        for pattern, emoji, probability in emoji_rules:
+            if emojis_added >= 2:
+                break
+            if self._rng.random() < probability:
+                result = re.sub(pattern, f'\\g<0> {emoji}', result, count=1, flags=re.IGNORECASE)
+                if emoji in result:
+                    emojis_added += 1
+        if '?' in result and '🤔' not in result:
+            result = result.replace('?', '? 🤔', 1)
+        return result
+
+def check_equivalence(seeds: int = 200):
+    for seed in range(seeds):
+        for reply in REPLIES:
+            legacy = LegacyWhatsAppOptimizer(random.Random(seed)).optimize_response(reply)
+            current = WhatsAppOptimizer(random.Random(seed)).optimize_response(reply)
+            assert legacy == current, (seed, reply, legacy, current)
+
+def run(optimizer, iterations: int) -> float:
+    """Optimize every reply ``iterations`` times and return microseconds per reply"""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for reply in REPLIES:
+            optimizer._make_conversational(reply)
+            optimizer._add_natural_emojis(reply)
+    return (time.perf_counter() - start) / (iterations * len(REPLIES)) * 1e6
+
+def run_end_to_end(optimizer, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for reply in REPLIES:
+            optimizer.optimize_response(reply)
+    return (time.perf_counter() - start) / (iterations * len(REPLIES)) * 1e6
+
+def run_stream(optimizer, iterations: int) -> float:
+    """Feed each reply as ~4-character tokens through the streaming path"""
+    streams = [[reply[i:i + 4] for i in range(0, len(reply), 4)] for reply in REPLIES]
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for tokens in streams:
+            list(optimizer.optimize_stream(tokens))
+    return (time.perf_counter() - start) / (iterations * len(REPLIES)) * 1e6
+
+def main(iterations: int):
+    check_equivalence()
+    print("Legacy and compiled optimizers produce identical messages")
+
+    legacy = LegacyWhatsAppOptimizer(random.Random(1))
+    current = WhatsAppOptimizer(random.Random(1))
+
+    # Warm up the re module cache for the legacy passes
+    run(legacy, 50)
+    run(current, 50)
+
+    # The optimizer logs one line per reply; keep that out of the timings
+    logging.disable(logging.INFO)
+
+    legacy_us = run(legacy, iterations)
+    current_us = run(current, iterations)
+    legacy_total = run_end_to_end(legacy, iterations)
+    current_total = run_end_to_end(current, iterations)
+    stream_us = run_stream(current, iterations)
+
+    print(f"Replies per variant:             {iterations * len(REPLIES)}")
+    print(f"Rewrite + emojis (before):       {legacy_us:8.1f} us/reply")
+    print(f"Rewrite + emojis (after):        {current_us:8.1f} us/reply  ({legacy_us / current_us:.1f}x)")
+    print(f"optimize_response (before):      {legacy_total:8.1f} us/reply")
+    print(f"optimize_response (after):       {current_total:8.1f} us/reply  ({legacy_total / current_total:.1f}x)")
+    print(f"optimize_stream, 4-char tokens:  {stream_us:8.1f} us/reply")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Benchmark per-request middleware overhead
+Compares the previous BaseHTTPMiddleware + PUBLIC_PATHS loop with the pure ASGI
+GlobalAuthMiddleware backed by the compiled route classifier.
+
+Requests are driven straight through the ASGI interface (no sockets), so the
+numbers isolate middleware cost.
+
+Usage: python benchmark_middleware.py [requests]
+"""
+import asyncio
+import base64
+import sys
+import time
+
+from starlette.applications import Starlette
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.responses import PlainTextResponse, Response
+from starlette.routing import Route
+
+from modules.core.global_auth import BASIC_AUTH_USERS, PUBLIC_PATHS, GlobalAuthMiddleware
+
+class LegacyGlobalAuthMiddleware(BaseHTTPMiddleware):
+    """The pre-classifier implementation, kept here only for comparison"""
+
+    async def dispatch(self, request, call_next):
+        path = str(request.url.path)
+        for public_path in PUBLIC_PATHS:
+            if path == public_path or path.startswith(public_path + "/"):
+                return await call_next(request)
+        auth_header = request.headers.get("authorization")
+        if not auth_header or not auth_header.lower().startswith("basic "):
+            return Response("Authentication required", status_code=401)
+        username, password = base64.b64decode(auth_header[6:]).decode("utf-8").split(":", 1)
+        if BASIC_AUTH_USERS.get(username) != password:
+            return Response("Invalid username or password", status_code=401)
+        request.state.authenticated_user = username
+        return await call_next(request)
+
+async def ok(request):
+    return PlainTextResponse("ok")
+
+def build_app(middleware_cls):
+    app = Starlette(routes=[
+        Route("/farmer/dashboard", ok),
+        Route("/dashboards/business", ok),
+        Route("/api/v1/chat", ok),
+    ])
+    app.add_middleware(middleware_cls)
+    return app
+
+def build_app_without_middleware():
+    return Starlette(routes=[
+        Route("/farmer/dashboard", ok),
+        Route("/dashboards/business", ok),
+        Route("/api/v1/chat", ok),
+    ])
+
+AUTH = b"Basic " + base64.b64encode(b"Peter:Semillon")
+
+REQUESTS = [
+    ("/farmer/dashboard", []),                                # public
+    ("/dashboards/business", [(b"authorization", AUTH)]),     # protected, authorized
+    ("/api/v1/chat", []),                                     # protected, 401
+]
+
+async def drive(app, count: int) -> float:
+    """Send ``count`` requests through the app and return seconds elapsed"""
+    async def send(message):
+        pass
+
+    start = time.perf_counter()
+    for i in range(count):
+        delivered = False
+
+        async def receive():
+            nonlocal delivered
+            if not delivered:
+                delivered = True
+                return {"type": "http.request", "body": b"", "more_body": False}
+            return {"type": "http.disconnect"}
+
+        path, headers = REQUESTS[i % len(REQUESTS)]
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+            "method": "GET", "scheme": "http", "path": path, "raw_path": path.encode(),
+            "query_string": b"", "root_path": "", "headers": headers,
+            "client": ("127.0.0.1", 1234), "server": ("testserver", 80),
+        }
+        await app(scope, receive, send)
+    return time.perf_counter() - start
+
+async def main(count: int):
+    baseline = build_app_without_middleware()
+    legacy = build_app(LegacyGlobalAuthMiddleware)
+    current = build_app(GlobalAuthMiddleware)
+
+    # Warm up middleware stacks and verdict cache
+    for app in (baseline, legacy, current):
+        await drive(app, 300)
+
+    base_s = await drive(baseline, count)
+    legacy_s = await drive(legacy, count)
+    current_s = await drive(current, count)
+
+    base_us = base_s / count * 1e6
+    legacy_us = legacy_s / count * 1e6
+    current_us = current_s / count * 1e6
+    print(f"Requests per variant:        {count}")
+    print(f"No middleware:               {base_us:8.1f} us/request")
+    print(f"BaseHTTPMiddleware (before): {legacy_us:8.1f} us/request  (+{legacy_us - base_us:.1f} us overhead)")
+    print(f"Pure ASGI + trie (after):    {current_us:8.1f} us/request  (+{current_us - base_us:.1f} us overhead)")
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000))
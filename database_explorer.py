@@ -3,8 +3,9 @@ AVA OLO Database Explorer - Port 8005
 Professional database exploration interface with AI-powered querying
 """
 from fastapi import FastAPI, Request, Query, HTTPException, Form, File, UploadFile
-from fastapi.responses import HTMLResponse, FileResponse, JSONResponse
+from fastapi.responses import HTMLResponse, FileResponse, JSONResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
+import asyncio
 import logging
 import os
 import sys
@@ -19,6 +20,9 @@ import re
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from database_operations import DatabaseOperations
+from table_stats import TableStatsService, quote_identifier
+from modules.core.query_export import EXPORT_FORMATS, export_filename, stream_export
+from modules.core.query_guard import open_guarded_export, run_guarded_select
 
 logger = logging.getLogger(__name__)
 
@@ -59,6 +63,7 @@ class DatabaseExplorer:
     
     def __init__(self):
         self.db_ops = DatabaseOperations()
+        self.table_stats = TableStatsService(self.db_ops)
         # Initialize LLM handler for constitutional compliance
         if LLM_AVAILABLE:
             self.llm_handler = LLMQueryHandler(self.db_ops)
@@ -90,61 +95,36 @@ class DatabaseExplorer:
             ]
         }
     
-    async def get_table_info(self, table_name: str) -> Dict[str, Any]:
-        """Get comprehensive table information"""
+    async def get_table_info(self, table_name: str, exact: bool = False) -> Dict[str, Any]:
+        """Get comprehensive table information (approximate counts unless exact is requested)"""
         try:
             with self.db_ops.get_session() as session:
-                inspector = inspect(session.bind)
-                
-                # Get columns
-                columns = inspector.get_columns(table_name)
-                
-                # Get row count
-                total_count = session.execute(
-                    text(f"SELECT COUNT(*) FROM {table_name}")
-                ).scalar() or 0
-                
-                # Get recent entries count - check if date columns exist
-                counts = {"24h": 0, "7d": 0, "30d": 0}
-                
-                # Check if table has date columns
-                date_columns = []
-                for col in columns:
-                    col_name = col["name"].lower()
-                    if col_name in ["created_at", "updated_at", "date", "timestamp"]:
-                        date_columns.append(col["name"])
-                
-                if date_columns:
-                    for period_name, days in [("24h", 1), ("7d", 7), ("30d", 30)]:
-                        start_date = datetime.now() - timedelta(days=days)
-                        date_conditions = " OR ".join([f"{col} >= :start_date" for col in date_columns])
-                        try:
-                            count = session.execute(
-                                text(f"SELECT COUNT(*) FROM {table_name} WHERE {date_conditions}"),
-                                {"start_date": start_date}
-                            ).scalar() or 0
-                            counts[period_name] = count
-                        except:
-                            pass
+                schema = self.table_stats.get_schema(session, table_name)
+                stats = self.table_stats.get_table_stats(session, table_name, exact=exact)
+                columns = schema.columns
                 
                 # Get sample data
                 try:
                     # Try to order by a date column if available, otherwise by id
-                    order_column = date_columns[0] if date_columns else "id"
+                    order_column = quote_identifier(schema.window_column or "id")
                     sample_rows = session.execute(
-                        text(f"SELECT * FROM {table_name} ORDER BY {order_column} DESC LIMIT 5")
+                        text(f"SELECT * FROM {schema.qualified_name} ORDER BY {order_column} DESC LIMIT 5")
                     ).fetchall()
                 except:
                     # If ordering fails, just get any 5 rows
+                    session.rollback()
                     sample_rows = session.execute(
-                        text(f"SELECT * FROM {table_name} LIMIT 5")
+                        text(f"SELECT * FROM {schema.qualified_name} LIMIT 5")
                     ).fetchall()
                 
                 return {
                     "table_name": table_name,
-                    "total_records": total_count,
-                    "columns": [{"name": col["name"], "type": str(col["type"])} for col in columns],
-                    "recent_counts": counts,
+                    "total_records": stats["total_records"],
+                    "total_records_exact": stats["total_records_exact"],
+                    "columns": columns,
+                    "recent_counts": stats["recent_counts"],
+                    "window_column": stats["window_column"],
+                    "last_analyzed": stats["last_analyzed"],
                     "sample_data": [dict(zip([col["name"] for col in columns], row)) for row in sample_rows] if sample_rows else []
                 }
                 
@@ -176,8 +156,7 @@ class DatabaseExplorer:
         """Get filtered table data"""
         try:
             with self.db_ops.get_session() as session:
-                inspector = inspect(session.bind)
-                columns = [col["name"] for col in inspector.get_columns(table_name)]
+                columns = [col["name"] for col in self.table_stats.get_columns(session, table_name)]
                 
                 # Build date filter
                 start_date = datetime.now() - timedelta(days=days)
@@ -409,51 +388,66 @@ Generate a PostgreSQL SELECT query to fulfill this request. Consider:
         
         return query
     
+    def _check_select_query(self, sql_query: str):
+        """Raise ValueError unless the query is read-only"""
+        # Security check
+        query_upper = sql_query.upper()
+        if not query_upper.strip().startswith("SELECT") and not query_upper.strip().startswith("--"):
+            raise ValueError("Only SELECT queries are allowed")
+        
+        # Check for dangerous keywords with word boundaries
+        dangerous_keywords = ["DROP", "DELETE", "UPDATE", "INSERT", "ALTER", "CREATE", "TRUNCATE"]
+        for keyword in dangerous_keywords:
+            if re.search(r'\b' + keyword + r'\b', query_upper):
+                raise ValueError("Query contains dangerous operations")
+    
+    def open_ai_query_export(self, sql_query: str):
+        """
+        Run an AI-generated SELECT through a server-side cursor for streaming export
+        Planned by the query guard and run under its statement_timeout like
+        execute_ai_query; no LIMIT is added unless the plan is over budget.
+        """
+        self._check_select_query(sql_query)
+        return open_guarded_export(sql_query.strip().rstrip(';'), connection_factory=self.db_ops.engine.raw_connection)
+    
     async def execute_ai_query(self, sql_query: str) -> Dict[str, Any]:
-        """Execute the AI-generated SQL query safely"""
+        """
+        Execute the AI-generated SQL query safely
+        Planned first by the query guard (cost/row budget, auto-LIMIT), then run
+        READ ONLY under a statement_timeout.
+        """
         try:
-            # Security check
+            self._check_select_query(sql_query)
+            sql_query = sql_query.strip().rstrip(';')
             query_upper = sql_query.upper()
-            if not query_upper.strip().startswith("SELECT") and not query_upper.strip().startswith("--"):
-                raise ValueError("Only SELECT queries are allowed")
             
-            # Check for dangerous keywords with word boundaries
-            dangerous_keywords = ["DROP", "DELETE", "UPDATE", "INSERT", "ALTER", "CREATE", "TRUNCATE"]
-            import re
-            for keyword in dangerous_keywords:
-                if re.search(r'\b' + keyword + r'\b', query_upper):
-                    raise ValueError("Query contains dangerous operations")
+            # Add limit if not present
+            if "LIMIT" not in query_upper and not query_upper.strip().startswith("--"):
+                sql_query += " LIMIT 100"
             
-            with self.db_ops.get_session() as session:
-                # Add limit if not present
-                if "LIMIT" not in query_upper and not query_upper.strip().startswith("--"):
-                    sql_query += " LIMIT 100"
-                
-                result = session.execute(text(sql_query))
-                
-                # Get column names first
-                columns = list(result.keys())
-                
-                # Fetch all rows
-                results = result.fetchall()
-                
-                if results:
-                    # Convert rows to dictionaries
-                    rows = []
-                    for row in results:
-                        row_dict = {}
-                        for idx, col in enumerate(columns):
-                            row_dict[col] = row[idx]
-                        rows.append(row_dict)
-                else:
-                    rows = []
-                
+            result = await asyncio.to_thread(
+                run_guarded_select, sql_query, connection_factory=self.db_ops.engine.raw_connection
+            )
+            if not result["success"]:
                 return {
-                    "success": True,
-                    "columns": columns,
-                    "rows": rows,
-                    "row_count": len(rows)
+                    "success": False,
+                    "error": result["error"],
+                    "plan": result.get("plan"),
+                    "columns": [],
+                    "rows": []
                 }
+            
+            columns = result["columns"]
+            rows = [dict(zip(columns, row)) for row in result["rows"]]
+            
+            return {
+                "success": True,
+                "columns": columns,
+                "rows": rows,
+                "row_count": len(rows),
+                "plan": result["plan"],
+                "auto_limited": result["limited"]
+            }
                 
         except Exception as e:
             return {
@@ -671,6 +665,8 @@ WHERE LOWER(name) = LOWER('{field_name}')"""
             with self.db_ops.get_session() as session:
                 result = session.execute(text(sql_query))
                 session.commit()
+                # Counts (and, for DDL, the schema fingerprint) are now stale
+                self.table_stats.invalidate()
                 
                 rows_affected = result.rowcount if hasattr(result, 'rowcount') else 0
                 
@@ -712,9 +708,9 @@ async def home(request: Request, lang: str = Query("en")):
     })
 
 @app.get("/table/{table_name}", response_class=HTMLResponse)
-async def view_table(request: Request, table_name: str, days: int = Query(30)):
+async def view_table(request: Request, table_name: str, days: int = Query(30), exact: bool = Query(False)):
     """View table with time-based filtering"""
-    table_info = await explorer.get_table_info(table_name)
+    table_info = await explorer.get_table_info(table_name, exact=exact)
     table_data = await explorer.get_table_data_filtered(table_name, days=days)
     
     return templates.TemplateResponse("table_view.html", {
@@ -758,9 +754,9 @@ async def api_table_data(
     return await explorer.get_table_data_filtered(table_name, days, page, limit)
 
 @app.get("/api/table/{table_name}/info")
-async def api_table_info(table_name: str):
-    """API endpoint for table information"""
-    return await explorer.get_table_info(table_name)
+async def api_table_info(table_name: str, exact: bool = Query(False)):
+    """API endpoint for table information (exact=true runs COUNT(*))"""
+    return await explorer.get_table_info(table_name, exact=exact)
 
 @app.post("/api/ai-query")
 async def api_ai_query(query_description: str = Form(...)):
@@ -779,6 +775,23 @@ async def api_ai_query(query_description: str = Form(...)):
             "execution": {"success": False, "error": "Could not generate valid SQL query"}
         }
 
+@app.post("/api/ai-query/export")
+async def api_ai_query_export(sql_query: str = Form(...), format: str = Form("csv")):
+    """Stream the full result of an AI-generated query as CSV or NDJSON"""
+    if format not in EXPORT_FORMATS:
+        return JSONResponse(status_code=400, content={"success": False, "error": f"Unsupported export format: {format}"})
+    
+    try:
+        columns, rows = await asyncio.to_thread(explorer.open_ai_query_export, sql_query)
+    except Exception as e:
+        return JSONResponse(status_code=400, content={"success": False, "error": str(e)})
+    
+    return StreamingResponse(
+        stream_export(columns, rows, format),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{export_filename("ai_query", format)}"'}
+    )
+
 @app.get("/api/test-connection")
 async def test_connection():
     """Test database connection and show basic info"""
@@ -959,6 +972,8 @@ async def import_sql_file(file: UploadFile = File(...)):
                     if 'already exists' in error_msg:
                         continue
         
+        explorer.table_stats.invalidate()
+        
         return {
             "success": len(errors) == 0,
             "filename": file.filename,
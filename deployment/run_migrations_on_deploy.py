@@ -63,6 +63,126 @@ def run_task_management_migration():
         logger.error(f"Error running task management migration: {e}")
         return False
 
+def run_keyset_pagination_migration():
+    """Create the composite indexes used by cursor-paginated list APIs"""
+    db_manager = get_db_manager()
+    
+    try:
+        logger.info("Starting keyset pagination index migration...")
+        
+        migration_path = os.path.join(
+            os.path.dirname(os.path.dirname(__file__)),
+            'migrations',
+            '001_keyset_pagination_indexes.sql'
+        )
+        
+        with open(migration_path, 'r') as f:
+            migration_sql = f.read()
+        
+        db_manager.execute_query(migration_sql)
+        logger.info("Keyset pagination indexes created/verified")
+        return True
+        
+    except Exception as e:
+        logger.error(f"Error running keyset pagination migration: {e}")
+        return False
+
+def run_business_rollup_migration():
+    """Create the business dashboard rollup tables"""
+    db_manager = get_db_manager()
+    
+    try:
+        logger.info("Starting business dashboard rollup migration...")
+        
+        migration_path = os.path.join(
+            os.path.dirname(os.path.dirname(__file__)),
+            'migrations',
+            '002_business_dashboard_rollups.sql'
+        )
+        
+        with open(migration_path, 'r') as f:
+            migration_sql = f.read()
+        
+        db_manager.execute_query(migration_sql)
+        logger.info("Business dashboard rollup tables created/verified")
+        return True
+        
+    except Exception as e:
+        logger.error(f"Error running business rollup migration: {e}")
+        return False
+
+def run_farmer_search_migration():
+    """Create pg_trgm and the trigram indexes behind farmer search"""
+    db_manager = get_db_manager()
+    
+    try:
+        logger.info("Starting farmer search trigram migration...")
+        
+        migration_path = os.path.join(
+            os.path.dirname(os.path.dirname(__file__)),
+            'migrations',
+            '003_farmer_search_trgm.sql'
+        )
+        
+        with open(migration_path, 'r') as f:
+            migration_sql = f.read()
+        
+        db_manager.execute_query(migration_sql)
+        logger.info("Farmer search trigram indexes created/verified")
+        return True
+        
+    except Exception as e:
+        logger.error(f"Error running farmer search migration: {e}")
+        return False
+
+def run_geocode_cache_migration():
+    """Create the geocode cache table"""
+    db_manager = get_db_manager()
+    
+    try:
+        logger.info("Starting geocode cache migration...")
+        
+        migration_path = os.path.join(
+            os.path.dirname(os.path.dirname(__file__)),
+            'migrations',
+            '004_geocode_cache.sql'
+        )
+        
+        with open(migration_path, 'r') as f:
+            migration_sql = f.read()
+        
+        db_manager.execute_query(migration_sql)
+        logger.info("Geocode cache table created/verified")
+        return True
+        
+    except Exception as e:
+        logger.error(f"Error running geocode cache migration: {e}")
+        return False
+
+def run_whatsapp_inbound_migration():
+    """Create the inbound WhatsApp message log used in queue ingest mode"""
+    db_manager = get_db_manager()
+    
+    try:
+        logger.info("Starting WhatsApp inbound message migration...")
+        
+        migration_path = os.path.join(
+            os.path.dirname(os.path.dirname(__file__)),
+            'migrations',
+            '005_whatsapp_inbound_messages.sql'
+        )
+        
+        with open(migration_path, 'r') as f:
+            migration_sql = f.read()
+        
+        db_manager.execute_query(migration_sql)
+        logger.info("WhatsApp inbound message table created/verified")
+        return True
+        
+    except Exception as e:
+        logger.error(f"Error running WhatsApp inbound message migration: {e}")
+        return False
+
 def main():
     """Main migration runner"""
     # Wait for database to be ready
@@ -90,6 +210,31 @@ def main():
         logger.error("Task management migration failed")
         migrations_success = False
     
+    # Run keyset pagination index migration
+    if not run_keyset_pagination_migration():
+        logger.error("Keyset pagination migration failed")
+        migrations_success = False
+    
+    # Run business dashboard rollup migration
+    if not run_business_rollup_migration():
+        logger.error("Business rollup migration failed")
+        migrations_success = False
+    
+    # Run farmer search trigram index migration
+    if not run_farmer_search_migration():
+        logger.error("Farmer search migration failed")
+        migrations_success = False
+    
+    # Run geocode cache migration
+    if not run_geocode_cache_migration():
+        logger.error("Geocode cache migration failed")
+        migrations_success = False
+    
+    # Run WhatsApp inbound message log migration
+    if not run_whatsapp_inbound_migration():
+        logger.error("WhatsApp inbound message migration failed")
+        migrations_success = False
+    
     if migrations_success:
         logger.info("All migrations completed successfully!")
     else:
@@ -5,11 +5,15 @@ LLM Integration for Database Dashboard
 📜 Constitutional: LLM-first approach with mango compliance
 """
 
+import asyncio
 import os
 import json
 import re
 from typing import Optional, Dict, Any, List
 
+from modules.core.query_guard import RESET_TIMEOUT, QueryRejected, guard_query_async, timeout_statement
+from modules.core.schema_context import PromptTemplate, get_schema_context_provider
+
 # Try to import OpenAI, handle if not available
 try:
     from openai import AsyncOpenAI
@@ -18,111 +22,56 @@ except ImportError:
     OPENAI_AVAILABLE = False
     AsyncOpenAI = None
 
-# Initialize OpenAI client
-async def get_openai_client() -> Optional[Any]:
-    """Get OpenAI client with constitutional error handling"""
-    if not OPENAI_AVAILABLE:
-        return None
-        
-    api_key = os.getenv('OPENAI_API_KEY')
-    if not api_key:
-        return None
-    
-    try:
-        client = AsyncOpenAI(api_key=api_key)
-        return client
-    except Exception as e:
-        print(f"OpenAI client creation failed: {e}")
-        return None
+# Hand-maintained schema notes, used only when live introspection is unavailable
+FALLBACK_SCHEMA_NOTES = """### **CORE TABLES:**
 
-async def test_llm_connection() -> Dict[str, Any]:
-    """
-    Test LLM connection and basic functionality
-    🥭 Constitutional: Test with mango farmer scenario
-    """
-    
-    if not OPENAI_AVAILABLE:
-        return {
-            "status": "library_missing",
-            "error": "OpenAI library not installed",
-            "fix": "Add 'openai>=1.0.0' to requirements.txt",
-            "constitutional_compliance": "violated - no LLM library"
-        }
-    
-    client = await get_openai_client()
-    if not client:
-        return {
-            "status": "failed",
-            "error": "OpenAI API key not configured",
-            "fix": "Set OPENAI_API_KEY environment variable in AWS ECS",
-            "constitutional_compliance": "violated - no LLM available"
-        }
-    
-    try:
-        # Test basic LLM functionality
-        response = await client.chat.completions.create(
-            model="gpt-4",  # Using GPT-4 for better performance
-            messages=[
-                {
-                    "role": "system", 
-                    "content": "You are an agricultural AI assistant. Respond briefly to test connectivity."
-                },
-                {
-                    "role": "user", 
-                    "content": "Hello, can you help with farming questions?"
-                }
-            ],
-            max_tokens=50,
-            timeout=10
-        )
-        
-        return {
-            "status": "connected",
-            "model": "gpt-4",
-            "test_response": response.choices[0].message.content,
-            "constitutional_compliance": "compliant - LLM available for farmer queries"
-        }
-        
-    except Exception as e:
-        error_msg = str(e)
-        if "api_key" in error_msg.lower():
-            return {
-                "status": "auth_error",
-                "error": "Invalid API key",
-                "fix": "Check your OpenAI API key is correct",
-                "constitutional_compliance": "violated - authentication failed"
-            }
-        elif "quota" in error_msg.lower():
-            return {
-                "status": "quota_error",
-                "error": "API quota exceeded",
-                "fix": "Check your OpenAI account billing",
-                "constitutional_compliance": "violated - quota exceeded"
-            }
-        else:
-            return {
-                "status": "error",
-                "error": str(e)[:200],
-                "constitutional_compliance": "violated - LLM connection failed"
-            }
+**farmers** (4 records)
+- id, farm_name, manager_name, manager_last_name, city, country, phone, wa_phone_number, email, state_farm_number
 
-async def process_natural_language_query(query: str, farmer_context: Dict[str, Any] = None) -> Dict[str, Any]:
-    """
-    Process natural language database queries using LLM
-    🥭 Constitutional: Works for any language (Bulgarian mango farmers included)
-    """
-    
-    client = await get_openai_client()
-    if not client:
-        return {
-            "status": "unavailable",
-            "error": "LLM not available",
-            "fallback": "Please use standard buttons for now"
-        }
-    
-    try:
-        # Build context-aware prompt
-        system_prompt = """# 🧠 WORLD'S BEST AGRICULTURAL DATABASE QUERY GENERATOR
+**fields** (53 records) 
+- id, farmer_id (FK to farmers.id), field_name, area_ha, latitude, longitude, country, notes, blok_id, raba
+
+**field_crops** (46 records)
+- id, field_id (FK to fields.id), start_year_int, crop_name, variety, expected_yield_t_ha, start_date, end_date
+
+**tasks** (194 records) - **KEY FOR COMPLEX QUERIES**
+- id, task_type, description, quantity, date_performed, status, inventory_id, notes, crop_name, machinery_id, rate_per_ha, rate_unit
+
+**task_fields** (junction table)
+- task_id (FK to tasks.id), field_id (FK to fields.id)
+
+**inventory** (49 records) - **MATERIALS/PRODUCTS**
+- id, farmer_id, material_id, quantity, unit, purchase_date, purchase_price, notes
+
+**material_catalog** (40 records) - **PRODUCT NAMES**
+- id, name, brand, group_name, formulation, unit, notes
+
+**inventory_deductions** (128 records) - **USAGE TRACKING**
+- id, task_id, inventory_id, quantity_used, created_at
+
+**fertilizers** (10 records)
+- id, product_name, npk_composition, producer, country
+
+**cp_products** (1 record) - **CROP PROTECTION PRODUCTS**
+- id, product_name, application_rate, target_issue, approved_crops, dose, pre_harvest_interval, country
+
+**crop_technology** (60 records) - **BEST PRACTICES**
+- id, crop_name, stage, action, timing, inputs, notes
+
+**fertilizing_plans** (15 records)
+- field_id, year, crop_name, p2o5_kg_ha, k2o_kg_ha, n_kg_ha, fertilizer_recommendation
+
+**incoming_messages** (73 records) - **FARMER COMMUNICATIONS**
+- id, farmer_id, phone_number, message_text, timestamp, role
+
+**weather_data** (3 records)
+- id, field_id, fetch_date, current_temp_c, current_soil_temp_10cm_c, current_precip_mm, forecast
+
+**field_soil_data** (soil analysis results)
+- field_id, analysis_date, ph, p2o5_mg_100g, k2o_mg_100g, organic_matter_percent, analysis_institution"""
+
+# Parsed once at import; the live schema digest is bound once per schema fingerprint
+NL_QUERY_SYSTEM_TEMPLATE = PromptTemplate("""# 🧠 WORLD'S BEST AGRICULTURAL DATABASE QUERY GENERATOR
 
 You are the **ULTIMATE AI AGRICULTURAL SQL EXPERT** - combining the knowledge of a master agronomist, database architect, and farming operations specialist.
 
@@ -165,52 +114,9 @@ WHERE t.date_performed <= (
 
 ## 📊 **COMPLETE DATABASE STRUCTURE**
 
-### **CORE TABLES:**
-
-**farmers** (4 records)
-- id, farm_name, manager_name, manager_last_name, city, country, phone, wa_phone_number, email, state_farm_number
-
-**fields** (53 records) 
-- id, farmer_id (FK to farmers.id), field_name, area_ha, latitude, longitude, country, notes, blok_id, raba
-
-**field_crops** (46 records)
-- id, field_id (FK to fields.id), start_year_int, crop_name, variety, expected_yield_t_ha, start_date, end_date
-
-**tasks** (194 records) - **KEY FOR COMPLEX QUERIES**
-- id, task_type, description, quantity, date_performed, status, inventory_id, notes, crop_name, machinery_id, rate_per_ha, rate_unit
-
-**task_fields** (junction table)
-- task_id (FK to tasks.id), field_id (FK to fields.id)
-
-**inventory** (49 records) - **MATERIALS/PRODUCTS**
-- id, farmer_id, material_id, quantity, unit, purchase_date, purchase_price, notes
-
-**material_catalog** (40 records) - **PRODUCT NAMES**
-- id, name, brand, group_name, formulation, unit, notes
-
-**inventory_deductions** (128 records) - **USAGE TRACKING**
-- id, task_id, inventory_id, quantity_used, created_at
-
-**fertilizers** (10 records)
-- id, product_name, npk_composition, producer, country
-
-**cp_products** (1 record) - **CROP PROTECTION PRODUCTS**
-- id, product_name, application_rate, target_issue, approved_crops, dose, pre_harvest_interval, country
-
-**crop_technology** (60 records) - **BEST PRACTICES**
-- id, crop_name, stage, action, timing, inputs, notes
+Columns marked PK are primary keys; `column→table` marks a foreign key.
 
-**fertilizing_plans** (15 records)
-- field_id, year, crop_name, p2o5_kg_ha, k2o_kg_ha, n_kg_ha, fertilizer_recommendation
-
-**incoming_messages** (73 records) - **FARMER COMMUNICATIONS**
-- id, farmer_id, phone_number, message_text, timestamp, role
-
-**weather_data** (3 records)
-- id, field_id, fetch_date, current_temp_c, current_soil_temp_10cm_c, current_precip_mm, forecast
-
-**field_soil_data** (soil analysis results)
-- field_id, analysis_date, ph, p2o5_mg_100g, k2o_mg_100g, organic_matter_percent, analysis_institution
+{schema}
 
 ## 📊 ULTIMATE QUERY PATTERNS
 
@@ -481,11 +387,11 @@ Include validation context when helpful:
 
 ```sql
 -- Valid international format check:
-WHERE wa_phone_number ~ '^\\+[1-9]\\d{1,14}$'
+WHERE wa_phone_number ~ '^\\+[1-9]\\d{{1,14}}$'
 
 -- Incomplete/invalid numbers:
 WHERE wa_phone_number IS NULL OR wa_phone_number = '' 
-   OR NOT (wa_phone_number ~ '^\\+[1-9]\\d{1,14}$')
+   OR NOT (wa_phone_number ~ '^\\+[1-9]\\d{{1,14}}$')
 
 -- Missing WhatsApp but has phone:
 WHERE (wa_phone_number IS NULL OR wa_phone_number = '') 
@@ -689,7 +595,116 @@ If farmer context is provided, use it:
 
 **REMEMBER**: You are the ultimate agricultural database expert - understanding farming operations like a master agronomist, optimizing queries like a database architect, and caring about farmers' success like family! 
 
-Every query should help farmers make better decisions, increase yields, reduce costs, and grow the best crops possible! 🌾💚"""
+Every query should help farmers make better decisions, increase yields, reduce costs, and grow the best crops possible! 🌾💚""")
+
+# Initialize OpenAI client
+async def get_openai_client() -> Optional[Any]:
+    """Get OpenAI client with constitutional error handling"""
+    if not OPENAI_AVAILABLE:
+        return None
+        
+    api_key = os.getenv('OPENAI_API_KEY')
+    if not api_key:
+        return None
+    
+    try:
+        client = AsyncOpenAI(api_key=api_key)
+        return client
+    except Exception as e:
+        print(f"OpenAI client creation failed: {e}")
+        return None
+
+async def test_llm_connection() -> Dict[str, Any]:
+    """
+    Test LLM connection and basic functionality
+    🥭 Constitutional: Test with mango farmer scenario
+    """
+    
+    if not OPENAI_AVAILABLE:
+        return {
+            "status": "library_missing",
+            "error": "OpenAI library not installed",
+            "fix": "Add 'openai>=1.0.0' to requirements.txt",
+            "constitutional_compliance": "violated - no LLM library"
+        }
+    
+    client = await get_openai_client()
+    if not client:
+        return {
+            "status": "failed",
+            "error": "OpenAI API key not configured",
+            "fix": "Set OPENAI_API_KEY environment variable in AWS ECS",
+            "constitutional_compliance": "violated - no LLM available"
+        }
+    
+    try:
+        # Test basic LLM functionality
+        response = await client.chat.completions.create(
+            model="gpt-4",  # Using GPT-4 for better performance
+            messages=[
+                {
+                    "role": "system", 
+                    "content": "You are an agricultural AI assistant. Respond briefly to test connectivity."
+                },
+                {
+                    "role": "user", 
+                    "content": "Hello, can you help with farming questions?"
+                }
+            ],
+            max_tokens=50,
+            timeout=10
+        )
+        
+        return {
+            "status": "connected",
+            "model": "gpt-4",
+            "test_response": response.choices[0].message.content,
+            "constitutional_compliance": "compliant - LLM available for farmer queries"
+        }
+        
+    except Exception as e:
+        error_msg = str(e)
+        if "api_key" in error_msg.lower():
+            return {
+                "status": "auth_error",
+                "error": "Invalid API key",
+                "fix": "Check your OpenAI API key is correct",
+                "constitutional_compliance": "violated - authentication failed"
+            }
+        elif "quota" in error_msg.lower():
+            return {
+                "status": "quota_error",
+                "error": "API quota exceeded",
+                "fix": "Check your OpenAI account billing",
+                "constitutional_compliance": "violated - quota exceeded"
+            }
+        else:
+            return {
+                "status": "error",
+                "error": str(e)[:200],
+                "constitutional_compliance": "violated - LLM connection failed"
+            }
+
+async def process_natural_language_query(query: str, farmer_context: Dict[str, Any] = None) -> Dict[str, Any]:
+    """
+    Process natural language database queries using LLM
+    🥭 Constitutional: Works for any language (Bulgarian mango farmers included)
+    """
+    
+    client = await get_openai_client()
+    if not client:
+        return {
+            "status": "unavailable",
+            "error": "LLM not available",
+            "fallback": "Please use standard buttons for now"
+        }
+    
+    try:
+        # Build context-aware prompt (schema digest is cached; DB is only touched on a fingerprint check)
+        system_prompt = await asyncio.to_thread(
+            get_schema_context_provider().render, NL_QUERY_SYSTEM_TEMPLATE,
+            fallback_schema=FALLBACK_SCHEMA_NOTES
+        )
 
         # Add farmer context if provided
         user_message = query
@@ -764,10 +779,19 @@ def extract_sql_from_response(llm_response: str) -> Optional[str]:
     except Exception:
         return None
 
+def _script_statements(sql_upper: str) -> List[str]:
+    """Statements of a (possibly multi-statement) script, comment lines dropped"""
+    lines = [line for line in sql_upper.splitlines() if not line.strip().startswith('--')]
+    return [statement.strip() for statement in '\n'.join(lines).split(';') if statement.strip()]
+
 async def execute_llm_generated_query(sql_query: str, conn) -> Dict[str, Any]:
     """
     Execute LLM-generated SQL query with safety checks
     🛡️ Constitutional: Error isolation and safety
+
+    The statement is planned first and rejected (or LIMITed) if its estimated
+    cost/rows exceed the query guard budget; it then runs under a
+    statement_timeout, in a READ ONLY transaction for SELECTs.
     """
     
     if not sql_query:
@@ -786,11 +810,13 @@ async def execute_llm_generated_query(sql_query: str, conn) -> Dict[str, Any]:
     elif sql_upper.startswith('BEGIN'):
         operation_type = "TRANSACTION"
     
-    # Safety check: Block dangerous operations without WHERE clause
-    if operation_type in ['UPDATE', 'DELETE']:
-        if 'WHERE' not in sql_upper:
+    # Safety check: Block dangerous operations without WHERE clause,
+    # including those wrapped in a BEGIN ... COMMIT script
+    for statement in _script_statements(sql_upper):
+        statement_type = statement.split(None, 1)[0]
+        if statement_type in ['UPDATE', 'DELETE'] and 'WHERE' not in statement:
             return {
-                "error": f"{operation_type} without WHERE clause is too dangerous",
+                "error": f"{statement_type} without WHERE clause is too dangerous",
                 "requires_confirmation": True,
                 "operation_type": operation_type
             }
@@ -807,17 +833,38 @@ async def execute_llm_generated_query(sql_query: str, conn) -> Dict[str, Any]:
         
         # For SELECT queries, use fetch
         if operation_type == "SELECT":
-            result = await conn.fetch(sql_query)
+            async with conn.transaction(readonly=True):
+                await conn.execute(timeout_statement())
+                guarded = await guard_query_async(sql_query, conn.fetchval)
+                result = await conn.fetch(guarded.sql)
             return {
                 "status": "success",
                 "operation_type": operation_type,
-                "sql_executed": sql_query,
+                "sql_executed": guarded.sql,
                 "row_count": len(result),
-                "data": [dict(row) for row in result[:100]]  # Limit to 100 rows
+                "data": [dict(row) for row in result[:100]],  # Limit to 100 rows
+                "plan": guarded.stats._asdict(),
+                "auto_limited": guarded.limited
             }
         else:
-            # For INSERT, UPDATE, DELETE, use execute
-            result = await conn.execute(sql_query)
+            # For INSERT, UPDATE, DELETE, use execute (planned first; never auto-limited).
+            # Explicit BEGIN ... COMMIT scripts manage their own transaction and
+            # cannot be EXPLAINed as a whole, so they run under a session-level
+            # statement_timeout that is reset afterwards.
+            if operation_type == "TRANSACTION":
+                await conn.execute(timeout_statement(local=False))
+                try:
+                    result = await conn.execute(sql_query)
+                finally:
+                    # A failed or unterminated script must not leave its transaction open
+                    if conn.is_in_transaction():
+                        await conn.execute("ROLLBACK")
+                    await conn.execute(RESET_TIMEOUT)
+            else:
+                async with conn.transaction():
+                    await conn.execute(timeout_statement())
+                    guarded = await guard_query_async(sql_query, conn.fetchval)
+                    result = await conn.execute(guarded.sql)
             # Extract affected rows count from result string
             affected_rows = 0
             if result:
@@ -834,6 +881,14 @@ async def execute_llm_generated_query(sql_query: str, conn) -> Dict[str, Any]:
                 "message": f"{operation_type} executed successfully"
             }
         
+    except QueryRejected as e:
+        return {
+            "status": "rejected",
+            "operation_type": operation_type,
+            "sql_attempted": sql_query,
+            "error": str(e),
+            "plan": e.stats._asdict() if e.stats else None
+        }
     except Exception as e:
         return {
             "status": "error",
@@ -3,11 +3,13 @@ Constitutional LLM-first query handler for database explorer
 Following AVA OLO Constitution Principle 3: LLM Intelligence First
 Enhanced with farming context intelligence and entity relationship understanding
 """
+import asyncio
 import os
 import logging
 import re
 from typing import Dict, Any, Optional, List, Tuple
-from sqlalchemy import inspect
+
+from modules.core.schema_context import PromptTemplate, get_schema_context_provider
 
 # Try to import OpenAI, but make it optional
 try:
@@ -19,6 +21,88 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# Parsed once; {schema} is bound to the shared schema digest per fingerprint
+ENHANCED_PROMPT = PromptTemplate("""You are an agricultural database expert. Generate PostgreSQL queries with deep understanding of farming relationships.
+
+CRITICAL FARMING ENTITY RELATIONSHIPS:
+- Farmers OWN fields (farmers.id → fields.farmer_id)
+- Fields CONTAIN crops (fields.id → field_crops.field_id)
+- Farmers PERFORM tasks (via fields: farmers.id → fields.farmer_id → tasks.field_id)
+- Tasks happen ON fields (tasks.field_id → fields.id)
+
+SEMANTIC INTERPRETATION RULES:
+- "fields of [PersonName]" = Find farmer named PersonName, then list their fields
+- "crops of [PersonName]" = Find farmer's fields, then crops in those fields
+- "tasks by [PersonName]" = Find farmer's tasks through their fields
+- "[PersonName]'s farm" = All data related to that farmer
+- Person names in queries usually refer to farmers (manager_name or manager_last_name columns)
+
+DATABASE SCHEMA:
+{schema}
+
+QUERY ANALYSIS:
+- Original Query: "{original_query}"
+- Detected Potential Farmer Names: {potential_farmer_names}
+- Detected Relationship Type: {relationship_type}
+- Likely Involves Farmer Lookup: {involves_farmer_lookup}
+
+IMPORTANT EXAMPLES:
+- "list fields of Edi Kante" should generate:
+  SELECT f.* FROM fields f 
+  JOIN farmers farm ON f.farmer_id = farm.id 
+  WHERE farm.manager_name ILIKE '%Edi%' 
+  AND farm.manager_last_name ILIKE '%Kante%'
+  
+- "what are edi kante's fields" should generate:
+  SELECT f.field_name, f.area_ha FROM fields f 
+  JOIN farmers farm ON f.farmer_id = farm.id 
+  WHERE farm.manager_name ILIKE '%edi%' 
+  AND farm.manager_last_name ILIKE '%kante%'
+
+- "show crops for Peter" should generate:
+  SELECT fc.*, f.field_name FROM field_crops fc 
+  JOIN fields f ON fc.field_id = f.id 
+  JOIN farmers farm ON f.farmer_id = farm.id 
+  WHERE farm.manager_name ILIKE '%Peter%'
+
+CRITICAL RULES FOR NAME MATCHING:
+1. NEVER use exact match (=) for person names - ALWAYS use ILIKE '%name%'
+2. NEVER use lowercase exact match like = 'edi' - ALWAYS use ILIKE '%edi%'
+3. Person names are CASE-INSENSITIVE - always use ILIKE, not =
+4. Example: WHERE manager_name ILIKE '%edi%' NOT WHERE manager_name = 'edi'
+
+ADDITIONAL RULES:
+1. Only generate SELECT queries (no modifications)
+2. When searching for person names, ALWAYS use ILIKE with % wildcards
+3. Handle both English and Slovenian terms (kmet=farmer, polje=field, pridelek=crop)
+4. Include appropriate JOINs when relationships are implied
+5. Add ORDER BY and LIMIT where appropriate
+6. Search in manager_name and manager_last_name columns for person names
+
+Generate the SQL query (ONLY the query, no explanations):""")
+
+BASIC_PROMPT = PromptTemplate("""You are an expert PostgreSQL query generator for an agricultural system.
+
+Database Schema:
+{schema}
+
+User Request: {description}
+
+Generate a PostgreSQL query following these rules:
+1. Only generate SELECT queries (no modifications)
+2. Use proper JOINs when needed
+3. Handle both English and Slovenian requests
+4. Common Slovenian agricultural terms:
+   - kmet/kmeti = farmer/farmers
+   - polje/parcela = field
+   - sporočilo = message
+   - naloga = task
+   - pridelek = crop
+5. Add appropriate ORDER BY and LIMIT clauses
+6. Return ONLY the SQL query, no explanations
+
+SQL Query:""")
+
 class LLMQueryHandler:
     """LLM-based SQL query generation with farming context intelligence"""
     
@@ -137,20 +221,8 @@ class LLMQueryHandler:
             }
     
     async def _get_schema_context(self) -> str:
-        """Get database schema for LLM context"""
-        with self.db_ops.get_session() as session:
-            inspector = inspect(session.bind)
-            
-            schema_info = []
-            for table_name in inspector.get_table_names():
-                columns = []
-                for col in inspector.get_columns(table_name):
-                    col_type = str(col['type']).split('(')[0]  # Simplify type
-                    columns.append(f"{col['name']} ({col_type})")
-                
-                schema_info.append(f"Table {table_name}: {', '.join(columns)}")
-            
-            return "\n".join(schema_info)
+        """Get database schema for LLM context (shared digest, re-introspected only after DDL changes)"""
+        return await asyncio.to_thread(get_schema_context_provider().get_schema_text)
     
     async def _llm_generate_sql_enhanced(self, preprocessed: Dict[str, Any]) -> Dict[str, Any]:
         """Generate SQL using OpenAI GPT with enhanced farming context intelligence"""
@@ -208,91 +280,21 @@ class LLMQueryHandler:
     
     def _build_enhanced_prompt(self, preprocessed: Dict[str, Any]) -> str:
         """Build enhanced prompt with farming context intelligence"""
-        prompt = f"""You are an agricultural database expert. Generate PostgreSQL queries with deep understanding of farming relationships.
-
-CRITICAL FARMING ENTITY RELATIONSHIPS:
-- Farmers OWN fields (farmers.id → fields.farmer_id)
-- Fields CONTAIN crops (fields.id → field_crops.field_id)
-- Farmers PERFORM tasks (via fields: farmers.id → fields.farmer_id → tasks.field_id)
-- Tasks happen ON fields (tasks.field_id → fields.id)
-
-SEMANTIC INTERPRETATION RULES:
-- "fields of [PersonName]" = Find farmer named PersonName, then list their fields
-- "crops of [PersonName]" = Find farmer's fields, then crops in those fields
-- "tasks by [PersonName]" = Find farmer's tasks through their fields
-- "[PersonName]'s farm" = All data related to that farmer
-- Person names in queries usually refer to farmers (manager_name or manager_last_name columns)
-
-DATABASE SCHEMA:
-{preprocessed['schema_context']}
-
-QUERY ANALYSIS:
-- Original Query: "{preprocessed['original_query']}"
-- Detected Potential Farmer Names: {preprocessed['potential_farmer_names']}
-- Detected Relationship Type: {preprocessed['relationship_type']}
-- Likely Involves Farmer Lookup: {preprocessed['involves_farmer_lookup']}
-
-IMPORTANT EXAMPLES:
-- "list fields of Edi Kante" should generate:
-  SELECT f.* FROM fields f 
-  JOIN farmers farm ON f.farmer_id = farm.id 
-  WHERE farm.manager_name ILIKE '%Edi%' 
-  AND farm.manager_last_name ILIKE '%Kante%'
-  
-- "what are edi kante's fields" should generate:
-  SELECT f.field_name, f.area_ha FROM fields f 
-  JOIN farmers farm ON f.farmer_id = farm.id 
-  WHERE farm.manager_name ILIKE '%edi%' 
-  AND farm.manager_last_name ILIKE '%kante%'
-
-- "show crops for Peter" should generate:
-  SELECT fc.*, f.field_name FROM field_crops fc 
-  JOIN fields f ON fc.field_id = f.id 
-  JOIN farmers farm ON f.farmer_id = farm.id 
-  WHERE farm.manager_name ILIKE '%Peter%'
-
-CRITICAL RULES FOR NAME MATCHING:
-1. NEVER use exact match (=) for person names - ALWAYS use ILIKE '%name%'
-2. NEVER use lowercase exact match like = 'edi' - ALWAYS use ILIKE '%edi%'
-3. Person names are CASE-INSENSITIVE - always use ILIKE, not =
-4. Example: WHERE manager_name ILIKE '%edi%' NOT WHERE manager_name = 'edi'
-
-ADDITIONAL RULES:
-1. Only generate SELECT queries (no modifications)
-2. When searching for person names, ALWAYS use ILIKE with % wildcards
-3. Handle both English and Slovenian terms (kmet=farmer, polje=field, pridelek=crop)
-4. Include appropriate JOINs when relationships are implied
-5. Add ORDER BY and LIMIT where appropriate
-6. Search in manager_name and manager_last_name columns for person names
-
-Generate the SQL query (ONLY the query, no explanations):"""
-        
-        return prompt
+        return get_schema_context_provider().render(
+            ENHANCED_PROMPT,
+            fallback_schema=preprocessed['schema_context'],
+            original_query=preprocessed['original_query'],
+            potential_farmer_names=preprocessed['potential_farmer_names'],
+            relationship_type=preprocessed['relationship_type'],
+            involves_farmer_lookup=preprocessed['involves_farmer_lookup']
+        )
     
     async def _llm_generate_sql_basic(self, description: str, schema_context: str) -> Dict[str, Any]:
         """Fallback to basic LLM SQL generation (original method)"""
         try:
-            prompt = f"""You are an expert PostgreSQL query generator for an agricultural system.
-
-Database Schema:
-{schema_context}
-
-User Request: {description}
-
-Generate a PostgreSQL query following these rules:
-1. Only generate SELECT queries (no modifications)
-2. Use proper JOINs when needed
-3. Handle both English and Slovenian requests
-4. Common Slovenian agricultural terms:
-   - kmet/kmeti = farmer/farmers
-   - polje/parcela = field
-   - sporočilo = message
-   - naloga = task
-   - pridelek = crop
-5. Add appropriate ORDER BY and LIMIT clauses
-6. Return ONLY the SQL query, no explanations
-
-SQL Query:"""
+            prompt = get_schema_context_provider().render(
+                BASIC_PROMPT, fallback_schema=schema_context, description=description
+            )
 
             response = await self.openai_client.ChatCompletion.acreate(
                 model="gpt-4",
@@ -10,7 +10,7 @@ import logging
 import asyncio
 from fastapi import FastAPI, Request, Depends
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse, RedirectResponse, FileResponse
+from fastapi.responses import HTMLResponse, RedirectResponse, FileResponse, JSONResponse
 from fastapi.templating import Jinja2Templates
 
 # Set up logger
@@ -23,71 +23,15 @@ templates = Jinja2Templates(directory="templates")
 from modules.core.config import VERSION, BUILD_ID, constitutional_deployment_completion, config
 from modules.core.language_service import get_language_service
 from modules.core.translations import get_translations
-from modules.api.health_routes import router as health_router
 
 # Startup modules
 from modules.core.startup_validator import StartupValidator
+from modules.core.startup_orchestrator import StartupOrchestrator
 from modules.core.api_key_manager import APIKeyManager
 from modules.core.database_manager import get_db_manager
 
-# Core routers
-from modules.api.deployment_routes import router as deployment_router, audit_router
-from modules.api.database_routes import router as database_router, agricultural_router, debug_router
-from modules.api.business_routes import router as business_router
-# Dashboard routes moved to monitoring-dashboards service
-from modules.api.deployment_webhook import router as webhook_router
-from modules.api.system_routes import router as system_router
-from modules.api.debug_services import router as debug_services_router
-from modules.api.debug_deployment import router as debug_deployment_router
-from modules.api.code_status import router as code_status_router
-from modules.auth.routes import router as auth_router
-from modules.weather.routes import router as weather_router
-from modules.api.farmer_dashboard_routes import router as farmer_dashboard_router
-from modules.api.fix_language_routes import router as fix_language_router
-from modules.api.weather_location_routes import router as weather_location_router
-
-# CAVA routers
-from modules.cava.routes import router as cava_router
-
-# Chat routers
-from modules.api.chat_routes import router as chat_router
-from modules.api.chat_history_routes import router as chat_history_router
-from modules.api.dashboard_chat_routes import router as dashboard_chat_router
-
-# WhatsApp integration
-from modules.whatsapp.webhook_handler import router as whatsapp_router
-
-# Migration routes (temporary)
-from modules.api.migration_location_routes import router as migration_router
-
-# Diagnostic routes for IP detection
-from modules.api.diagnostic_routes import router as diagnostic_router
-from modules.api.debug_chat_routes import router as debug_chat_router
-from modules.api.db_query_route import router as db_query_router
-from modules.api.db_inspect_route import router as db_inspect_router
-from modules.api.direct_db_check import router as direct_db_router
-
-# Fix routes
-from modules.api.fix_farmer_whatsapp import router as fix_whatsapp_router
-from modules.api.fix_whatsapp_auto import router as fix_auto_router
-from modules.api.create_edi_route import router as create_edi_router
-
-# Database initialization routes
-from modules.api.database_init_routes import router as db_init_router
-from modules.api.database_fix_routes import router as db_fix_router
-from modules.api.check_edi_messages import router as check_edi_router
-from modules.api.test_message_save import router as test_save_router
-from modules.api.check_edi_fields import router as check_fields_router
-from modules.api.check_fields_table import router as check_table_router
-
-# Dashboards landing page and database dashboard
-from modules.api.dashboards_landing_route import router as dashboards_landing_router
-from modules.api.database_dashboard_routes import router as database_dashboard_router
-from modules.api.database_explorer_routes import router as database_explorer_router
-from modules.api.llm_query_routes import router as llm_query_router
-
-# Unified farmer data API
-from modules.api.farmer_data_api import router as farmer_data_api_router
+# Router feature groups, imported by profile or on first request
+from modules.core.router_registry import ROUTER_PROFILE, LazyRouterMiddleware, RouterRegistry, RouterSpec
 
 # Global authentication middleware
 from modules.core.global_auth import GlobalAuthMiddleware
@@ -95,7 +39,18 @@ from modules.core.global_auth import GlobalAuthMiddleware
 # Create FastAPI app
 app = FastAPI(title="AVA OLO Agricultural Core", version=VERSION)
 
+# Routers are grouped by feature: ROUTER_PROFILE=production imports "core"
+# at startup and loads "debug"/"maintenance" on the first request under
+# their paths; ROUTER_PROFILE=diagnostics imports everything up front
+routers = RouterRegistry(app, profiles={
+    "production": ["core"],
+    "diagnostics": ["core", "debug", "maintenance"]
+})
+app.state.router_registry = routers
+app.add_middleware(LazyRouterMiddleware, registry=routers)
+
 # Add global authentication middleware - this MUST protect everything
+# (added last, so it runs before lazy router loading)
 app.add_middleware(GlobalAuthMiddleware)
 
 # Mount static files
@@ -170,6 +125,23 @@ async def root(request: Request):
 async def health():
     return {"status": "healthy", "version": VERSION}
 
+# Liveness: the process is up and the event loop responds
+@app.get("/health/live")
+async def health_live():
+    return {"status": "alive", "version": VERSION}
+
+# Readiness: required startup phases succeeded and the database still answers
+@app.get("/health/ready")
+async def health_ready():
+    from modules.core.canary import get_canary
+    report = startup.report()
+    database_live = get_canary().liveness.get("database", {}).get("ok", True)
+    ready = report["ready"] and database_live
+    return JSONResponse(
+        {"status": "ready" if ready else "not_ready", "version": VERSION, "startup": report},
+        status_code=200 if ready else 503
+    )
+
 # Test endpoint for debugging
 @app.get("/test-simple")
 async def test_simple():
@@ -297,105 +269,163 @@ async def minimal_signin_test(request: Request):
         }
 
 # Include all routers
-app.include_router(health_router)
-app.include_router(deployment_router)
-app.include_router(audit_router)
-app.include_router(database_router)
-app.include_router(agricultural_router)
-app.include_router(debug_router)
-app.include_router(business_router)
-app.include_router(dashboards_landing_router)
-app.include_router(database_dashboard_router)
-app.include_router(database_explorer_router)
-app.include_router(llm_query_router)
-# Dashboard routers moved to monitoring-dashboards service
-app.include_router(webhook_router)
-app.include_router(system_router)
-app.include_router(debug_services_router)
-app.include_router(debug_deployment_router)
-app.include_router(code_status_router)
-app.include_router(auth_router)
-app.include_router(weather_router)
-app.include_router(farmer_dashboard_router)
-app.include_router(fix_language_router)
-app.include_router(weather_location_router)
-app.include_router(cava_router)
-app.include_router(chat_router)
-app.include_router(chat_history_router)
-# Also mount chat router at /api/v1 for backward compatibility with dashboard
-app.include_router(chat_router, prefix="/api/v1")
-app.include_router(dashboard_chat_router)
-app.include_router(whatsapp_router)
-app.include_router(migration_router)
-app.include_router(diagnostic_router)
-app.include_router(debug_chat_router)
-app.include_router(db_query_router)
-app.include_router(db_inspect_router)
-app.include_router(direct_db_router)
-app.include_router(fix_whatsapp_router)
-app.include_router(fix_auto_router)
-app.include_router(create_edi_router)
-app.include_router(db_init_router)
-app.include_router(db_fix_router)
-app.include_router(check_edi_router)
-app.include_router(test_save_router)
-app.include_router(check_fields_router)
-app.include_router(check_table_router)
-
-# Add unified farmer data API
-app.include_router(farmer_data_api_router)
-
-# Add debug Edi route
-from modules.api.debug_edi_route import router as debug_edi_router
-app.include_router(debug_edi_router)
-
-# Add field_crops debug route
-from modules.api.debug_field_crops import router as debug_crops_router
-app.include_router(debug_crops_router)
-
-# Add field data debug route
-from modules.api.debug_field_data import router as debug_field_data_router
-app.include_router(debug_field_data_router)
-
-# Add welcome package debug route (disabled - has import issues)
-# from modules.api.debug_welcome_package import router as debug_welcome_router
-# app.include_router(debug_welcome_router)
-
-# Add simple cache debug route
-from modules.api.debug_cache_simple import router as debug_cache_router
-app.include_router(debug_cache_router)
-
-# Add test logging route
-from modules.api.test_logging import router as test_logging_router
-app.include_router(test_logging_router, prefix="/api")
-
-# Add Redis debug route
-from modules.api.redis_debug_route import router as redis_debug_router
-app.include_router(redis_debug_router)
-
-STARTUP_STATUS["total_routers_included"] = 36
+routers.add_group("core", [
+    RouterSpec("modules.api.health_routes"),
+    RouterSpec("modules.api.deployment_routes"),
+    RouterSpec("modules.api.deployment_routes", "audit_router"),
+    RouterSpec("modules.api.database_routes"),
+    RouterSpec("modules.api.database_routes", "agricultural_router"),
+    RouterSpec("modules.api.database_routes", "debug_router"),
+    RouterSpec("modules.api.business_routes"),
+    # Dashboards landing page and database dashboard
+    RouterSpec("modules.api.dashboards_landing_route"),
+    RouterSpec("modules.api.database_dashboard_routes"),
+    RouterSpec("modules.api.database_explorer_routes"),
+    RouterSpec("modules.api.llm_query_routes"),
+    # Dashboard routers moved to monitoring-dashboards service
+    RouterSpec("modules.api.deployment_webhook"),
+    RouterSpec("modules.api.system_routes"),
+    RouterSpec("modules.api.code_status"),
+    RouterSpec("modules.auth.routes"),
+    RouterSpec("modules.weather.routes"),
+    RouterSpec("modules.api.farmer_dashboard_routes"),
+    RouterSpec("modules.api.weather_location_routes"),
+    # CAVA and chat
+    RouterSpec("modules.cava.routes"),
+    RouterSpec("modules.api.chat_routes"),
+    RouterSpec("modules.api.chat_history_routes"),
+    # Also mount chat router at /api/v1 for backward compatibility with dashboard
+    RouterSpec("modules.api.chat_routes", prefix="/api/v1"),
+    RouterSpec("modules.api.dashboard_chat_routes"),
+    # WhatsApp integration
+    RouterSpec("modules.whatsapp.webhook_handler"),
+    # Unified farmer data API
+    RouterSpec("modules.api.farmer_data_api"),
+])
+
+# Debug, diagnostic and test endpoints
+routers.add_group("debug", [
+    RouterSpec("modules.api.debug_services"),
+    RouterSpec("modules.api.debug_deployment"),
+    # Diagnostic routes for IP detection
+    RouterSpec("modules.api.diagnostic_routes"),
+    RouterSpec("modules.api.debug_chat_routes"),
+    RouterSpec("modules.api.db_query_route"),
+    RouterSpec("modules.api.db_inspect_route"),
+    RouterSpec("modules.api.direct_db_check"),
+    RouterSpec("modules.api.check_edi_messages"),
+    RouterSpec("modules.api.test_message_save"),
+    RouterSpec("modules.api.check_edi_fields"),
+    RouterSpec("modules.api.check_fields_table"),
+    RouterSpec("modules.api.debug_edi_route"),
+    RouterSpec("modules.api.debug_field_crops"),
+    RouterSpec("modules.api.debug_field_data"),
+    # Welcome package debug route (disabled - has import issues)
+    # RouterSpec("modules.api.debug_welcome_package"),
+    RouterSpec("modules.api.debug_cache_simple"),
+    RouterSpec("modules.api.test_logging", prefix="/api"),
+    RouterSpec("modules.api.redis_debug_route"),
+], paths=[
+    "/api/v1/debug", "/api/v1/chat/test", "/api/debug", "/diagnostic", "/debug",
+    "/db", "/dbcheck", "/test", "/api/test"
+])
+
+# One-off fixes, migrations and database initialisation
+routers.add_group("maintenance", [
+    RouterSpec("modules.api.fix_language_routes"),
+    # Migration routes (temporary)
+    RouterSpec("modules.api.migration_location_routes"),
+    RouterSpec("modules.api.fix_farmer_whatsapp"),
+    RouterSpec("modules.api.fix_whatsapp_auto"),
+    RouterSpec("modules.api.create_edi_route"),
+    RouterSpec("modules.api.database_init_routes"),
+    RouterSpec("modules.api.database_fix_routes"),
+], paths=["/api/fix", "/api/migrations", "/fix", "/api/v1/db", "/api/v1/db-fix"])
+
+STARTUP_STATUS["router_groups"] = routers.load_profile(ROUTER_PROFILE)
+STARTUP_STATUS["total_routers_included"] = routers.routers_included
+
+# Startup warm-ups, run concurrently in the background so the app serves
+# /health/live immediately and /health/ready once the required phases pass
+startup = StartupOrchestrator()
+
+async def _database_phase():
+    if not await get_db_manager().test_connection_async(retries=5, delay=0.5):
+        raise RuntimeError("Database not reachable")
+    STARTUP_STATUS["db_test"] = "success"
+
+async def _redis_phase():
+    from modules.core.session_store import get_shared_redis_client
+    client = await asyncio.to_thread(get_shared_redis_client)
+    return {"connected": client is not None}
+
+async def _openai_key_phase():
+    if not await APIKeyManager.ensure_api_key():
+        raise RuntimeError("OpenAI API key not found")
+
+def _preload_templates():
+    # Compile every page once, so first requests don't pay for it
+    loaded, broken = 0, []
+    for name in templates.env.list_templates(extensions=["html"]):
+        try:
+            templates.env.get_template(name)
+            loaded += 1
+        except Exception as e:
+            logger.warning(f"Template {name} failed to compile: {e}")
+            broken.append(name)
+    return {"loaded": loaded, "broken": broken}
+
+async def _templates_phase():
+    return await asyncio.to_thread(_preload_templates)
+
+async def _translations_phase():
+    from modules.core.translations import COMPILED_TRANSLATIONS
+    return {
+        "languages": len(COMPILED_TRANSLATIONS),
+        "keys": len(COMPILED_TRANSLATIONS["en"])
+    }
+
+async def _geoip_phase():
+    from modules.core.geoip import get_geoip_resolver
+    return {"ranges": await asyncio.to_thread(get_geoip_resolver().load)}
+
+async def _validation_phase():
+    validation_report = await StartupValidator.validate_and_fix()
+    STARTUP_STATUS["validation_result"] = validation_report.get("system_ready", False)
+
+startup.add("database", _database_phase, timeout=60)
+startup.add("redis", _redis_phase, required=False, timeout=10)
+startup.add("openai_key", _openai_key_phase, required=False, timeout=15)
+startup.add("templates", _templates_phase, required=False, timeout=30)
+startup.add("translations", _translations_phase, timeout=10)
+startup.add("geoip", _geoip_phase, required=False, timeout=60)
+startup.add("validation", _validation_phase, required=False, timeout=60,
+            depends_on=("database", "openai_key"))
+
+async def _run_startup():
+    report = await startup.run()
+    STARTUP_STATUS["startup_report"] = report
+    failed = [name for name, phase in report["phases"].items() if phase["status"] != "ok"]
+    if failed:
+        STARTUP_STATUS["error"] = f"Startup phases not ok: {', '.join(failed)}"
+
+# Business dashboard rollups: every task runs the loop, only the elected leader refreshes
+from modules.dashboards.business_rollups import start_rollup_refresher
+app.add_event_handler("startup", start_rollup_refresher)
 
 # Startup event
 @app.on_event("startup")
 async def startup_event():
     """Core startup for production with 20 routers and basic auth"""
-    global STARTUP_STATUS
     logger.info(f"Starting AVA OLO Agricultural Core {VERSION} with 20 routers and basic auth protection")
     
-    # Run validation
-    try:
-        validation_report = await StartupValidator.validate_and_fix()
-        STARTUP_STATUS["validation_result"] = validation_report.get("system_ready", False)
-    except Exception as e:
-        STARTUP_STATUS["error"] = f"Validation: {str(e)}"
+    asyncio.create_task(_run_startup())
     
-    # Test database
-    try:
-        db_manager = get_db_manager()
-        if db_manager.test_connection(retries=5, delay=3):
-            STARTUP_STATUS["db_test"] = "success"
-    except Exception as e:
-        STARTUP_STATUS["error"] = f"Database: {str(e)}"
+    # Offline geocoding of farmer addresses (request paths only read the cache);
+    # every task runs the loop but only the elected leader geocodes
+    from modules.location.geocoding import GEOCODE_BACKFILL_ENABLED, run_geocode_backfill
+    if GEOCODE_BACKFILL_ENABLED:
+        asyncio.create_task(run_geocode_backfill())
     
     # Start monitoring
     try:
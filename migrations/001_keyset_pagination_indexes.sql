@@ -0,0 +1,31 @@
+-- Composite indexes backing keyset (cursor) pagination
+-- /api/tasks/list            -> tasks (farmer_id, planned_date DESC, id DESC)
+-- /api/tasks/field-history   -> field_history (field_id, activity_date DESC, id DESC)
+-- /api/chat/history          -> chat_messages (wa_phone_number, timestamp DESC, id DESC)
+--
+-- Each index is created in its own guarded block so a deployment whose
+-- schema lacks one of these tables still gets the others.
+
+DO $$
+BEGIN
+    CREATE INDEX IF NOT EXISTS idx_tasks_farmer_planned_keyset
+        ON tasks (farmer_id, planned_date DESC, id DESC);
+EXCEPTION WHEN undefined_table OR undefined_column THEN
+    RAISE NOTICE 'Skipping idx_tasks_farmer_planned_keyset: %', SQLERRM;
+END $$;
+
+DO $$
+BEGIN
+    CREATE INDEX IF NOT EXISTS idx_field_history_field_date_keyset
+        ON field_history (field_id, activity_date DESC, id DESC);
+EXCEPTION WHEN undefined_table OR undefined_column THEN
+    RAISE NOTICE 'Skipping idx_field_history_field_date_keyset: %', SQLERRM;
+END $$;
+
+DO $$
+BEGIN
+    CREATE INDEX IF NOT EXISTS idx_chat_messages_phone_ts_keyset
+        ON chat_messages (wa_phone_number, timestamp DESC, id DESC);
+EXCEPTION WHEN undefined_table OR undefined_column THEN
+    RAISE NOTICE 'Skipping idx_chat_messages_phone_ts_keyset: %', SQLERRM;
+END $$;
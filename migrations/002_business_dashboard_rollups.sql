@@ -0,0 +1,47 @@
+-- Rollup tables behind /dashboards/business/api/dashboard-bundle
+-- Maintained by modules.dashboards.business_rollups.BusinessRollupAggregator
+--
+-- business_daily_rollup     one row per day: registrations, new hectares, churn, active farmers
+-- business_hourly_rollup    same counters per hour, kept for the trailing 48 hours
+-- business_category_rollup  current active farmers / hectares per crop category
+-- business_rollup_state     aggregator watermark
+
+CREATE TABLE IF NOT EXISTS business_daily_rollup (
+    bucket_date DATE PRIMARY KEY,
+    registrations INTEGER NOT NULL DEFAULT 0,
+    new_hectares NUMERIC(14, 2) NOT NULL DEFAULT 0,
+    churned INTEGER NOT NULL DEFAULT 0,
+    active_farmers INTEGER,
+    refreshed_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS business_hourly_rollup (
+    bucket_hour TIMESTAMP PRIMARY KEY,
+    registrations INTEGER NOT NULL DEFAULT 0,
+    new_hectares NUMERIC(14, 2) NOT NULL DEFAULT 0,
+    churned INTEGER NOT NULL DEFAULT 0,
+    refreshed_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS business_category_rollup (
+    crop_category VARCHAR(32) PRIMARY KEY,
+    farmer_count INTEGER NOT NULL DEFAULT 0,
+    total_hectares NUMERIC(14, 2) NOT NULL DEFAULT 0,
+    refreshed_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS business_rollup_state (
+    rollup_name VARCHAR(64) PRIMARY KEY,
+    watermark TIMESTAMP NOT NULL,
+    refreshed_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+-- The aggregator only scans farmers changed inside its refresh window,
+-- and the bundle's activity/change feeds read the newest rows
+DO $$
+BEGIN
+    CREATE INDEX IF NOT EXISTS idx_farmers_created_at ON farmers (created_at DESC);
+    CREATE INDEX IF NOT EXISTS idx_farmers_updated_at ON farmers (updated_at DESC);
+EXCEPTION WHEN undefined_table OR undefined_column THEN
+    RAISE NOTICE 'Skipping farmers timestamp indexes: %', SQLERRM;
+END $$;
@@ -0,0 +1,58 @@
+-- Trigram indexes behind modules.farmers.search (context search, dashboard
+-- search-farmer, typeahead). The indexed expressions must match
+-- NAME_DOCUMENT, LOCATION_DOCUMENT, CROP_DOCUMENT and PHONE_DOCUMENT there.
+--
+-- farmers      manager name + last name + farm name, city + village + country,
+--              WhatsApp number digits
+-- field_crops  crop name
+--
+-- pg_trgm ships with PostgreSQL (and RDS); creating it needs rds_superuser.
+-- Without it the search keeps working on LIKE scans.
+
+DO $$
+BEGIN
+    CREATE EXTENSION IF NOT EXISTS pg_trgm;
+EXCEPTION WHEN insufficient_privilege OR undefined_file THEN
+    RAISE NOTICE 'Skipping pg_trgm: %', SQLERRM;
+END $$;
+
+DO $$
+BEGIN
+    CREATE INDEX IF NOT EXISTS idx_farmers_search_name_trgm ON farmers USING gin (
+        lower(coalesce(manager_name, '') || ' ' || coalesce(manager_last_name, '') || ' ' || coalesce(farm_name, ''))
+        gin_trgm_ops
+    );
+EXCEPTION WHEN undefined_table OR undefined_column OR undefined_object THEN
+    RAISE NOTICE 'Skipping idx_farmers_search_name_trgm: %', SQLERRM;
+END $$;
+
+DO $$
+BEGIN
+    CREATE INDEX IF NOT EXISTS idx_farmers_search_location_trgm ON farmers USING gin (
+        lower(coalesce(city, '') || ' ' || coalesce(village, '') || ' ' || coalesce(country, ''))
+        gin_trgm_ops
+    );
+EXCEPTION WHEN undefined_table OR undefined_column OR undefined_object THEN
+    RAISE NOTICE 'Skipping idx_farmers_search_location_trgm: %', SQLERRM;
+END $$;
+
+DO $$
+BEGIN
+    CREATE INDEX IF NOT EXISTS idx_farmers_search_phone_trgm ON farmers USING gin (
+        regexp_replace(coalesce(wa_phone_number, ''), '[^0-9]', '', 'g') gin_trgm_ops
+    );
+EXCEPTION WHEN undefined_table OR undefined_column OR undefined_object THEN
+    RAISE NOTICE 'Skipping idx_farmers_search_phone_trgm: %', SQLERRM;
+END $$;
+
+DO $$
+BEGIN
+    CREATE INDEX IF NOT EXISTS idx_field_crops_search_crop_trgm ON field_crops USING gin (
+        lower(crop_name) gin_trgm_ops
+    );
+EXCEPTION WHEN undefined_table OR undefined_column OR undefined_object THEN
+    RAISE NOTICE 'Skipping idx_field_crops_search_crop_trgm: %', SQLERRM;
+END $$;
+
+-- The lateral crop lookup per candidate farmer
+CREATE INDEX IF NOT EXISTS idx_fields_farmer_id ON fields (farmer_id);
@@ -0,0 +1,28 @@
+-- Persistent geocoding results behind modules.location.geocoding
+-- Written only by the batch geocoder (GeocodeBackfillWorker); request
+-- paths read it to place farmers whose row has no coordinates yet.
+--
+-- address_key  normalized address (normalize_address), one row per address
+-- status       found / not_found / error; not_found and error rows are
+--              negative cache entries and are retried after expires_at
+
+CREATE TABLE IF NOT EXISTS geocode_cache (
+    address_key VARCHAR(512) PRIMARY KEY,
+    query TEXT NOT NULL,
+    status VARCHAR(16) NOT NULL,
+    latitude DECIMAL(10, 8),
+    longitude DECIMAL(11, 8),
+    provider VARCHAR(32) NOT NULL DEFAULT 'nominatim',
+    attempts INTEGER NOT NULL DEFAULT 1,
+    geocoded_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    expires_at TIMESTAMP
+);
+
+-- The backfill pages through farmers without coordinates by id
+DO $$
+BEGIN
+    CREATE INDEX IF NOT EXISTS idx_farmers_missing_coordinates ON farmers (id)
+        WHERE weather_latitude IS NULL OR weather_longitude IS NULL;
+EXCEPTION WHEN undefined_table OR undefined_column THEN
+    RAISE NOTICE 'Skipping idx_farmers_missing_coordinates: %', SQLERRM;
+END $$;
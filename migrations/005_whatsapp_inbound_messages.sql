@@ -0,0 +1,28 @@
+-- Inbound WhatsApp message log behind modules.whatsapp.ingest_queue (queue mode)
+--
+-- status        received (waiting, possibly for a retry at next_attempt_at),
+--               processing (claimed by claimed_by since claimed_at),
+--               processed, failed (out of attempts)
+-- claimed_by    task holding the lease; leases older than
+--               WHATSAPP_INGEST_LEASE_SECONDS are taken over by other tasks
+
+CREATE TABLE IF NOT EXISTS whatsapp_inbound_messages (
+    message_sid VARCHAR(64) PRIMARY KEY,
+    from_number VARCHAR(32) NOT NULL,
+    to_number VARCHAR(32),
+    body TEXT,
+    status VARCHAR(16) NOT NULL DEFAULT 'received',
+    received_at TIMESTAMP DEFAULT NOW(),
+    processed_at TIMESTAMP,
+    reply_sid VARCHAR(64),
+    error TEXT
+);
+
+-- Tables created by earlier versions at runtime lack the lease columns
+ALTER TABLE whatsapp_inbound_messages ADD COLUMN IF NOT EXISTS claimed_by VARCHAR(128);
+ALTER TABLE whatsapp_inbound_messages ADD COLUMN IF NOT EXISTS claimed_at TIMESTAMP;
+ALTER TABLE whatsapp_inbound_messages ADD COLUMN IF NOT EXISTS attempts INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE whatsapp_inbound_messages ADD COLUMN IF NOT EXISTS next_attempt_at TIMESTAMP;
+
+CREATE INDEX IF NOT EXISTS idx_whatsapp_inbound_pending
+    ON whatsapp_inbound_messages (status, received_at);
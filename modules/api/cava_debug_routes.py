@@ -14,6 +14,7 @@ import httpx
 
 from modules.core.openai_config import OpenAIConfig
 from modules.cava.chat_engine import get_cava_engine
+from modules.chat.openai_chat import get_openai_chat
 from modules.core.database_manager import DatabaseManager
 
 logger = logging.getLogger(__name__)
@@ -95,6 +96,7 @@ async def debug_openai_connection() -> Dict[str, Any]:
     # 4. Check CAVA engine status
     cava_engine = get_cava_engine()
     debug_info["cava_engine_status"] = cava_engine.get_status()
+    debug_info["openai_chat_history"] = get_openai_chat().get_history_stats()
     
     return debug_info
 
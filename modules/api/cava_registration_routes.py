@@ -3,12 +3,13 @@
 CAVA Registration API Routes
 Intelligent registration endpoints using GPT-3.5
 """
+import asyncio
 import logging
 from datetime import datetime
 from fastapi import APIRouter, Request, HTTPException
 from pydantic import BaseModel
 from typing import Dict, Any, Optional
-from modules.cava.cava_registration_engine import get_cava_registration_engine
+from modules.cava.cava_registration_engine import get_cava_registration_engine, new_registration_session
 
 logger = logging.getLogger(__name__)
 
@@ -41,20 +42,13 @@ async def initialize_registration_session(request: dict):
             raise HTTPException(status_code=400, detail="session_id is required")
         
         # Initialize session with greeting
-        cava_registration.sessions[session_id] = {
-            'first_name': None,
-            'last_name': None,
-            'wa_phone_number': None,
-            'password': None,
-            'password_confirmation': None,
-            'language': None,
-            'conversation_history': [{
-                'role': 'assistant',
-                'content': "Hi! I'm AVA, let me help you register. What is your name? 😊",
-                'timestamp': datetime.utcnow().isoformat()
-            }],
-            'created_at': datetime.utcnow().isoformat()
-        }
+        session = new_registration_session()
+        session['conversation_history'].append({
+            'role': 'assistant',
+            'content': "Hi! I'm AVA, let me help you register. What is your name? 😊",
+            'timestamp': datetime.utcnow().isoformat()
+        })
+        await cava_registration.save_session(session_id, session)
         
         logger.info(f"🔄 Initialized registration session: {session_id}")
         
@@ -116,7 +110,7 @@ async def cava_registration_chat(request: ChatMessageRequest):
         
         # Step 3: Check session state
         print("🔍 Step 3: Checking session state...")
-        session = cava_registration.sessions.get(request.session_id, {})
+        session = await cava_registration.sessions.aget(request.session_id, {})
         print(f"   Session exists: {bool(session)}")
         print(f"   Conversation history length: {len(session.get('conversation_history', []))}")
         
@@ -179,7 +173,7 @@ async def cava_registration_chat(request: ChatMessageRequest):
 async def registration_status(session_id: str) -> SessionStatusResponse:
     """Check registration progress"""
     try:
-        status = cava_registration.get_session_status(session_id)
+        status = await cava_registration.get_session_status(session_id)
         return SessionStatusResponse(**status)
         
     except Exception as e:
@@ -190,7 +184,7 @@ async def registration_status(session_id: str) -> SessionStatusResponse:
 async def clear_registration_session(session_id: str):
     """Clear registration session"""
     try:
-        cleared = cava_registration.clear_session(session_id)
+        cleared = await cava_registration.clear_session(session_id)
         return {
             "success": cleared,
             "message": "Session cleared" if cleared else "Session not found"
@@ -232,7 +226,7 @@ async def registration_debug():
             "registration_engine_initialized": cava_registration is not None,
             "openai_api_key_configured": bool(cava_registration.api_key),
             "openai_connection_test": test_result,
-            "active_sessions": len(cava_registration.sessions),
+            "active_sessions": await asyncio.to_thread(len, cava_registration.sessions),
             "model": cava_registration.model,
             "api_url": cava_registration.api_url
         }
@@ -256,7 +250,7 @@ async def test_registration_connection():
         )
         
         # Clean up test session
-        cava_registration.clear_session(test_session)
+        await cava_registration.clear_session(test_session)
         
         return {
             "success": True,
@@ -383,13 +377,14 @@ async def demo_registration():
                 break
         
         # Get final status
-        final_status = cava_registration.get_session_status(demo_session)
+        final_status = await cava_registration.get_session_status(demo_session)
         
         return {
             "success": True,
             "conversation": conversation,
             "final_status": final_status,
-            "farmer_id": final_status.get('farmer_id'),
+            # A finished registration's session is already gone
+            "farmer_id": final_status.get('farmer_id') or result.get('farmer_id'),
             "message": "Demo registration completed successfully"
         }
         
@@ -7,7 +7,11 @@ from fastapi import APIRouter, HTTPException, Request
 from typing import Optional, List, Dict
 from modules.core.database_manager import get_db_manager
 from modules.core.simple_db import execute_simple_query
+from modules.core.pagination import (
+    InvalidCursorError, build_page, clamp_page_size, keyset_predicate
+)
 from modules.auth.routes import get_current_farmer
+from modules.auth.session_tokens import invalidate_farmer_profile
 import logging
 
 logger = logging.getLogger(__name__)
@@ -15,83 +19,89 @@ logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/chat", tags=["chat-history"])
 
 @router.get("/history")
-async def get_farmer_chat_history(request: Request, limit: int = 100):
+async def get_farmer_chat_history(request: Request, limit: int = 100, cursor: Optional[str] = None):
     """Get last N chat messages for authenticated farmer"""
+    farmer = None
     try:
         # Get farmer info
         farmer = await get_current_farmer(request)
         if not farmer:
             raise HTTPException(status_code=401, detail="Not authenticated")
         
-        # Get farmer's WhatsApp number (which is their username)
-        farmer_query = """
-        SELECT COALESCE(whatsapp_number, wa_phone_number) as whatsapp_number
-        FROM farmers 
-        WHERE id = %s
-        """
+        # Get farmer's WhatsApp number (which is their username) - signed sessions already carry it
+        wa_phone_number = farmer.get('whatsapp_number')
         
-        farmer_result = execute_simple_query(farmer_query, (farmer['farmer_id'],))
+        if not wa_phone_number:
+            farmer_query = """
+            SELECT COALESCE(whatsapp_number, wa_phone_number) as whatsapp_number
+            FROM farmers 
+            WHERE id = %s
+            """
         
-        # Every farmer MUST have a WhatsApp number since it's their username
-        if farmer_result.get('success') and farmer_result.get('rows') and farmer_result['rows'][0][0]:
-            wa_phone_number = farmer_result['rows'][0][0]
-            logger.info(f"Found WhatsApp for farmer {farmer['farmer_id']}: {wa_phone_number}")
-        else:
-            # Auto-fix: Set WhatsApp number if missing
-            logger.warning(f"Farmer {farmer['farmer_id']} has no WhatsApp number, auto-fixing...")
+            farmer_result = execute_simple_query(farmer_query, (farmer['farmer_id'],))
+        
+            # Every farmer MUST have a WhatsApp number since it's their username
+            if farmer_result.get('success') and farmer_result.get('rows') and farmer_result['rows'][0][0]:
+                wa_phone_number = farmer_result['rows'][0][0]
+                logger.info(f"Found WhatsApp for farmer {farmer['farmer_id']}: {wa_phone_number}")
+            else:
+                # Auto-fix: Set WhatsApp number if missing
+                logger.warning(f"Farmer {farmer['farmer_id']} has no WhatsApp number, auto-fixing...")
             
-            # Get username to use as WhatsApp if it looks like a phone
-            username_query = "SELECT COALESCE(whatsapp_number, wa_phone_number) FROM farmers WHERE id = %s"
-            username_result = execute_simple_query(username_query, (farmer['farmer_id'],))
+                # Get username to use as WhatsApp if it looks like a phone
+                username_query = "SELECT COALESCE(whatsapp_number, wa_phone_number) FROM farmers WHERE id = %s"
+                username_result = execute_simple_query(username_query, (farmer['farmer_id'],))
             
-            if username_result.get('success') and username_result.get('rows'):
-                username = username_result['rows'][0][0]
-                if username and username.startswith('+'):
-                    wa_phone_number = username
+                if username_result.get('success') and username_result.get('rows'):
+                    username = username_result['rows'][0][0]
+                    if username and username.startswith('+'):
+                        wa_phone_number = username
+                    else:
+                        wa_phone_number = f"+38640{str(farmer['farmer_id']).zfill(6)}"
                 else:
                     wa_phone_number = f"+38640{str(farmer['farmer_id']).zfill(6)}"
-            else:
-                wa_phone_number = f"+38640{str(farmer['farmer_id']).zfill(6)}"
             
-            # Update farmer record with the WhatsApp number
-            update_query = "UPDATE farmers SET whatsapp_number = %s WHERE id = %s"
-            execute_simple_query(update_query, (wa_phone_number, farmer['farmer_id']))
+                # Update farmer record with the WhatsApp number
+                update_query = "UPDATE farmers SET whatsapp_number = %s WHERE id = %s"
+                execute_simple_query(update_query, (wa_phone_number, farmer['farmer_id']))
+                invalidate_farmer_profile(farmer['farmer_id'])
             
-            # Also update any old messages
-            old_format = f"+farmer_{farmer['farmer_id']}"
-            msg_update_query = "UPDATE chat_messages SET wa_phone_number = %s WHERE wa_phone_number = %s"
-            execute_simple_query(msg_update_query, (wa_phone_number, old_format))
+                # Also update any old messages
+                old_format = f"+farmer_{farmer['farmer_id']}"
+                msg_update_query = "UPDATE chat_messages SET wa_phone_number = %s WHERE wa_phone_number = %s"
+                execute_simple_query(msg_update_query, (wa_phone_number, old_format))
             
-            logger.info(f"Auto-fixed WhatsApp for farmer {farmer['farmer_id']}: {wa_phone_number}")
+                logger.info(f"Auto-fixed WhatsApp for farmer {farmer['farmer_id']}: {wa_phone_number}")
         
         logger.info(f"Looking for messages with wa_phone_number: {wa_phone_number}")
         
         # Get chat messages filtered by farmer's WhatsApp number
-        # Using subquery to get last N messages in correct order (oldest to newest)
-        query = """
-        SELECT role, content, timestamp FROM (
-            SELECT 
-                role,
-                content,
-                timestamp
-            FROM chat_messages
-            WHERE wa_phone_number = %s
-            ORDER BY timestamp DESC
-            LIMIT %s
-        ) AS recent_messages
-        ORDER BY timestamp ASC
+        # Newest page first, keyset-paginated on (timestamp, id); next_cursor walks back to older messages
+        cursor_sql, cursor_params = keyset_predicate("timestamp", "id", cursor)
+        cursor_clause = f"AND {cursor_sql}" if cursor_sql else ""
+        page_size = clamp_page_size(limit, default=100)
+        
+        query = f"""
+        SELECT role, content, timestamp, id
+        FROM chat_messages
+        WHERE wa_phone_number = %s {cursor_clause}
+        ORDER BY timestamp DESC, id DESC
+        LIMIT %s
         """
         
-        result = execute_simple_query(query, (wa_phone_number, limit))
+        result = execute_simple_query(query, (wa_phone_number, *cursor_params, page_size + 1))
         
+        rows = result['rows'] if result.get('success') and result.get('rows') else []
+        rows, next_cursor = build_page(rows, page_size, sort_index=2, id_index=3)
+        
+        # Present the page oldest to newest
         messages = []
-        if result.get('success') and result.get('rows'):
-            for row in result['rows']:
-                messages.append({
-                    "role": row[0],
-                    "content": row[1],
-                    "timestamp": row[2].isoformat() if row[2] else None
-                })
+        for row in reversed(rows):
+            messages.append({
+                "role": row[0],
+                "content": row[1],
+                "timestamp": row[2].isoformat() if row[2] else None
+            })
         
         return {
             "status": "success",
@@ -100,12 +110,16 @@ async def get_farmer_chat_history(request: Request, limit: int = 100):
                 "farmer_id": farmer['farmer_id'],
                 "farmer_name": farmer['name'],
                 "wa_phone_number": wa_phone_number,
-                "total_messages": len(messages)
+                "total_messages": len(messages),
+                "next_cursor": next_cursor,
+                "has_more": next_cursor is not None
             }
         }
         
     except HTTPException:
         raise
+    except InvalidCursorError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
     except Exception as e:
         logger.error(f"Error getting chat history: {e}")
         # Return empty history instead of failing
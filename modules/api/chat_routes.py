@@ -189,7 +189,7 @@ async def chat_endpoint(request: ChatRequest):
         
         # 3. Extract facts from user message
         print(f"🎯 Extracting facts...")
-        facts = await fact_extractor.extract_facts(message, context['context_summary'])
+        facts = await fact_extractor.extract_facts(message, context['context_summary'], context.get('farmer'))
         print(f"✅ Facts extracted: {facts}")
         
         # 3a. MEMORY ENFORCEMENT: Extract critical facts
@@ -982,7 +982,7 @@ async def chat_with_cava_engine(request: ChatRequest):
             await store_message(wa_phone_number, 'assistant', result["response"])
             
             # Extract facts from conversation
-            facts = await fact_extractor.extract_facts(message, farmer_context.get("location", ""))
+            facts = await fact_extractor.extract_facts(message, farmer_context.get("location", ""), farmer_context)
             
             return ChatResponse(
                 response=result["response"],
@@ -1139,6 +1139,7 @@ async def chat_status():
             'total_messages_stored': total_messages,
             'recent_messages': recent_messages,
             'message_storage_working': total_messages > 0,
+            'fact_extraction': fact_extractor.get_stats(),
             'timestamp': datetime.now().isoformat()
         }
     except Exception as e:
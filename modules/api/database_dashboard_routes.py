@@ -3,15 +3,19 @@
 Database Dashboard Routes
 Provides database query functionality directly in agricultural-core
 """
-from fastapi import APIRouter, Request, HTTPException
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi import APIRouter, Request, HTTPException, Form
+from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
 from pydantic import BaseModel
+import asyncio
 import logging
 from typing import Optional, List, Dict, Any
 
 from ..core.config import VERSION
 from ..core.simple_db import execute_simple_query
+from ..core.query_export import EXPORT_FORMATS, export_filename, open_export, stream_export
+from ..core.query_guard import run_guarded_select
+from ..farmers.search import FARMER_TYPEAHEAD_ENABLED, RESULT_COLUMNS, get_farmer_search, get_farmer_typeahead
 
 # Import enhanced LLM query handler
 try:
@@ -61,29 +65,33 @@ async def database_dashboard(request: Request):
         logger.error(f"Error rendering database dashboard: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+def validate_select_query(sql_query: str) -> Optional[str]:
+    """Return an error message unless the query is a plain SELECT"""
+    # Safety check - only allow SELECT queries
+    if not sql_query.upper().startswith('SELECT'):
+        return "Only SELECT queries are allowed for safety reasons"
+    
+    # Additional safety checks
+    forbidden_keywords = ['DROP', 'DELETE', 'INSERT', 'UPDATE', 'ALTER', 'CREATE', 'TRUNCATE', 'EXEC', 'EXECUTE']
+    query_upper = sql_query.upper()
+    for keyword in forbidden_keywords:
+        if keyword in query_upper:
+            return f"Query contains forbidden keyword: {keyword}"
+    return None
+
 @router.post("/sql", response_class=JSONResponse)
 async def execute_sql_query(request: SQLRequest):
     """Execute a raw SQL query (SELECT only for safety)"""
     try:
         sql_query = request.query.strip()
         
-        # Safety check - only allow SELECT queries
-        if not sql_query.upper().startswith('SELECT'):
+        validation_error = validate_select_query(sql_query)
+        if validation_error:
             return JSONResponse(content={
                 "success": False,
-                "error": "Only SELECT queries are allowed for safety reasons"
+                "error": validation_error
             })
         
-        # Additional safety checks
-        forbidden_keywords = ['DROP', 'DELETE', 'INSERT', 'UPDATE', 'ALTER', 'CREATE', 'TRUNCATE', 'EXEC', 'EXECUTE']
-        query_upper = sql_query.upper()
-        for keyword in forbidden_keywords:
-            if keyword in query_upper:
-                return JSONResponse(content={
-                    "success": False,
-                    "error": f"Query contains forbidden keyword: {keyword}"
-                })
-        
         # Execute the query
         result = execute_simple_query(sql_query, ())
         
@@ -140,6 +148,35 @@ async def execute_sql_query(request: SQLRequest):
             "error": str(e)
         })
 
+@router.post("/sql/export")
+async def export_sql_query(query: str = Form(...), format: str = Form("csv")):
+    """Stream a SELECT result as CSV or NDJSON through a server-side cursor"""
+    sql_query = query.strip().rstrip(';')
+    
+    validation_error = validate_select_query(sql_query)
+    if not validation_error and format not in EXPORT_FORMATS:
+        validation_error = f"Unsupported export format: {format}"
+    if validation_error:
+        return JSONResponse(status_code=400, content={
+            "success": False,
+            "error": validation_error
+        })
+    
+    try:
+        columns, rows = await asyncio.to_thread(open_export, sql_query)
+    except Exception as e:
+        logger.error(f"Export query failed: {e}")
+        return JSONResponse(status_code=400, content={
+            "success": False,
+            "error": str(e)
+        })
+    
+    return StreamingResponse(
+        stream_export(columns, rows, format),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{export_filename("query_export", format)}"'}
+    )
+
 @router.post("/nlq", response_class=JSONResponse)
 async def natural_language_query(request: NLQRequest):
     """Convert natural language to SQL and execute with enhanced farming intelligence"""
@@ -185,9 +222,9 @@ async def natural_language_query(request: NLQRequest):
                 "error": "Could not understand the query. Please try rephrasing."
             })
         
-        # Execute the query
+        # Execute the query (plan-checked, read-only, under a statement timeout)
         logger.info(f"Executing SQL query: {sql_query}")
-        result = execute_simple_query(sql_query, ())
+        result = await asyncio.to_thread(run_guarded_select, sql_query)
         
         if result.get('success'):
             # Format the results
@@ -227,6 +264,8 @@ async def natural_language_query(request: NLQRequest):
                     
                 data.append(row_dict)
             
+            query_metadata["plan"] = result.get('plan')
+            query_metadata["auto_limited"] = result.get('limited', False)
             return JSONResponse(content={
                 "success": True,
                 "data": data,
@@ -237,7 +276,8 @@ async def natural_language_query(request: NLQRequest):
         else:
             return JSONResponse(content={
                 "success": False,
-                "error": result.get('error', 'Query execution failed')
+                "error": result.get('error', 'Query execution failed'),
+                "plan": result.get('plan')
             })
             
     except Exception as e:
@@ -345,99 +385,74 @@ async def quick_query(query_type: str):
 async def search_farmer(name: str):
     """Search for a farmer by name"""
     try:
-        sql_query = """
-            SELECT id, farm_name, manager_name, manager_last_name,
-                   city, country, phone, wa_phone_number, email, created_at
-            FROM farmers 
-            WHERE LOWER(manager_name) LIKE LOWER(%s) 
-               OR LOWER(manager_last_name) LIKE LOWER(%s)
-               OR LOWER(farm_name) LIKE LOWER(%s)
-               OR LOWER(CONCAT(manager_name, ' ', manager_last_name)) LIKE LOWER(%s)
-            ORDER BY created_at DESC
-            LIMIT 20
-        """
+        matches = await asyncio.to_thread(get_farmer_search().search, names=[name], limit=20)
+        columns = RESULT_COLUMNS
         
-        search_pattern = f"%{name}%"
-        result = execute_simple_query(sql_query, (search_pattern, search_pattern, search_pattern, search_pattern))
+        # Convert to dict format with proper type handling
+        data = []
+        for match in matches:
+            row_dict = {}
+            for col in columns:
+                value = match.get(col)
+                if hasattr(value, 'isoformat'):
+                    value = value.isoformat()
+                elif isinstance(value, (int, float)):
+                    value = value
+                elif value is None:
+                    value = ""
+                else:
+                    value = str(value)
+                row_dict[col] = value
+            row_dict['match_confidence'] = match['match_confidence']
+            data.append(row_dict)
         
-        if result.get('success'):
-            rows = result.get('rows', [])
-            columns = result.get('columns', [])
-            
-            # Convert to dict format with proper type handling
-            data = []
-            for row in rows:
-                row_dict = {}
-                # Ensure we don't go out of bounds
-                for i in range(min(len(columns), len(row))):
-                    col = columns[i]
-                    value = row[i]
-                    if hasattr(value, 'isoformat'):
-                        value = value.isoformat()
-                    elif isinstance(value, (int, float)):
-                        value = value
-                    elif value is None:
-                        value = ""
-                    else:
-                        value = str(value)
-                    row_dict[col] = value
-                # Add any missing columns as empty
-                for col in columns[len(row):]:
-                    row_dict[col] = ""
-                data.append(row_dict)
+        # If farmer found, also get their fields
+        if data and len(data) > 0:
+            farmer_ids = [d['id'] for d in data]
+            fields_query = """
+                SELECT farmer_id, id as field_id, field_name, area_ha, 
+                       latitude, longitude, created_at
+                FROM fields 
+                WHERE farmer_id = ANY(%s)
+                ORDER BY farmer_id, field_name
+            """
+            fields_result = execute_simple_query(fields_query, (farmer_ids,))
             
-            # If farmer found, also get their fields
-            if data and len(data) > 0:
-                farmer_ids = [d['id'] for d in data]
-                fields_query = """
-                    SELECT farmer_id, id as field_id, field_name, area_ha, 
-                           latitude, longitude, created_at
-                    FROM fields 
-                    WHERE farmer_id = ANY(%s)
-                    ORDER BY farmer_id, field_name
-                """
-                fields_result = execute_simple_query(fields_query, (farmer_ids,))
+            if fields_result.get('success'):
+                fields_data = []
+                fields_rows = fields_result.get('rows', [])
+                fields_columns = fields_result.get('columns', [])
                 
-                if fields_result.get('success'):
-                    fields_data = []
-                    fields_rows = fields_result.get('rows', [])
-                    fields_columns = fields_result.get('columns', [])
-                    
-                    for row in fields_rows:
-                        field_dict = {}
-                        # Ensure we don't go out of bounds
-                        for i in range(min(len(fields_columns), len(row))):
-                            col = fields_columns[i]
-                            value = row[i]
-                            if hasattr(value, 'isoformat'):
-                                value = value.isoformat()
-                            elif isinstance(value, (int, float)):
-                                value = value
-                            elif value is None:
-                                value = ""
-                            else:
-                                value = str(value)
-                            field_dict[col] = value
-                        # Add any missing columns as empty
-                        for col in fields_columns[len(row):]:
-                            field_dict[col] = ""
-                        fields_data.append(field_dict)
-                    
-                    # Add fields to farmers
-                    for farmer in data:
-                        farmer['fields'] = [f for f in fields_data if f['farmer_id'] == farmer['id']]
-            
-            return JSONResponse(content={
-                "success": True,
-                "data": data,
-                "columns": columns,
-                "query": f"Search for: {name}"
-            })
-        else:
-            return JSONResponse(content={
-                "success": False,
-                "error": result.get('error', 'Search failed')
-            })
+                for row in fields_rows:
+                    field_dict = {}
+                    # Ensure we don't go out of bounds
+                    for i in range(min(len(fields_columns), len(row))):
+                        col = fields_columns[i]
+                        value = row[i]
+                        if hasattr(value, 'isoformat'):
+                            value = value.isoformat()
+                        elif isinstance(value, (int, float)):
+                            value = value
+                        elif value is None:
+                            value = ""
+                        else:
+                            value = str(value)
+                        field_dict[col] = value
+                    # Add any missing columns as empty
+                    for col in fields_columns[len(row):]:
+                        field_dict[col] = ""
+                    fields_data.append(field_dict)
+                
+                # Add fields to farmers
+                for farmer in data:
+                    farmer['fields'] = [f for f in fields_data if f['farmer_id'] == farmer['id']]
+        
+        return JSONResponse(content={
+            "success": True,
+            "data": data,
+            "columns": columns,
+            "query": f"Search for: {name}"
+        })
             
     except Exception as e:
         logger.error(f"Error in farmer search: {e}")
@@ -446,6 +461,37 @@ async def search_farmer(name: str):
             "error": str(e)
         })
 
+@router.get("/farmer-typeahead", response_class=JSONResponse)
+async def farmer_typeahead(q: str, limit: int = 10):
+    """Farmer suggestions while typing (in-process trigram index when enabled)"""
+    try:
+        if FARMER_TYPEAHEAD_ENABLED:
+            index = get_farmer_typeahead()
+            await asyncio.to_thread(index.refresh)
+            data = index.suggest(q, limit)
+        else:
+            matches = await asyncio.to_thread(get_farmer_search().search, names=[q], limit=limit)
+            data = [{
+                'id': match['id'],
+                'name': ' '.join(part for part in (match['manager_name'], match['manager_last_name']) if part),
+                'farm_name': match['farm_name'] or '',
+                'city': match['city'] or '',
+                'wa_phone_number': match['wa_phone_number'] or '',
+                'score': match['match_confidence']
+            } for match in matches]
+
+        return JSONResponse(content={
+            "success": True,
+            "data": data
+        })
+
+    except Exception as e:
+        logger.error(f"Error in farmer typeahead: {e}")
+        return JSONResponse(content={
+            "success": False,
+            "error": str(e)
+        })
+
 def convert_nlq_to_sql(question: str) -> Optional[str]:
     """
     Simple NLQ to SQL conversion
@@ -14,6 +14,7 @@ from ..core.config import VERSION
 from ..core.database_manager import get_db_manager
 from ..core.simple_db import execute_simple_query
 from ..auth.routes import get_current_farmer, require_auth
+from ..auth.session_tokens import invalidate_farmer_profile
 
 logger = logging.getLogger(__name__)
 
@@ -390,21 +391,22 @@ async def get_farmer_weather(farmer_id: int) -> Dict[str, Any]:
         ]
     }
 
-def get_farmer_messages(farmer_id: int, limit: int = 6) -> List[Dict[str, Any]]:
+def get_farmer_messages(farmer_id: int, limit: int = 6, wa_number: Optional[str] = None) -> List[Dict[str, Any]]:
     """Get last N messages for a farmer"""
     try:
-        # Get farmer's WhatsApp number
-        farmer_query = """
-        SELECT COALESCE(whatsapp_number, wa_phone_number) 
-        FROM farmers 
-        WHERE id = %s
-        """
-        farmer_result = execute_simple_query(farmer_query, (farmer_id,))
-        
-        if not farmer_result or not farmer_result.get('success') or 'rows' not in farmer_result or not farmer_result['rows'] or not farmer_result['rows'][0][0]:
-            return []
-        
-        wa_number = farmer_result['rows'][0][0]
+        # Get farmer's WhatsApp number unless the session already carries it
+        if not wa_number:
+            farmer_query = """
+            SELECT COALESCE(whatsapp_number, wa_phone_number) 
+            FROM farmers 
+            WHERE id = %s
+            """
+            farmer_result = execute_simple_query(farmer_query, (farmer_id,))
+            
+            if not farmer_result or not farmer_result.get('success') or 'rows' not in farmer_result or not farmer_result['rows'] or not farmer_result['rows'][0][0]:
+                return []
+            
+            wa_number = farmer_result['rows'][0][0]
         
         # Get messages
         query = """
@@ -459,6 +461,7 @@ async def farmer_dashboard(request: Request, farmer: dict = Depends(require_auth
             WHERE farmer_id = %s AND whatsapp_number IS NULL
             """
             execute_simple_query(update_query, (new_whatsapp, farmer_id))
+            invalidate_farmer_profile(farmer_id)
             
             # Also fix any old messages
             old_format = f"+farmer_{farmer_id}"
@@ -475,12 +478,12 @@ async def farmer_dashboard(request: Request, farmer: dict = Depends(require_auth
         # Get farmer's data
         fields = get_farmer_fields(farmer_id)
         weather = await get_farmer_weather(farmer_id)  # Now async with real weather data
-        messages = get_farmer_messages(farmer_id)
+        messages = get_farmer_messages(farmer_id, wa_number=farmer.get('whatsapp_number'))
         
         # Calculate totals
         total_area = sum(field['area_ha'] for field in fields if field['area_ha'])
         
-        # Get farmer's language preference from database
+        # Not cached in the session, so a language change shows on the next page load
         detected_language = get_farmer_language(farmer_id)
         logger.info(f"Farmer {farmer_id} language preference: {detected_language}")
         
@@ -531,7 +534,7 @@ async def api_farmer_weather(farmer: dict = Depends(require_auth)):
 @router.get("/api/messages", response_class=JSONResponse)
 async def api_farmer_messages(farmer: dict = Depends(require_auth), limit: int = 6):
     """API endpoint for farmer's messages"""
-    messages = get_farmer_messages(farmer['farmer_id'], limit)
+    messages = get_farmer_messages(farmer['farmer_id'], limit, wa_number=farmer.get('whatsapp_number'))
     return JSONResponse(content={
         "success": True,
         "messages": messages,
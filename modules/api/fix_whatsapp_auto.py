@@ -5,31 +5,29 @@ Auto-fix WhatsApp numbers for farmers without them
 from fastapi import APIRouter, Request, Depends
 from fastapi.responses import JSONResponse
 from ..core.simple_db import execute_simple_query
+from ..auth.routes import get_current_farmer
 import logging
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/fix", tags=["fix"])
 
 async def get_farmer_from_cookie(request: Request):
-    """Get farmer from cookie"""
-    farmer_id = request.cookies.get("farmer_id")
-    if not farmer_id:
-        return None
-    return {"farmer_id": int(farmer_id)}
+    """Get farmer from the signed session cookie"""
+    return await get_current_farmer(request)
 
 @router.post("/auto-whatsapp")
 async def auto_fix_whatsapp(request: Request):
     """Auto-fix WhatsApp number for logged-in farmer"""
     try:
-        # Get farmer from cookie
-        farmer_id = request.cookies.get("farmer_id")
-        if not farmer_id:
+        # Get farmer from the signed session
+        farmer = await get_farmer_from_cookie(request)
+        if not farmer:
             return JSONResponse(content={
                 "success": False,
                 "error": "Not logged in"
             }, status_code=401)
         
-        farmer_id = int(farmer_id)
+        farmer_id = farmer['farmer_id']
         
         # Check current WhatsApp number
         check_query = """
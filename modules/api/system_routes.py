@@ -6,14 +6,24 @@ Provides endpoints to check environment variables and service connectivity
 import os
 import logging
 from typing import Dict, List, Optional
-from fastapi import APIRouter, HTTPException
+import asyncio
+from fastapi import APIRouter, HTTPException, Request
 from datetime import datetime
 import httpx
 
+from modules.core.database_manager import get_db_manager
+from modules.core.health_probes import get_health_registry
+
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/v1/system", tags=["system"])
 
+health_registry = get_health_registry()
+router.add_event_handler("startup", health_registry.start_refresher)
+router.add_event_handler("shutdown", health_registry.stop_refresher)
+# A probe that misses its deadline reports as disconnected
+SYSTEM_PROBE_FAILURE = {"connected": False, "status": "timeout"}
+
 # Required environment variables for full functionality
 REQUIRED_ENV_VARS = {
     "database": [
@@ -389,11 +399,12 @@ async def comprehensive_health_check():
     # Start timing
     start_time = datetime.now()
     
-    # Test each service
+    # Latest cached result of each service; probes run concurrently in the background
+    probes = await health_registry.results("system")
     health_results = {
-        "database": await test_database_health_detailed(),
-        "openai": await test_openai_health_detailed(),
-        "weather": await test_weather_health_detailed(),
+        "database": probes["system.database"],
+        "openai": probes["system.openai"],
+        "weather": probes["system.weather"],
         "response_time_ms": 0
     }
     
@@ -408,8 +419,38 @@ async def comprehensive_health_check():
     
     return health_results
 
+@router.get("/health/probes")
+async def health_probe_status():
+    """Cache age, TTL and last duration of every registered health probe"""
+    return {
+        **health_registry.stats(),
+        "timestamp": datetime.now().isoformat()
+    }
+
+@router.get("/canary")
+async def canary_status():
+    """Latest liveness and deep canary results for this task"""
+    from modules.core.canary import get_canary
+    return {
+        **get_canary().status(),
+        "timestamp": datetime.now().isoformat()
+    }
+
+@router.get("/routers")
+async def router_groups(request: Request):
+    """Router groups of this task, whether they are loaded and what loading cost"""
+    return {
+        **request.app.state.router_registry.stats(),
+        "timestamp": datetime.now().isoformat()
+    }
+
+@health_registry.probe("system.database", timeout=10.0, group="system", failure=SYSTEM_PROBE_FAILURE)
 async def test_database_health_detailed() -> Dict:
     """Detailed database health check"""
+    # The queries use the sync driver, so they run off the event loop
+    return await asyncio.to_thread(_database_health_detailed)
+
+def _database_health_detailed() -> Dict:
     start = datetime.now()
     
     try:
@@ -476,6 +517,10 @@ async def test_database_health_detailed() -> Dict:
             "response_time_ms": int((datetime.now() - start).total_seconds() * 1000)
         }
 
+# Each check is a billed completion: it runs only when health is requested,
+# and then at most every 5 minutes
+@health_registry.probe("system.openai", timeout=10.0, ttl=300, group="system",
+                       failure=SYSTEM_PROBE_FAILURE, on_demand=True)
 async def test_openai_health_detailed() -> Dict:
     """Detailed OpenAI health check"""
     start = datetime.now()
@@ -543,6 +588,7 @@ async def test_openai_health_detailed() -> Dict:
             "response_time_ms": int((datetime.now() - start).total_seconds() * 1000)
         }
 
+@health_registry.probe("system.weather", timeout=15.0, group="system", failure=SYSTEM_PROBE_FAILURE)
 async def test_weather_health_detailed() -> Dict:
     """Detailed weather API health check"""
     start = datetime.now()
@@ -10,6 +10,9 @@ import logging
 import json
 
 from ..core.database_manager import get_db_manager
+from ..core.pagination import (
+    InvalidCursorError, build_page, clamp_page_size, keyset_predicate
+)
 from ..auth.routes import require_auth
 
 logger = logging.getLogger(__name__)
@@ -100,68 +103,74 @@ async def get_materials(material_type: Optional[str] = None, farmer: dict = Depe
 async def get_farmer_tasks(
     status: Optional[str] = None,
     limit: int = 50,
+    cursor: Optional[str] = None,
     farmer: dict = Depends(require_auth)
 ):
-    """Get tasks for a farmer"""
+    """Get tasks for a farmer, newest first, keyset-paginated on (planned_date, id)"""
     db_manager = get_db_manager()
     farmer_id = farmer['farmer_id']
+    page_size = clamp_page_size(limit)
     
     try:
+        try:
+            cursor_sql, cursor_params = keyset_predicate("t.planned_date", "t.id", cursor)
+        except InvalidCursorError:
+            return JSONResponse(content={
+                "success": False,
+                "error": "Invalid cursor"
+            }, status_code=400)
+        
+        conditions = ["t.farmer_id = %s"]
+        params = [farmer_id]
         if status:
-            query = """
-            SELECT DISTINCT
-                t.id, t.task_name, t.task_type, t.status, 
-                t.planned_date, t.completed_date, t.notes,
-                STRING_AGG(f.field_name, ', ') as field_names,
-                COUNT(DISTINCT tf.field_id) as field_count,
-                SUM(tf.area_covered) as total_area
-            FROM tasks t
-            JOIN task_fields tf ON t.id = tf.task_id
-            JOIN fields f ON tf.field_id = f.id
-            WHERE t.farmer_id = %s AND t.status = %s
-            GROUP BY t.id
-            ORDER BY t.planned_date DESC
-            LIMIT %s
-            """
-            result = db_manager.execute_query(query, (farmer_id, status, limit))
-        else:
-            query = """
-            SELECT DISTINCT
-                t.id, t.task_name, t.task_type, t.status, 
-                t.planned_date, t.completed_date, t.notes,
-                STRING_AGG(f.field_name, ', ') as field_names,
-                COUNT(DISTINCT tf.field_id) as field_count,
-                SUM(tf.area_covered) as total_area
-            FROM tasks t
-            JOIN task_fields tf ON t.id = tf.task_id
-            JOIN fields f ON tf.field_id = f.id
-            WHERE t.farmer_id = %s
-            GROUP BY t.id
-            ORDER BY t.planned_date DESC
-            LIMIT %s
-            """
-            result = db_manager.execute_query(query, (farmer_id, limit))
+            conditions.append("t.status = %s")
+            params.append(status)
+        if cursor_sql:
+            conditions.append(cursor_sql)
+            params.extend(cursor_params)
+        params.append(page_size + 1)
+        
+        query = f"""
+        SELECT
+            t.id, t.task_name, t.task_type, t.status, 
+            t.planned_date, t.completed_date, t.notes,
+            STRING_AGG(f.field_name, ', ') as field_names,
+            COUNT(DISTINCT tf.field_id) as field_count,
+            SUM(tf.area_covered) as total_area
+        FROM tasks t
+        JOIN task_fields tf ON t.id = tf.task_id
+        JOIN fields f ON tf.field_id = f.id
+        WHERE {' AND '.join(conditions)}
+        GROUP BY t.id
+        ORDER BY t.planned_date DESC, t.id DESC
+        LIMIT %s
+        """
+        result = db_manager.execute_query(query, tuple(params))
+        
+        rows = result['rows'] if result and 'rows' in result else []
+        rows, next_cursor = build_page(rows, page_size, sort_index=4, id_index=0)
         
         tasks = []
-        if result and 'rows' in result:
-            for row in result['rows']:
-                tasks.append({
-                    'id': row[0],
-                    'task_name': row[1],
-                    'task_type': row[2],
-                    'status': row[3],
-                    'planned_date': row[4].isoformat() if row[4] else None,
-                    'completed_date': row[5].isoformat() if row[5] else None,
-                    'notes': row[6],
-                    'field_names': row[7],
-                    'field_count': row[8],
-                    'total_area': float(row[9]) if row[9] else 0
-                })
+        for row in rows:
+            tasks.append({
+                'id': row[0],
+                'task_name': row[1],
+                'task_type': row[2],
+                'status': row[3],
+                'planned_date': row[4].isoformat() if row[4] else None,
+                'completed_date': row[5].isoformat() if row[5] else None,
+                'notes': row[6],
+                'field_names': row[7],
+                'field_count': row[8],
+                'total_area': float(row[9]) if row[9] else 0
+            })
         
         return JSONResponse(content={
             "success": True,
             "tasks": tasks,
-            "count": len(tasks)
+            "count": len(tasks),
+            "next_cursor": next_cursor,
+            "has_more": next_cursor is not None
         })
     except Exception as e:
         logger.error(f"Error fetching tasks: {e}")
@@ -398,11 +407,17 @@ async def complete_task(task_id: int, request: Request, farmer: dict = Depends(r
 async def get_field_history(
     field_id: int, 
     year: Optional[int] = None,
+    limit: int = 100,
+    cursor: Optional[str] = None,
     farmer: dict = Depends(require_auth)
 ):
-    """Get activity history for a field"""
+    """
+    Get activity history for a field
+    Full history is keyset-paginated on (activity_date, id); pass next_cursor back as cursor
+    """
     db_manager = get_db_manager()
     farmer_id = farmer['farmer_id']
+    next_cursor = None
     
     try:
         # Verify field belongs to farmer
@@ -419,9 +434,21 @@ async def get_field_history(
             # Use the stored function for specific year
             query = "SELECT * FROM get_field_history_by_year(%s, %s)"
             result = db_manager.execute_query(query, (field_id, year))
+            rows = result['rows'] if result and 'rows' in result else []
         else:
-            # Get all history
-            query = """
+            try:
+                cursor_sql, cursor_params = keyset_predicate("fh.activity_date", "fh.id", cursor)
+            except InvalidCursorError:
+                return JSONResponse(content={
+                    "success": False,
+                    "error": "Invalid cursor"
+                }, status_code=400)
+            
+            page_size = clamp_page_size(limit, default=100)
+            cursor_clause = f"AND {cursor_sql}" if cursor_sql else ""
+            
+            # Get one page of history
+            query = f"""
             SELECT 
                 fh.activity_date,
                 fh.activity_type,
@@ -429,33 +456,38 @@ async def get_field_history(
                 fh.materials_used,
                 fh.cost,
                 t.task_name,
-                t.notes
+                t.notes,
+                fh.id
             FROM field_history fh
             LEFT JOIN tasks t ON fh.task_id = t.id
-            WHERE fh.field_id = %s
-            ORDER BY fh.activity_date DESC
+            WHERE fh.field_id = %s {cursor_clause}
+            ORDER BY fh.activity_date DESC, fh.id DESC
+            LIMIT %s
             """
-            result = db_manager.execute_query(query, (field_id,))
+            result = db_manager.execute_query(query, (field_id, *cursor_params, page_size + 1))
+            rows = result['rows'] if result and 'rows' in result else []
+            rows, next_cursor = build_page(rows, page_size, sort_index=0, id_index=7)
         
         history = []
-        if result and 'rows' in result:
-            for row in result['rows']:
-                history.append({
-                    'activity_date': row[0].isoformat() if row[0] else None,
-                    'activity_type': row[1],
-                    'description': row[2],
-                    'materials_used': row[3] if isinstance(row[3], dict) else json.loads(row[3]) if row[3] else [],
-                    'cost': float(row[4]) if row[4] else 0,
-                    'task_name': row[5] if len(row) > 5 else None,
-                    'notes': row[6] if len(row) > 6 else None
-                })
+        for row in rows:
+            history.append({
+                'activity_date': row[0].isoformat() if row[0] else None,
+                'activity_type': row[1],
+                'description': row[2],
+                'materials_used': row[3] if isinstance(row[3], dict) else json.loads(row[3]) if row[3] else [],
+                'cost': float(row[4]) if row[4] else 0,
+                'task_name': row[5] if len(row) > 5 else None,
+                'notes': row[6] if len(row) > 6 else None
+            })
         
         return JSONResponse(content={
             "success": True,
             "field_id": field_id,
             "year": year,
             "history": history,
-            "count": len(history)
+            "count": len(history),
+            "next_cursor": next_cursor,
+            "has_more": next_cursor is not None
         })
         
     except Exception as e:
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Password hashing off the event loop
+Versioned hash formats, a bounded worker pool and rehash-on-login.
+
+Stored formats understood by verify:
+    pbkdf2_sha256$<salt>$<hex>                   legacy, 100,000 iterations
+    pbkdf2_sha256$<iterations>$<salt>$<hex>      current PBKDF2 format
+    scrypt$<n>$<r>$<p>$<salt>$<hex>              optional stronger KDF
+    $2b$...                                      bcrypt hashes from CAVA registration
+
+New hashes are produced with PASSWORD_HASH_ALGORITHM / PASSWORD_HASH_ITERATIONS,
+and any stored hash that does not match that policy is flagged for rehash.
+"""
+import asyncio
+import hashlib
+import hmac
+import logging
+import os
+import secrets
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+try:
+    import bcrypt
+    BCRYPT_AVAILABLE = True
+except ImportError:
+    BCRYPT_AVAILABLE = False
+
+LEGACY_PBKDF2_ITERATIONS = 100000
+
+PASSWORD_HASH_ALGORITHM = os.getenv('PASSWORD_HASH_ALGORITHM', 'pbkdf2_sha256')
+PASSWORD_HASH_ITERATIONS = int(os.getenv('PASSWORD_HASH_ITERATIONS', str(LEGACY_PBKDF2_ITERATIONS)))
+SCRYPT_N = int(os.getenv('PASSWORD_SCRYPT_N', '16384'))
+SCRYPT_R = int(os.getenv('PASSWORD_SCRYPT_R', '8'))
+SCRYPT_P = int(os.getenv('PASSWORD_SCRYPT_P', '1'))
+
+# KDF work runs in its own small pool; the semaphore caps how many logins
+# may queue for it so a burst cannot starve the default executor
+HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', '2'))
+HASH_MAX_PENDING = int(os.getenv('PASSWORD_HASH_MAX_PENDING', '32'))
+
+_executor: Optional[ThreadPoolExecutor] = None
+_semaphore: Optional[asyncio.Semaphore] = None
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="password-hash")
+    return _executor
+
+def _get_semaphore() -> asyncio.Semaphore:
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(HASH_MAX_PENDING)
+    return _semaphore
+
+def _pbkdf2(password: str, salt: str, iterations: int) -> str:
+    return hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt.encode('utf-8'), iterations).hex()
+
+def _scrypt(password: str, salt: str, n: int, r: int, p: int) -> str:
+    return hashlib.scrypt(password.encode('utf-8'), salt=salt.encode('utf-8'),
+                          n=n, r=r, p=p, maxmem=128 * n * r * p + 1024 * 1024).hex()
+
+def hash_password(password: str) -> str:
+    """Hash a password with the configured algorithm (blocking)"""
+    salt = secrets.token_hex(16)
+    if PASSWORD_HASH_ALGORITHM == 'scrypt':
+        key = _scrypt(password, salt, SCRYPT_N, SCRYPT_R, SCRYPT_P)
+        return f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}${salt}${key}"
+    key = _pbkdf2(password, salt, PASSWORD_HASH_ITERATIONS)
+    return f"pbkdf2_sha256${PASSWORD_HASH_ITERATIONS}${salt}${key}"
+
+def check_password(password: str, hashed_password: str) -> bool:
+    """Verify a password against any supported stored format (blocking)"""
+    try:
+        if not hashed_password:
+            return False
+        if hashed_password.startswith('$2'):
+            if not BCRYPT_AVAILABLE:
+                logger.error("bcrypt hash found but bcrypt is not installed")
+                return False
+            return bcrypt.checkpw(password.encode('utf-8'), hashed_password.encode('utf-8'))
+
+        parts = hashed_password.split('$')
+        if parts[0] == 'pbkdf2_sha256' and len(parts) == 3:
+            return hmac.compare_digest(_pbkdf2(password, parts[1], LEGACY_PBKDF2_ITERATIONS), parts[2])
+        if parts[0] == 'pbkdf2_sha256' and len(parts) == 4:
+            return hmac.compare_digest(_pbkdf2(password, parts[2], int(parts[1])), parts[3])
+        if parts[0] == 'scrypt' and len(parts) == 6:
+            n, r, p = int(parts[1]), int(parts[2]), int(parts[3])
+            return hmac.compare_digest(_scrypt(password, parts[4], n, r, p), parts[5])
+        return False
+    except Exception as e:
+        logger.error(f"Password verification error: {e}")
+        return False
+
+def needs_rehash(hashed_password: str) -> bool:
+    """True when a stored hash was made under an older policy"""
+    if not hashed_password:
+        return False
+    parts = hashed_password.split('$')
+    if PASSWORD_HASH_ALGORITHM == 'scrypt':
+        return not (parts[0] == 'scrypt' and len(parts) == 6
+                    and parts[1:4] == [str(SCRYPT_N), str(SCRYPT_R), str(SCRYPT_P)])
+    return not (parts[0] == 'pbkdf2_sha256' and len(parts) == 4
+                and parts[1] == str(PASSWORD_HASH_ITERATIONS))
+
+async def _run_in_pool(func, *args):
+    async with _get_semaphore():
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_executor(), func, *args)
+
+async def hash_password_async(password: str) -> str:
+    """Hash a password without blocking the event loop"""
+    return await _run_in_pool(hash_password, password)
+
+async def verify_password_async(password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verify a password without blocking the event loop
+    Returns (valid, new_hash); new_hash is set when the stored hash should be upgraded
+    """
+    valid = await _run_in_pool(check_password, password, hashed_password)
+    if valid and needs_rehash(hashed_password):
+        return True, await hash_password_async(password)
+    return valid, None
@@ -14,6 +14,10 @@ from modules.core.config import VERSION
 from modules.core.database_manager import get_db_manager
 from modules.core.translations import get_translations
 from modules.core.language_service import get_language_service
+from .session_tokens import (
+    SESSION_COOKIE_NAME, SESSION_TTL_SECONDS, issue_session_token,
+    verify_session_token, get_farmer_profile, invalidate_farmer_profile
+)
 
 logger = logging.getLogger(__name__)
 
@@ -24,9 +28,10 @@ import os
 template_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "templates")
 templates = Jinja2Templates(directory=template_dir)
 
-# Password hashing using standard library
-import hashlib
-import secrets
+# Password hashing using standard library, executed off the event loop
+from .password_hashing import (
+    check_password, hash_password, hash_password_async, verify_password_async
+)
 
 def validate_whatsapp_number(number: str) -> bool:
     """Validate WhatsApp number format"""
@@ -58,25 +63,25 @@ def format_whatsapp_number(number: str) -> str:
     return digits_only
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify password against hash"""
-    try:
-        if not hashed_password or '$' not in hashed_password:
-            return False
-        parts = hashed_password.split('$')
-        if len(parts) != 3 or parts[0] != 'pbkdf2_sha256':
-            return False
-        salt = parts[1]
-        key = hashlib.pbkdf2_hmac('sha256', plain_password.encode('utf-8'), salt.encode('utf-8'), 100000)
-        return key.hex() == parts[2]
-    except Exception as e:
-        logger.error(f"Password verification error: {e}")
-        return False
+    """Verify password against hash (blocking - prefer verify_password_async in handlers)"""
+    return check_password(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
-    """Generate password hash"""
-    salt = secrets.token_hex(16)
-    key = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt.encode('utf-8'), 100000)
-    return f"pbkdf2_sha256${salt}${key.hex()}"
+    """Generate password hash (blocking - prefer hash_password_async in handlers)"""
+    return hash_password(password)
+
+async def upgrade_password_hash(farmer_id: int, new_hash: str):
+    """Store a rehashed password after a successful login under an older policy"""
+    try:
+        db_manager = get_db_manager()
+        db_manager.execute_query(
+            "UPDATE farmers SET password_hash = %s WHERE id = %s",
+            (new_hash, farmer_id)
+        )
+        logger.info(f"Upgraded password hash for farmer {farmer_id}")
+    except Exception as e:
+        # Login already succeeded; the upgrade will be retried next time
+        logger.warning(f"Could not upgrade password hash for farmer {farmer_id}: {e}")
 
 async def get_active_farmer_by_whatsapp(whatsapp_number: str):
     """Get ONLY active farmer from farmers table (not archived/deleted farmers)"""
@@ -92,7 +97,8 @@ async def get_active_farmer_by_whatsapp(whatsapp_number: str):
                COALESCE(whatsapp_number, wa_phone_number) as whatsapp_number, 
                password_hash, 
                created_at, 
-               COALESCE(is_active, true) as is_active
+               COALESCE(is_active, true) as is_active,
+               language_preference
         FROM farmers 
         WHERE (whatsapp_number = %s OR wa_phone_number = %s OR phone = %s)
               AND (is_active = true OR is_active IS NULL)
@@ -112,7 +118,8 @@ async def get_active_farmer_by_whatsapp(whatsapp_number: str):
                 'whatsapp_number': row[4],
                 'password_hash': row[5],
                 'created_at': row[6],
-                'is_active': row[7]
+                'is_active': row[7],
+                'language': row[8]
             }
         return None
     except Exception as e:
@@ -135,7 +142,7 @@ async def create_farmer_account(first_name: str, last_name: str, whatsapp_number
             )
         
         # Hash password
-        password_hash = get_password_hash(password)
+        password_hash = await hash_password_async(password)
         
         # Create default farm name
         default_farm_name = f"{first_name} {last_name}'s Farm"
@@ -303,7 +310,8 @@ async def signin_submit(
         })
     
     # Verify password
-    if not verify_password(password, farmer['password_hash']):
+    password_valid, upgraded_hash = await verify_password_async(password, farmer['password_hash'])
+    if not password_valid:
         return templates.TemplateResponse("auth/signin.html", {
             "request": request,
             "version": VERSION,
@@ -312,10 +320,17 @@ async def signin_submit(
             "t": translations
         })
     
+    if upgraded_hash:
+        await upgrade_password_hash(farmer['farmer_id'], upgraded_hash)
+    
     # Successful login - redirect to farmer dashboard
     response = RedirectResponse(url="/farmer/dashboard", status_code=303)
-    response.set_cookie(key="farmer_id", value=str(farmer['farmer_id']), httponly=True)
-    response.set_cookie(key="farmer_name", value=farmer['name'], httponly=True)
+    set_session_cookies(
+        response,
+        farmer['farmer_id'],
+        farmer['name'],
+        farmer.get('whatsapp_number') or formatted_number
+    )
     
     return response
 
@@ -475,8 +490,12 @@ async def register_submit(
         if farmer_id:
             # Successful registration - redirect to farmer dashboard
             response = RedirectResponse(url="/farmer/dashboard", status_code=303)
-            response.set_cookie(key="farmer_id", value=str(farmer_id), httponly=True)
-            response.set_cookie(key="farmer_name", value=f"{first_name} {last_name}".strip(), httponly=True)
+            set_session_cookies(
+                response,
+                farmer_id,
+                f"{first_name} {last_name}".strip(),
+                formatted_number
+            )
             
             return response
         else:
@@ -501,29 +520,38 @@ async def register_submit(
         })
 
 @router.get("/logout")
-async def logout():
+async def logout(request: Request):
     """Log out user"""
+    farmer = await get_current_farmer(request)
+    if farmer:
+        invalidate_farmer_profile(farmer['farmer_id'])
+    
     response = RedirectResponse(url="/", status_code=303)
+    response.delete_cookie(key=SESSION_COOKIE_NAME)
     response.delete_cookie(key="farmer_id")
     response.delete_cookie(key="farmer_name")
     response.delete_cookie(key="is_admin")
     return response
 
+def set_session_cookies(response, farmer_id: int, name: str, whatsapp_number: Optional[str]):
+    """Attach the signed session token"""
+    token = issue_session_token(farmer_id, name, whatsapp_number)
+    response.set_cookie(key=SESSION_COOKIE_NAME, value=token, httponly=True,
+                        max_age=SESSION_TTL_SECONDS, samesite="lax")
+
 async def get_current_farmer(request: Request) -> Optional[dict]:
-    """Get current logged-in farmer from cookies"""
-    farmer_id = request.cookies.get("farmer_id")
-    farmer_name = request.cookies.get("farmer_name")
-    
-    if farmer_id and farmer_name:
-        return {
-            "farmer_id": int(farmer_id),
-            "name": farmer_name
-        }
-    
-    return None
+    """
+    Get current logged-in farmer
+    Only the signed session token is trusted; the unsigned farmer_id/farmer_name
+    cookies of old sessions are ignored, so those farmers sign in again
+    """
+    return verify_session_token(request.cookies.get(SESSION_COOKIE_NAME))
 
 async def require_auth(request: Request):
-    """Dependency to require authentication"""
+    """
+    Dependency to require authentication
+    Signed sessions are returned as-is; sessions without a WhatsApp number are enriched from the profile cache
+    """
     farmer = await get_current_farmer(request)
     if not farmer:
         raise HTTPException(
@@ -532,28 +560,12 @@ async def require_auth(request: Request):
             headers={"WWW-Authenticate": "Basic"},
         )
     
-    # Get full farmer data including WhatsApp from database
-    from ..core.simple_db import execute_simple_query
-    farmer_id = farmer.get('farmer_id')
-    
-    query = """
-    SELECT id, CONCAT(manager_name, ' ', manager_last_name) as name, 
-           COALESCE(whatsapp_number, wa_phone_number) as whatsapp_number, 
-           COALESCE(whatsapp_number, wa_phone_number) as username, 
-           email
-    FROM farmers
-    WHERE id = %s
-    """
-    result = execute_simple_query(query, (farmer_id,))
-    
-    if result.get('success') and result.get('rows'):
-        row = result['rows'][0]
-        return {
-            "farmer_id": row[0],
-            "name": row[1],
-            "whatsapp_number": row[2],
-            "username": row[3],
-            "email": row[4]
-        }
-    
-    return farmer
\ No newline at end of file
+    # Verified token claims already carry name, language and WhatsApp number
+    if farmer.get('whatsapp_number'):
+        return farmer
+    
+    profile = get_farmer_profile(farmer['farmer_id'])
+    if profile:
+        return dict(profile)
+    
+    return farmer
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Signed, expiring farmer session tokens
+HMAC-SHA256 over a compact JSON claim set - no external service required.
+
+The token carries the stable claims every authenticated page needs (farmer
+id, display name, WhatsApp number) so require_auth does not have to re-read
+the farmers row on each request. The language preference is not cached in
+it - it can change at any time and is read per request. Anything else
+comes from a short-lived in-process profile cache.
+"""
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import os
+import secrets
+import time
+from typing import Any, Dict, Optional
+
+from ..core.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+SESSION_COOKIE_NAME = "ava_session"
+SESSION_TTL_SECONDS = int(os.getenv('SESSION_TTL_SECONDS', str(7 * 24 * 3600)))
+TOKEN_VERSION = 1
+
+_secret: Optional[bytes] = None
+
+def _get_secret() -> bytes:
+    """Signing key from SESSION_SECRET; a per-process key is used if unset"""
+    global _secret
+    if _secret is None:
+        configured = os.getenv('SESSION_SECRET')
+        if configured:
+            _secret = configured.encode('utf-8')
+        else:
+            logger.warning("SESSION_SECRET not configured - using a per-process key, "
+                           "sessions will not be shared between tasks")
+            _secret = secrets.token_bytes(32)
+    return _secret
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).decode('ascii').rstrip('=')
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + '=' * (-len(data) % 4))
+
+def _sign(payload: str) -> str:
+    return _b64encode(hmac.new(_get_secret(), payload.encode('ascii'), hashlib.sha256).digest())
+
+def issue_session_token(farmer_id: int, name: str, whatsapp_number: Optional[str] = None,
+                        ttl_seconds: int = SESSION_TTL_SECONDS) -> str:
+    """Create a signed session token for a farmer"""
+    now = int(time.time())
+    claims = {
+        "v": TOKEN_VERSION,
+        "sub": int(farmer_id),
+        "name": name or "",
+        "wa": whatsapp_number,
+        "iat": now,
+        "exp": now + ttl_seconds
+    }
+    payload = _b64encode(json.dumps(claims, separators=(',', ':')).encode('utf-8'))
+    return f"{payload}.{_sign(payload)}"
+
+def verify_session_token(token: Optional[str]) -> Optional[Dict[str, Any]]:
+    """
+    Verify signature and expiry
+    Returns the farmer dict used throughout the routes, or None if invalid
+    """
+    if not token or '.' not in token:
+        return None
+    try:
+        payload, signature = token.rsplit('.', 1)
+        if not hmac.compare_digest(signature, _sign(payload)):
+            return None
+        claims = json.loads(_b64decode(payload))
+        if claims.get("v") != TOKEN_VERSION or claims.get("exp", 0) < time.time():
+            return None
+        return {
+            "farmer_id": int(claims["sub"]),
+            "name": claims.get("name", ""),
+            "whatsapp_number": claims.get("wa"),
+            "username": claims.get("wa")
+        }
+    except Exception as e:
+        logger.debug(f"Rejected session token: {e}")
+        return None
+
+# Short-lived cache for profile fields not carried in the token
+_profile_cache = TTLCache(
+    max_size=int(os.getenv('FARMER_PROFILE_CACHE_SIZE', '2048')),
+    ttl_seconds=float(os.getenv('FARMER_PROFILE_CACHE_TTL', '60'))
+)
+
+def get_farmer_profile(farmer_id: int) -> Optional[Dict[str, Any]]:
+    """Farmer profile row, served from the in-process cache when fresh"""
+    cached = _profile_cache.get(farmer_id)
+    if cached is not None:
+        return cached
+
+    from ..core.simple_db import execute_simple_query
+    query = """
+    SELECT id, CONCAT(manager_name, ' ', manager_last_name) as name,
+           COALESCE(whatsapp_number, wa_phone_number) as whatsapp_number,
+           email,
+           language_preference
+    FROM farmers
+    WHERE id = %s
+    """
+    result = execute_simple_query(query, (farmer_id,))
+    if not (result.get('success') and result.get('rows')):
+        return None
+
+    row = result['rows'][0]
+    profile = {
+        "farmer_id": row[0],
+        "name": row[1],
+        "whatsapp_number": row[2],
+        "username": row[2],
+        "email": row[3],
+        "language": row[4]
+    }
+    _profile_cache.set(farmer_id, profile)
+    return profile
+
+def invalidate_farmer_profile(farmer_id: int):
+    """Drop a cached profile after the farmers row changes"""
+    _profile_cache.invalidate(farmer_id)
+
+def get_profile_cache_stats() -> Dict[str, Any]:
+    return _profile_cache.stats()
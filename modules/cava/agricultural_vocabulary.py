@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Agricultural vocabulary shared by CAVA fact extraction and intent detection
+English keywords plus Slovenian, Croatian and Bulgarian stems, each mapped
+to one canonical English term. Stems are matched as substrings, so they
+also cover inflected forms (koruza, koruzo, koruze -> corn). Words that are
+ambiguous on their own are only listed inside phrases that fix their meaning:
+'vreme' / 'vrijeme' is "weather" but also "time" in Serbian, Croatian and
+Bosnian ("nemam vremena"), so the weather intent needs e.g. "kakvo je vrijeme"
+or "vremenska prognoza".
+
+All vocabularies are compiled into a single KeywordMatcher; callers scan
+a message once and read whichever categories they need.
+"""
+from typing import Dict, List, Optional
+
+from modules.core.keyword_matcher import KeywordMatcher
+
+def _with_translations(english: List[str], translations: Dict[str, str]) -> Dict[str, str]:
+    vocabulary = {word: word for word in english}
+    vocabulary.update(translations)
+    return vocabulary
+
+CROPS = _with_translations(
+    ['mango', 'corn', 'wheat', 'tomato', 'tomatoes', 'pepper', 'potato', 'potatoes',
+     'soybean', 'grape', 'grapes', 'vineyard', 'apple', 'banana', 'rice', 'barley',
+     'sunflower', 'cucumber', 'cabbage', 'lettuce', 'carrot', 'onion', 'garlic'],
+    {
+        # Slovenian / Croatian
+        'koruz': 'corn', 'kukuruz': 'corn', 'pšenic': 'wheat', 'paradižnik': 'tomato',
+        'rajčic': 'tomato', 'paprik': 'pepper', 'krompir': 'potato', 'soja': 'soybean',
+        'grozdj': 'grape', 'grožđ': 'grape', 'vinograd': 'vineyard', 'jabolk': 'apple',
+        'jabuk': 'apple', 'ječmen': 'barley', 'sončnic': 'sunflower', 'suncokret': 'sunflower',
+        'kumar': 'cucumber', 'krastavac': 'cucumber', 'zelje': 'cabbage', 'kupus': 'cabbage',
+        'čebul': 'onion', 'česen': 'garlic', 'češnjak': 'garlic', 'korenj': 'carrot', 'mrkv': 'carrot',
+        # Bulgarian
+        'манго': 'mango', 'царевиц': 'corn', 'пшениц': 'wheat', 'домат': 'tomato',
+        'пипер': 'pepper', 'картоф': 'potato', 'соя': 'soybean', 'грозд': 'grape',
+        'лозя': 'vineyard', 'ябълк': 'apple', 'банан': 'banana',
+        'ечемик': 'barley', 'слънчоглед': 'sunflower', 'краставиц': 'cucumber',
+        'морков': 'carrot', 'чесън': 'garlic'
+    }
+)
+
+LOCATIONS = _with_translations(
+    ['bulgaria', 'bulgarian', 'plovdiv', 'sofia', 'croatia', 'croatian', 'zagreb',
+     'serbia', 'serbian', 'germany', 'german', 'munich', 'italy', 'italian', 'sicily',
+     'poland', 'polish', 'krakow', 'spain', 'spanish', 'andalusia', 'france', 'french',
+     'provence', 'netherlands', 'dutch', 'holland'],
+    {
+        'bolgarij': 'bulgaria', 'hrvatsk': 'croatia', 'srbij': 'serbia',
+        'българия': 'bulgaria', 'български': 'bulgarian', 'пловдив': 'plovdiv', 'софия': 'sofia'
+    }
+)
+
+PROBLEMS = _with_translations(
+    ['aphid', 'aphids', 'mildew', 'rust', 'blight', 'weed', 'weeds', 'drought',
+     'flood', 'pest', 'pests', 'disease', 'diseases', 'fungus', 'fungal', 'virus',
+     'yellow', 'brown', 'wilting', 'dying', 'sick', 'problem', 'issue'],
+    {
+        'listne uši': 'aphids', 'lisne uši': 'aphids', 'plesen': 'mildew', 'plijesan': 'mildew',
+        'plevel': 'weeds', 'korov': 'weeds', 'suša': 'drought', 'poplav': 'flood',
+        'škodljiv': 'pests', 'štetnik': 'pests', 'bolezen': 'disease', 'bolest': 'disease',
+        'žut': 'yellow',
+        'листни въшки': 'aphids', 'мана': 'mildew', 'плевел': 'weeds', 'суша': 'drought',
+        'наводнен': 'flood', 'вредител': 'pests', 'болест': 'disease', 'пожълт': 'yellow'
+    }
+)
+
+# Pesticides, fertilizers and other inputs
+CHEMICALS = _with_translations(
+    ['roundup', 'fertilizer', 'npk', 'fungicide', 'herbicide', 'pesticide',
+     'insecticide', 'organic', 'compost', 'manure', 'spray'],
+    {
+        'gnojil': 'fertilizer', 'gnojiv': 'fertilizer', 'fungicid': 'fungicide',
+        'herbicid': 'herbicide', 'pesticid': 'pesticide', 'insekticid': 'insecticide',
+        'kompost': 'compost', 'hlevski gnoj': 'manure', 'stajsko gnojivo': 'manure',
+        'škropi': 'spray', 'prskan': 'spray', 'ekološk': 'organic',
+        'торене': 'fertilizer', 'торове': 'fertilizer', 'фунгицид': 'fungicide', 'хербицид': 'herbicide',
+        'пестицид': 'pesticide', 'инсектицид': 'insecticide', 'компост': 'compost',
+        'оборски тор': 'manure', 'пръскан': 'spray', 'биологичн': 'organic'
+    }
+)
+
+MONTH_NAMES = ['january', 'february', 'march', 'april', 'may', 'june', 'july', 'august',
+               'september', 'october', 'november', 'december']
+
+MONTHS = _with_translations(
+    MONTH_NAMES,
+    {
+        'januar': 'january', 'februar': 'february', 'marec': 'march', 'junij': 'june', 'julij': 'july', 'avgust': 'august',
+        'oktob': 'october', 'listopad': 'october', 'novemb': 'november', 'studeni': 'november',
+        'decemb': 'december', 'prosin': 'december', 'siječ': 'january', 'veljač': 'february',
+        'ožuj': 'march', 'travanj': 'april', 'svib': 'may', 'lipanj': 'june', 'srpanj': 'july',
+        'kolovoz': 'august', 'rujan': 'september',
+        'януари': 'january', 'февруари': 'february', 'март': 'march', 'април': 'april',
+        'юни': 'june', 'юли': 'july', 'август': 'august', 'септември': 'september',
+        'октомври': 'october', 'ноември': 'november', 'декември': 'december'
+    }
+)
+
+SEASONS = ['spring', 'summer', 'autumn', 'fall', 'winter']
+
+RELATIVE_DAYS = _with_translations(
+    ['yesterday', 'today', 'tomorrow'],
+    {
+        'včeraj': 'yesterday', 'jučer': 'yesterday', 'вчера': 'yesterday',
+        'danes': 'today', 'danas': 'today', 'днес': 'today',
+        'jutri': 'tomorrow', 'sutra': 'tomorrow', 'утре': 'tomorrow'
+    }
+)
+
+RELATIVE_PERIODS = ['last week', 'next week', 'this year', 'last year']
+
+# FactExtractor.identify_agricultural_intent, first match in this order wins
+INTENT_KEYWORDS = {
+    'harvest_timing': ['when harvest', 'ready to harvest', 'harvest time', 'when to collect',
+                       'žetev', 'trgatev', 'berba', 'жътва', 'беритба'],
+    'pest_control': ['pest', 'disease', 'insect', 'spray', 'pesticide', 'fungicide',
+                     'škropi', 'prskan', 'škodljiv', 'štetnik', 'bolezen', 'bolest',
+                     'пръскан', 'вредител', 'болест'],
+    'fertilizer': ['fertilizer', 'npk', 'nitrogen', 'phosphorus', 'potassium', 'nutrient',
+                   'gnojil', 'gnojiv', 'dušik', 'торене', 'азот'],
+    'planting': ['plant', 'seed', 'sow', 'planting time', 'when to plant',
+                 'sajen', 'sadit', 'setev', 'sjetv', 'сеитба', 'засажд'],
+    'weather': ['weather', 'rain', 'drought', 'temperature', 'forecast',
+                'kakšno bo vreme', 'kakšno je vreme', 'kakvo je vreme', 'kakvo je vrijeme',
+                'kakvo će biti vreme', 'kakvo će biti vrijeme', 'lepo vreme', 'slabo vreme',
+                'lijepo vrijeme', 'loše vrijeme', 'loše vreme', 'napoved vremena', 'prognoza vremena',
+                'vremenske prilike', 'vremenski uvjeti', 'vremenski uslovi', 'vremenske razmere',
+                'napoved', 'prognoz', 'времето', 'прогноза', 'дъжд'],
+    'yield': ['yield', 'production', 'how much', 'tons per hectare', 'pridelek', 'prinos', 'добив'],
+    'organic': ['organic', 'bio', 'natural', 'chemical-free', 'certification', 'ekološk', 'биологичн'],
+    'irrigation': ['water', 'irrigation', 'drip', 'sprinkler', 'watering',
+                   'namakan', 'zalivan', 'navodnjav', 'напояв', 'поливан'],
+    'soil': ['soil', 'ph', 'analysis', 'test', 'quality', 'zemlj', 'почва'],
+    'market': ['price', 'sell', 'market', 'buyer', 'export', 'cijena', 'prodaj', 'цена', 'продаж']
+}
+
+# CAVAMemory._extract_topics (recent messages), in priority order
+TOPIC_KEYWORDS = {
+    'harvest': ['harvest', 'ready', 'ripe', 'collect'],
+    'planting': ['plant', 'seed', 'sow', 'planting'],
+    'fertilizer': ['fertilizer', 'npk', 'nitrogen', 'phosphorus', 'potassium'],
+    'pest': ['pest', 'insect', 'disease', 'spray', 'pesticide'],
+    'weather': ['weather', 'rain', 'drought', 'temperature', 'forecast'],
+    'yield': ['yield', 'production', 'tons', 'hectare'],
+    'organic': ['organic', 'bio', 'natural', 'chemical-free'],
+    'irrigation': ['water', 'irrigation', 'drip', 'sprinkler'],
+    'soil': ['soil', 'ph', 'analysis', 'test'],
+    'equipment': ['tractor', 'machinery', 'equipment', 'tools']
+}
+
+# CAVAMemory._extract_conversation_themes (whole conversation)
+THEME_KEYWORDS = {
+    'planting': ['plant', 'seed', 'sow', 'planting', 'seeding'],
+    'harvesting': ['harvest', 'ready', 'ripe', 'collect', 'picking'],
+    'fertilization': ['fertilizer', 'npk', 'nitrogen', 'feed', 'nutrition'],
+    'pest_control': ['pest', 'spray', 'disease', 'fungicide', 'pesticide'],
+    'weather_concerns': ['weather', 'rain', 'drought', 'temperature', 'climate'],
+    'yield_optimization': ['yield', 'production', 'improve', 'increase', 'optimize'],
+    'organic_farming': ['organic', 'bio', 'natural', 'chemical-free'],
+    'irrigation': ['water', 'irrigation', 'drip', 'watering'],
+    'soil_management': ['soil', 'ph', 'analysis', 'test', 'quality'],
+    'equipment': ['tractor', 'machinery', 'equipment', 'tools']
+}
+
+def _vocabularies() -> Dict[str, object]:
+    vocabularies = {
+        'crop': CROPS,
+        'location': LOCATIONS,
+        'problem': PROBLEMS,
+        'chemical': CHEMICALS,
+        'month': MONTHS,
+        'season': SEASONS,
+        'relative_day': RELATIVE_DAYS,
+        'relative_period': RELATIVE_PERIODS,
+    }
+    for prefix, groups in (('intent', INTENT_KEYWORDS), ('topic', TOPIC_KEYWORDS), ('theme', THEME_KEYWORDS)):
+        for name, keywords in groups.items():
+            vocabularies[f"{prefix}:{name}"] = keywords
+    return vocabularies
+
+def first_group(hits: Dict[str, tuple], prefix: str, names) -> Optional[str]:
+    """First of ``names`` (in their order) whose ``prefix:name`` category was hit"""
+    return next((name for name in names if f"{prefix}:{name}" in hits), None)
+
+_matcher: Optional[KeywordMatcher] = None
+
+def get_agricultural_matcher() -> KeywordMatcher:
+    """Get or create the shared matcher (built once per process)"""
+    global _matcher
+    if _matcher is None:
+        _matcher = KeywordMatcher(_vocabularies())
+    return _matcher
@@ -3,17 +3,22 @@
 CAVA Registration Engine - Intelligent registration using GPT-3.5
 Handles natural conversation registration with data extraction and validation
 Constitutional Amendment #15 compliant - 95%+ LLM intelligence
+Passwords are hashed as soon as they are extracted; sessions (and the
+conversation history in them) never hold the plaintext.
 """
 import os
 import logging
 import json
 import re
-import bcrypt
 import asyncio
 import asyncpg
 from typing import Dict, Any, Optional
 from datetime import datetime, timedelta
 
+from modules.auth.password_hashing import hash_password_async, verify_password_async
+from modules.core.session_store import REGISTRATION_SESSION_TTL, create_session_store
+from modules.core.phone_prefixes import resolve_phone_number
+
 # Language detection
 try:
     from langdetect import detect, LangDetectException
@@ -25,6 +30,21 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+PASSWORD_MASK = "********"
+
+def new_registration_session() -> Dict[str, Any]:
+    """Empty registration session; password_confirmed stays None until a confirmation arrives"""
+    return {
+        'first_name': None,
+        'last_name': None,
+        'wa_phone_number': None,
+        'password_hash': None,
+        'password_confirmed': None,
+        'language': None,
+        'conversation_history': [],
+        'created_at': datetime.utcnow().isoformat()
+    }
+
 class CAVARegistrationEngine:
     """Intelligent registration engine using GPT-3.5 - Constitutional Amendment #15 compliant"""
     
@@ -32,7 +52,8 @@ class CAVARegistrationEngine:
         self.api_key = os.getenv('OPENAI_API_KEY')
         self.api_url = "https://api.openai.com/v1/chat/completions"
         self.model = "gpt-3.5-turbo"
-        self.sessions = {}  # Track registration sessions in memory
+        # Registration sessions, shared across workers when Redis is configured
+        self.sessions = create_session_store("cava_registration", REGISTRATION_SESSION_TTL)
         
         # Database configuration
         self.db_config = {
@@ -82,18 +103,11 @@ class CAVARegistrationEngine:
     
     async def process_registration_message(self, session_id: str, message: str) -> Dict[str, Any]:
         """Process registration message with full CAVA intelligence"""
+        if not session_id:
+            raise ValueError("session_id is required")
         
         # Get or create session
-        session = self.sessions.get(session_id, {
-            'first_name': None,
-            'last_name': None,
-            'wa_phone_number': None,
-            'password': None,
-            'password_confirmation': None,
-            'language': None,
-            'conversation_history': [],
-            'created_at': datetime.utcnow().isoformat()
-        })
+        session = await self.sessions.aget(session_id) or new_registration_session()
         
         # Add user message to history
         session['conversation_history'].append({
@@ -145,7 +159,7 @@ class CAVARegistrationEngine:
                     extracted_data = self._extract_data_from_text(message, ai_content)
                 
                 # Update session with extracted data
-                updated_fields = self._update_session_data(session, {'extracted_data': extracted_data})
+                updated_fields = await self._update_session_data(session, {'extracted_data': extracted_data})
                 
                 # Add AI response to history
                 session['conversation_history'].append({
@@ -166,7 +180,7 @@ class CAVARegistrationEngine:
                         session['completed_at'] = datetime.utcnow().isoformat()
                 
                 # Save session
-                self.sessions[session_id] = session
+                await self.save_session(session_id, session)
                 
                 return {
                     'success': True,
@@ -180,11 +194,18 @@ class CAVARegistrationEngine:
                     'tokens_used': ai_response.get('usage', {}).get('total_tokens', 0)
                 }
             else:
-                return self._fallback_response(session, message)
+                return await self._fallback_response(session_id, session, message)
                 
         except Exception as e:
             logger.error(f"CAVA Registration Error: {e}")
-            return self._fallback_response(session, message)
+            return await self._fallback_response(session_id, session, message)
+    
+    async def save_session(self, session_id: str, session: Dict[str, Any]):
+        """Persist the session; it is dropped once the farmer account exists"""
+        if session.get('farmer_created'):
+            await self.sessions.adelete(session_id)
+        else:
+            await self.sessions.aset(session_id, session)
     
     def _build_registration_prompt(self, session: Dict[str, Any]) -> str:
         """Build intelligent registration prompt for GPT-3.5"""
@@ -193,8 +214,8 @@ class CAVARegistrationEngine:
             'first_name': session.get('first_name'),
             'last_name': session.get('last_name'),
             'wa_phone_number': session.get('wa_phone_number'),
-            'password': 'SET' if session.get('password') else None,
-            'password_confirmed': session.get('password_confirmation') == session.get('password') if session.get('password') else False
+            'password': 'SET' if session.get('password_hash') else None,
+            'password_confirmed': bool(session.get('password_confirmed'))
         }
         
         return f"""You are AVA, a friendly agricultural assistant helping a farmer register for AVA OLO.
@@ -230,20 +251,29 @@ RESPOND NATURALLY - no need for JSON format. Just have a normal conversation and
 
 Remember: You're helping a farmer register. Be patient, friendly, and helpful like a real person would be."""
     
-    def _update_session_data(self, session: Dict[str, Any], ai_data: Dict[str, Any]) -> list:
+    async def _update_session_data(self, session: Dict[str, Any], ai_data: Dict[str, Any]) -> list:
         """Update session with extracted data and return list of updated fields"""
         updated_fields = []
         
         extracted = ai_data.get('extracted_data', {})
         
-        for field in ['first_name', 'last_name', 'wa_phone_number', 'password']:
+        for field in ['first_name', 'last_name', 'wa_phone_number']:
             if extracted.get(field) and not session.get(field):
                 session[field] = extracted[field]
                 updated_fields.append(field)
         
+        # Only the hash of the password is kept
+        if extracted.get('password') and not session.get('password_hash'):
+            self._mask_password(session, extracted['password'])
+            session['password_hash'] = await hash_password_async(extracted['password'])
+            updated_fields.append('password')
+        
         # Handle password confirmation separately
-        if extracted.get('password_confirmation'):
-            session['password_confirmation'] = extracted['password_confirmation']
+        if extracted.get('password_confirmation') and session.get('password_hash'):
+            self._mask_password(session, extracted['password_confirmation'])
+            session['password_confirmed'], _ = await verify_password_async(
+                extracted['password_confirmation'], session['password_hash']
+            )
             updated_fields.append('password_confirmation')
         
         # Detect language
@@ -252,6 +282,11 @@ Remember: You're helping a farmer register. Be patient, friendly, and helpful li
         
         return updated_fields
     
+    def _mask_password(self, session: Dict[str, Any], password: str):
+        """Replace a password in the stored conversation history"""
+        for entry in session.get('conversation_history', []):
+            entry['content'] = entry['content'].replace(password, PASSWORD_MASK)
+    
     def _extract_data_from_text(self, user_message: str, ai_response: str) -> Dict[str, str]:
         """Extract registration data from user message using intelligent pattern matching"""
         extracted = {}
@@ -300,8 +335,8 @@ Remember: You're helping a farmer register. Be patient, friendly, and helpful li
             session.get('first_name'),
             session.get('last_name'),
             session.get('wa_phone_number'),
-            session.get('password'),
-            session.get('password_confirmation') == session.get('password')
+            session.get('password_hash'),
+            session.get('password_confirmed')
         ])
     
     def _get_collection_status(self, session: Dict[str, Any]) -> Dict[str, bool]:
@@ -310,19 +345,13 @@ Remember: You're helping a farmer register. Be patient, friendly, and helpful li
             'first_name': bool(session.get('first_name')),
             'last_name': bool(session.get('last_name')),
             'wa_phone_number': bool(session.get('wa_phone_number')),
-            'password': bool(session.get('password')),
-            'password_confirmed': session.get('password_confirmation') == session.get('password') if session.get('password') else False
+            'password': bool(session.get('password_hash')),
+            'password_confirmed': bool(session.get('password_confirmed'))
         }
     
     async def _create_farmer(self, session: Dict[str, Any]) -> Optional[int]:
         """Create farmer entry in database"""
         try:
-            # Hash password with bcrypt
-            password_hash = bcrypt.hashpw(
-                session['password'].encode('utf-8'),
-                bcrypt.gensalt()
-            ).decode('utf-8')
-            
             # Connect to database
             conn = await asyncpg.connect(**self.db_config)
             
@@ -338,7 +367,7 @@ Remember: You're helping a farmer register. Be patient, friendly, and helpful li
                 session['first_name'],
                 session['last_name'],
                 session['wa_phone_number'],
-                password_hash,
+                session['password_hash'],
                 datetime.utcnow(),
                 self._detect_country(session['wa_phone_number']),
                 'CAVA_REGISTRATION',
@@ -354,22 +383,10 @@ Remember: You're helping a farmer register. Be patient, friendly, and helpful li
     
     def _detect_country(self, phone_number: str) -> str:
         """Detect country from WhatsApp number prefix"""
-        if phone_number.startswith('+359'):
-            return 'Bulgaria'
-        elif phone_number.startswith('+386'):
-            return 'Slovenia'
-        elif phone_number.startswith('+385'):
-            return 'Croatia'
-        elif phone_number.startswith('+381'):
-            return 'Serbia'
-        elif phone_number.startswith('+49'):
-            return 'Germany'
-        elif phone_number.startswith('+1'):
-            return 'USA'
-        else:
-            return 'Unknown'
+        dialing_code = resolve_phone_number(phone_number).dialing_code
+        return dialing_code.country if dialing_code else 'Unknown'
     
-    def _fallback_response(self, session: Dict[str, Any], message: str) -> Dict[str, Any]:
+    async def _fallback_response(self, session_id: str, session: Dict[str, Any], message: str) -> Dict[str, Any]:
         """Fallback response when AI is unavailable"""
         
         # Simple field extraction without AI
@@ -390,16 +407,16 @@ Remember: You're helping a farmer register. Be patient, friendly, and helpful li
             response = f"Nice to meet you, {session['first_name']}! What's your last name?"
         elif not session.get('wa_phone_number'):
             response = "Great! Now I need your WhatsApp phone number (with country code, like +359...)."
-        elif not session.get('password'):
+        elif not session.get('password_hash'):
             response = "Perfect! Please create a password for your account (minimum 8 characters)."
-        elif not session.get('password_confirmation'):
+        elif session.get('password_confirmed') is None:
             response = "Please type your password again to confirm it."
-        elif session.get('password_confirmation') != session.get('password'):
+        elif not session.get('password_confirmed'):
             response = "The passwords don't match. Please type your password again."
         else:
             response = "Thank you! Your registration is complete. Welcome to AVA OLO!"
         
-        self.sessions[session.get('session_id', 'fallback')] = session
+        await self.save_session(session_id, session)
         
         return {
             'success': True,
@@ -410,9 +427,9 @@ Remember: You're helping a farmer register. Be patient, friendly, and helpful li
             'fallback_mode': True
         }
     
-    def get_session_status(self, session_id: str) -> Dict[str, Any]:
+    async def get_session_status(self, session_id: str) -> Dict[str, Any]:
         """Get registration session status"""
-        session = self.sessions.get(session_id, {})
+        session = await self.sessions.aget(session_id, {})
         
         return {
             'session_exists': bool(session),
@@ -425,12 +442,9 @@ Remember: You're helping a farmer register. Be patient, friendly, and helpful li
             'completed_at': session.get('completed_at')
         }
     
-    def clear_session(self, session_id: str) -> bool:
+    async def clear_session(self, session_id: str) -> bool:
         """Clear registration session"""
-        if session_id in self.sessions:
-            del self.sessions[session_id]
-            return True
-        return False
+        return await self.sessions.adelete(session_id)
 
 # Singleton instance
 _cava_engine = None
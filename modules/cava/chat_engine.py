@@ -13,6 +13,7 @@ import json
 from datetime import datetime
 import asyncio
 from .conversation_optimizer import get_optimizer
+from modules.core.conversation_history import ConversationHistory
 
 logger = logging.getLogger(__name__)
 
@@ -23,8 +24,9 @@ class CAVAChatEngine:
         self.api_key = os.getenv('OPENAI_API_KEY')
         self.api_url = "https://api.openai.com/v1/chat/completions"
         self.model = "gpt-3.5-turbo"  # Using GPT-3.5 as specified
-        self.conversations = {}  # Store conversations by session_id
         self.max_history = 20  # Keep last 20 messages for context
+        # Ring buffer of max_history messages per session; idle/LRU sessions are evicted
+        self.conversations = ConversationHistory("cava_chat", self.max_history)
         self.initialized = False
         self.connection_status = "not_checked"
         
@@ -147,9 +149,8 @@ Remember: You're chatting on WhatsApp, not writing a manual. Short, helpful, fri
                 "connection_status": self.connection_status
             }
         
-        # Initialize conversation history if needed
-        if session_id not in self.conversations:
-            self.conversations[session_id] = []
+        # Load conversation history (empty for a new or expired session)
+        history = await self.conversations.aget(session_id)
         
         # Get system prompt with context
         system_prompt = self._get_system_prompt(farmer_context or {})
@@ -158,7 +159,7 @@ Remember: You're chatting on WhatsApp, not writing a manual. Short, helpful, fri
         messages = [{"role": "system", "content": system_prompt}]
         
         # Add conversation history
-        for msg in self.conversations[session_id][-self.max_history:]:
+        for msg in history:
             messages.append(msg)
         
         # Add current user message
@@ -202,8 +203,11 @@ Remember: You're chatting on WhatsApp, not writing a manual. Short, helpful, fri
                     final_response = '\n\n'.join(optimized_messages)
                     
                     # Update conversation history with original response
-                    self.conversations[session_id].append({"role": "user", "content": message})
-                    self.conversations[session_id].append({"role": "assistant", "content": ai_response})
+                    await self.conversations.aappend(
+                        session_id,
+                        {"role": "user", "content": message},
+                        {"role": "assistant", "content": ai_response}
+                    )
                     
                     # Track token usage and response metrics
                     usage = result.get('usage', {})
@@ -246,6 +250,15 @@ Remember: You're chatting on WhatsApp, not writing a manual. Short, helpful, fri
                 "success": False
             }
     
+    def _history_status(self) -> Dict:
+        history = self.conversations.stats()
+        return {
+            "active_sessions": history["sessions"],
+            "total_messages": history["messages"],
+            "history_memory_bytes": history["approx_bytes"],
+            "history": history
+        }
+    
     def get_status(self) -> Dict:
         """Get CAVA engine status"""
         return {
@@ -254,20 +267,16 @@ Remember: You're chatting on WhatsApp, not writing a manual. Short, helpful, fri
             "model": self.model,
             "api_key_set": bool(self.api_key),
             "api_key_preview": self.api_key[:8] + "..." if self.api_key else "NOT_SET",
-            "active_sessions": len(self.conversations),
-            "total_messages": sum(len(msgs) for msgs in self.conversations.values())
+            **self._history_status()
         }
     
     def clear_session(self, session_id: str):
         """Clear conversation history for a session"""
-        if session_id in self.conversations:
-            del self.conversations[session_id]
-            return True
-        return False
+        return self.conversations.clear(session_id)
     
     def get_session_history(self, session_id: str) -> List[Dict]:
         """Get conversation history for a session"""
-        return self.conversations.get(session_id, [])
+        return self.conversations.get(session_id)
 
 # Singleton instance
 _cava_engine = None
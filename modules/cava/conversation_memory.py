@@ -4,13 +4,30 @@ CAVA Conversation Memory Module
 Handles conversation context retrieval and management for persistent chat sessions
 """
 import logging
+import re
 from typing import Dict, List, Optional, Any
 from datetime import datetime, timedelta
 import asyncpg
 from modules.core.database_manager import DatabaseManager
+from .agricultural_vocabulary import THEME_KEYWORDS, TOPIC_KEYWORDS, get_agricultural_matcher
 
 logger = logging.getLogger(__name__)
 
+QUANTITY_PATTERN = re.compile(r'(\d+)\s*(hectare|hectares|ha|ton|tons|kg|kilogram|liter|liters|acre|acres)')
+DURATION_PATTERN = re.compile(r'(\d+)\s*(year|years|month|months|week|weeks|day|days)')
+
+# Matcher category -> conversation fact list
+FACT_CATEGORIES = {
+    'crop': 'crops_mentioned',
+    'location': 'locations_mentioned',
+    'problem': 'problems_mentioned',
+    'chemical': 'products_mentioned',
+    'season': 'time_references',
+    'month': 'time_references',
+    'relative_day': 'time_references',
+    'relative_period': 'time_references'
+}
+
 class CAVAMemory:
     """
     CAVA Memory component for conversation context management
@@ -365,65 +382,23 @@ class CAVAMemory:
             'time_references': set()
         }
         
-        # Define comprehensive keyword lists
-        crop_keywords = ['mango', 'corn', 'wheat', 'tomato', 'tomatoes', 'pepper', 'potato', 'potatoes', 
-                        'soybean', 'grape', 'grapes', 'vineyard', 'apple', 'banana', 'rice', 'barley',
-                        'sunflower', 'cucumber', 'cabbage', 'lettuce', 'carrot', 'onion', 'garlic']
-        
-        location_keywords = ['bulgaria', 'bulgarian', 'plovdiv', 'sofia', 'croatia', 'croatian', 'zagreb',
-                           'germany', 'german', 'munich', 'italy', 'italian', 'sicily', 'poland', 'polish',
-                           'krakow', 'spain', 'spanish', 'andalusia', 'france', 'french', 'provence',
-                           'netherlands', 'dutch', 'holland']
-        
-        problem_keywords = ['aphid', 'aphids', 'mildew', 'rust', 'blight', 'weed', 'weeds', 'drought', 
-                          'flood', 'pest', 'pests', 'disease', 'diseases', 'fungus', 'fungal', 'virus',
-                          'yellow', 'brown', 'wilting', 'dying', 'sick', 'problem', 'issue']
-        
-        product_keywords = ['roundup', 'fertilizer', 'npk', 'fungicide', 'herbicide', 'pesticide',
-                          'insecticide', 'organic', 'compost', 'manure', 'spray']
-        
+        matcher = get_agricultural_matcher()
         for msg in messages:
             content = msg.get('content', '').lower()
             
-            # Extract crops
-            for crop in crop_keywords:
-                if crop in content:
-                    facts['crops_mentioned'].add(crop)
+            # Crops, locations, problems, products and named time references in one scan
+            for category, terms in matcher.scan(content).items():
+                fact_key = FACT_CATEGORIES.get(category)
+                if fact_key:
+                    facts[fact_key].update(terms)
             
             # Extract quantities with units
-            import re
-            quantities = re.findall(r'(\d+)\s*(hectare|hectares|ha|ton|tons|kg|kilogram|liter|liters|acre|acres)', content)
-            for qty, unit in quantities:
+            for qty, unit in QUANTITY_PATTERN.findall(content):
                 facts['quantities_mentioned'].add(f"{qty} {unit}")
             
-            # Extract locations
-            for location in location_keywords:
-                if location in content:
-                    facts['locations_mentioned'].add(location)
-            
-            # Extract problems
-            for problem in problem_keywords:
-                if problem in content:
-                    facts['problems_mentioned'].add(problem)
-            
-            # Extract products
-            for product in product_keywords:
-                if product in content:
-                    facts['products_mentioned'].add(product)
-            
-            # Extract time references
-            time_patterns = [r'(\d+)\s*(year|years|month|months|week|weeks|day|days)', 
-                           r'(spring|summer|autumn|fall|winter)', 
-                           r'(january|february|march|april|may|june|july|august|september|october|november|december)',
-                           r'(yesterday|today|tomorrow|last week|next week|this year|last year)']
-            
-            for pattern in time_patterns:
-                matches = re.findall(pattern, content, re.IGNORECASE)
-                for match in matches:
-                    if isinstance(match, tuple):
-                        facts['time_references'].add(' '.join(match))
-                    else:
-                        facts['time_references'].add(match)
+            # Durations ("3 weeks")
+            for match in DURATION_PATTERN.findall(content):
+                facts['time_references'].add(' '.join(match))
         
         # Convert sets to lists and limit
         result = {}
@@ -436,26 +411,11 @@ class CAVAMemory:
         """Extract main themes from the entire conversation"""
         themes = set()
         
-        theme_keywords = {
-            'planting': ['plant', 'seed', 'sow', 'planting', 'seeding'],
-            'harvesting': ['harvest', 'ready', 'ripe', 'collect', 'picking'],
-            'fertilization': ['fertilizer', 'npk', 'nitrogen', 'feed', 'nutrition'],
-            'pest_control': ['pest', 'spray', 'disease', 'fungicide', 'pesticide'],
-            'weather_concerns': ['weather', 'rain', 'drought', 'temperature', 'climate'],
-            'yield_optimization': ['yield', 'production', 'improve', 'increase', 'optimize'],
-            'organic_farming': ['organic', 'bio', 'natural', 'chemical-free'],
-            'irrigation': ['water', 'irrigation', 'drip', 'watering'],
-            'soil_management': ['soil', 'ph', 'analysis', 'test', 'quality'],
-            'equipment': ['tractor', 'machinery', 'equipment', 'tools']
-        }
-        
+        matcher = get_agricultural_matcher()
         for msg in messages:
             if msg.get('role') == 'user':
-                content = msg.get('content', '').lower()
-                
-                for theme, keywords in theme_keywords.items():
-                    if any(keyword in content for keyword in keywords):
-                        themes.add(theme)
+                hits = matcher.scan(msg.get('content', '').lower())
+                themes.update(theme for theme in THEME_KEYWORDS if f"theme:{theme}" in hits)
         
         return list(themes)[:5]  # Return top 5 themes
     
@@ -463,29 +423,15 @@ class CAVAMemory:
         """Extract main topics from recent messages"""
         topics = []
         
-        # Keywords to look for in agricultural conversations
-        topic_keywords = {
-            'harvest': ['harvest', 'ready', 'ripe', 'collect'],
-            'planting': ['plant', 'seed', 'sow', 'planting'],
-            'fertilizer': ['fertilizer', 'npk', 'nitrogen', 'phosphorus', 'potassium'],
-            'pest': ['pest', 'insect', 'disease', 'spray', 'pesticide'],
-            'weather': ['weather', 'rain', 'drought', 'temperature', 'forecast'],
-            'yield': ['yield', 'production', 'tons', 'hectare'],
-            'organic': ['organic', 'bio', 'natural', 'chemical-free'],
-            'irrigation': ['water', 'irrigation', 'drip', 'sprinkler'],
-            'soil': ['soil', 'ph', 'analysis', 'test'],
-            'equipment': ['tractor', 'machinery', 'equipment', 'tools']
-        }
-        
-        # Check messages for topics
+        # Check messages for topics (shared vocabulary, one scan per message)
+        matcher = get_agricultural_matcher()
         for msg in messages:
             if msg.get('role') == 'user':
-                content_lower = msg.get('content', '').lower()
+                hits = matcher.scan(msg.get('content', '').lower())
                 
-                for topic, keywords in topic_keywords.items():
-                    if any(keyword in content_lower for keyword in keywords):
-                        if topic not in topics:
-                            topics.append(topic)
+                for topic in TOPIC_KEYWORDS:
+                    if f"topic:{topic}" in hits and topic not in topics:
+                        topics.append(topic)
         
         return topics[:3]  # Return top 3 topics
     
@@ -3,13 +3,126 @@
 WhatsApp Conversation Optimizer for CAVA
 Transforms AI responses into natural, WhatsApp-style messages
 Mango Test Compliant: Bulgarian farmer gets crisp, conversational responses
+
+All rewriting is table-driven and precompiled at import: phrase and unit
+substitutions share one alternation regex resolved through a lookup table,
+and emoji placement is found in a single scan. SentenceSplitter lets the
+same pipeline run incrementally over a streamed (token-by-token) reply.
 """
+import random
 import re
-from typing import List, Dict, Tuple
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 import logging
 
+from modules.core.keyword_matcher import FoldedPattern, fold_case, trie_pattern
+
 logger = logging.getLogger(__name__)
 
+# Formal phrase -> casual phrase (matched case-insensitively)
+PHRASE_REPLACEMENTS = {
+    "Based on the analysis": "Looking at your situation",
+    "It is recommended that": "You should",
+    "It would be advisable to": "Better to",
+    "In accordance with": "Following",
+    "Furthermore": "Also",
+    "However": "But",
+    "Therefore": "So",
+    "Approximately": "About",
+    "Utilize": "Use",
+    "Implement": "Start",
+    "Optimal": "Best",
+    "Ensure that": "Make sure",
+    "It appears that": "Looks like",
+    "In conclusion": "So",
+    "Additionally": "Plus",
+    "Prior to": "Before",
+    "Subsequent to": "After",
+    "With regard to": "About",
+    "In order to": "To",
+    "Due to the fact that": "Because",
+    "At this point in time": "Now",
+    "In the event that": "If",
+    "Has the ability to": "Can",
+    "Is able to": "Can"
+}
+
+# Verbose unit after a number -> short unit (matched case-sensitively)
+UNIT_ABBREVIATIONS = {
+    "degrees Celsius": "°C",
+    "kilometers per hour": " km/h",
+    "kilograms per hectare": " kg/ha",
+    "millimeters": "mm",
+    "hectares": "ha"
+}
+
+# (keywords, emoji, probability) in priority order; at most MAX_EMOJIS are added
+EMOJI_RULES = [
+    (('plant', 'seed', 'sow'), '🌱', 0.7),  # 70% chance
+    (('water', 'irrigat', 'moisture'), '💧', 0.6),
+    (('sun', 'sunny', 'solar'), '☀️', 0.8),
+    (('rain', 'precipitat'), '🌧️', 0.8),
+    (('harvest', 'pick', 'collect'), '🌾', 0.7),
+    (('mango',), '🥭', 1.0),  # Always for mango
+    (('grape', 'vineyard'), '🍇', 0.9),
+    (('warning', 'caution', 'careful'), '⚠️', 0.9),
+    (('perfect', 'excellent', 'great'), '✅', 0.5),
+    (('timing', 'schedule', 'when'), '⏰', 0.4),
+    (('important', 'critical', 'essential'), '❗', 0.6),
+    (('temperature', 'degrees', '°C'), '🌡️', 0.5),
+    (('profit', 'cost', 'price', 'money'), '💰', 0.6),
+]
+MAX_EMOJIS = 2  # Don't overdo it
+
+_PHRASE_LOOKUP = {fold_case(formal): casual for formal, casual in PHRASE_REPLACEMENTS.items()}
+# Units are checked case-sensitively against the original text after matching
+_REWRITE_PATTERN = FoldedPattern(
+    f"(?P<phrase>{trie_pattern(_PHRASE_LOOKUP)})"
+    f"|(?<=\\d) (?P<unit>{trie_pattern(fold_case(unit) for unit in UNIT_ABBREVIATIONS)})"
+)
+
+_EMOJI_RULE_BY_WORD = {
+    fold_case(word): index for index, (words, _, _) in enumerate(EMOJI_RULES) for word in words
+}
+_EMOJI_PATTERN = FoldedPattern(f"\\b(?:{trie_pattern(_EMOJI_RULE_BY_WORD)})\\b")
+
+_SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])\s+')
+# A sentence end, or a paragraph break without closing punctuation
+_STREAM_BOUNDARY = re.compile(r'[.!?]\s+|\n\s*\n')
+
+class SentenceSplitter:
+    """
+    Incremental sentence splitter for streamed model output
+
+    feed() returns the sentences completed by a chunk and keeps the partial
+    one buffered; only the buffered tail is rescanned, so a token stream is
+    split in linear time. flush() returns whatever is left at the end.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._scan_from = 0
+
+    def feed(self, chunk: str) -> List[str]:
+        self._buffer += chunk
+        sentences = []
+        start = 0
+        for match in _STREAM_BOUNDARY.finditer(self._buffer, self._scan_from):
+            sentence = self._buffer[start:match.start() + 1].strip()
+            if sentence:
+                sentences.append(sentence)
+            start = match.end()
+        self._buffer = self._buffer[start:]
+        # A boundary can only start at the last non-space character or after it
+        trailing = len(self._buffer) - len(self._buffer.rstrip())
+        self._scan_from = max(len(self._buffer) - trailing - 1, 0)
+        return sentences
+
+    def flush(self) -> Optional[str]:
+        sentence = self._buffer.strip()
+        self._buffer = ""
+        self._scan_from = 0
+        return sentence or None
+
 class WhatsAppOptimizer:
     """Optimizes CAVA responses for WhatsApp-style conversation"""
     
@@ -43,6 +156,10 @@ class WhatsAppOptimizer:
         'location': '📍'
     }
     
+    def __init__(self, rng=None):
+        # Anything with random(); a seeded random.Random makes emoji placement repeatable
+        self._rng = rng or random
+    
     def optimize_response(self, original_response: str, context: Dict = None) -> List[str]:
         """
         Transform a long AI response into WhatsApp-style messages
@@ -77,81 +194,53 @@ class WhatsAppOptimizer:
     def _make_conversational(self, text: str) -> str:
         """Convert formal language to conversational WhatsApp style"""
         
-        # Replace formal phrases with casual ones
-        replacements = {
-            "Based on the analysis": "Looking at your situation",
-            "It is recommended that": "You should",
-            "It would be advisable to": "Better to",
-            "In accordance with": "Following",
-            "Furthermore": "Also",
-            "However": "But",
-            "Therefore": "So",
-            "Approximately": "About",
-            "Utilize": "Use",
-            "Implement": "Start",
-            "Optimal": "Best",
-            "Ensure that": "Make sure",
-            "It appears that": "Looks like",
-            "In conclusion": "So",
-            "Additionally": "Plus",
-            "Prior to": "Before",
-            "Subsequent to": "After",
-            "With regard to": "About",
-            "In order to": "To",
-            "Due to the fact that": "Because",
-            "At this point in time": "Now",
-            "In the event that": "If",
-            "Has the ability to": "Can",
-            "Is able to": "Can"
-        }
-        
-        result = text
-        for formal, casual in replacements.items():
-            result = re.sub(formal, casual, result, flags=re.IGNORECASE)
-        
-        # Shorten verbose technical explanations
-        result = re.sub(r'(\d+) degrees Celsius', r'\1°C', result)
-        result = re.sub(r'(\d+) kilometers per hour', r'\1 km/h', result)
-        result = re.sub(r'(\d+) kilograms per hectare', r'\1 kg/ha', result)
-        result = re.sub(r'(\d+) millimeters', r'\1mm', result)
-        result = re.sub(r'(\d+) hectares', r'\1ha', result)
-        
-        return result
+        # Formal phrases and verbose units in one pass, resolved through lookup tables
+        parts = []
+        last = 0
+        for match in _REWRITE_PATTERN.finditer(text):
+            start, end = match.span()
+            if match.lastgroup == 'phrase':
+                replacement = _PHRASE_LOOKUP[match.group()]
+            else:
+                unit = text[match.start('unit'):end]
+                if unit not in UNIT_ABBREVIATIONS:
+                    continue  # Units are case-sensitive
+                replacement = UNIT_ABBREVIATIONS[unit]
+            parts.append(text[last:start])
+            parts.append(replacement)
+            last = end
+        parts.append(text[last:])
+        return ''.join(parts)
     
     def _add_natural_emojis(self, text: str, context: Dict = None) -> str:
         """Add emojis naturally without overdoing it"""
         
-        # Detect topic and add relevant emoji at strategic points
-        emoji_rules = [
-            (r'\b(plant|seed|sow)\b', '🌱', 0.7),  # 70% chance
-            (r'\b(water|irrigat|moisture)\b', '💧', 0.6),
-            (r'\b(sun|sunny|solar)\b', '☀️', 0.8),
-            (r'\b(rain|precipitat)\b', '🌧️', 0.8),
-            (r'\b(harvest|pick|collect)\b', '🌾', 0.7),
-            (r'\b(mango)\b', '🥭', 1.0),  # Always for mango
-            (r'\b(grape|vineyard)\b', '🍇', 0.9),
-            (r'\b(warning|caution|careful)\b', '⚠️', 0.9),
-            (r'\b(perfect|excellent|great)\b', '✅', 0.5),
-            (r'\b(timing|schedule|when)\b', '⏰', 0.4),
-            (r'\b(important|critical|essential)\b', '❗', 0.6),
-            (r'\b(temperature|degrees|°C)\b', '🌡️', 0.5),
-            (r'\b(profit|cost|price|money)\b', '💰', 0.6),
-        ]
+        # First occurrence of each rule's keywords, found in a single scan
+        first_match: Dict[int, int] = {}
+        for match in _EMOJI_PATTERN.finditer(text):
+            rule = _EMOJI_RULE_BY_WORD[match.group()]
+            if rule not in first_match:
+                first_match[rule] = match.end()
+                if len(first_match) == len(EMOJI_RULES):
+                    break
         
-        result = text
+        # Rules are still drawn in priority order, so placement matches the old sequential passes
+        insertions: List[Tuple[int, str]] = []
         emojis_added = 0
-        max_emojis = 2  # Don't overdo it
-        
-        import random
-        for pattern, emoji, probability in emoji_rules:
-            if emojis_added >= max_emojis:
+        for rule, (_, emoji, probability) in enumerate(EMOJI_RULES):
+            if emojis_added >= MAX_EMOJIS:
                 break
-            if random.random() < probability:
+            if self._rng.random() < probability:
                 # Add emoji after the first occurrence only
-                result = re.sub(pattern, f'\\g<0> {emoji}', result, count=1, flags=re.IGNORECASE)
-                if emoji in result:
+                if rule in first_match:
+                    insertions.append((first_match[rule], emoji))
+                if rule in first_match or emoji in text:
                     emojis_added += 1
         
+        result = text
+        for position, emoji in sorted(insertions, reverse=True):
+            result = f"{result[:position]} {emoji}{result[position:]}"
+        
         # Add thinking/ending emoji for questions
         if '?' in result and '🤔' not in result:
             result = result.replace('?', '? 🤔', 1)
@@ -170,25 +259,8 @@ class WhatsAppOptimizer:
         for paragraph in paragraphs:
             # If paragraph itself is too long, split by sentences
             if len(paragraph) > self.MAX_MESSAGE_LENGTH:
-                sentences = re.split(r'(?<=[.!?])\s+', paragraph)
-                
-                for sentence in sentences:
-                    # If adding this sentence keeps us under limit, add it
-                    if len(current_message) + len(sentence) + 1 < self.MAX_MESSAGE_LENGTH:
-                        current_message += (" " if current_message else "") + sentence
-                    else:
-                        # Save current message if it's not empty
-                        if current_message:
-                            messages.append(current_message.strip())
-                        
-                        # Start new message with this sentence
-                        if len(sentence) > self.MAX_MESSAGE_LENGTH:
-                            # Split very long sentence at natural break points
-                            parts = self._split_long_sentence(sentence)
-                            messages.extend(parts[:-1])
-                            current_message = parts[-1]
-                        else:
-                            current_message = sentence
+                for sentence in _SENTENCE_BOUNDARY.split(paragraph):
+                    current_message = self._pack_sentence(current_message, sentence, messages)
             else:
                 # If adding this paragraph keeps us under limit, add it
                 if len(current_message) + len(paragraph) + 2 < self.MAX_MESSAGE_LENGTH:
@@ -219,6 +291,24 @@ class WhatsAppOptimizer:
         
         return messages
     
+    def _pack_sentence(self, current_message: str, sentence: str, messages: List[str]) -> str:
+        """Append a sentence to the message being built; full messages go to ``messages``"""
+        # If adding this sentence keeps us under limit, add it
+        if len(current_message) + len(sentence) + 1 < self.MAX_MESSAGE_LENGTH:
+            return current_message + (" " if current_message else "") + sentence
+        
+        # Save current message if it's not empty
+        if current_message:
+            messages.append(current_message.strip())
+        
+        # Start new message with this sentence
+        if len(sentence) > self.MAX_MESSAGE_LENGTH:
+            # Split very long sentence at natural break points
+            parts = self._split_long_sentence(sentence)
+            messages.extend(parts[:-1])
+            return parts[-1]
+        return sentence
+    
     def _split_long_sentence(self, sentence: str) -> List[str]:
         """Split a very long sentence at natural points"""
         
@@ -296,17 +386,43 @@ class WhatsAppOptimizer:
             return messages
         
         # Add continuation hints where appropriate
-        refined = []
-        for i, msg in enumerate(messages):
-            if i < len(messages) - 1:
-                # If message ends abruptly, add continuation hint
-                if not msg.endswith(('.', '!', '?', ':', '...')):
-                    if len(msg) + 3 <= self.MAX_MESSAGE_LENGTH:
-                        msg += '...'
-            
-            refined.append(msg)
+        return [self._continuation_hint(msg) for msg in messages[:-1]] + messages[-1:]
+    
+    def _continuation_hint(self, msg: str) -> str:
+        """Mark a message that is followed by another one and ends abruptly"""
+        if not msg.endswith(('.', '!', '?', ':', '...')):
+            if len(msg) + 3 <= self.MAX_MESSAGE_LENGTH:
+                msg += '...'
+        return msg
+    
+    def optimize_stream(self, chunks: Iterable[str]) -> Iterator[str]:
+        """
+        Incremental optimize_response for a streamed reply
+        
+        Yields each WhatsApp message as soon as the following sentence shows
+        it is full, so the first message can be sent before generation ends.
+        Emojis are left out: their placement needs the whole reply.
+        """
+        splitter = SentenceSplitter()
+        pending: List[str] = []
+        current_message = ""
+        
+        def sentences() -> Iterator[str]:
+            for chunk in chunks:
+                yield from splitter.feed(chunk)
+            tail = splitter.flush()
+            if tail:
+                yield tail
         
-        return refined
+        for sentence in sentences():
+            current_message = self._pack_sentence(current_message, self._make_conversational(sentence), pending)
+            # Something is always left in current_message, so these are never the last message
+            for msg in pending:
+                yield self._continuation_hint(msg)
+            pending.clear()
+        
+        if current_message:
+            yield current_message.strip()
     
     def format_quick_response(self, topic: str, answer: str) -> str:
         """Format very short responses for simple questions"""
@@ -3,44 +3,45 @@
 Enhanced CAVA Registration - Pure LLM-driven conversation with full validation
 Collects: first_name, last_name, whatsapp_number, password (with confirmation)
 Language-aware, validates WhatsApp format, checks duplicates, enforces password rules
+Passwords are hashed (modules.auth.password_hashing) as soon as they are
+entered; sessions only hold the hash, and a finished registration is deleted.
 """
 from typing import Dict, Optional, Tuple
 import logging
 import re
 import json
-import asyncio
-from datetime import datetime, timedelta
+from datetime import datetime
 from langdetect import detect, LangDetectException
-from passlib.context import CryptContext
 
+from modules.auth.password_hashing import hash_password_async, verify_password_async
 from modules.chat.openai_chat import get_openai_chat
 from modules.core.database_manager import DatabaseManager
+from modules.core.session_store import REGISTRATION_SESSION_TTL, create_session_store
 
 logger = logging.getLogger(__name__)
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Stands in for a password in the conversation history kept in the session
+PASSWORD_MASK = "********"
 
 class EnhancedCAVARegistration:
     """Pure LLM-driven registration with validation and multi-language support"""
     
     def __init__(self):
-        self.sessions: Dict[str, Dict] = {}
+        # Abandoned sessions expire after REGISTRATION_SESSION_TTL of inactivity
+        self.sessions = create_session_store("enhanced_registration", REGISTRATION_SESSION_TTL)
         self.chat_service = get_openai_chat()
         self.db_manager = DatabaseManager()
-        
-        # Start session cleanup task
-        asyncio.create_task(self._periodic_cleanup())
     
-    def get_or_create_session(self, session_id: str) -> Dict:
+    async def get_or_create_session(self, session_id: str) -> Dict:
         """Get or create registration session with timeout tracking"""
-        if session_id not in self.sessions:
-            self.sessions[session_id] = {
+        session = await self.sessions.aget(session_id)
+        if session is None:
+            session = {
                 "collected": {
                     "first_name": None,
                     "last_name": None,
                     "whatsapp": None,
-                    "password": None,
+                    "password_hash": None,
                     "password_confirmed": False
                 },
                 "conversation_history": [],
@@ -49,13 +50,37 @@ class EnhancedCAVARegistration:
                 "complete": False,
                 "language": "en",  # Default to English
                 "awaiting_password_confirmation": False,
-                "temp_password": None
+                "pending_password_hash": None
             }
         else:
             # Update last activity
-            self.sessions[session_id]["last_activity"] = datetime.utcnow()
+            session["last_activity"] = datetime.utcnow()
             
-        return self.sessions[session_id]
+        return session
+    
+    async def save_session(self, session_id: str, session: Dict):
+        """Persist the session; a finished registration's session is dropped"""
+        if session["complete"]:
+            await self.sessions.adelete(session_id)
+        else:
+            await self.sessions.aset(session_id, session)
+    
+    async def _password_matches(self, candidate: str, password_hash: Optional[str]) -> bool:
+        """Check a confirmation against the hash of the password entered first"""
+        if not candidate or not password_hash:
+            return False
+        valid, _ = await verify_password_async(candidate, password_hash)
+        return valid
+    
+    def _mask_password(self, session: Dict, password: str):
+        """Keep the plaintext out of the conversation history stored with the session"""
+        if password:
+            session["conversation_history"] = [
+                entry.replace(password, PASSWORD_MASK) for entry in session["conversation_history"]
+            ]
+    
+    def _public_fields(self, collected: Dict) -> Dict:
+        return {key: value for key, value in collected.items() if key != "password_hash"}
     
     def detect_language(self, text: str) -> str:
         """Detect language from text"""
@@ -121,14 +146,20 @@ class EnhancedCAVARegistration:
             collected.get("first_name"),
             collected.get("last_name"), 
             collected.get("whatsapp"),
-            collected.get("password"),
+            collected.get("password_hash"),
             collected.get("password_confirmed", False)
         ])
     
     async def process_message(self, session_id: str, message: str) -> Dict:
         """Process user message with enhanced LLM conversation"""
-        session = self.get_or_create_session(session_id)
-        
+        session = await self.get_or_create_session(session_id)
+        try:
+            return await self._handle_message(session_id, session, message)
+        finally:
+            await self.save_session(session_id, session)
+    
+    async def _handle_message(self, session_id: str, session: Dict, message: str) -> Dict:
+        """Process a message against an already loaded session"""
         # Detect language
         detected_lang = self.detect_language(message)
         if session["language"] == "en" and detected_lang != "en":
@@ -142,7 +173,7 @@ class EnhancedCAVARegistration:
             return {
                 "response": self._get_completion_message(session["language"]),
                 "registration_complete": True,
-                "collected_data": session["collected"],
+                "collected_data": self._public_fields(session["collected"]),
                 "action": "redirect_to_chat"
             }
         
@@ -208,7 +239,7 @@ Currently collected:
 - First name: {collected.get('first_name') or 'NOT PROVIDED'}
 - Last name: {collected.get('last_name') or 'NOT PROVIDED'}
 - WhatsApp: {collected.get('whatsapp') or 'NOT PROVIDED'}
-- Password: {'PROVIDED' if collected.get('password') else 'NOT PROVIDED'}
+- Password: {'PROVIDED' if collected.get('password_hash') else 'NOT PROVIDED'}
 - Password confirmed: {'YES' if collected.get('password_confirmed') else 'NO'}
 
 User's detected language: {lang} ({lang_examples.get(lang, 'Hello, I am John')})
@@ -291,47 +322,50 @@ Return JSON:
         # Handle password
         if extracted.get("password") and extracted["password"] not in ["null", None]:
             password = extracted["password"].strip()
+            self._mask_password(session, password)
             is_valid, reason = self.validate_password(password)
             
             if is_valid:
-                if not collected.get("password"):
+                if not collected.get("password_hash"):
                     # First time password entry
-                    session["temp_password"] = password
+                    session["pending_password_hash"] = await hash_password_async(password)
                     session["awaiting_password_confirmation"] = True
                     response_data["action"] = "request_confirmation"
                 else:
                     # This might be a new password, treat as change
-                    session["temp_password"] = password
+                    session["pending_password_hash"] = await hash_password_async(password)
                     session["awaiting_password_confirmation"] = True
                     response_data["action"] = "request_confirmation"
             else:
                 session["password_validation"] = reason
         
         # Handle password confirmation
-        if extracted.get("password_confirmation") and session.get("temp_password"):
-            if extracted["password_confirmation"] == session["temp_password"]:
-                collected["password"] = session["temp_password"]
+        if extracted.get("password_confirmation") and session.get("pending_password_hash"):
+            self._mask_password(session, extracted["password_confirmation"])
+            if await self._password_matches(extracted["password_confirmation"], session["pending_password_hash"]):
+                collected["password_hash"] = session["pending_password_hash"]
                 collected["password_confirmed"] = True
                 session["awaiting_password_confirmation"] = False
-                session["temp_password"] = None
+                session["pending_password_hash"] = None
             else:
                 session["password_mismatch"] = True
     
     async def _handle_password_confirmation(self, session_id: str, session: Dict, message: str) -> Dict:
         """Handle password confirmation step"""
-        # Check if the message matches the temp password
-        if message.strip() == session.get("temp_password", ""):
-            session["collected"]["password"] = session["temp_password"]
+        # Check if the message matches the password entered before
+        self._mask_password(session, message.strip())
+        if await self._password_matches(message.strip(), session.get("pending_password_hash")):
+            session["collected"]["password_hash"] = session["pending_password_hash"]
             session["collected"]["password_confirmed"] = True
             session["awaiting_password_confirmation"] = False
-            session["temp_password"] = None
+            session["pending_password_hash"] = None
             
             # Check if registration is now complete
             if self.is_complete(session["collected"]):
                 return await self._complete_registration(session_id, session)
             else:
                 # Continue collecting other fields
-                return await self.process_message(session_id, "")
+                return await self._handle_message(session_id, session, "")
         else:
             # Password mismatch
             lang = session["language"]
@@ -395,9 +429,6 @@ Return JSON:
             # Create farmer account
             with self.db_manager.get_connection() as conn:
                 with conn.cursor() as cursor:
-                    # Hash the password
-                    password_hash = pwd_context.hash(collected["password"])
-                    
                     # Insert farmer
                     cursor.execute("""
                         INSERT INTO farmers (
@@ -409,7 +440,7 @@ Return JSON:
                         collected["first_name"],
                         collected["last_name"],
                         collected["whatsapp"],
-                        password_hash,
+                        collected["password_hash"],
                         f"{collected['first_name']}'s Farm",  # Default farm name
                         datetime.utcnow()
                     ))
@@ -417,14 +448,10 @@ Return JSON:
                     farmer_id = cursor.fetchone()[0]
                     conn.commit()
             
-            # Mark session as complete
+            # Mark session as complete; save_session then drops it
             session["complete"] = True
             session["farmer_id"] = farmer_id
             
-            # Clear sensitive data
-            session["collected"]["password"] = None
-            session["temp_password"] = None
-            
             lang = session["language"]
             return {
                 "response": self._get_success_message(lang, collected["first_name"]),
@@ -532,7 +559,7 @@ Return JSON:
                 'en': f"Thanks, {collected['first_name']} {collected['last_name']}! What's your WhatsApp number (with country code)?"
             }
             response = messages.get(lang, messages['en'])
-        elif not collected.get("password"):
+        elif not collected.get("password_hash"):
             messages = {
                 'bg': "Отлично! Сега изберете парола (поне 8 символа):",
                 'sl': "Odlično! Zdaj izberite geslo (vsaj 8 znakov):",
@@ -548,33 +575,21 @@ Return JSON:
             "action": "continue"
         }
     
-    async def _periodic_cleanup(self):
-        """Clean up expired sessions every minute"""
-        while True:
-            await asyncio.sleep(60)  # Check every minute
-            await self.cleanup_expired_sessions()
-    
     async def cleanup_expired_sessions(self):
-        """Remove sessions older than 5 minutes"""
-        cutoff = datetime.utcnow() - timedelta(minutes=5)
-        expired = []
-        
-        for session_id, data in self.sessions.items():
-            if data["last_activity"] < cutoff and not data["complete"]:
-                expired.append(session_id)
-        
-        for session_id in expired:
-            logger.info(f"Cleaning up expired session: {session_id}")
-            del self.sessions[session_id]
+        """Drop sessions idle longer than REGISTRATION_SESSION_TTL (the store also does this lazily)"""
+        expired = self.sessions.expire()
+        if expired:
+            logger.info(f"Cleaned up {expired} expired registration sessions")
     
-    def get_session_data(self, session_id: str) -> Optional[Dict]:
-        """Get session data for debugging"""
-        if session_id in self.sessions:
+    async def get_session_data(self, session_id: str) -> Optional[Dict]:
+        """Get session data for debugging (without the password hash)"""
+        session = await self.sessions.aget(session_id)
+        if session is not None:
             return {
-                "collected": self.sessions[session_id]["collected"],
-                "language": self.sessions[session_id]["language"],
-                "complete": self.sessions[session_id]["complete"],
-                "created_at": self.sessions[session_id]["created_at"],
-                "last_activity": self.sessions[session_id]["last_activity"]
+                "collected": self._public_fields(session["collected"]),
+                "language": session["language"],
+                "complete": session["complete"],
+                "created_at": session["created_at"],
+                "last_activity": session["last_activity"]
             }
         return None
\ No newline at end of file
@@ -1,31 +1,78 @@
 #!/usr/bin/env python3
 """
 CAVA Fact Extractor Module
-Extracts agricultural facts from conversations using GPT-3.5 Turbo
+Extracts agricultural facts from conversations in two tiers: a local
+rule/vocabulary stage resolves crops, chemicals, problems, quantities,
+dates and the farmer's own field names; GPT-3.5 Turbo is only asked when
+the message is agricultural and the local stage cannot fully resolve it.
 """
 import json
 import logging
-from typing import Dict, Any, Optional
+import os
+import re
+from datetime import datetime, timedelta
+from typing import Dict, Any, Iterable, List, NamedTuple, Optional
 from modules.chat.openai_key_manager import get_openai_client
+from .agricultural_vocabulary import INTENT_KEYWORDS, MONTH_NAMES, first_group, get_agricultural_matcher
 
 logger = logging.getLogger(__name__)
 
+# Quantity patterns: (key, pattern); the first match of each kind is kept
+QUANTITY_PATTERNS = [
+    ('area', re.compile(r'(\d+\.?\d*)\s*(hectare|ha|acre|m2|m²)', re.IGNORECASE)),
+    ('weight', re.compile(r'(\d+\.?\d*)\s*(kg|kilogram|ton|tonne|g|gram|pound|lb)', re.IGNORECASE)),
+    ('volume', re.compile(r'(\d+\.?\d*)\s*(liter|litre|l|gallon|gal|ml)', re.IGNORECASE)),
+]
+PERCENT_PATTERN = re.compile(r'(\d+\.?\d*)\s*%')
+DAYS_AGO_PATTERN = re.compile(r'(\d+)\s*days?\s*ago', re.IGNORECASE)
+
+RELATIVE_DAY_OFFSETS = {'yesterday': -1, 'today': 0, 'tomorrow': 1}
+
+# Below this local confidence an agricultural message goes to the LLM
+FACT_EXTRACTION_MIN_CONFIDENCE = float(os.getenv('FACT_EXTRACTION_MIN_CONFIDENCE', '0.8'))
+
+# Vocabulary categories that make a message agricultural
+AGRICULTURAL_CATEGORIES = ('crop', 'problem', 'chemical')
+# Intents where a product name is expected ("sprayed Bravo 720 today")
+PRODUCT_INTENTS = ('pest_control', 'fertilizer')
+# Brand names are capitalised mid-sentence ("sprayed Bravo 720 today")
+PRODUCT_TOKEN_PATTERN = re.compile(r"\b[A-Z][\w'-]*")
+SENTENCE_START_PATTERN = re.compile(r'(?:^|[.!?:\n]\s*)$')
+WEEKDAYS = {'monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday'}
+
+class LocalExtraction(NamedTuple):
+    """Result of the rule-based stage"""
+    facts: Dict[str, Any]
+    confidence: float
+    agricultural: bool
+    unresolved: List[str]
+
 class FactExtractor:
     """
     Extracts structured agricultural facts from farmer conversations
-    Uses GPT-3.5 Turbo for cost-effective fact extraction
+    Rules first; GPT-3.5 Turbo only for what the rules cannot resolve
     """
     
-    def __init__(self):
+    def __init__(self, min_confidence: float = FACT_EXTRACTION_MIN_CONFIDENCE):
         self.client = None
+        self.min_confidence = min_confidence
+        self.stats = {
+            'messages': 0,
+            'non_agricultural': 0,
+            'resolved_locally': 0,
+            'llm_calls': 0,
+            'llm_failures': 0
+        }
+        # Shared keyword automaton; built here so the cost is paid at startup
+        self.matcher = get_agricultural_matcher()
         self.extraction_prompt = """
         Extract agricultural facts from this conversation.
         Return JSON with any of these if mentioned:
         - crops: [list of crop names mentioned]
         - chemicals_used: [list of pesticides/herbicides/fertilizers mentioned]
         - problems: [list of issues/diseases/pests mentioned]
-        - dates: {planting: date, spraying: date, harvest: date, etc}
-        - quantities: {fertilizer: amount, yield: amount, area: amount, etc}
+        - dates: {{planting: date, spraying: date, harvest: date, etc}}
+        - quantities: {{fertilizer: amount, yield: amount, area: amount, etc}}
         - field_names: [list of field names mentioned]
         - farming_practices: [organic, conventional, precision, etc]
         - equipment: [tractors, sprayers, harvesters mentioned]
@@ -33,22 +80,119 @@ class FactExtractor:
         Message: {message}
         Previous context: {context}
         
-        Return only valid JSON or empty {} if no facts found.
+        Return only valid JSON or empty {{}} if no facts found.
         Be specific and extract exact values when mentioned.
         """
         logger.info("FactExtractor initialized")
     
-    async def extract_facts(self, message: str, context: str = "") -> Dict[str, Any]:
+    async def extract_facts(self, message: str, context: str = "",
+                            farmer_profile: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
-        Use GPT-3.5 Turbo to extract farming facts from a message
+        Extract farming facts from a message, locally when possible
         
         Args:
             message: The user's message to extract facts from
-            context: Previous conversation context
+            context: Previous conversation context (only sent to the LLM)
+            farmer_profile: Farmer or welcome package data; its crops and
+                field names are recognised locally
             
         Returns:
             Dictionary of extracted facts
         """
+        self.stats['messages'] += 1
+        local = self.extract_facts_locally(message, farmer_profile)
+        
+        if not local.agricultural:
+            self.stats['non_agricultural'] += 1
+            return local.facts
+        
+        if local.confidence >= self.min_confidence:
+            self.stats['resolved_locally'] += 1
+            logger.info(f"Extracted facts locally (confidence {local.confidence:.2f}): {local.facts}")
+            return local.facts
+        
+        logger.info(f"Local fact extraction unresolved ({', '.join(local.unresolved)}), asking LLM")
+        llm_facts = await self._extract_facts_with_llm(message, context)
+        return _merge_facts(local.facts, llm_facts)
+    
+    def extract_facts_locally(self, message: str,
+                              farmer_profile: Optional[Dict[str, Any]] = None) -> LocalExtraction:
+        """
+        Rule-based fact extraction (no LLM)
+        Confidence is the share of resolved facts among everything the
+        message appears to mention; unresolved lists what the rules missed.
+        """
+        if not message or not message.strip():
+            return LocalExtraction({}, 1.0, False, [])
+        
+        hits = self.matcher.scan(message)
+        known_crops = _profile_crops(farmer_profile)
+        known_fields = _profile_field_names(farmer_profile)
+        lowered = message.lower()
+        
+        facts: Dict[str, Any] = {}
+        crops = list(hits.get('crop', ()))
+        crops += [crop for crop in known_crops if crop.lower() in lowered and crop.lower() not in crops]
+        if crops:
+            facts['crops'] = crops
+        if hits.get('chemical'):
+            facts['chemicals_used'] = list(hits['chemical'])
+        if hits.get('problem'):
+            facts['problems'] = list(hits['problem'])
+        field_names = []
+        for name in known_fields:
+            if name.lower() in lowered and not any(name.lower() in found.lower() for found in field_names):
+                field_names.append(name)
+        if field_names:
+            facts['field_names'] = field_names
+        quantities = self.extract_quantities(message)
+        if quantities:
+            facts['quantities'] = quantities
+        dates = self.extract_dates(message)
+        if dates:
+            facts['dates'] = dates
+        if 'intent:organic' in hits:
+            facts['farming_practices'] = ['organic']
+        if hits.get('topic:equipment'):
+            facts['equipment'] = list(hits['topic:equipment'])
+        
+        intent = first_group(hits, 'intent', INTENT_KEYWORDS)
+        agricultural = bool(intent or field_names or crops or quantities
+                            or any(category in hits for category in AGRICULTURAL_CATEGORIES))
+        if not agricultural:
+            return LocalExtraction({}, 1.0, False, [])
+        
+        unresolved = []
+        subject = crops or field_names or 'chemicals_used' in facts
+        if quantities and not subject:
+            unresolved.append('quantity without crop, field or product')
+        if 'problems' in facts and not (crops or field_names):
+            unresolved.append('problem without crop or field')
+        if intent in PRODUCT_INTENTS or 'chemicals_used' in facts:
+            unknown = self._unknown_product_tokens(message, known_crops + known_fields)
+            if unknown:
+                unresolved.append(f"unknown product {', '.join(unknown)}")
+        
+        resolved = len(facts)
+        confidence = resolved / (resolved + len(unresolved)) if unresolved else 1.0
+        return LocalExtraction(facts, confidence, True, unresolved)
+    
+    def _unknown_product_tokens(self, message: str, known_names: Iterable[str]) -> List[str]:
+        """Capitalised mid-sentence words the vocabulary and the farmer profile do not know"""
+        known = {word.lower() for name in known_names for word in name.split()} | WEEKDAYS
+        unknown = []
+        for match in PRODUCT_TOKEN_PATTERN.finditer(message):
+            token = match.group(0)
+            if token == 'I' or SENTENCE_START_PATTERN.search(message, 0, match.start()):
+                continue
+            if token.lower() in known or self.matcher.scan(token):
+                continue
+            unknown.append(token)
+        return unknown
+    
+    async def _extract_facts_with_llm(self, message: str, context: str) -> Dict[str, Any]:
+        """Use GPT-3.5 Turbo to extract farming facts from a message"""
+        self.stats['llm_calls'] += 1
         try:
             # Get OpenAI client
             if not self.client:
@@ -56,6 +200,7 @@ class FactExtractor:
             
             if not self.client:
                 logger.error("OpenAI client not available for fact extraction")
+                self.stats['llm_failures'] += 1
                 return {}
             
             # Prepare the prompt
@@ -82,15 +227,29 @@ class FactExtractor:
             try:
                 facts = json.loads(content)
                 logger.info(f"Extracted facts: {facts}")
-                return facts
+                return facts if isinstance(facts, dict) else {}
             except json.JSONDecodeError:
                 logger.warning(f"Failed to parse JSON from GPT-3.5 response: {content}")
+                self.stats['llm_failures'] += 1
                 return {}
                 
         except Exception as e:
             logger.error(f"Error in fact extraction: {str(e)}")
+            self.stats['llm_failures'] += 1
             return {}
     
+    def get_stats(self) -> Dict[str, Any]:
+        """Extraction counters and the share of messages that needed no LLM call"""
+        messages = self.stats['messages']
+        saved = messages - self.stats['llm_calls']
+        return {
+            **self.stats,
+            'llm_calls_saved': saved,
+            'llm_hit_rate': round(self.stats['llm_calls'] / messages, 3) if messages else 0.0,
+            'saved_rate': round(saved / messages, 3) if messages else 0.0,
+            'min_confidence': self.min_confidence
+        }
+    
     def extract_facts_from_registration(self, collected_data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Extract facts from registration data (no LLM needed)
@@ -132,68 +291,29 @@ class FactExtractor:
         Quick intent identification without LLM
         Returns the type of agricultural query
         """
-        message_lower = message.lower()
-        
-        # Define intent patterns
-        intents = {
-            'harvest_timing': ['when harvest', 'ready to harvest', 'harvest time', 'when to collect'],
-            'pest_control': ['pest', 'disease', 'insect', 'spray', 'pesticide', 'fungicide'],
-            'fertilizer': ['fertilizer', 'npk', 'nitrogen', 'phosphorus', 'potassium', 'nutrient'],
-            'planting': ['plant', 'seed', 'sow', 'planting time', 'when to plant'],
-            'weather': ['weather', 'rain', 'drought', 'temperature', 'forecast'],
-            'yield': ['yield', 'production', 'how much', 'tons per hectare'],
-            'organic': ['organic', 'bio', 'natural', 'chemical-free', 'certification'],
-            'irrigation': ['water', 'irrigation', 'drip', 'sprinkler', 'watering'],
-            'soil': ['soil', 'ph', 'analysis', 'test', 'quality'],
-            'market': ['price', 'sell', 'market', 'buyer', 'export']
-        }
-        
-        # Check for intent matches
-        for intent, keywords in intents.items():
-            if any(keyword in message_lower for keyword in keywords):
-                logger.info(f"Identified intent: {intent}")
-                return intent
-        
-        return None
+        # One scan of the shared multilingual vocabulary; intents are checked in priority order
+        intent = first_group(self.matcher.scan(message), 'intent', INTENT_KEYWORDS)
+        if intent:
+            logger.info(f"Identified intent: {intent}")
+        return intent
     
     def extract_quantities(self, message: str) -> Dict[str, Any]:
         """
         Extract quantities and measurements from message
         """
-        import re
-        
         quantities = {}
         
-        # Pattern for hectares/acres
-        area_pattern = r'(\d+\.?\d*)\s*(hectare|ha|acre|m2|m²)'
-        area_match = re.search(area_pattern, message, re.IGNORECASE)
-        if area_match:
-            quantities['area'] = {
-                'value': float(area_match.group(1)),
-                'unit': area_match.group(2).lower()
-            }
+        # Area, weight and volume
+        for key, pattern in QUANTITY_PATTERNS:
+            match = pattern.search(message)
+            if match:
+                quantities[key] = {
+                    'value': float(match.group(1)),
+                    'unit': match.group(2).lower()
+                }
         
-        # Pattern for weight (kg, tons, etc)
-        weight_pattern = r'(\d+\.?\d*)\s*(kg|kilogram|ton|tonne|g|gram|pound|lb)'
-        weight_match = re.search(weight_pattern, message, re.IGNORECASE)
-        if weight_match:
-            quantities['weight'] = {
-                'value': float(weight_match.group(1)),
-                'unit': weight_match.group(2).lower()
-            }
-        
-        # Pattern for liters/gallons
-        volume_pattern = r'(\d+\.?\d*)\s*(liter|litre|l|gallon|gal|ml)'
-        volume_match = re.search(volume_pattern, message, re.IGNORECASE)
-        if volume_match:
-            quantities['volume'] = {
-                'value': float(volume_match.group(1)),
-                'unit': volume_match.group(2).lower()
-            }
-        
-        # Pattern for percentage
-        percent_pattern = r'(\d+\.?\d*)\s*%'
-        percent_match = re.search(percent_pattern, message)
+        # Percentage
+        percent_match = PERCENT_PATTERN.search(message)
         if percent_match:
             quantities['percentage'] = float(percent_match.group(1))
         
@@ -203,37 +323,65 @@ class FactExtractor:
         """
         Extract date references from message
         """
-        import re
-        from datetime import datetime, timedelta
-        
         dates = {}
         today = datetime.now()
+        hits = self.matcher.scan(message)
         
-        # Yesterday/today/tomorrow patterns
-        if 'yesterday' in message.lower():
-            dates['reference_date'] = (today - timedelta(days=1)).strftime('%Y-%m-%d')
-        elif 'today' in message.lower():
-            dates['reference_date'] = today.strftime('%Y-%m-%d')
-        elif 'tomorrow' in message.lower():
-            dates['reference_date'] = (today + timedelta(days=1)).strftime('%Y-%m-%d')
+        # Yesterday/today/tomorrow (any supported language), in that priority
+        relative_days = hits.get('relative_day', ())
+        for day, offset in RELATIVE_DAY_OFFSETS.items():
+            if day in relative_days:
+                dates['reference_date'] = (today + timedelta(days=offset)).strftime('%Y-%m-%d')
+                break
         
         # X days ago pattern
-        days_ago_pattern = r'(\d+)\s*days?\s*ago'
-        days_match = re.search(days_ago_pattern, message, re.IGNORECASE)
+        days_match = DAYS_AGO_PATTERN.search(message)
         if days_match:
             days = int(days_match.group(1))
             dates['days_ago'] = (today - timedelta(days=days)).strftime('%Y-%m-%d')
         
-        # Month patterns
-        months = {
-            'january': 1, 'february': 2, 'march': 3, 'april': 4,
-            'may': 5, 'june': 6, 'july': 7, 'august': 8,
-            'september': 9, 'october': 10, 'november': 11, 'december': 12
-        }
+        # Month patterns, earliest month in the calendar first
+        months = hits.get('month', ())
+        month_name = next((month for month in MONTH_NAMES if month in months), None)
+        if month_name:
+            dates['month_mentioned'] = month_name
         
-        for month_name, month_num in months.items():
-            if month_name in message.lower():
-                dates['month_mentioned'] = month_name
-                break
-        
-        return dates
\ No newline at end of file
+        return dates
+
+def _profile_crops(profile: Optional[Dict[str, Any]]) -> List[str]:
+    """Crop names from a farmer profile or welcome package"""
+    if not profile:
+        return []
+    crops = list(profile.get('crops') or [])
+    for entry in profile.get('all_crops') or []:
+        crops.append(entry.get('crop') if isinstance(entry, dict) else entry)
+    for field in profile.get('fields') or []:
+        if isinstance(field, dict):
+            crops.append(field.get('crop'))
+            crops.extend(field.get('crops') or [])
+    return list(dict.fromkeys(crop for crop in crops if isinstance(crop, str) and crop))
+
+def _profile_field_names(profile: Optional[Dict[str, Any]]) -> List[str]:
+    """Field names from a farmer profile (names or field dicts) or welcome package"""
+    if not profile:
+        return []
+    names = []
+    for field in profile.get('fields') or []:
+        names.append(field.get('name') or field.get('field_name') if isinstance(field, dict) else field)
+    names.extend(profile.get('field_names') or [])
+    # Longest first, so "North Field 2" is not also reported as "North Field"
+    unique = dict.fromkeys(name.strip() for name in names if isinstance(name, str) and name.strip())
+    return sorted(unique, key=len, reverse=True)
+
+def _merge_facts(local: Dict[str, Any], llm: Dict[str, Any]) -> Dict[str, Any]:
+    """LLM facts on top of local ones; lists are unioned, dicts updated"""
+    merged = dict(local)
+    for key, value in llm.items():
+        current = merged.get(key)
+        if isinstance(current, list) and isinstance(value, list):
+            merged[key] = current + [item for item in value if item not in current]
+        elif isinstance(current, dict) and isinstance(value, dict):
+            merged[key] = {**current, **value}
+        elif value not in (None, [], {}, ""):
+            merged[key] = value
+    return merged
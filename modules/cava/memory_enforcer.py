@@ -6,6 +6,13 @@ from typing import Dict, List, Set
 import json
 from datetime import datetime
 
+from .agricultural_vocabulary import get_agricultural_matcher
+
+QUANTITY_PATTERN = re.compile(r'(\d+)\s*(hectare|ha|ton|kg)')
+NAME_PATTERN = re.compile(r"(?:i'm|i am|my name is|call me)\s+(\w+)", re.IGNORECASE)
+# A tropical crop mentioned together with one of these is worth remarking on
+TEMPERATE_LOCATIONS = {'bulgaria', 'croatian', 'serbian'}
+
 class MemoryEnforcer:
     """Ensures LLM responses demonstrate memory explicitly"""
     
@@ -42,26 +49,20 @@ class MemoryEnforcer:
         for msg in all_messages:
             if msg['role'] == 'user':
                 content = msg['content'].lower()
+                hits = get_agricultural_matcher().scan(content)
                 
                 # Extract quantities
-                quantities = re.findall(r'(\d+)\s*(hectare|ha|ton|kg)', content)
-                for qty, unit in quantities:
+                for qty, unit in QUANTITY_PATTERN.findall(content):
                     critical_facts['quantities'][f"{qty}_{unit}"] = f"{qty} {unit}"
                 
                 # Extract unusual combinations
-                if 'mango' in content and any(loc in content for loc in ['bulgaria', 'croatian', 'serbian']):
+                if 'mango' in hits.get('crop', ()) and TEMPERATE_LOCATIONS.intersection(hits.get('location', ())):
                     critical_facts['unusual_aspects'].append("tropical fruit in temperate climate")
                 
                 # Extract names
-                name_patterns = [
-                    r"i'm\s+(\w+)",
-                    r"i am\s+(\w+)",
-                    r"my name is\s+(\w+)",
-                    r"call me\s+(\w+)"
-                ]
-                for pattern in name_patterns:
-                    match = re.search(pattern, content, re.IGNORECASE)
-                    if match and not critical_facts['farmer_name']:
+                if not critical_facts['farmer_name']:
+                    match = NAME_PATTERN.search(content)
+                    if match:
                         critical_facts['farmer_name'] = match.group(1).capitalize()
         
         # Build conversation summary
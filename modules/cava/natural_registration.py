@@ -9,6 +9,7 @@ import json
 import logging
 from datetime import datetime
 from modules.chat.openai_chat import get_openai_chat
+from modules.core.session_store import REGISTRATION_SESSION_TTL, create_session_store
 
 logger = logging.getLogger(__name__)
 
@@ -16,7 +17,7 @@ class NaturalRegistrationFlow:
     """Manages natural conversational registration flow using LLM"""
     
     def __init__(self):
-        self.sessions: Dict[str, Dict] = {}
+        self.sessions = create_session_store("natural_registration", REGISTRATION_SESSION_TTL)
         self.chat_service = get_openai_chat()
         
         # Required fields for registration
@@ -26,10 +27,11 @@ class NaturalRegistrationFlow:
             "whatsapp": "WhatsApp number"
         }
     
-    def get_or_create_session(self, session_id: str) -> Dict:
+    async def get_or_create_session(self, session_id: str) -> Dict:
         """Get existing session or create new one"""
-        if session_id not in self.sessions:
-            self.sessions[session_id] = {
+        session = await self.sessions.aget(session_id)
+        if session is None:
+            session = {
                 "collected_data": {},
                 "history": [],
                 "created_at": datetime.utcnow(),
@@ -39,8 +41,15 @@ class NaturalRegistrationFlow:
                 "language": None
             }
         else:
-            self.sessions[session_id]["last_activity"] = datetime.utcnow()
-        return self.sessions[session_id]
+            session["last_activity"] = datetime.utcnow()
+        return session
+    
+    async def save_session(self, session_id: str, session: Dict):
+        """Persist the session; a finished registration's session is dropped"""
+        if session["registration_complete"]:
+            await self.sessions.adelete(session_id)
+        else:
+            await self.sessions.aset(session_id, session)
     
     def get_missing_fields(self, collected_data: Dict) -> List[str]:
         """Get list of fields still needed"""
@@ -136,8 +145,14 @@ Respond naturally and extract any available data. Format your response as JSON:
     
     async def process_message(self, session_id: str, message: str) -> Dict:
         """Process a message from the farmer using LLM"""
-        session = self.get_or_create_session(session_id)
-        
+        session = await self.get_or_create_session(session_id)
+        try:
+            return await self._handle_message(session_id, session, message)
+        finally:
+            await self.save_session(session_id, session)
+    
+    async def _handle_message(self, session_id: str, session: Dict, message: str) -> Dict:
+        """Process a message against an already loaded session"""
         # Add user message to history
         session["history"].append({
             "role": "user",
@@ -236,7 +251,7 @@ Respond naturally and extract any available data. Format your response as JSON:
         except Exception as e:
             logger.error(f"Error in natural registration: {e}")
             # Fallback to simple pattern matching
-            return self._simple_fallback(session_id, message)
+            return self._simple_fallback(session, message)
     
     def _fallback_extraction(self, message: str, llm_response: str) -> Dict:
         """Fallback extraction when JSON parsing fails"""
@@ -262,9 +277,8 @@ Respond naturally and extract any available data. Format your response as JSON:
         
         return result
     
-    def _simple_fallback(self, session_id: str, message: str) -> Dict:
+    def _simple_fallback(self, session: Dict, message: str) -> Dict:
         """Simple fallback when LLM is not available"""
-        session = self.sessions[session_id]
         collected = session["collected_data"]
         
         # Try to extract data
@@ -337,13 +351,11 @@ Respond naturally and extract any available data. Format your response as JSON:
             "missing_fields": missing
         }
     
-    def get_session_data(self, session_id: str) -> Optional[Dict]:
+    async def get_session_data(self, session_id: str) -> Optional[Dict]:
         """Get registration data for a session"""
-        if session_id in self.sessions:
-            return self.sessions[session_id]["collected_data"]
-        return None
+        session = await self.sessions.aget(session_id)
+        return session["collected_data"] if session is not None else None
     
-    def clear_session(self, session_id: str):
+    async def clear_session(self, session_id: str):
         """Clear a session after registration"""
-        if session_id in self.sessions:
-            del self.sessions[session_id]
\ No newline at end of file
+        await self.sessions.adelete(session_id)
\ No newline at end of file
@@ -2,12 +2,19 @@
 """
 CAVA Registration Flow
 Handles conversational registration for new farmers
+The password is hashed as soon as it is entered and never kept in the
+session or its history.
 """
 from typing import Dict, Optional, Tuple
 import re
 from datetime import datetime
 import asyncio
 
+from modules.auth.password_hashing import hash_password_async, verify_password_async
+from modules.core.session_store import REGISTRATION_SESSION_TTL, create_session_store
+
+PASSWORD_STAGES = {"password", "confirm_password"}
+
 class RegistrationFlow:
     """Manages the conversational registration flow"""
     
@@ -80,21 +87,29 @@ class RegistrationFlow:
     }
     
     def __init__(self):
-        self.sessions: Dict[str, Dict] = {}
+        self.sessions = create_session_store("registration_flow", REGISTRATION_SESSION_TTL)
     
-    def get_or_create_session(self, farmer_id: str) -> Dict:
+    async def get_or_create_session(self, farmer_id: str) -> Dict:
         """Get existing session or create new one"""
-        if farmer_id not in self.sessions:
-            self.sessions[farmer_id] = {
+        session = await self.sessions.aget(farmer_id)
+        if session is None:
+            session = {
                 "stage": "greeting",
                 "data": {},
                 "history": [],
                 "created_at": datetime.utcnow(),
                 "attempts": {}
             }
-        return self.sessions[farmer_id]
+        return session
+    
+    async def save_session(self, farmer_id: str, session: Dict):
+        """Persist the session; a finished registration's session is dropped"""
+        if session["stage"] == "complete":
+            await self.sessions.adelete(farmer_id)
+        else:
+            await self.sessions.aset(farmer_id, session)
     
-    def validate_input(self, validation_type: str, value: str, session: Dict) -> Tuple[bool, Optional[str]]:
+    async def validate_input(self, validation_type: str, value: str, session: Dict) -> Tuple[bool, Optional[str]]:
         """Validate user input based on type"""
         if validation_type == "name":
             if len(value.strip()) < 2:
@@ -129,8 +144,8 @@ class RegistrationFlow:
             return True, None
         
         elif validation_type == "confirm_password":
-            original_password = session["data"].get("password", "")
-            if value != original_password:
+            matches, _ = await verify_password_async(value, session["data"].get("password_hash", ""))
+            if not matches:
                 return False, "Passwords don't match. Please try again"
             return True, None
         
@@ -147,12 +162,18 @@ class RegistrationFlow:
     
     async def process_message(self, farmer_id: str, message: str) -> Dict:
         """Process a message from the farmer"""
-        session = self.get_or_create_session(farmer_id)
-        
-        # Add message to history
+        session = await self.get_or_create_session(farmer_id)
+        try:
+            return await self._handle_message(session, message)
+        finally:
+            await self.save_session(farmer_id, session)
+    
+    async def _handle_message(self, session: Dict, message: str) -> Dict:
+        """Process a message against an already loaded session"""
+        # Add message to history (passwords are masked)
         session["history"].append({
             "type": "user",
-            "message": message,
+            "message": "********" if session["stage"] in PASSWORD_STAGES else message,
             "timestamp": datetime.utcnow()
         })
         
@@ -187,7 +208,7 @@ class RegistrationFlow:
         
         # Validate input for current stage
         if "validation" in current_stage:
-            is_valid, error_msg = self.validate_input(
+            is_valid, error_msg = await self.validate_input(
                 current_stage["validation"],
                 message,
                 session
@@ -225,7 +246,10 @@ class RegistrationFlow:
             if current_stage["field"] == "whatsapp_number":
                 field_value = self.format_whatsapp_number(field_value)
             
-            session["data"][current_stage["field"]] = field_value
+            if current_stage["field"] == "password":
+                session["data"]["password_hash"] = await hash_password_async(field_value)
+            elif current_stage["field"] != "confirm_password":
+                session["data"][current_stage["field"]] = field_value
         
         # Move to next stage
         session["stage"] = current_stage["next_stage"]
@@ -267,13 +291,11 @@ class RegistrationFlow:
         except ValueError:
             return 0
     
-    def get_session_data(self, farmer_id: str) -> Optional[Dict]:
+    async def get_session_data(self, farmer_id: str) -> Optional[Dict]:
         """Get registration data for a session"""
-        if farmer_id in self.sessions:
-            return self.sessions[farmer_id]["data"]
-        return None
+        session = await self.sessions.aget(farmer_id)
+        return session["data"] if session is not None else None
     
-    def clear_session(self, farmer_id: str):
+    async def clear_session(self, farmer_id: str):
         """Clear a session after registration"""
-        if farmer_id in self.sessions:
-            del self.sessions[farmer_id]
\ No newline at end of file
+        await self.sessions.adelete(farmer_id)
\ No newline at end of file
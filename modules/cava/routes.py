@@ -592,7 +592,7 @@ async def test_registration_llm():
 @router.get("/registration/cava/session/{farmer_id}")
 async def get_registration_session(farmer_id: str) -> JSONResponse:
     """Get current registration session status"""
-    session_data = registration_flow.get_session_data(farmer_id)
+    session_data = await registration_flow.get_session_data(farmer_id)
     
     if not session_data:
         return JSONResponse(content={
@@ -600,8 +600,8 @@ async def get_registration_session(farmer_id: str) -> JSONResponse:
             "message": "No active registration session"
         })
     
-    # Don't expose password in response
-    safe_data = {k: v for k, v in session_data.items() if k not in ["password", "confirm_password"]}
+    # Don't expose the password hash in response
+    safe_data = {k: v for k, v in session_data.items() if k != "password_hash"}
     
     return JSONResponse(content={
         "exists": True,
@@ -612,7 +612,7 @@ async def get_registration_session(farmer_id: str) -> JSONResponse:
 @router.delete("/registration/cava/session/{farmer_id}")
 async def clear_registration_session(farmer_id: str) -> JSONResponse:
     """Clear a registration session"""
-    registration_flow.clear_session(farmer_id)
+    await registration_flow.clear_session(farmer_id)
     
     return JSONResponse(content={
         "success": True,
@@ -667,7 +667,7 @@ async def natural_registration_chat(request: Request) -> JSONResponse:
 @router.get("/registration/cava/natural/session/{session_id}")
 async def get_natural_registration_session(session_id: str) -> JSONResponse:
     """Get current natural registration session status"""
-    session_data = natural_registration.get_session_data(session_id)
+    session_data = await natural_registration.get_session_data(session_id)
     
     if not session_data:
         return JSONResponse(content={
@@ -687,7 +687,7 @@ async def get_natural_registration_session(session_id: str) -> JSONResponse:
 @router.delete("/registration/cava/natural/session/{session_id}")
 async def clear_natural_registration_session(session_id: str) -> JSONResponse:
     """Clear a natural registration session"""
-    natural_registration.clear_session(session_id)
+    await natural_registration.clear_session(session_id)
     
     return JSONResponse(content={
         "success": True,
@@ -726,7 +726,7 @@ async def true_cava_registration(request: Request) -> JSONResponse:
 @router.get("/registration/cava/true/session/{session_id}")
 async def get_true_cava_session(session_id: str) -> JSONResponse:
     """Get true CAVA session status"""
-    session_data = true_cava.get_session_data(session_id)
+    session_data = await true_cava.get_session_data(session_id)
     
     if not session_data:
         return JSONResponse(content={
@@ -772,7 +772,7 @@ async def enhanced_cava_registration(request: Request) -> JSONResponse:
 @router.get("/registration/cava/enhanced/session/{session_id}")
 async def get_enhanced_cava_session(session_id: str) -> JSONResponse:
     """Get enhanced CAVA session status"""
-    session_data = enhanced_cava.get_session_data(session_id)
+    session_data = await enhanced_cava.get_session_data(session_id)
     
     if not session_data:
         return JSONResponse(content={
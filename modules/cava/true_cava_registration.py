@@ -7,6 +7,7 @@ from typing import Dict, Optional
 import logging
 from datetime import datetime
 from modules.chat.openai_chat import get_openai_chat
+from modules.core.session_store import REGISTRATION_SESSION_TTL, create_session_store
 
 logger = logging.getLogger(__name__)
 
@@ -14,13 +15,14 @@ class TrueCAVARegistration:
     """Pure conversational registration - no hardcoding"""
     
     def __init__(self):
-        self.sessions: Dict[str, Dict] = {}
+        self.sessions = create_session_store("true_cava_registration", REGISTRATION_SESSION_TTL)
         self.chat_service = get_openai_chat()
     
-    def get_or_create_session(self, session_id: str) -> Dict:
+    async def get_or_create_session(self, session_id: str) -> Dict:
         """Get or create registration session"""
-        if session_id not in self.sessions:
-            self.sessions[session_id] = {
+        session = await self.sessions.aget(session_id)
+        if session is None:
+            session = {
                 "collected": {
                     "first_name": None,
                     "last_name": None,
@@ -30,7 +32,14 @@ class TrueCAVARegistration:
                 "created_at": datetime.utcnow(),
                 "complete": False
             }
-        return self.sessions[session_id]
+        return session
+    
+    async def save_session(self, session_id: str, session: Dict):
+        """Persist the session; a finished registration's session is dropped"""
+        if session["complete"]:
+            await self.sessions.adelete(session_id)
+        else:
+            await self.sessions.aset(session_id, session)
     
     def is_complete(self, collected: Dict) -> bool:
         """Check if all required fields are collected"""
@@ -38,8 +47,14 @@ class TrueCAVARegistration:
     
     async def process_message(self, session_id: str, message: str) -> Dict:
         """Process user message with pure LLM conversation"""
-        session = self.get_or_create_session(session_id)
-        
+        session = await self.get_or_create_session(session_id)
+        try:
+            return await self._handle_message(session_id, session, message)
+        finally:
+            await self.save_session(session_id, session)
+    
+    async def _handle_message(self, session_id: str, session: Dict, message: str) -> Dict:
+        """Process a message against an already loaded session"""
         # Add user message to history
         session["conversation_history"].append(f"User: {message}")
         
@@ -180,13 +195,11 @@ Respond as JSON:
             "collected_data": collected
         }
     
-    def get_session_data(self, session_id: str) -> Optional[Dict]:
+    async def get_session_data(self, session_id: str) -> Optional[Dict]:
         """Get session data"""
-        if session_id in self.sessions:
-            return self.sessions[session_id]["collected"]
-        return None
+        session = await self.sessions.aget(session_id)
+        return session["collected"] if session is not None else None
     
-    def clear_session(self, session_id: str):
+    async def clear_session(self, session_id: str):
         """Clear session after registration"""
-        if session_id in self.sessions:
-            del self.sessions[session_id]
\ No newline at end of file
+        await self.sessions.adelete(session_id)
\ No newline at end of file
@@ -11,6 +11,8 @@ import json
 from datetime import datetime
 import random
 
+from modules.core.conversation_history import ConversationHistory
+
 logger = logging.getLogger(__name__)
 
 class OpenAIChat:
@@ -20,8 +22,9 @@ class OpenAIChat:
         self.api_key = os.getenv('OPENAI_API_KEY')
         self.api_url = "https://api.openai.com/v1/chat/completions"
         self.model = "gpt-4"  # Use gpt-3.5-turbo if gpt-4 not available
-        self.conversations = {}  # Store conversations by session_id
         self.max_history = 20  # Keep last 20 messages for better context
+        # Ring buffer of max_history messages per session; idle/LRU sessions are evicted
+        self.conversations = ConversationHistory("openai_chat", self.max_history)
         self.connected = self._test_connection()
         
     def _test_connection(self) -> bool:
@@ -111,11 +114,8 @@ IMPORTANT:
             # CONSTITUTIONAL LOGGING - Track all LLM usage
             logger.info(f"🏛️ CONSTITUTIONAL LLM CALL: session={session_id}, message_length={len(message)}")
             
-            # Get or create conversation history
-            if session_id not in self.conversations:
-                self.conversations[session_id] = []
-            
-            history = self.conversations[session_id]
+            # Get conversation history (empty for a new or expired session)
+            history = await self.conversations.aget(session_id)
             
             # Build messages array
             messages = [
@@ -187,12 +187,12 @@ IMPORTANT:
                             retry_data = retry_response.json()
                             ai_response = retry_data['choices'][0]['message']['content']
                     
-                    # Update conversation history
-                    history.append({"role": "user", "content": message})
-                    history.append({"role": "assistant", "content": ai_response})
-                    
-                    # Keep only last N messages
-                    self.conversations[session_id] = history[-self.max_history:]
+                    # Update conversation history (the ring buffer keeps the last N messages)
+                    await self.conversations.aappend(
+                        session_id,
+                        {"role": "user", "content": message},
+                        {"role": "assistant", "content": ai_response}
+                    )
                     
                     return {
                         "response": ai_response,
@@ -274,8 +274,11 @@ IMPORTANT:
     
     def clear_conversation(self, session_id: str):
         """Clear conversation history for a session"""
-        if session_id in self.conversations:
-            del self.conversations[session_id]
+        self.conversations.clear(session_id)
+    
+    def get_history_stats(self) -> Dict:
+        """Session count, message count and approximate memory of the kept history"""
+        return self.conversations.stats()
 
 # Singleton instance
 _openai_chat = None
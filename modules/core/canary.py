@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Tiered synthetic canary
+Replaces the loop that pushed "+385HEALTH_CHECK" through the real chat
+endpoint in every process, which ran the whole DB + fact extraction +
+OpenAI pipeline and stored chat rows each time.
+
+- Liveness (every process, every CANARY_LIVENESS_INTERVAL seconds):
+  async pool ping and cached OpenAI key presence; no upstream API calls.
+- Deep probe (every CANARY_DEEP_INTERVAL seconds, sampled at
+  CANARY_DEEP_SAMPLE_RATE, cluster leader only): a read-only chat history
+  query, the local fact extraction rules and a one-token completion with a
+  fixed prompt. Nothing is persisted.
+
+The leader is elected with modules.core.leader_lock (Redis lease, or a
+Postgres advisory lock without Redis).
+"""
+import asyncio
+import logging
+import os
+import random
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from .api_key_manager import APIKeyManager
+from .database_manager import get_db_manager
+from .leader_lock import create_leader_lock as create_shared_leader_lock
+
+logger = logging.getLogger(__name__)
+
+CANARY_LIVENESS_INTERVAL = float(os.getenv('CANARY_LIVENESS_INTERVAL', '60'))
+CANARY_DEEP_INTERVAL = float(os.getenv('CANARY_DEEP_INTERVAL', '900'))
+CANARY_DEEP_SAMPLE_RATE = float(os.getenv('CANARY_DEEP_SAMPLE_RATE', '1.0'))
+CANARY_PROBE_TIMEOUT = float(os.getenv('CANARY_PROBE_TIMEOUT', '10'))
+
+CANARY_LEADER_KEY = "ava:canary:leader"
+# pg_advisory_lock key for the deep probe ("avacan" in ASCII)
+CANARY_ADVISORY_LOCK_KEY = 0x617661636E61
+
+# Fixed inputs, so the deep probe costs the same every time
+CANARY_MESSAGE = "Sprayed 2 l of fungicide on the corn today"
+CANARY_PROMPT = "Reply with OK"
+
+def create_leader_lock():
+    """Leader lock for the deep probe"""
+    return create_shared_leader_lock(CANARY_LEADER_KEY, CANARY_ADVISORY_LOCK_KEY, ttl_seconds=CANARY_DEEP_INTERVAL * 2)
+
+async def _timed(check: Callable[[], Awaitable[Dict[str, Any]]], timeout: float) -> Dict[str, Any]:
+    start = time.monotonic()
+    try:
+        result = await asyncio.wait_for(check(), timeout)
+        result.setdefault("ok", True)
+    except asyncio.TimeoutError:
+        result = {"ok": False, "error": f"No response within {timeout:g}s"}
+    except Exception as e:
+        result = {"ok": False, "error": str(e)}
+    result["latency_ms"] = int((time.monotonic() - start) * 1000)
+    return result
+
+class Canary:
+    """Liveness in every process, sampled deep probe on the leader"""
+
+    def __init__(self, leader_lock=None,
+                 liveness_interval: float = CANARY_LIVENESS_INTERVAL,
+                 deep_interval: float = CANARY_DEEP_INTERVAL,
+                 sample_rate: float = CANARY_DEEP_SAMPLE_RATE,
+                 timeout: float = CANARY_PROBE_TIMEOUT,
+                 rng=None):
+        self.leader_lock = leader_lock
+        self.liveness_interval = liveness_interval
+        self.deep_interval = deep_interval
+        self.sample_rate = sample_rate
+        self.timeout = timeout
+        self._rng = rng or random
+        self.is_leader = False
+        self.liveness: Dict[str, Any] = {}
+        self.deep: Dict[str, Any] = {}
+        # Last known key validity, from the startup check or the deep probe's completion
+        self.key_valid: Optional[bool] = None
+        self.counters = {"liveness_runs": 0, "deep_runs": 0, "deep_skipped": 0, "recoveries": 0}
+        self._next_deep = 0.0
+
+    # Tier 1
+
+    async def _ping_pool(self) -> Dict[str, Any]:
+        async with get_db_manager().get_connection_async() as conn:
+            await conn.fetchval("SELECT 1")
+        return {"ok": True}
+
+    async def _check_key(self) -> Dict[str, Any]:
+        key = APIKeyManager._cached_key or os.getenv("OPENAI_API_KEY")
+        if not key:
+            logger.warning("OpenAI API key lost - attempting recovery...")
+            self.counters["recoveries"] += 1
+            present = await APIKeyManager.ensure_api_key()
+        else:
+            present = True
+        return {"ok": present and self.key_valid is not False, "present": present, "valid": self.key_valid}
+
+    async def check_liveness(self) -> Dict[str, Any]:
+        """Cheap local checks; safe to run often in every process"""
+        self.counters["liveness_runs"] += 1
+        database, openai_key = await asyncio.gather(
+            _timed(self._ping_pool, self.timeout),
+            _timed(self._check_key, self.timeout)
+        )
+        self.liveness = {
+            "ok": database["ok"] and openai_key["ok"],
+            "database": database,
+            "openai_key": openai_key,
+            "checked_at": datetime.now().isoformat()
+        }
+        return self.liveness
+
+    # Tier 2
+
+    async def _read_chat_history(self) -> Dict[str, Any]:
+        async with get_db_manager().get_connection_async() as conn:
+            await conn.fetch("SELECT role, content FROM chat_messages ORDER BY timestamp DESC LIMIT 1")
+        return {"ok": True}
+
+    async def _extract_facts(self) -> Dict[str, Any]:
+        from modules.cava.fact_extractor import FactExtractor
+        local = FactExtractor().extract_facts_locally(CANARY_MESSAGE)
+        return {"ok": bool(local.facts.get("crops")), "confidence": local.confidence}
+
+    async def _complete(self) -> Dict[str, Any]:
+        from modules.core.openai_config import OpenAIConfig
+        client = OpenAIConfig.get_client()
+        if not client:
+            return {"ok": False, "error": "OpenAI client not available"}
+        try:
+            await asyncio.to_thread(
+                client.chat.completions.create,
+                model="gpt-3.5-turbo",
+                messages=[{"role": "user", "content": CANARY_PROMPT}],
+                max_tokens=1,
+                temperature=0
+            )
+        except Exception as e:
+            if getattr(e, "status_code", None) == 401:
+                self.key_valid = False
+            raise
+        self.key_valid = True
+        return {"ok": True}
+
+    async def deep_probe(self) -> Dict[str, Any]:
+        """Read-only walk through the chat pipeline's dependencies"""
+        self.counters["deep_runs"] += 1
+        database, facts, completion = await asyncio.gather(
+            _timed(self._read_chat_history, self.timeout),
+            _timed(self._extract_facts, self.timeout),
+            _timed(self._complete, self.timeout)
+        )
+        self.deep = {
+            "ok": database["ok"] and facts["ok"] and completion["ok"],
+            "database": database,
+            "fact_extraction": facts,
+            "openai": completion,
+            "checked_at": datetime.now().isoformat()
+        }
+        return self.deep
+
+    async def _elect(self) -> bool:
+        if self.leader_lock is None:
+            self.is_leader = True
+            return True
+        try:
+            self.is_leader = await self.leader_lock.acquire()
+        except Exception as e:
+            logger.warning(f"Canary leader election failed: {e}")
+            self.is_leader = False
+        return self.is_leader
+
+    async def tick(self, now: Optional[float] = None) -> Dict[str, Any]:
+        """One liveness round, plus the deep probe when it is due, sampled and we lead"""
+        now = time.monotonic() if now is None else now
+        await self.check_liveness()
+        if now < self._next_deep:
+            return self.status()
+        self._next_deep = now + self.deep_interval
+        if not await self._elect() or self._rng.random() >= self.sample_rate:
+            self.counters["deep_skipped"] += 1
+            return self.status()
+        deep = await self.deep_probe()
+        if not deep["ok"]:
+            logger.warning(f"Deep canary failed: {deep}")
+            from .startup_validator import StartupValidator
+            self.counters["recoveries"] += 1
+            await StartupValidator.validate_and_fix()
+        return self.status()
+
+    async def run(self):
+        """Background loop; the first deep probe waits one full interval after startup"""
+        self._next_deep = time.monotonic() + self.deep_interval
+        try:
+            while True:
+                await asyncio.sleep(self.liveness_interval)
+                try:
+                    await self.tick()
+                except Exception as e:
+                    logger.error(f"Canary error: {e}")
+        finally:
+            if self.is_leader and self.leader_lock is not None:
+                await self.leader_lock.release()
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "leader": self.is_leader,
+            "leader_backend": getattr(self.leader_lock, "backend", None),
+            "liveness": self.liveness,
+            "deep": self.deep,
+            "intervals": {
+                "liveness_seconds": self.liveness_interval,
+                "deep_seconds": self.deep_interval,
+                "deep_sample_rate": self.sample_rate
+            },
+            **self.counters
+        }
+
+_canary: Optional[Canary] = None
+
+def get_canary() -> Canary:
+    """Get or create the process-wide canary"""
+    global _canary
+    if _canary is None:
+        _canary = Canary(create_leader_lock())
+    return _canary
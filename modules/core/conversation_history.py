@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Bounded per-session chat history
+Each session keeps at most ``max_messages`` messages in a ring buffer
+(a deque with maxlen), and whole sessions are evicted by the underlying
+session store's LRU bound and idle TTL. Memory is therefore capped at
+roughly SESSION_MAX_ENTRIES x max_messages messages per chat service,
+instead of growing with every message ever received.
+
+Statistics walk every session of an in-process store. A Redis-backed
+history is shared by all tasks and may hold many sessions, so stats()
+only reads a sample of up to HISTORY_STATS_SAMPLE sessions and reports
+per-session averages plus this process's own counters.
+"""
+import os
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+from .session_store import CHAT_SESSION_TTL, SESSION_MAX_ENTRIES, SessionStore, create_session_store
+
+# Per-message overhead (dict, role string, deque slot) added to the content size
+_MESSAGE_OVERHEAD_BYTES = 240
+
+HISTORY_STATS_SAMPLE = int(os.getenv('HISTORY_STATS_SAMPLE', '100'))
+
+def approx_message_bytes(message: Dict[str, Any]) -> int:
+    return _MESSAGE_OVERHEAD_BYTES + sum(len(str(value)) for value in message.values())
+
+class ConversationHistory:
+    """Ring-buffered message history per session, backed by a SessionStore"""
+
+    def __init__(self, namespace: str, max_messages: int, ttl_seconds: float = CHAT_SESSION_TTL,
+                 max_sessions: int = SESSION_MAX_ENTRIES, store: Optional[SessionStore] = None):
+        self.max_messages = max_messages
+        self.store = store if store is not None else create_session_store(namespace, ttl_seconds, max_sessions)
+        # Messages appended by this process since start
+        self.appended = 0
+
+    def get(self, session_id: str) -> List[Dict[str, Any]]:
+        """Oldest-first copy of the session's messages (empty if unknown or expired)"""
+        return list(self.store.get(session_id) or ())
+
+    def append(self, session_id: str, *messages: Dict[str, Any]):
+        """Add messages, dropping the oldest beyond max_messages, and restart the idle TTL"""
+        history = self.store.get(session_id)
+        if not isinstance(history, deque):
+            # New session, or a plain list coming back from Redis
+            history = deque(history or (), maxlen=self.max_messages)
+        history.extend(messages)
+        self.store.set(session_id, history)
+        self.appended += len(messages)
+
+    def clear(self, session_id: str) -> bool:
+        return self.store.delete(session_id)
+
+    async def aget(self, session_id: str) -> List[Dict[str, Any]]:
+        """get() for async callers; a Redis-backed store is read off the event loop"""
+        return list(await self.store.aget(session_id) or ())
+
+    async def aappend(self, session_id: str, *messages: Dict[str, Any]):
+        """append() for async callers"""
+        history = await self.store.aget(session_id)
+        if not isinstance(history, deque):
+            history = deque(history or (), maxlen=self.max_messages)
+        history.extend(messages)
+        await self.store.aset(session_id, history)
+        self.appended += len(messages)
+
+    def __len__(self) -> int:
+        return len(self.store)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Session/message counts and approximate memory use
+        Exact for an in-process store; for a shared store the totals are None
+        and the averages come from a bounded sample.
+        """
+        sampled = not self.store.in_process
+        sessions = self.store.sample(HISTORY_STATS_SAMPLE) if sampled else self.store.values()
+        messages = sum(len(history) for history in sessions)
+        approx_bytes = sum(approx_message_bytes(m) for history in sessions for m in history)
+        return {
+            "sessions": None if sampled else len(sessions),
+            "messages": None if sampled else messages,
+            "approx_bytes": None if sampled else approx_bytes,
+            "sampled": sampled,
+            "sample_sessions": len(sessions),
+            "avg_messages_per_session": round(messages / len(sessions), 1) if sessions else 0,
+            "avg_bytes_per_session": approx_bytes // len(sessions) if sessions else 0,
+            "max_messages_per_session": self.max_messages,
+            "appended_by_this_process": self.appended,
+            "store": self.store.stats()
+        }
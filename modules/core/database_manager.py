@@ -10,6 +10,7 @@ import time
 from contextlib import contextmanager, asynccontextmanager
 from typing import Dict, Any, Optional
 from .config import get_database_config
+from .retry import retry_async
 
 logger = logging.getLogger(__name__)
 
@@ -108,6 +109,21 @@ class DatabaseManager:
                     logger.warning(f"Connection test attempt {attempt + 1} failed: {e}. Retrying in {delay}s...")
                     time.sleep(delay)
     
+    async def test_connection_async(self, retries=5, delay=0.5):
+        """
+        Fill the async pool and run SELECT 1, retrying with exponential backoff
+        Waits with asyncio.sleep, so the event loop keeps serving meanwhile
+        """
+        async def ping():
+            async with self.get_connection_async() as conn:
+                return await conn.fetchval("SELECT 1") == 1
+        
+        try:
+            return await retry_async(ping, attempts=retries, base_delay=delay)
+        except Exception as e:
+            logger.error(f"Async connection test failed after {retries} attempts: {e}")
+            return False
+    
     def execute_query(self, query: str, params: tuple = None):
         """Execute a query and return results"""
         try:
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Local IP-to-country resolution
+IP ranges from a CSV database are loaded into sorted arrays and searched
+with bisect; recent answers are kept in an LRU cache. Public IPs the local
+database does not know are looked up on ip-api.com in the background, so a
+lookup never waits on the network: the first request from such an IP gets
+no country (the caller's default) and later requests the remote answer.
+
+Supported files (GEOIP_DB_PATH, several separated by commas):
+- range CSV as published by DB-IP / IP2Location lite: start,end,country
+  with dotted or integer addresses
+- MaxMind GeoLite2 Country CSV blocks (...-Blocks-IPv4.csv / -IPv6.csv);
+  the matching ...-Locations-en.csv next to it maps geoname ids to countries
+IPv6 ranges are stored by their top 64 bits, which is the granularity
+country allocations are made at.
+"""
+import asyncio
+import csv
+import ipaddress
+import logging
+import os
+from array import array
+from bisect import bisect_right
+from itertools import chain
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+import httpx
+
+from modules.core.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+GEOIP_DB_PATH = os.getenv('GEOIP_DB_PATH', 'data/geoip/ip-to-country.csv')
+GEOIP_CACHE_SIZE = int(os.getenv('GEOIP_CACHE_SIZE', '10000'))
+GEOIP_CACHE_TTL = float(os.getenv('GEOIP_CACHE_TTL', '86400'))
+GEOIP_REMOTE_FALLBACK = os.getenv('GEOIP_REMOTE_FALLBACK', 'true').lower() == 'true'
+GEOIP_REMOTE_TIMEOUT = float(os.getenv('GEOIP_REMOTE_TIMEOUT', '5'))
+# ip-api.com allows 45 requests a minute; more pending lookups are dropped
+GEOIP_REMOTE_MAX_PENDING = int(os.getenv('GEOIP_REMOTE_MAX_PENDING', '20'))
+# Failed remote lookups are not retried for this long
+GEOIP_FAILURE_TTL = 300.0
+
+IPAddress = Union[ipaddress.IPv4Address, ipaddress.IPv6Address]
+_MISSING = object()
+
+def _parse_address(value: str) -> IPAddress:
+    value = value.strip()
+    if value.isdigit():
+        number = int(value)
+        return ipaddress.IPv4Address(number) if number <= 0xFFFFFFFF else ipaddress.IPv6Address(number)
+    return ipaddress.ip_address(value)
+
+def _range_key(address: IPAddress) -> Tuple[int, int]:
+    """(IP version, sortable key) of an address"""
+    if address.version == 6:
+        if address.ipv4_mapped:
+            return 4, int(address.ipv4_mapped)
+        return 6, int(address) >> 64
+    return 4, int(address)
+
+def _geolite_countries(blocks_path: str) -> Dict[str, str]:
+    """geoname_id -> ISO code from the Locations file next to a GeoLite2 Blocks file"""
+    directory, name = os.path.split(blocks_path)
+    prefix = name.split('-Blocks-')[0]
+    with open(os.path.join(directory, f"{prefix}-Locations-en.csv"), newline='', encoding='utf-8') as f:
+        return {row['geoname_id']: row['country_iso_code'] for row in csv.DictReader(f) if row['country_iso_code']}
+
+class IPRangeDatabase:
+    """Sorted, non-overlapping IP ranges mapped to ISO country codes"""
+
+    def __init__(self, ranges: Iterable[Tuple[IPAddress, IPAddress, str]] = ()):
+        rows: Dict[int, List[Tuple[int, int, str]]] = {4: [], 6: []}
+        for start, end, country in ranges:
+            version, start_key = _range_key(start)
+            rows[version].append((start_key, _range_key(end)[1], country.upper()))
+
+        self.countries: List[str] = sorted({country for version in rows.values() for _, _, country in version})
+        index = {country: position for position, country in enumerate(self.countries)}
+        self._starts: Dict[int, array] = {}
+        self._ends: Dict[int, array] = {}
+        self._country_index: Dict[int, array] = {}
+        for version, version_rows in rows.items():
+            version_rows.sort()
+            self._starts[version] = array('Q', (row[0] for row in version_rows))
+            self._ends[version] = array('Q', (row[1] for row in version_rows))
+            self._country_index[version] = array('H', (index[row[2]] for row in version_rows))
+
+    @classmethod
+    def from_csv(cls, paths: Iterable[str]) -> "IPRangeDatabase":
+        ranges = []
+        for path in paths:
+            with open(path, newline='', encoding='utf-8') as f:
+                reader = csv.reader(f)
+                header = next(reader, None)
+                if header is None:
+                    continue
+                if header[0] == 'network':
+                    ranges.extend(cls._geolite_ranges(reader, header, _geolite_countries(path)))
+                else:
+                    ranges.extend(cls._plain_ranges(chain([header], reader)))
+        return cls(ranges)
+
+    @staticmethod
+    def _plain_ranges(rows) -> Iterable[Tuple[IPAddress, IPAddress, str]]:
+        for row in rows:
+            # Header lines and unassigned ranges ("-", "ZZ") are skipped
+            if len(row) < 3 or len(row[2]) != 2 or row[2] == 'ZZ':
+                continue
+            try:
+                yield _parse_address(row[0]), _parse_address(row[1]), row[2]
+            except ValueError:
+                continue
+
+    @staticmethod
+    def _geolite_ranges(reader, header: List[str], countries: Dict[str, str]):
+        geoname = header.index('geoname_id')
+        registered = header.index('registered_country_geoname_id')
+        for row in reader:
+            country = countries.get(row[geoname]) or countries.get(row[registered])
+            if country:
+                network = ipaddress.ip_network(row[0])
+                yield network.network_address, network.broadcast_address, country
+
+    def lookup(self, address: IPAddress) -> Optional[str]:
+        version, key = _range_key(address)
+        position = bisect_right(self._starts[version], key) - 1
+        if position >= 0 and key <= self._ends[version][position]:
+            return self.countries[self._country_index[version][position]]
+        return None
+
+    def __len__(self) -> int:
+        return len(self._starts[4]) + len(self._starts[6])
+
+async def ip_api_country(ip_address: str) -> Optional[str]:
+    """Country of ``ip_address`` according to ip-api.com (free, no API key)"""
+    async with httpx.AsyncClient() as client:
+        response = await client.get(f"http://ip-api.com/json/{ip_address}", timeout=GEOIP_REMOTE_TIMEOUT)
+    if response.status_code == 200:
+        data = response.json()
+        if data.get('status') == 'success':
+            return data.get('countryCode') or None
+    return None
+
+class GeoIPResolver:
+    """
+    IP -> ISO country code without waiting on the network: LRU cache, then
+    the local range database, then (in the background) the remote lookup
+    """
+
+    def __init__(self, database: Optional[IPRangeDatabase] = None,
+                 remote_lookup: Optional[Callable[[str], Awaitable[Optional[str]]]] = None,
+                 cache_size: int = GEOIP_CACHE_SIZE, cache_ttl: float = GEOIP_CACHE_TTL,
+                 max_pending: int = GEOIP_REMOTE_MAX_PENDING):
+        self.database = database if database is not None else IPRangeDatabase()
+        self.remote_lookup = remote_lookup
+        self.cache = TTLCache(cache_size, cache_ttl)
+        self.max_pending = max_pending
+        self._pending: Dict[str, asyncio.Task] = {}
+        self.counters = {"local_hits": 0, "remote_lookups": 0, "remote_failures": 0, "remote_dropped": 0}
+
+    def load(self, paths: str = GEOIP_DB_PATH) -> int:
+        """(Re)load the range database from the existing files in ``paths``; returns the range count"""
+        existing = [path.strip() for path in paths.split(',') if os.path.isfile(path.strip())]
+        if not existing:
+            logger.info(f"No GeoIP database at {paths} - unknown IPs use the remote lookup only")
+            return 0
+        self.database = IPRangeDatabase.from_csv(existing)
+        self.cache.clear()
+        logger.info(f"GeoIP database loaded: {len(self.database)} ranges from {', '.join(existing)}")
+        return len(self.database)
+
+    def country_for(self, ip_address: str) -> Optional[str]:
+        """Country code of a public IP, or None when unknown (for now) or not public"""
+        cached = self.cache.get(ip_address, _MISSING)
+        if cached is not _MISSING:
+            return cached or None
+        try:
+            address = ipaddress.ip_address(ip_address.strip())
+        except ValueError:
+            return None
+        if not address.is_global:
+            return None
+        country = self.database.lookup(address)
+        if country:
+            self.counters["local_hits"] += 1
+            self.cache.set(ip_address, country)
+            return country
+        self._schedule_remote(ip_address)
+        return None
+
+    def _schedule_remote(self, ip_address: str):
+        if self.remote_lookup is None or ip_address in self._pending:
+            return
+        if len(self._pending) >= self.max_pending:
+            self.counters["remote_dropped"] += 1
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._pending[ip_address] = loop.create_task(self._resolve_remote(ip_address))
+
+    async def _resolve_remote(self, ip_address: str):
+        self.counters["remote_lookups"] += 1
+        try:
+            country = await self.remote_lookup(ip_address)
+            # Unknown countries are cached too, so each IP is asked about once
+            self.cache.set(ip_address, (country or '').upper())
+        except Exception as e:
+            self.counters["remote_failures"] += 1
+            logger.warning(f"Remote IP geolocation failed for {ip_address}: {e}")
+            self.cache.set(ip_address, '', ttl_seconds=GEOIP_FAILURE_TTL)
+        finally:
+            self._pending.pop(ip_address, None)
+
+    async def wait_pending(self):
+        """Wait for the background lookups in flight (tests, shutdown)"""
+        if self._pending:
+            await asyncio.gather(*list(self._pending.values()), return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "ranges": len(self.database),
+            "pending": len(self._pending),
+            "cache": self.cache.stats(),
+            **self.counters
+        }
+
+# Singleton instance
+_geoip_resolver = None
+
+def get_geoip_resolver() -> GeoIPResolver:
+    """Shared resolver; the database is loaded by the startup geoip phase"""
+    global _geoip_resolver
+    if _geoip_resolver is None:
+        _geoip_resolver = GeoIPResolver(remote_lookup=ip_api_country if GEOIP_REMOTE_FALLBACK else None)
+    return _geoip_resolver
@@ -4,14 +4,12 @@ Global authentication middleware that actually works
 Forces authentication on ALL routes except explicitly public ones
 """
 import secrets
-from typing import Optional, Callable
-from fastapi import Request, Response, HTTPException
-from fastapi.security import HTTPBasicCredentials
-from fastapi.responses import PlainTextResponse
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.types import ASGIApp
+from fastapi import Response
+from starlette.types import ASGIApp, Receive, Scope, Send
 import base64
 
+from .route_classifier import get_route_classifier
+
 # Hardcoded users for basic auth
 BASIC_AUTH_USERS = {
     "Peter": "Semillon",
@@ -41,52 +39,55 @@ PUBLIC_PATHS = [
     "/dashboards/database/llm",  # LLM query assistant - public for admin use
 ]
 
-class GlobalAuthMiddleware(BaseHTTPMiddleware):
-    """Global authentication middleware that properly intercepts ALL requests"""
+def _unauthorized(message: str) -> Response:
+    """401 that triggers the browser's Basic auth prompt"""
+    return Response(
+        content=message,
+        status_code=401,
+        headers={
+            "WWW-Authenticate": 'Basic realm="AVA OLO Protected Area", charset="UTF-8"'
+        }
+    )
+
+class GlobalAuthMiddleware:
+    """
+    Global authentication middleware that properly intercepts ALL requests
+    
+    Pure ASGI (no BaseHTTPMiddleware task/stream wrapping). Public paths are
+    resolved by the shared compiled route classifier with a per-path verdict cache.
+    """
     
     def __init__(self, app: ASGIApp):
-        super().__init__(app)
+        self.app = app
+        self.classifier = get_route_classifier()
     
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
         """Process each request and enforce authentication"""
-        
-        # Get the path
-        path = str(request.url.path)
-        
-        # Check if path is public
-        is_public = False
-        for public_path in PUBLIC_PATHS:
-            if path == public_path or path.startswith(public_path + "/"):
-                is_public = True
-                break
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
         
         # If public, allow through
-        if is_public:
-            response = await call_next(request)
-            return response
+        if self.classifier.classify(scope["path"]).is_public:
+            await self.app(scope, receive, send)
+            return
         
         # Otherwise, require authentication
-        auth_header = request.headers.get("authorization")
+        auth_header = None
+        for name, value in scope.get("headers", []):
+            if name == b"authorization":
+                auth_header = value.decode("latin-1")
+                break
         
         # If no auth header, return 401 with WWW-Authenticate to trigger browser prompt
         if not auth_header:
-            return Response(
-                content="Authentication required",
-                status_code=401,
-                headers={
-                    "WWW-Authenticate": 'Basic realm="AVA OLO Protected Area", charset="UTF-8"'
-                }
-            )
+            await _unauthorized("Authentication required")(scope, receive, send)
+            return
         
         # Check if it's Basic auth
         if not auth_header.lower().startswith("basic "):
-            return Response(
-                content="Invalid authentication method",
-                status_code=401,
-                headers={
-                    "WWW-Authenticate": 'Basic realm="AVA OLO Protected Area", charset="UTF-8"'
-                }
-            )
+            await _unauthorized("Invalid authentication method")(scope, receive, send)
+            return
         
         # Decode credentials
         try:
@@ -95,28 +96,17 @@ class GlobalAuthMiddleware(BaseHTTPMiddleware):
             decoded = base64.b64decode(encoded).decode("utf-8")
             username, password = decoded.split(":", 1)
         except Exception:
-            return Response(
-                content="Invalid authentication format",
-                status_code=401,
-                headers={
-                    "WWW-Authenticate": 'Basic realm="AVA OLO Protected Area", charset="UTF-8"'
-                }
-            )
+            await _unauthorized("Invalid authentication format")(scope, receive, send)
+            return
         
         # Verify credentials
         correct_password = BASIC_AUTH_USERS.get(username)
         if not correct_password or not secrets.compare_digest(password, correct_password):
-            return Response(
-                content="Invalid username or password",
-                status_code=401,
-                headers={
-                    "WWW-Authenticate": 'Basic realm="AVA OLO Protected Area", charset="UTF-8"'
-                }
-            )
+            await _unauthorized("Invalid username or password")(scope, receive, send)
+            return
         
         # Authentication successful - add username to request state
-        request.state.authenticated_user = username
+        scope.setdefault("state", {})["authenticated_user"] = username
         
         # Continue with the request
-        response = await call_next(request)
-        return response
\ No newline at end of file
+        await self.app(scope, receive, send)
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Health probe registry
+Upstream checks (database, OpenAI, weather, ...) register once with a
+deadline and a TTL. Reads are served from each probe's last result: a
+probe only runs again when its result is older than its TTL, stale results
+are returned while the re-run happens in the background, and concurrent
+readers share a single in-flight run. However often health pages and load
+balancers poll, each upstream sees at most one check per TTL.
+
+A background refresher re-runs probes shortly before they expire, so reads
+stay at cache speed. Probes registered with ``on_demand=True`` (billed
+upstreams such as OpenAI and Perplexity) are skipped by the refresher: they
+only run when a reader finds their result expired, so an idle deployment
+with several tasks makes no paid calls at all.
+"""
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+HEALTH_PROBE_TIMEOUT = float(os.getenv('HEALTH_PROBE_TIMEOUT', '5'))
+HEALTH_PROBE_TTL = float(os.getenv('HEALTH_PROBE_TTL', '30'))
+HEALTH_REFRESH_INTERVAL = float(os.getenv('HEALTH_REFRESH_INTERVAL', '5'))
+
+ProbeCheck = Callable[[], Awaitable[Dict[str, Any]]]
+
+@dataclass
+class HealthProbe:
+    """One registered check and its last result"""
+    name: str
+    check: ProbeCheck
+    timeout: float
+    ttl: float
+    group: str = "default"
+    # Refreshed only by reads, never by the background refresher
+    on_demand: bool = False
+    # Result reported when the check times out or raises
+    failure: Dict[str, Any] = field(default_factory=dict)
+    result: Optional[Dict[str, Any]] = None
+    checked_at: float = 0.0  # time.monotonic()
+    last_checked: Optional[str] = None
+    duration_ms: int = 0
+    task: Optional[asyncio.Task] = None
+
+    def age(self, now: float) -> float:
+        return now - self.checked_at
+
+    def is_fresh(self, now: float) -> bool:
+        return self.result is not None and self.age(now) < self.ttl
+
+class HealthProbeRegistry:
+    """Concurrent, cached health checks"""
+
+    def __init__(self, refresh_interval: float = HEALTH_REFRESH_INTERVAL):
+        self.refresh_interval = refresh_interval
+        self._probes: Dict[str, HealthProbe] = {}
+        self._refresher: Optional[asyncio.Task] = None
+        self.runs = 0
+        self.timeouts = 0
+
+    def register(self, name: str, check: ProbeCheck, timeout: Optional[float] = None,
+                 ttl: Optional[float] = None, group: str = "default",
+                 failure: Optional[Dict[str, Any]] = None, on_demand: bool = False) -> HealthProbe:
+        """Add (or replace) a probe; ``check`` is an async callable returning a result dict"""
+        probe = HealthProbe(
+            name=name,
+            check=check,
+            timeout=HEALTH_PROBE_TIMEOUT if timeout is None else timeout,
+            ttl=HEALTH_PROBE_TTL if ttl is None else ttl,
+            group=group,
+            on_demand=on_demand,
+            failure=failure or {"status": "unhealthy"}
+        )
+        self._probes[name] = probe
+        return probe
+
+    def probe(self, name: str, **options) -> Callable[[ProbeCheck], ProbeCheck]:
+        """Decorator form of register(); the function itself is returned unchanged"""
+        def decorator(check: ProbeCheck) -> ProbeCheck:
+            self.register(name, check, **options)
+            return check
+        return decorator
+
+    async def _run(self, probe: HealthProbe) -> Dict[str, Any]:
+        start = time.monotonic()
+        self.runs += 1
+        try:
+            result = await asyncio.wait_for(probe.check(), probe.timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            logger.warning(f"Health probe {probe.name} timed out after {probe.timeout:g}s")
+            result = {**probe.failure, "error": f"No response within {probe.timeout:g}s"}
+        except Exception as e:
+            logger.error(f"Health probe {probe.name} failed: {e}")
+            result = {**probe.failure, "error": str(e)}
+        probe.result = result
+        probe.checked_at = time.monotonic()
+        probe.last_checked = datetime.now().isoformat()
+        probe.duration_ms = int((probe.checked_at - start) * 1000)
+        return result
+
+    def _refresh(self, probe: HealthProbe) -> asyncio.Task:
+        """Start a run unless one is already in flight (single-flight)"""
+        if probe.task is None or probe.task.done():
+            probe.task = asyncio.ensure_future(self._run(probe))
+        return probe.task
+
+    def _report(self, probe: HealthProbe, now: float) -> Dict[str, Any]:
+        return {
+            **probe.result,
+            "last_checked": probe.last_checked,
+            "cache_age_seconds": round(probe.age(now), 1)
+        }
+
+    async def results(self, group: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Latest result of every probe (in ``group``), in registration order
+        Only probes that never ran are awaited; they all run concurrently.
+        """
+        probes = [p for p in self._probes.values() if group is None or p.group == group]
+        now = time.monotonic()
+        first_runs = []
+        for probe in probes:
+            if not probe.is_fresh(now):
+                task = self._refresh(probe)
+                if probe.result is None:
+                    first_runs.append(task)
+        if first_runs:
+            # shield: a client disconnecting must not cancel a run other readers share
+            await asyncio.gather(*(asyncio.shield(task) for task in first_runs))
+        now = time.monotonic()
+        return {probe.name: self._report(probe, now) for probe in probes}
+
+    async def refresh_due(self) -> int:
+        """Re-run every background-refreshed probe that expires before the next tick"""
+        now = time.monotonic()
+        due = [
+            probe for probe in self._probes.values()
+            if not probe.on_demand
+            and (probe.result is None or probe.age(now) >= probe.ttl - self.refresh_interval)
+        ]
+        if due:
+            await asyncio.gather(*(self._refresh(probe) for probe in due))
+        return len(due)
+
+    async def _refresh_loop(self):
+        while True:
+            try:
+                await self.refresh_due()
+            except Exception as e:
+                logger.error(f"Health probe refresh failed: {e}")
+            await asyncio.sleep(self.refresh_interval)
+
+    def start_refresher(self):
+        """Keep the cache warm in the background (idempotent)"""
+        if self._refresher is None or self._refresher.done():
+            self._refresher = asyncio.create_task(self._refresh_loop())
+            logger.info(f"Health probe refresher started for {len(self._probes)} probes")
+
+    async def stop_refresher(self):
+        if self._refresher and not self._refresher.done():
+            self._refresher.cancel()
+            try:
+                await self._refresher
+            except asyncio.CancelledError:
+                pass
+        self._refresher = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-probe cache state for diagnostics endpoints"""
+        now = time.monotonic()
+        return {
+            "runs": self.runs,
+            "timeouts": self.timeouts,
+            "refresher_running": bool(self._refresher and not self._refresher.done()),
+            "probes": {
+                probe.name: {
+                    "group": probe.group,
+                    "on_demand": probe.on_demand,
+                    "status": probe.result.get("status") if probe.result else None,
+                    "age_seconds": round(probe.age(now), 1) if probe.result else None,
+                    "ttl_seconds": probe.ttl,
+                    "timeout_seconds": probe.timeout,
+                    "last_duration_ms": probe.duration_ms
+                }
+                for probe in self._probes.values()
+            }
+        }
+
+_health_registry: Optional[HealthProbeRegistry] = None
+
+def get_health_registry() -> HealthProbeRegistry:
+    """Get or create the process-wide probe registry"""
+    global _health_registry
+    if _health_registry is None:
+        _health_registry = HealthProbeRegistry()
+    return _health_registry
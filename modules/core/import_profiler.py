@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Import-time profiler
+Imports a module (main by default) in a fresh interpreter with
+``python -X importtime`` and reports what it cost: total time, peak
+resident memory, the slowest modules and the heaviest third-party
+packages. With --profiles it compares ROUTER_PROFILE values side by side.
+
+Usage:
+    python -m modules.core.import_profiler [--module main] [--top 25]
+    python -m modules.core.import_profiler --profiles production diagnostics
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Dict, List, NamedTuple, Optional
+
+# "import time:       412 |       1234 |     modules.api.chat_routes"
+IMPORT_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+class ImportCost(NamedTuple):
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+class ImportProfile(NamedTuple):
+    target: str
+    total_ms: float
+    peak_rss_mb: float
+    imports: List[ImportCost]
+
+    def slowest(self, count: int = 25) -> List[ImportCost]:
+        """Modules by cumulative import time (themselves plus what they import)"""
+        return sorted(self.imports, key=lambda cost: cost.cumulative_us, reverse=True)[:count]
+
+    def by_package(self) -> Dict[str, int]:
+        """Self time summed per top-level package, in microseconds"""
+        totals: Dict[str, int] = defaultdict(int)
+        for cost in self.imports:
+            totals[cost.module.split('.')[0]] += cost.self_us
+        return dict(sorted(totals.items(), key=lambda item: item[1], reverse=True))
+
+def parse_importtime(output: str) -> List[ImportCost]:
+    imports = []
+    for line in output.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            imports.append(ImportCost(module, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return imports
+
+_CHILD = (
+    "import importlib, resource, sys, time\n"
+    "start = time.perf_counter()\n"
+    "importlib.import_module(sys.argv[1])\n"
+    "elapsed = (time.perf_counter() - start) * 1000\n"
+    "rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024\n"
+    "print(f'{elapsed:.1f} {rss:.1f}')\n"
+)
+
+def profile_imports(target: str = "main", env: Optional[Dict[str, str]] = None) -> ImportProfile:
+    """Import ``target`` in a new interpreter and collect per-module costs"""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _CHILD, target],
+        capture_output=True, text=True, env={**os.environ, **(env or {})}
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"Importing {target} failed:\n{completed.stderr[-2000:]}")
+    total_ms, peak_rss_mb = completed.stdout.strip().splitlines()[-1].split()
+    return ImportProfile(target, float(total_ms), float(peak_rss_mb), parse_importtime(completed.stderr))
+
+def print_profile(profile: ImportProfile, top: int = 25):
+    print(f"{profile.target}: {profile.total_ms:.0f} ms, peak RSS {profile.peak_rss_mb:.0f} MB, "
+          f"{len(profile.imports)} modules")
+    print(f"\n{'cumulative ms':>14} {'self ms':>9}  module")
+    for cost in profile.slowest(top):
+        print(f"{cost.cumulative_us / 1000:14.1f} {cost.self_us / 1000:9.1f}  {'  ' * cost.depth}{cost.module}")
+    print(f"\n{'self ms':>9}  package")
+    for package, self_us in list(profile.by_package().items())[:top]:
+        print(f"{self_us / 1000:9.1f}  {package}")
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--module", default="main", help="module to import (default: main)")
+    parser.add_argument("--top", type=int, default=25, help="rows per table")
+    parser.add_argument("--profiles", nargs="+", metavar="PROFILE",
+                        help="compare import cost for these ROUTER_PROFILE values")
+    args = parser.parse_args(argv)
+
+    if not args.profiles:
+        print_profile(profile_imports(args.module), args.top)
+        return
+
+    print(f"{'ROUTER_PROFILE':<16} {'import ms':>10} {'peak RSS MB':>12} {'modules':>8}")
+    for name in args.profiles:
+        profile = profile_imports(args.module, {"ROUTER_PROFILE": name})
+        print(f"{name:<16} {profile.total_ms:10.0f} {profile.peak_rss_mb:12.0f} {len(profile.imports):8}")
+
+if __name__ == "__main__":
+    main()
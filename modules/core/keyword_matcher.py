@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Multi-keyword matcher for message scanning
+Aho-Corasick style: every keyword of every vocabulary goes into one prefix
+trie that is compiled into a single regex, so a message is scanned once,
+in C, however many keywords there are. Each hit is expanded through
+precomputed output links (the keywords that are prefixes of the matched
+one), so results keep plain substring semantics: "tomatoes" reports both
+"tomatoes" and "tomato", "pesticide" both "pesticide" and "pest".
+(A pure-Python automaton would walk the text a character at a time and
+lose to the str.__contains__ loops it replaces.)
+
+Results are cached per text, which makes re-scanning a conversation's
+history on every turn almost free.
+"""
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, Mapping, Tuple, Union
+
+def trie_pattern(words: Iterable[str]) -> str:
+    """
+    Alternation of ``words`` factored into a prefix trie, e.g.
+    ``s(?:eed|ow|un(?:ny)?)``, so the regex engine follows one branch per
+    character instead of retrying every word at every position
+    """
+    trie: Dict[str, dict] = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def emit(node: Dict[str, dict]) -> str:
+        branches = [re.escape(char) + emit(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        if len(branches) == 1 and '' not in node:
+            return branches[0]
+        return f"(?:{'|'.join(branches)})" + ('?' if '' in node else '')
+
+    return emit(trie)
+
+def fold_case(text: str) -> str:
+    """
+    Lower-case ``text`` without changing its length
+    A character whose lower case is longer (e.g. 'İ' -> 'i̇') keeps only
+    its first code point, so offsets into the folded text are offsets into
+    ``text`` and every match is a lower-case literal.
+    """
+    folded = text.lower()
+    if len(folded) == len(text):
+        return folded
+    return ''.join(char.lower()[0] for char in text)
+
+class FoldedPattern:
+    """
+    Case-insensitive pattern over lower-case literals
+    Matching case-folded text against a case-sensitive pattern keeps the
+    engine's literal fast paths, which re.IGNORECASE disables. Match spans
+    line up with the original text and match.group() is the folded literal.
+    """
+
+    def __init__(self, source: str):
+        self._folded = re.compile(source)
+
+    def finditer(self, text: str) -> Iterator[re.Match]:
+        return self._folded.finditer(fold_case(text))
+
+# A vocabulary is a list of keywords, or keyword -> canonical term
+# (e.g. {'koruza': 'corn'}) so hits in any language report one name
+Vocabulary = Union[Iterable[str], Mapping[str, str]]
+
+class KeywordMatcher:
+    """
+    All vocabularies in one automaton
+
+    scan() returns {category: canonical terms found}, terms in order of
+    first occurrence. A keyword may belong to several categories.
+    """
+
+    def __init__(self, vocabularies: Mapping[str, Vocabulary], cache_size: int = 4096):
+        # keyword -> ((category, canonical), ...)
+        self._entries: Dict[str, List[Tuple[str, str]]] = {}
+        for category, vocabulary in vocabularies.items():
+            pairs = vocabulary.items() if isinstance(vocabulary, Mapping) else ((k, k) for k in vocabulary)
+            for keyword, canonical in pairs:
+                entries = self._entries.setdefault(fold_case(keyword), [])
+                if (category, canonical) not in entries:
+                    entries.append((category, canonical))
+
+        # Output links, found once here instead of per message: the scan reports
+        # the longest keyword starting at each position, which stands for every
+        # keyword that is a prefix of it ("tomatoes" -> "tomato", "tomatoes")
+        self._outputs: Dict[str, Tuple[Tuple[str, str], ...]] = {
+            keyword: tuple(
+                entry for other in sorted(self._entries, key=len)
+                if keyword.startswith(other) for entry in self._entries[other]
+            )
+            for keyword in self._entries
+        }
+
+        self.categories = tuple(vocabularies)
+        self.keyword_count = len(self._entries)
+        # Zero-width lookahead: finditer tries every position, so overlapping
+        # keywords ("rain" in "grain", "rainfall") are all seen
+        self._pattern = FoldedPattern(f"(?=({trie_pattern(self._entries)}))")
+        self._cached_scan = lru_cache(maxsize=cache_size)(self._scan)
+
+    def _scan(self, text: str) -> Dict[str, Tuple[str, ...]]:
+        found: Dict[str, Dict[str, None]] = {}
+        for match in self._pattern.finditer(text):
+            for category, canonical in self._outputs[match.group(1)]:
+                found.setdefault(category, {})[canonical] = None
+        return {category: tuple(terms) for category, terms in found.items()}
+
+    def scan(self, text: str) -> Dict[str, Tuple[str, ...]]:
+        """Canonical terms per category found anywhere in ``text`` (case-insensitive)"""
+        if not text:
+            return {}
+        return dict(self._cached_scan(text))
+
+    def stats(self) -> Dict[str, int]:
+        info = self._cached_scan.cache_info()
+        return {
+            "keywords": self.keyword_count,
+            "categories": len(self.categories),
+            "cache_hits": info.hits,
+            "cache_misses": info.misses,
+            "cached_texts": info.currsize
+        }
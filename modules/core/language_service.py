@@ -6,9 +6,11 @@ Handles IP-based detection, WhatsApp country mapping, and language persistence
 import logging
 import re
 from typing import Optional, Dict, Tuple
-import httpx
 import json
 
+from modules.core.geoip import GeoIPResolver, get_geoip_resolver
+from modules.core.phone_prefixes import resolve_phone_number
+
 logger = logging.getLogger(__name__)
 
 class LanguageService:
@@ -16,59 +18,6 @@ class LanguageService:
     Intelligent language detection and management service
     """
     
-    # WhatsApp country code to language mapping
-    COUNTRY_CODE_TO_LANGUAGE = {
-        # Balkans
-        '+386': 'sl',  # Slovenia → Slovenian
-        '+385': 'hr',  # Croatia → Croatian  
-        '+359': 'bg',  # Bulgaria → Bulgarian
-        '+381': 'sr',  # Serbia → Serbian
-        '+389': 'mk',  # North Macedonia → Macedonian
-        '+387': 'bs',  # Bosnia → Bosnian
-        '+382': 'me',  # Montenegro → Montenegrin
-        '+383': 'sq',  # Kosovo → Albanian
-        
-        # Central Europe
-        '+43': 'de',   # Austria → German
-        '+49': 'de',   # Germany → German
-        '+41': 'de',   # Switzerland → German (primary)
-        '+420': 'cs',  # Czech Republic → Czech
-        '+421': 'sk',  # Slovakia → Slovak
-        '+36': 'hu',   # Hungary → Hungarian
-        '+48': 'pl',   # Poland → Polish
-        
-        # Southern Europe
-        '+39': 'it',   # Italy → Italian
-        '+34': 'es',   # Spain → Spanish
-        '+351': 'pt',  # Portugal → Portuguese
-        '+30': 'el',   # Greece → Greek
-        '+33': 'fr',   # France → French
-        
-        # English-speaking
-        '+1': 'en',    # USA/Canada → English
-        '+44': 'en',   # UK → English
-        '+353': 'en',  # Ireland → English
-        '+61': 'en',   # Australia → English
-        '+64': 'en',   # New Zealand → English
-        '+91': 'en',   # India → English (primary business)
-        
-        # Other European
-        '+31': 'nl',   # Netherlands → Dutch
-        '+32': 'nl',   # Belgium → Dutch/French
-        '+45': 'da',   # Denmark → Danish
-        '+46': 'sv',   # Sweden → Swedish
-        '+47': 'no',   # Norway → Norwegian
-        '+358': 'fi',  # Finland → Finnish
-        '+372': 'et',  # Estonia → Estonian
-        '+371': 'lv',  # Latvia → Latvian
-        '+370': 'lt',  # Lithuania → Lithuanian
-        '+40': 'ro',   # Romania → Romanian
-        '+90': 'tr',   # Turkey → Turkish
-        '+380': 'uk',  # Ukraine → Ukrainian
-        '+7': 'ru',    # Russia → Russian
-        '+375': 'be',  # Belarus → Belarusian
-    }
-    
     # IP country to language mapping
     COUNTRY_TO_LANGUAGE = {
         # Primary mappings
@@ -151,65 +100,36 @@ class LanguageService:
         'be': 'Belarusian',
     }
     
-    def __init__(self):
+    def __init__(self, ip_resolver: Optional[GeoIPResolver] = None):
         """Initialize language service"""
         self.default_language = 'en'
+        self.ip_resolver = ip_resolver or get_geoip_resolver()
         
     async def detect_language_from_ip(self, ip_address: str) -> str:
         """
-        Detect language from IP address using geolocation
-        Falls back to English if detection fails
+        Detect language from IP address using the local GeoIP database
+        Falls back to English when the country is not known yet; public IPs
+        missing from the database are geolocated remotely in the background
         """
-        try:
-            # Skip localhost/private IPs
-            if ip_address in ['127.0.0.1', 'localhost'] or ip_address.startswith('192.168.'):
-                logger.info(f"Private IP {ip_address}, defaulting to English")
-                return self.default_language
-            
-            # Use ip-api.com for free geolocation (no API key needed)
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"http://ip-api.com/json/{ip_address}",
-                    timeout=5.0
-                )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    if data.get('status') == 'success':
-                        country_code = data.get('countryCode', '')
-                        detected_language = self.COUNTRY_TO_LANGUAGE.get(
-                            country_code, 
-                            self.default_language
-                        )
-                        
-                        logger.info(f"IP {ip_address} → Country {country_code} → Language {detected_language}")
-                        return detected_language
-                        
-        except Exception as e:
-            logger.warning(f"IP geolocation failed for {ip_address}: {e}")
-        
-        return self.default_language
+        country_code = self.ip_resolver.country_for(ip_address)
+        if country_code is None:
+            logger.debug(f"No country for IP {ip_address}, defaulting to English")
+            return self.default_language
+        
+        detected_language = self.COUNTRY_TO_LANGUAGE.get(country_code, self.default_language)
+        logger.debug(f"IP {ip_address} → Country {country_code} → Language {detected_language}")
+        return detected_language
     
     def detect_language_from_whatsapp(self, whatsapp_number: str) -> str:
         """
         Detect language from WhatsApp number country code
         """
-        # Clean the number - keep only digits and +
-        clean_number = re.sub(r'[^\d+]', '', whatsapp_number)
-        
-        # Ensure it starts with + (required format)
-        if not clean_number.startswith('+'):
-            clean_number = '+' + clean_number
+        dialing_code = resolve_phone_number(whatsapp_number).dialing_code
+        if dialing_code and dialing_code.language:
+            logger.info(f"WhatsApp {whatsapp_number} → Country code {dialing_code.code} → Language {dialing_code.language}")
+            return dialing_code.language
         
-        # Try to match country codes (longest match first)
-        for length in [4, 3, 2, 1]:  # Some country codes are up to 4 digits
-            country_code = clean_number[:length+1]  # +1 for the + sign
-            if country_code in self.COUNTRY_CODE_TO_LANGUAGE:
-                detected_language = self.COUNTRY_CODE_TO_LANGUAGE[country_code]
-                logger.info(f"WhatsApp {whatsapp_number} → Country code {country_code} → Language {detected_language}")
-                return detected_language
-        
-        logger.warning(f"Unknown country code for {whatsapp_number}, defaulting to English")
+        logger.warning(f"No language for the country code of {whatsapp_number}, defaulting to English")
         return self.default_language
     
     async def get_farmer_language(self, farmer_id: int, db_connection) -> str:
@@ -299,28 +219,8 @@ class LanguageService:
     
     def get_whatsapp_country_from_number(self, whatsapp_number: str) -> Optional[str]:
         """Get country name from WhatsApp number"""
-        clean_number = re.sub(r'[^\d+]', '', whatsapp_number)
-        if not clean_number.startswith('+'):
-            clean_number = '+' + clean_number
-        
-        # Country code to country name mapping
-        COUNTRY_NAMES = {
-            '+386': 'Slovenia',
-            '+385': 'Croatia',
-            '+359': 'Bulgaria',
-            '+43': 'Austria',
-            '+39': 'Italy',
-            '+1': 'USA/Canada',
-            '+44': 'United Kingdom',
-            # Add more as needed
-        }
-        
-        for length in [4, 3, 2, 1]:
-            country_code = clean_number[:length+1]
-            if country_code in COUNTRY_NAMES:
-                return COUNTRY_NAMES[country_code]
-        
-        return None
+        dialing_code = resolve_phone_number(whatsapp_number).dialing_code
+        return dialing_code.country if dialing_code else None
 
 # Singleton instance
 _language_service = None
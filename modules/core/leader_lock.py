@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Cluster leader election for background jobs
+Periodic work that must not run once per uvicorn worker / ECS task (the
+canary deep probe, rollup refreshes, geocoding) is gated on a leader lock:
+a Redis lease (SET NX PX, renewed by the holder) when Redis is configured,
+otherwise a Postgres advisory lock held on a dedicated connection. Either is released automatically if the leader dies.
+
+Each job has its own Redis key and advisory lock key, so leadership of
+different jobs can land on different tasks.
+"""
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from typing import Any, Awaitable, Callable
+
+from .database_manager import get_db_manager
+from .session_store import get_shared_redis_client
+
+logger = logging.getLogger(__name__)
+
+LEADER_CONNECT_TIMEOUT = 10.0
+
+_RENEW_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+_RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+def _holder_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+class RedisLeaderLock:
+    """Leadership lease in Redis; the holder renews it, everyone else waits for it to lapse"""
+
+    backend = "redis"
+
+    def __init__(self, client, key: str, ttl_seconds: float):
+        self.client = client
+        self.key = key
+        self.ttl_ms = int(ttl_seconds * 1000)
+        self.token = _holder_id()
+
+    def _acquire(self) -> bool:
+        if self.client.set(self.key, self.token, nx=True, px=self.ttl_ms):
+            return True
+        return bool(self.client.eval(_RENEW_SCRIPT, 1, self.key, self.token, self.ttl_ms))
+
+    async def acquire(self) -> bool:
+        """Take or renew the lease; the sync client runs off the event loop"""
+        return await asyncio.to_thread(self._acquire)
+
+    async def release(self):
+        await asyncio.to_thread(self.client.eval, _RELEASE_SCRIPT, 1, self.key, self.token)
+
+class AdvisoryLeaderLock:
+    """
+    Leadership as a session-level Postgres advisory lock
+    The leader keeps the connection that holds the lock; if the process or
+    the connection dies, Postgres releases it and another task takes over.
+    """
+
+    backend = "postgres"
+
+    def __init__(self, connect: Callable[[], Awaitable[Any]], key: int):
+        self._connect = connect
+        self.key = key
+        self._conn = None
+
+    async def acquire(self) -> bool:
+        if self._conn is not None and not self._conn.is_closed():
+            return True
+        conn = await self._connect()
+        try:
+            acquired = await conn.fetchval("SELECT pg_try_advisory_lock($1)", self.key)
+        except Exception:
+            await conn.close()
+            raise
+        if acquired:
+            self._conn = conn
+            return True
+        await conn.close()
+        return False
+
+    async def release(self):
+        if self._conn is not None and not self._conn.is_closed():
+            try:
+                await self._conn.execute("SELECT pg_advisory_unlock($1)", self.key)
+            finally:
+                await self._conn.close()
+        self._conn = None
+
+async def _connect_dedicated():
+    """A connection outside the pool, so a held lock does not pin a pooled connection"""
+    import asyncpg
+    config = get_db_manager().config
+    return await asyncpg.connect(
+        user=config['user'], password=config['password'], host=config['host'],
+        port=config['port'], database=config['database'], timeout=LEADER_CONNECT_TIMEOUT
+    )
+
+def create_leader_lock(redis_key: str, advisory_key: int, ttl_seconds: float):
+    """
+    Redis lease when Redis is reachable, otherwise a Postgres advisory lock
+    ``ttl_seconds`` must exceed the holder's renewal interval
+    """
+    client = get_shared_redis_client()
+    if client is not None:
+        return RedisLeaderLock(client, redis_key, ttl_seconds)
+    return AdvisoryLeaderLock(_connect_dedicated, advisory_key)
+
+async def is_leader(lock) -> bool:
+    """Take or renew leadership; a failing backend counts as not leading"""
+    try:
+        return await lock.acquire()
+    except Exception as e:
+        logger.warning(f"Leader election failed ({getattr(lock, 'backend', '?')}): {e}")
+        return False
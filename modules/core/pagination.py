@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Keyset (cursor) pagination helpers for list APIs
+Cursors are opaque base64 tokens carrying the last row's (sort value, id)
+"""
+import base64
+import json
+import logging
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+MAX_PAGE_SIZE = 200
+
+class InvalidCursorError(ValueError):
+    """Raised when a client sends a cursor we did not issue"""
+
+def _serialize_value(value: Any) -> Dict[str, Any]:
+    """Tag the sort value so it round-trips with its original type"""
+    if value is None:
+        return {"t": "null", "v": None}
+    if isinstance(value, datetime):
+        return {"t": "datetime", "v": value.isoformat()}
+    if isinstance(value, date):
+        return {"t": "date", "v": value.isoformat()}
+    return {"t": "raw", "v": value}
+
+def _deserialize_value(tagged: Dict[str, Any]) -> Any:
+    kind = tagged.get("t")
+    value = tagged.get("v")
+    if kind == "null":
+        return None
+    if kind == "datetime":
+        return datetime.fromisoformat(value)
+    if kind == "date":
+        return date.fromisoformat(value)
+    if kind == "raw":
+        return value
+    raise InvalidCursorError(f"Unknown cursor value type: {kind}")
+
+def encode_cursor(sort_value: Any, row_id: int) -> str:
+    """Build an opaque cursor pointing just past the given row"""
+    payload = {"k": _serialize_value(sort_value), "id": row_id}
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[Any, int]:
+    """Decode a cursor back into (sort value, id)"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return _deserialize_value(payload["k"]), int(payload["id"])
+    except InvalidCursorError:
+        raise
+    except Exception as e:
+        raise InvalidCursorError(f"Malformed cursor: {e}")
+
+def clamp_page_size(limit: Optional[int], default: int = 50) -> int:
+    """Keep page sizes within sane bounds"""
+    if not limit or limit < 1:
+        return default
+    return min(limit, MAX_PAGE_SIZE)
+
+def keyset_predicate(sort_column: str, id_column: str,
+                     cursor: Optional[str]) -> Tuple[str, tuple]:
+    """
+    SQL predicate selecting rows after the cursor for a
+    ``ORDER BY sort_column DESC, id_column DESC`` scan.
+
+    PostgreSQL sorts NULLs first in descending order, so a cursor taken
+    inside the NULL group continues within it before moving on to dated rows.
+    Returns ("", ()) when there is no cursor.
+    """
+    if not cursor:
+        return "", ()
+    sort_value, row_id = decode_cursor(cursor)
+    if sort_value is None:
+        return (
+            f"(({sort_column} IS NULL AND {id_column} < %s) OR {sort_column} IS NOT NULL)",
+            (row_id,)
+        )
+    return (
+        f"({sort_column} < %s OR ({sort_column} = %s AND {id_column} < %s))",
+        (sort_value, sort_value, row_id)
+    )
+
+def build_page(rows: List[tuple], limit: int, sort_index: int,
+               id_index: int) -> Tuple[List[tuple], Optional[str]]:
+    """
+    Trim a LIMIT limit+1 result to one page and compute the next cursor.
+    Returns (page_rows, next_cursor); next_cursor is None on the last page.
+    """
+    if len(rows) <= limit:
+        return rows, None
+    page = rows[:limit]
+    last = page[-1]
+    return page, encode_cursor(last[sort_index], last[id_index])
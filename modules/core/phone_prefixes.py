@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+E.164 dialing-prefix trie
+One table of country calling codes with the country, ISO code and UI
+language for each, shared by language detection, the phone country
+detector and CAVA registration. A number is normalized once ("+386 40-123",
+"00386 40 123" and "38640123" are all +38640123) and its longest calling
+code found in a single walk down a digit trie; results are memoized per
+raw number, so repeat senders cost one dict lookup.
+"""
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, NamedTuple, Optional
+
+class DialingCode(NamedTuple):
+    code: str                # '+386'
+    country: str             # 'Slovenia'
+    iso_code: str            # 'SI'
+    language: Optional[str]  # UI language for the country, None when we have none
+
+# code, country, ISO code, language
+DIALING_CODES = [DialingCode(*row) for row in (
+    # Balkans
+    ('+386', 'Slovenia', 'SI', 'sl'),
+    ('+385', 'Croatia', 'HR', 'hr'),
+    ('+359', 'Bulgaria', 'BG', 'bg'),
+    ('+381', 'Serbia', 'RS', 'sr'),
+    ('+389', 'North Macedonia', 'MK', 'mk'),
+    ('+387', 'Bosnia and Herzegovina', 'BA', 'bs'),
+    ('+382', 'Montenegro', 'ME', 'me'),
+    ('+383', 'Kosovo', 'XK', 'sq'),
+
+    # Central Europe
+    ('+43', 'Austria', 'AT', 'de'),
+    ('+49', 'Germany', 'DE', 'de'),
+    ('+41', 'Switzerland', 'CH', 'de'),
+    ('+420', 'Czech Republic', 'CZ', 'cs'),
+    ('+421', 'Slovakia', 'SK', 'sk'),
+    ('+36', 'Hungary', 'HU', 'hu'),
+    ('+48', 'Poland', 'PL', 'pl'),
+
+    # Southern Europe
+    ('+39', 'Italy', 'IT', 'it'),
+    ('+34', 'Spain', 'ES', 'es'),
+    ('+351', 'Portugal', 'PT', 'pt'),
+    ('+30', 'Greece', 'GR', 'el'),
+    ('+33', 'France', 'FR', 'fr'),
+
+    # English-speaking
+    ('+1', 'United States/Canada', 'US', 'en'),
+    ('+44', 'United Kingdom', 'GB', 'en'),
+    ('+353', 'Ireland', 'IE', 'en'),
+    ('+61', 'Australia', 'AU', 'en'),
+    ('+64', 'New Zealand', 'NZ', 'en'),
+    ('+91', 'India', 'IN', 'en'),
+
+    # Other European
+    ('+31', 'Netherlands', 'NL', 'nl'),
+    ('+32', 'Belgium', 'BE', 'nl'),
+    ('+45', 'Denmark', 'DK', 'da'),
+    ('+46', 'Sweden', 'SE', 'sv'),
+    ('+47', 'Norway', 'NO', 'no'),
+    ('+358', 'Finland', 'FI', 'fi'),
+    ('+372', 'Estonia', 'EE', 'et'),
+    ('+371', 'Latvia', 'LV', 'lv'),
+    ('+370', 'Lithuania', 'LT', 'lt'),
+    ('+40', 'Romania', 'RO', 'ro'),
+    ('+90', 'Turkey', 'TR', 'tr'),
+    ('+380', 'Ukraine', 'UA', 'uk'),
+    ('+7', 'Russia', 'RU', 'ru'),
+    ('+375', 'Belarus', 'BY', 'be'),
+
+    # Rest of the world
+    ('+86', 'China', 'CN', None),
+    ('+81', 'Japan', 'JP', None),
+    ('+82', 'South Korea', 'KR', None),
+    ('+27', 'South Africa', 'ZA', None),
+    ('+254', 'Kenya', 'KE', None),
+    ('+255', 'Tanzania', 'TZ', None),
+    ('+256', 'Uganda', 'UG', None),
+    ('+234', 'Nigeria', 'NG', None),
+    ('+20', 'Egypt', 'EG', None),
+    ('+212', 'Morocco', 'MA', None),
+    ('+216', 'Tunisia', 'TN', None),
+    ('+213', 'Algeria', 'DZ', None),
+    ('+55', 'Brazil', 'BR', None),
+    ('+54', 'Argentina', 'AR', None),
+    ('+52', 'Mexico', 'MX', None),
+    ('+57', 'Colombia', 'CO', None),
+    ('+56', 'Chile', 'CL', None),
+    ('+51', 'Peru', 'PE', None),
+    ('+593', 'Ecuador', 'EC', None),
+)]
+
+NON_DIGITS = re.compile(r'\D')
+
+class ResolvedNumber(NamedTuple):
+    e164: str                         # '+38640123456', '' for input without digits
+    dialing_code: Optional[DialingCode]
+
+def normalize_number(phone_number: str) -> str:
+    """E.164 form: digits only behind '+'; a leading 00 is the international prefix"""
+    phone_number = phone_number or ''
+    digits = NON_DIGITS.sub('', phone_number)
+    if digits.startswith('00') and not phone_number.lstrip().startswith('+'):
+        digits = digits[2:]
+    return f"+{digits}" if digits else ''
+
+class PhonePrefixTrie:
+    """Digit trie over calling codes; resolve() is memoized per raw number"""
+
+    def __init__(self, codes: Iterable[DialingCode] = DIALING_CODES, cache_size: int = 4096):
+        self._root: Dict[str, dict] = {}
+        for dialing_code in codes:
+            node = self._root
+            for digit in dialing_code.code.lstrip('+'):
+                node = node.setdefault(digit, {})
+            node[''] = dialing_code
+        self.resolve = lru_cache(maxsize=cache_size)(self._resolve)
+
+    def _resolve(self, phone_number: str) -> ResolvedNumber:
+        e164 = normalize_number(phone_number)
+        node, found = self._root, None
+        # Calling codes are prefix-free in practice; the deepest hit still wins
+        for digit in e164[1:5]:
+            node = node.get(digit)
+            if node is None:
+                break
+            found = node.get('', found)
+        return ResolvedNumber(e164, found)
+
+    def stats(self) -> Dict[str, int]:
+        info = self.resolve.cache_info()
+        return {"cache_hits": info.hits, "cache_misses": info.misses, "cached_numbers": info.currsize}
+
+# Singleton instance
+_phone_prefix_trie = None
+
+def get_phone_prefix_trie() -> PhonePrefixTrie:
+    """Get or create the shared prefix trie"""
+    global _phone_prefix_trie
+    if _phone_prefix_trie is None:
+        _phone_prefix_trie = PhonePrefixTrie()
+    return _phone_prefix_trie
+
+def resolve_phone_number(phone_number: str) -> ResolvedNumber:
+    """Normalized number and its calling code (None when unknown)"""
+    return get_phone_prefix_trie().resolve(phone_number or '')
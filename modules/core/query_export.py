@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Streaming export of SELECT results
+Rows are pulled through a psycopg2 named (server-side) cursor in batches of
+EXPORT_FETCH_SIZE and encoded to CSV or NDJSON as they arrive, so worker
+memory stays flat regardless of result size.
+
+The export runs inside a READ ONLY transaction under a statement_timeout
+(EXPORT_TIMEOUT_MS, applied to each batch fetch) and is cut off once it
+exceeds EXPORT_MAX_ROWS rows or EXPORT_MAX_BYTES bytes. Because the
+response status is already sent by then, truncation is reported in-band:
+a final {"_truncated": ...} line for NDJSON, a trailing "# ..." line for CSV.
+"""
+import csv
+import io
+import json
+import logging
+import os
+import uuid
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Callable, Iterator, List, NamedTuple, Optional, Sequence
+
+import psycopg2
+
+from .config import get_database_config
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson"
+}
+
+class ExportLimits(NamedTuple):
+    max_rows: int = int(os.getenv('EXPORT_MAX_ROWS', '500000'))
+    max_bytes: int = int(os.getenv('EXPORT_MAX_BYTES', str(200 * 1024 * 1024)))
+    fetch_size: int = int(os.getenv('EXPORT_FETCH_SIZE', '2000'))
+    statement_timeout_ms: int = int(os.getenv('EXPORT_TIMEOUT_MS', '60000'))
+
+class ExportError(ValueError):
+    """Raised for an unsupported export format"""
+
+def _default_connection():
+    db_config = get_database_config()
+    if db_config['url']:
+        return psycopg2.connect(db_config['url'])
+    return psycopg2.connect(
+        host=db_config['host'],
+        database=db_config['name'],
+        user=db_config['user'],
+        password=db_config['password'],
+        port=db_config['port']
+    )
+
+def _json_value(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (bytes, memoryview)):
+        return bytes(value).hex()
+    return value
+
+def _csv_value(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+def iter_query_rows(query: str, params: Optional[Sequence] = None,
+                    fetch_size: int = ExportLimits().fetch_size,
+                    connection_factory: Callable = _default_connection,
+                    statement_timeout_ms: int = ExportLimits().statement_timeout_ms,
+                    prepare: Optional[Callable[[Any, str], str]] = None) -> Iterator[Any]:
+    """
+    Yield the column list, then each row, from a server-side cursor
+
+    ``prepare(cursor, query)`` may vet or rewrite the query inside the
+    export transaction before it runs (see query_guard.open_guarded_export).
+
+    The connection is rolled back and closed when the generator finishes or
+    is closed early (client disconnect, cap reached).
+    """
+    conn = connection_factory()
+    try:
+        with conn.cursor() as setup:
+            setup.execute("SET TRANSACTION READ ONLY")
+            # SET LOCAL so the timeout ends with the transaction
+            setup.execute(f"SET LOCAL statement_timeout = {int(statement_timeout_ms)}")
+            if prepare is not None:
+                query = prepare(setup, query)
+        cursor = conn.cursor(name=f"export_{uuid.uuid4().hex[:12]}")
+        cursor.itersize = fetch_size
+        try:
+            cursor.execute(query, params)
+            # Named cursors only expose description after the first fetch
+            first = cursor.fetchone()
+            yield [desc[0] for desc in cursor.description]
+            if first is not None:
+                yield first
+                for row in cursor:
+                    yield row
+        finally:
+            cursor.close()
+    finally:
+        try:
+            conn.rollback()
+        finally:
+            conn.close()
+
+def _encode_csv(columns: List[str], row: Optional[Sequence]) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(columns if row is None else [_csv_value(v) for v in row])
+    return buffer.getvalue().encode('utf-8')
+
+def _encode_ndjson(columns: List[str], row: Sequence) -> bytes:
+    record = {col: _json_value(value) for col, value in zip(columns, row)}
+    return (json.dumps(record, default=str) + "\n").encode('utf-8')
+
+def _truncation_marker(fmt: str, reason: str, rows: int) -> bytes:
+    if fmt == "ndjson":
+        return (json.dumps({"_truncated": True, "reason": reason, "rows": rows}) + "\n").encode('utf-8')
+    return f"# export truncated after {rows} rows: {reason}\n".encode('utf-8')
+
+def open_export(query: str, params: Optional[Sequence] = None,
+                limits: ExportLimits = ExportLimits(),
+                connection_factory: Callable = _default_connection,
+                prepare: Optional[Callable[[Any, str], str]] = None):
+    """
+    Run the query and return (columns, row_iterator)
+    Blocking; call it before starting the response so SQL errors can still
+    be returned as a normal error instead of a broken stream.
+    """
+    rows = iter_query_rows(query, params, limits.fetch_size, connection_factory,
+                           limits.statement_timeout_ms, prepare)
+    return next(rows), rows
+
+def stream_export(columns: List[str], rows: Iterator[Sequence], fmt: str,
+                  limits: ExportLimits = ExportLimits(), chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+    """
+    Encode rows into ~chunk_size byte chunks, enforcing the row/byte caps
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ExportError(f"Unsupported export format: {fmt}")
+
+    pending: List[bytes] = []
+    pending_size = 0
+    sent_bytes = 0
+    row_count = 0
+
+    if fmt == "csv":
+        header = _encode_csv(columns, None)
+        pending.append(header)
+        pending_size = len(header)
+
+    try:
+        for row in rows:
+            if row_count >= limits.max_rows:
+                pending.append(_truncation_marker(fmt, f"row limit {limits.max_rows}", row_count))
+                break
+            encoded = _encode_csv(columns, row) if fmt == "csv" else _encode_ndjson(columns, row)
+            if sent_bytes + pending_size + len(encoded) > limits.max_bytes:
+                pending.append(_truncation_marker(fmt, f"byte limit {limits.max_bytes}", row_count))
+                break
+            pending.append(encoded)
+            pending_size += len(encoded)
+            row_count += 1
+
+            if pending_size >= chunk_size:
+                yield b"".join(pending)
+                sent_bytes += pending_size
+                pending, pending_size = [], 0
+
+        if pending:
+            yield b"".join(pending)
+    finally:
+        # Release the server-side cursor as soon as we stop reading,
+        # including when the client disconnects mid-download
+        close = getattr(rows, "close", None)
+        if close:
+            close()
+        logger.info(f"Streamed {fmt} export: {row_count} rows")
+
+def export_filename(prefix: str, fmt: str) -> str:
+    return f"{prefix}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{fmt}"
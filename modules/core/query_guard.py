@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Execution guard for LLM-generated SQL
+Every generated statement is planned with EXPLAIN (FORMAT JSON) before it
+runs. Plans above LLM_QUERY_MAX_COST or LLM_QUERY_MAX_ROWS are either
+wrapped in a LIMIT and re-planned (SELECTs, LLM_QUERY_OVER_BUDGET=limit)
+or rejected outright. The statement itself then runs in a READ ONLY
+transaction with a per-query statement_timeout, so a bad cross join is
+cancelled by Postgres instead of pinning the database. Streaming exports
+of generated SQL go through the same plan check (open_guarded_export).
+"""
+import json
+import logging
+import os
+from typing import Any, Awaitable, Callable, Dict, NamedTuple, Optional, Sequence, Tuple
+
+import psycopg2
+
+from .config import get_database_config
+from .query_export import ExportLimits, open_export
+
+logger = logging.getLogger(__name__)
+
+class GuardLimits(NamedTuple):
+    max_cost: float = float(os.getenv('LLM_QUERY_MAX_COST', '100000'))
+    max_rows: int = int(os.getenv('LLM_QUERY_MAX_ROWS', '100000'))
+    auto_limit: int = int(os.getenv('LLM_QUERY_AUTO_LIMIT', '1000'))
+    on_exceed: str = os.getenv('LLM_QUERY_OVER_BUDGET', 'limit')  # 'limit' or 'reject'
+    statement_timeout_ms: int = int(os.getenv('LLM_QUERY_TIMEOUT_MS', '5000'))
+
+class PlanStats(NamedTuple):
+    total_cost: float
+    plan_rows: int
+    node_type: str
+    seq_scans: Tuple[str, ...]
+
+class GuardedQuery(NamedTuple):
+    sql: str
+    stats: PlanStats
+    limited: bool
+
+class QueryRejected(ValueError):
+    """Raised when a generated query's plan exceeds the configured budget"""
+
+    def __init__(self, message: str, stats: Optional[PlanStats] = None):
+        super().__init__(message)
+        self.stats = stats
+
+def strip_statement(sql: str) -> str:
+    return sql.strip().rstrip(';').strip()
+
+def explain_statement(sql: str) -> str:
+    return f"EXPLAIN (FORMAT JSON) {strip_statement(sql)}"
+
+def timeout_statement(limits: GuardLimits = GuardLimits(), local: bool = True) -> str:
+    """
+    SET LOCAL so the timeout ends with the transaction; ``local=False`` sets
+    it for the session, which the caller must RESET (see RESET_TIMEOUT)
+    """
+    scope = "LOCAL " if local else ""
+    return f"SET {scope}statement_timeout = {int(limits.statement_timeout_ms)}"
+
+RESET_TIMEOUT = "RESET statement_timeout"
+
+def with_limit(sql: str, rows: int) -> str:
+    return f"SELECT * FROM ({strip_statement(sql)}) AS guarded_query LIMIT {int(rows)}"
+
+def is_select(sql: str) -> bool:
+    return strip_statement(sql).upper().startswith(('SELECT', 'WITH'))
+
+def parse_plan(raw: Any) -> PlanStats:
+    """
+    Summarise EXPLAIN (FORMAT JSON) output
+    Accepts the JSON text (asyncpg) or the decoded list (psycopg2), either
+    bare or still wrapped in its single result row.
+    """
+    if isinstance(raw, (list, tuple)) and len(raw) == 1 and isinstance(raw[0], (list, tuple, str)):
+        raw = raw[0]
+    if isinstance(raw, str):
+        raw = json.loads(raw)
+    plan = raw[0]["Plan"]
+
+    seq_scans = []
+    stack = [plan]
+    while stack:
+        node = stack.pop()
+        if node.get("Node Type") == "Seq Scan":
+            seq_scans.append(node.get("Relation Name", "?"))
+        stack.extend(node.get("Plans", []))
+
+    return PlanStats(
+        total_cost=float(plan.get("Total Cost", 0.0)),
+        plan_rows=int(plan.get("Plan Rows", 0)),
+        node_type=plan.get("Node Type", ""),
+        seq_scans=tuple(sorted(seq_scans))
+    )
+
+def over_budget(stats: PlanStats, limits: GuardLimits) -> Optional[str]:
+    """Human-readable reason the plan is over budget, or None"""
+    if stats.total_cost > limits.max_cost:
+        return f"estimated cost {stats.total_cost:,.0f} exceeds {limits.max_cost:,.0f}"
+    if stats.plan_rows > limits.max_rows:
+        return f"estimated {stats.plan_rows:,} rows exceeds {limits.max_rows:,}"
+    return None
+
+def _rewrite_or_reject(sql: str, stats: PlanStats, limits: GuardLimits) -> Optional[str]:
+    """None if the plan is within budget, a LIMITed rewrite to re-plan, or QueryRejected"""
+    reason = over_budget(stats, limits)
+    if reason is None:
+        return None
+    if limits.on_exceed == 'limit' and limits.auto_limit > 0 and is_select(sql):
+        return with_limit(sql, limits.auto_limit)
+    raise QueryRejected(f"Query rejected: {reason}. Add filters or a LIMIT.", stats)
+
+def _accept(sql: str, stats: PlanStats, limits: GuardLimits, limited: bool) -> GuardedQuery:
+    if limited:
+        # LIMIT does not help blocking plans (sorts, hash aggregates over a cross join)
+        reason = over_budget(stats, limits)
+        if reason is not None:
+            raise QueryRejected(f"Query rejected even with LIMIT {limits.auto_limit}: {reason}.", stats)
+    logger.info(f"LLM query plan: cost={stats.total_cost:.0f} rows={stats.plan_rows} "
+                f"node={stats.node_type} seq_scans={','.join(stats.seq_scans) or '-'} limited={limited}")
+    return GuardedQuery(strip_statement(sql), stats, limited)
+
+def guard_query(sql: str, explain: Callable[[str], Any],
+                limits: GuardLimits = GuardLimits()) -> GuardedQuery:
+    """Plan the query through ``explain`` (runs a statement, returns its result) and apply the budget"""
+    stats = parse_plan(explain(explain_statement(sql)))
+    rewritten = _rewrite_or_reject(sql, stats, limits)
+    if rewritten is None:
+        return _accept(sql, stats, limits, limited=False)
+    return _accept(rewritten, parse_plan(explain(explain_statement(rewritten))), limits, limited=True)
+
+async def guard_query_async(sql: str, explain: Callable[[str], Awaitable[Any]],
+                            limits: GuardLimits = GuardLimits()) -> GuardedQuery:
+    """Async counterpart of guard_query, e.g. with asyncpg's ``conn.fetchval``"""
+    stats = parse_plan(await explain(explain_statement(sql)))
+    rewritten = _rewrite_or_reject(sql, stats, limits)
+    if rewritten is None:
+        return _accept(sql, stats, limits, limited=False)
+    return _accept(rewritten, parse_plan(await explain(explain_statement(rewritten))), limits, limited=True)
+
+def _default_connection():
+    db_config = get_database_config()
+    if db_config['url']:
+        return psycopg2.connect(db_config['url'])
+    return psycopg2.connect(
+        host=db_config['host'],
+        database=db_config['name'],
+        user=db_config['user'],
+        password=db_config['password'],
+        port=db_config['port']
+    )
+
+def run_guarded_select(sql: str, params: Optional[Sequence] = None,
+                       limits: GuardLimits = GuardLimits(),
+                       connection_factory: Callable = _default_connection) -> Dict[str, Any]:
+    """
+    Plan, budget-check and run a generated SELECT (blocking)
+    Returns the execute_simple_query shape plus ``plan`` and ``limited``;
+    a rejected plan comes back as success=False with ``rejected`` set.
+    """
+    conn = None
+    params = params or None
+    try:
+        conn = connection_factory()
+        with conn.cursor() as cursor:
+            cursor.execute("SET TRANSACTION READ ONLY")
+            cursor.execute(timeout_statement(limits))
+
+            def explain(statement):
+                cursor.execute(statement, params)
+                return cursor.fetchone()
+
+            guarded = guard_query(sql, explain, limits)
+            cursor.execute(guarded.sql, params)
+            return {
+                'success': True,
+                'columns': [desc[0] for desc in cursor.description],
+                'rows': cursor.fetchall(),
+                'plan': guarded.stats._asdict(),
+                'limited': guarded.limited
+            }
+    except QueryRejected as e:
+        logger.warning(f"{e} SQL: {sql}")
+        return {
+            'success': False,
+            'rejected': True,
+            'error': str(e),
+            'plan': e.stats._asdict() if e.stats else None
+        }
+    except Exception as e:
+        logger.error(f"Guarded query failed: {e}")
+        return {
+            'success': False,
+            'error': str(e)
+        }
+    finally:
+        if conn is not None:
+            try:
+                conn.rollback()
+            finally:
+                conn.close()
+
+def open_guarded_export(sql: str, params: Optional[Sequence] = None,
+                        limits: GuardLimits = GuardLimits(),
+                        export_limits: ExportLimits = ExportLimits(),
+                        connection_factory: Callable = _default_connection):
+    """
+    Streaming export of a generated SELECT (blocking, returns open_export's
+    (columns, rows)). Planned and budget-checked like run_guarded_select
+    inside the export transaction, which runs under the guard's
+    statement_timeout; raises QueryRejected for plans over budget.
+    """
+    def prepare(cursor, statement: str) -> str:
+        def explain(plan_statement):
+            cursor.execute(plan_statement, params)
+            return cursor.fetchone()
+        return guard_query(statement, explain, limits).sql
+
+    export_limits = export_limits._replace(statement_timeout_ms=limits.statement_timeout_ms)
+    return open_export(sql, params or None, export_limits, connection_factory, prepare)
@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+"""
+Async retry with exponential backoff
+Shared by the startup orchestrator's phases and the database pool's
+connection checks, so neither has to import the other.
+"""
+import asyncio
+import logging
+import random
+from typing import Any, Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+async def retry_async(func: Callable[[], Awaitable[Any]], attempts: int = 3,
+                      base_delay: float = 0.5, max_delay: float = 8.0) -> Any:
+    """
+    Await ``func()`` until it succeeds, sleeping (without blocking the loop)
+    base_delay * 2**n with full jitter between attempts; re-raises the last error
+    """
+    for attempt in range(attempts):
+        try:
+            return await func()
+        except Exception as e:
+            if attempt == attempts - 1:
+                raise
+            delay = random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+            logger.warning(f"Attempt {attempt + 1}/{attempts} failed: {e}. Retrying in {delay:.1f}s...")
+            await asyncio.sleep(delay)
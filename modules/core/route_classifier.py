@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Compiled route classifier shared by the ASGI middlewares
+One walk over the request path answers "is it public?" and "is usage tracked?"
+"""
+from functools import lru_cache
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+# Label kinds stored on trie nodes
+PUBLIC = "public"
+EXEMPT = "exempt"
+TRACKED = "tracked"
+
+# Usage-metered endpoints (re-exported by modules.usage_middleware)
+TRACKED_ENDPOINTS = [
+    '/api/v1/chat',
+    '/api/v1/weather',
+    '/api/v1/fields',
+    '/api/v1/advice',
+    '/api/v1/market-prices',
+    '/api/v1/disease-detection',
+    '/api/v1/irrigation',
+    '/api/v1/harvest-prediction'
+]
+
+# Endpoints that are never metered
+EXEMPT_ENDPOINTS = [
+    '/api/v1/payment',
+    '/api/v1/subscription',
+    '/api/v1/auth',
+    '/api/health',
+    '/api/v1/admin',
+    '/webhooks',
+    '/static',
+    '/docs',
+    '/openapi.json'
+]
+
+class RouteVerdict(NamedTuple):
+    """Per-path classification result"""
+    is_public: bool
+    track_usage: bool
+
+class _Node:
+    __slots__ = ("children", "labels")
+
+    def __init__(self):
+        self.children: Dict[str, "_Node"] = {}
+        # (label, segment_boundary) pairs for prefixes ending at this node
+        self.labels: List[Tuple[str, bool]] = []
+
+class PathPrefixTrie:
+    """
+    Character trie over path prefixes
+
+    A prefix registered with ``segment_boundary=True`` only matches the exact
+    path or the path followed by "/" (so "/static" matches "/static/app.js"
+    but not "/staticfoo"). Without it the prefix matches like str.startswith.
+    """
+
+    def __init__(self):
+        self._root = _Node()
+
+    def add(self, prefix: str, label: str, segment_boundary: bool = False):
+        node = self._root
+        for char in prefix:
+            node = node.children.setdefault(char, _Node())
+        node.labels.append((label, segment_boundary))
+
+    def match(self, path: str) -> set:
+        """Return every label whose prefix matches ``path``"""
+        found = set()
+        node = self._root
+        length = len(path)
+        self._collect(node, path, 0, length, found)
+        for index, char in enumerate(path):
+            node = node.children.get(char)
+            if node is None:
+                break
+            self._collect(node, path, index + 1, length, found)
+        return found
+
+    @staticmethod
+    def _collect(node: _Node, path: str, end: int, length: int, found: set):
+        for label, segment_boundary in node.labels:
+            if not segment_boundary or end == length or path[end] == "/":
+                found.add(label)
+
+class RouteClassifier:
+    """
+    Builds a single trie from the auth and usage path lists and memoizes verdicts
+    """
+
+    def __init__(self, public_paths: Iterable[str], exempt_prefixes: Iterable[str],
+                 tracked_prefixes: Iterable[str], cache_size: int = 4096):
+        self._trie = PathPrefixTrie()
+        for path in public_paths:
+            self._trie.add(path, PUBLIC, segment_boundary=True)
+        for prefix in exempt_prefixes:
+            self._trie.add(prefix, EXEMPT)
+        for prefix in tracked_prefixes:
+            self._trie.add(prefix, TRACKED)
+        self.classify = lru_cache(maxsize=cache_size)(self._classify)
+
+    def _classify(self, path: str) -> RouteVerdict:
+        labels = self._trie.match(path)
+        if EXEMPT in labels:
+            track_usage = False
+        else:
+            # WhatsApp webhooks are tracked wherever they are mounted
+            track_usage = TRACKED in labels or ("/whatsapp" in path and "/webhook" in path)
+        return RouteVerdict(is_public=PUBLIC in labels, track_usage=track_usage)
+
+    def cache_info(self):
+        return self.classify.cache_info()
+
+_classifier: Optional[RouteClassifier] = None
+
+def get_route_classifier() -> RouteClassifier:
+    """Shared classifier built from global_auth.PUBLIC_PATHS and the usage endpoint lists"""
+    global _classifier
+    if _classifier is None:
+        from .global_auth import PUBLIC_PATHS
+        _classifier = RouteClassifier(PUBLIC_PATHS, EXEMPT_ENDPOINTS, TRACKED_ENDPOINTS)
+    return _classifier
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Router registry with feature groups
+Routers are declared by module path and grouped (core, debug, maintenance,
+...). The ROUTER_PROFILE environment variable picks the groups imported at
+startup; every other group is imported on demand by LazyRouterMiddleware
+the first time a request hits one of its path prefixes. Debug and one-off
+fix routers, and the libraries they pull in, then cost nothing on a cold
+start while their endpoints stay reachable.
+"""
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+ROUTER_PROFILE = os.getenv('ROUTER_PROFILE', 'production')
+
+@dataclass(frozen=True)
+class RouterSpec:
+    """``module.attr`` is an APIRouter, included with an optional extra prefix"""
+    module: str
+    attr: str = "router"
+    prefix: str = ""
+
+@dataclass
+class RouterGroup:
+    name: str
+    routers: List[RouterSpec]
+    # Path prefixes served by the group's routers; a request under one loads the group
+    paths: Tuple[str, ...] = ()
+    loaded: bool = False
+    load_ms: Optional[int] = None
+    error: Optional[str] = None
+
+def _path_matches(path: str, prefix: str) -> bool:
+    return path == prefix or path.startswith(prefix.rstrip("/") + "/")
+
+class RouterRegistry:
+    """Feature groups of routers for one FastAPI app"""
+
+    def __init__(self, app, profiles: Dict[str, Iterable[str]]):
+        self.app = app
+        self.profiles = {name: tuple(groups) for name, groups in profiles.items()}
+        self.groups: Dict[str, RouterGroup] = {}
+        self.routers_included = 0
+        self._lock: Optional[asyncio.Lock] = None
+
+    def add_group(self, name: str, routers: Iterable[RouterSpec], paths: Iterable[str] = ()) -> RouterGroup:
+        group = RouterGroup(name, list(routers), tuple(paths))
+        self.groups[name] = group
+        return group
+
+    def _import(self, group: RouterGroup) -> List[Tuple[RouterSpec, Any]]:
+        # __import__ rather than importlib.import_module: only the former is
+        # seen by `python -X importtime` (and so by modules.core.import_profiler)
+        return [(spec, getattr(__import__(spec.module, fromlist=[spec.attr]), spec.attr))
+                for spec in group.routers]
+
+    def _include(self, group: RouterGroup, routers: List[Tuple[RouterSpec, Any]], start: float):
+        for spec, router in routers:
+            self.app.include_router(router, prefix=spec.prefix)
+        self.routers_included += len(routers)
+        # The OpenAPI schema is cached on first use; rebuild it with the new routes
+        self.app.openapi_schema = None
+        group.loaded = True
+        group.load_ms = int((time.perf_counter() - start) * 1000)
+        logger.info(f"Router group {group.name}: {len(routers)} routers in {group.load_ms}ms")
+
+    def load(self, name: str) -> bool:
+        """Import and include a group now (at startup)"""
+        group = self.groups[name]
+        if group.loaded:
+            return True
+        start = time.perf_counter()
+        self._include(group, self._import(group), start)
+        return True
+
+    async def load_async(self, name: str) -> bool:
+        """Load a group while serving: imports run off the event loop, once"""
+        group = self.groups[name]
+        if group.loaded:
+            return True
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if group.loaded:
+                return True
+            start = time.perf_counter()
+            try:
+                routers = await asyncio.to_thread(self._import, group)
+            except Exception as e:
+                group.error = str(e)
+                logger.error(f"Router group {name} failed to load: {e}")
+                return False
+            self._include(group, routers, start)
+        return True
+
+    def load_profile(self, profile: str = ROUTER_PROFILE) -> List[str]:
+        """Load the groups of ``profile`` (unknown profiles fall back to production)"""
+        if profile not in self.profiles:
+            logger.warning(f"Unknown ROUTER_PROFILE {profile!r} - using production")
+            profile = "production"
+        for name in self.profiles[profile]:
+            self.load(name)
+        return list(self.profiles[profile])
+
+    def pending_group_for(self, path: str) -> Optional[str]:
+        """Name of a not-yet-loaded group serving ``path``"""
+        for group in self.groups.values():
+            if not group.loaded and group.error is None and any(_path_matches(path, p) for p in group.paths):
+                return group.name
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "routers_included": self.routers_included,
+            "groups": {
+                group.name: {
+                    "routers": len(group.routers),
+                    "loaded": group.loaded,
+                    "load_ms": group.load_ms,
+                    **({"error": group.error} if group.error else {})
+                }
+                for group in self.groups.values()
+            }
+        }
+
+class LazyRouterMiddleware:
+    """Loads a router group on the first request under one of its path prefixes"""
+
+    def __init__(self, app: ASGIApp, registry: RouterRegistry):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] in ("http", "websocket"):
+            name = self.registry.pending_group_for(scope["path"])
+            if name is not None:
+                await self.registry.load_async(name)
+        await self.app(scope, receive, send)
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+Shared schema context for natural-language-to-SQL prompts
+Introspects the public schema once, keeps a compact token-budgeted digest
+keyed by a catalog fingerprint, and renders precompiled prompt templates.
+
+Per NL query this costs nothing until SCHEMA_CONTEXT_CHECK_SECONDS have
+passed; then one cheap fingerprint query runs, and the full introspection
+only repeats if the fingerprint (i.e. the DDL) changed.
+"""
+import logging
+import math
+import os
+import threading
+import time
+from string import Formatter
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import psycopg2
+
+from .config import get_database_config
+
+logger = logging.getLogger(__name__)
+
+TOKEN_BUDGET = int(os.getenv('SCHEMA_CONTEXT_TOKEN_BUDGET', '1500'))
+CHECK_INTERVAL_SECONDS = float(os.getenv('SCHEMA_CONTEXT_CHECK_SECONDS', '300'))
+
+# Tables the NL queries are mostly about; they get budget first
+PRIORITY_TABLES = [
+    'farmers', 'fields', 'field_crops', 'tasks', 'task_fields', 'inventory',
+    'material_catalog', 'inventory_deductions', 'chat_messages', 'incoming_messages',
+    'conversations', 'weather_data', 'field_soil_data', 'fertilizing_plans',
+    'cp_products', 'crop_technology', 'fertilizers'
+]
+
+# Internal bookkeeping tables that never belong in a prompt
+EXCLUDED_TABLES = {
+    name.strip() for name in os.getenv(
+        'SCHEMA_CONTEXT_EXCLUDE',
+        'business_daily_rollup,business_hourly_rollup,business_category_rollup,'
+        'business_rollup_state,whatsapp_inbound_messages,schema_migrations'
+    ).split(',') if name.strip()
+}
+
+# Changes whenever a table/column/constraint in public is created, altered,
+# renamed or dropped; names are included because a rename alone may leave
+# oid/attnum and, depending on the catalog update, xmin looking unchanged
+FINGERPRINT_QUERY = """
+SELECT md5(
+    COALESCE((SELECT string_agg(a.attrelid::text || '.' || c.relname || '.' || a.attnum || '.'
+                                || a.attname || '.' || a.xmin::text, ','
+                                ORDER BY a.attrelid, a.attnum)
+              FROM pg_attribute a
+              JOIN pg_class c ON c.oid = a.attrelid
+              WHERE c.relnamespace = 'public'::regnamespace
+                AND c.relkind IN ('r', 'p', 'v', 'm')
+                AND a.attnum > 0), '')
+    || '|' ||
+    COALESCE((SELECT string_agg(oid::text, ',' ORDER BY oid)
+              FROM pg_constraint
+              WHERE connamespace = 'public'::regnamespace), '')
+)
+"""
+
+# Every column of every public table with PK/FK markers, in one round trip
+INTROSPECTION_QUERY = """
+SELECT c.relname,
+       a.attname,
+       format_type(a.atttypid, a.atttypmod),
+       EXISTS (SELECT 1 FROM pg_constraint p
+               WHERE p.conrelid = c.oid AND p.contype = 'p' AND a.attnum = ANY (p.conkey)) AS is_pk,
+       (SELECT f.confrelid::regclass::text FROM pg_constraint f
+        WHERE f.conrelid = c.oid AND f.contype = 'f' AND a.attnum = ANY (f.conkey)
+        LIMIT 1) AS references,
+       GREATEST(c.reltuples, 0)::bigint AS row_estimate
+FROM pg_class c
+JOIN pg_attribute a ON a.attrelid = c.oid AND a.attnum > 0 AND NOT a.attisdropped
+WHERE c.relnamespace = 'public'::regnamespace
+  AND c.relkind IN ('r', 'p', 'v', 'm')
+ORDER BY c.relname, a.attnum
+"""
+
+_TYPE_ABBREVIATIONS = {
+    'integer': 'int',
+    'smallint': 'int',
+    'character varying': 'varchar',
+    'character': 'char',
+    'timestamp without time zone': 'timestamp',
+    'timestamp with time zone': 'timestamptz',
+    'double precision': 'float',
+    'real': 'float',
+    'boolean': 'bool',
+}
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token for schema text)"""
+    return math.ceil(len(text) / 4)
+
+def abbreviate_type(type_name: str) -> str:
+    base = type_name.split('(')[0].strip()
+    return _TYPE_ABBREVIATIONS.get(base, base)
+
+class SchemaDigest(NamedTuple):
+    """Compact schema description valid for one catalog fingerprint"""
+    fingerprint: str
+    text: str
+    tokens: int
+    tables: Tuple[str, ...]
+    omitted_tables: Tuple[str, ...]
+
+def build_digest(rows: List[tuple], fingerprint: str, token_budget: int = TOKEN_BUDGET) -> SchemaDigest:
+    """
+    Render introspection rows as one line per table:
+        fields(id int PK, farmer_id int→farmers, field_name varchar, ...) ~53 rows
+    Priority tables first, then the largest; tables that do not fit the
+    budget are listed by name only.
+    """
+    tables: Dict[str, List[str]] = {}
+    estimates: Dict[str, int] = {}
+    for relname, attname, type_name, is_pk, references, row_estimate in rows:
+        if relname in EXCLUDED_TABLES:
+            continue
+        column = f"{attname} {abbreviate_type(type_name)}"
+        if is_pk:
+            column += " PK"
+        if references:
+            column += f"→{references}"
+        tables.setdefault(relname, []).append(column)
+        estimates[relname] = row_estimate or 0
+
+    priority = {name: index for index, name in enumerate(PRIORITY_TABLES)}
+    ordered = sorted(tables, key=lambda t: (priority.get(t, len(priority)), -estimates[t], t))
+
+    lines, included, omitted = [], [], []
+    used = 0
+    for table in ordered:
+        line = f"{table}({', '.join(tables[table])})"
+        if estimates[table]:
+            line += f" ~{estimates[table]} rows"
+        cost = estimate_tokens(line) + 1
+        if used + cost > token_budget:
+            omitted.append(table)
+            continue
+        lines.append(line)
+        included.append(table)
+        used += cost
+
+    if omitted:
+        lines.append(f"Other tables (columns omitted): {', '.join(sorted(omitted))}")
+
+    text = "\n".join(lines)
+    return SchemaDigest(fingerprint, text, estimate_tokens(text), tuple(included), tuple(omitted))
+
+class PromptTemplate:
+    """
+    str.format-style prompt parsed once at import time
+
+    render() only joins precomputed literal segments with the per-query
+    values; the {schema} field is bound once per digest fingerprint.
+    """
+
+    def __init__(self, text: str):
+        self._segments: List[Tuple[str, Optional[str]]] = [
+            (literal, field) for literal, field, _, _ in Formatter().parse(text)
+        ]
+        self.fields = {field for _, field in self._segments if field}
+        self._bound_fingerprint: Optional[str] = None
+        self._bound_segments: List[Tuple[str, Optional[str]]] = self._segments
+
+    def _bind_schema(self, digest: SchemaDigest) -> List[Tuple[str, Optional[str]]]:
+        if self._bound_fingerprint != digest.fingerprint:
+            bound: List[Tuple[str, Optional[str]]] = []
+            pending = ""
+            for literal, field in self._segments:
+                pending += literal
+                if field == "schema":
+                    pending += digest.text
+                elif field:
+                    bound.append((pending, field))
+                    pending = ""
+            bound.append((pending, None))
+            self._bound_segments = bound
+            self._bound_fingerprint = digest.fingerprint
+        return self._bound_segments
+
+    def render(self, digest: Optional[SchemaDigest] = None, **values: Any) -> str:
+        segments = self._bind_schema(digest) if digest is not None else self._segments
+        return "".join(literal + (str(values[field]) if field else "") for literal, field in segments)
+
+def _default_connection():
+    db_config = get_database_config()
+    if db_config['url']:
+        return psycopg2.connect(db_config['url'])
+    return psycopg2.connect(
+        host=db_config['host'],
+        database=db_config['name'],
+        user=db_config['user'],
+        password=db_config['password'],
+        port=db_config['port']
+    )
+
+class SchemaContextProvider:
+    """Process-wide cache of the schema digest"""
+
+    def __init__(self, connection_factory: Callable = _default_connection,
+                 token_budget: int = TOKEN_BUDGET, check_interval: float = CHECK_INTERVAL_SECONDS):
+        self.connection_factory = connection_factory
+        self.token_budget = token_budget
+        self.check_interval = check_interval
+        self._digest: Optional[SchemaDigest] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.stats = {"fingerprint_checks": 0, "introspections": 0, "cache_hits": 0}
+
+    def _fetch(self, query: str) -> List[tuple]:
+        conn = self.connection_factory()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(query)
+                return cursor.fetchall()
+        finally:
+            conn.close()
+
+    def get_digest(self, force: bool = False) -> Optional[SchemaDigest]:
+        """
+        Current schema digest (blocking; may hit the database)
+        Returns the last good digest - or None - if the database is unreachable.
+        """
+        now = time.monotonic()
+        if not force and self._digest is not None and now - self._checked_at < self.check_interval:
+            self.stats["cache_hits"] += 1
+            return self._digest
+
+        with self._lock:
+            if not force and self._digest is not None and time.monotonic() - self._checked_at < self.check_interval:
+                self.stats["cache_hits"] += 1
+                return self._digest
+            try:
+                self.stats["fingerprint_checks"] += 1
+                fingerprint = self._fetch(FINGERPRINT_QUERY)[0][0]
+                if force or self._digest is None or self._digest.fingerprint != fingerprint:
+                    self.stats["introspections"] += 1
+                    self._digest = build_digest(self._fetch(INTROSPECTION_QUERY), fingerprint, self.token_budget)
+                    logger.info(f"Schema digest rebuilt: {len(self._digest.tables)} tables, "
+                                f"~{self._digest.tokens} tokens, {len(self._digest.omitted_tables)} omitted")
+                self._checked_at = time.monotonic()
+            except Exception as e:
+                logger.warning(f"Schema introspection failed, using cached digest: {e}")
+                # Back off instead of retrying on every query
+                self._checked_at = time.monotonic()
+            return self._digest
+
+    def get_schema_text(self, fallback: str = "") -> str:
+        digest = self.get_digest()
+        return digest.text if digest else fallback
+
+    def render(self, template: PromptTemplate, fallback_schema: str = "", **values: Any) -> str:
+        """Render a template with the current digest bound to {schema}"""
+        digest = self.get_digest()
+        if digest is None and "schema" in template.fields:
+            values["schema"] = fallback_schema
+        return template.render(digest, **values)
+
+    def invalidate(self):
+        """Force a fingerprint check on the next call"""
+        self._checked_at = 0.0
+
+_provider: Optional[SchemaContextProvider] = None
+
+def get_schema_context_provider() -> SchemaContextProvider:
+    global _provider
+    if _provider is None:
+        _provider = SchemaContextProvider()
+    return _provider
@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+"""
+Pluggable session store for the registration and chat engines
+
+Two backends share one small mapping-style interface (get/set/delete plus
+``store[key]``, ``key in store``, ``len(store)``):
+
+- MemorySessionStore: per-process LRU with idle TTL. Expiry is driven by a
+  hashed timer wheel, so each operation only touches the sessions that are
+  actually due instead of scanning all of them.
+- RedisSessionStore: JSON values under ``ava:session:<namespace>:<key>``
+  with a native Redis TTL, shared by every uvicorn worker / ECS task.
+
+Sessions are plain dicts that callers mutate in place, so callers must
+``set()`` the session again after changing it; the memory backend hands out
+the stored object, the Redis backend a fresh copy. Async callers use
+``aget``/``aset``/``adelete``, which keep the blocking Redis client off the
+event loop. Sessions are stored as JSON in Redis, so callers must never put
+plaintext secrets (passwords) in them.
+
+SESSION_STORE selects the backend: ``auto`` (Redis when REDIS_HOST is
+configured and reachable, otherwise memory), ``memory`` or ``redis``.
+"""
+import asyncio
+import json
+import logging
+import math
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+SESSION_STORE_BACKEND = os.getenv('SESSION_STORE', 'auto')
+SESSION_MAX_ENTRIES = int(os.getenv('SESSION_MAX_ENTRIES', '10000'))
+
+# Idle timeouts: an abandoned registration and a chat conversation.
+# Finished registrations are deleted right away.
+REGISTRATION_SESSION_TTL = float(os.getenv('REGISTRATION_SESSION_TTL', '300'))
+CHAT_SESSION_TTL = float(os.getenv('CHAT_SESSION_TTL', '86400'))
+REDIS_KEY_PREFIX = "ava:session:"
+# SCAN pages read at most when sampling a Redis namespace for statistics
+SAMPLE_MAX_PAGES = 10
+
+_MISSING = object()
+
+class TimerWheel:
+    """
+    Hashed timing wheel with ``slots`` buckets of ``tick_seconds`` each
+
+    schedule/cancel are O(1); advance() only visits the buckets whose tick
+    has passed. Deadlines further out than one revolution share a bucket
+    with nearer ones and are simply left in place until their round comes.
+    """
+
+    def __init__(self, tick_seconds: float = 1.0, slots: int = 4096, now: float = 0.0):
+        self.tick_seconds = tick_seconds
+        self._slots: List[Set[str]] = [set() for _ in range(slots)]
+        self._current_tick = int(now // tick_seconds)
+
+    def _bucket(self, tick: int) -> Set[str]:
+        return self._slots[tick % len(self._slots)]
+
+    def schedule(self, key: str, deadline: float) -> int:
+        """File ``key`` under the tick containing ``deadline``; returns that tick"""
+        tick = max(math.ceil(deadline / self.tick_seconds), self._current_tick + 1)
+        self._bucket(tick).add(key)
+        return tick
+
+    def cancel(self, key: str, tick: int):
+        self._bucket(tick).discard(key)
+
+    def advance(self, now: float, is_expired: Callable[[str], bool]) -> List[str]:
+        """Remove and return the keys in elapsed buckets for which ``is_expired`` holds"""
+        now_tick = int(now // self.tick_seconds)
+        elapsed = now_tick - self._current_tick
+        if elapsed <= 0:
+            return []
+        expired: List[str] = []
+        # After a full revolution every bucket has been visited once
+        for tick in range(self._current_tick + 1, self._current_tick + 1 + min(elapsed, len(self._slots))):
+            bucket = self._bucket(tick)
+            due = [key for key in bucket if is_expired(key)]
+            bucket.difference_update(due)
+            expired.extend(due)
+        self._current_tick = now_tick
+        return expired
+
+class SessionStore(ABC):
+    """Common interface of the session backends"""
+
+    # Whether every session lives in this process, so counting them is cheap
+    in_process = True
+
+    @abstractmethod
+    def get(self, key: str, default: Any = None) -> Any:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None):
+        ...
+
+    @abstractmethod
+    def delete(self, key: str) -> bool:
+        ...
+
+    @abstractmethod
+    def values(self) -> List[Any]:
+        ...
+
+    def sample(self, limit: int) -> List[Any]:
+        """Up to ``limit`` sessions, for statistics"""
+        return self.values()[:limit]
+
+    @abstractmethod
+    def __len__(self) -> int:
+        ...
+
+    @abstractmethod
+    def stats(self) -> Dict[str, Any]:
+        ...
+
+    def expire(self) -> int:
+        """Drop expired sessions now (a no-op where the backend expires natively)"""
+        return 0
+
+    async def aget(self, key: str, default: Any = None) -> Any:
+        return self.get(key, default)
+
+    async def aset(self, key: str, value: Any, ttl_seconds: Optional[float] = None):
+        self.set(key, value, ttl_seconds)
+
+    async def adelete(self, key: str) -> bool:
+        return self.delete(key)
+
+    def __getitem__(self, key: str) -> Any:
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key: str, value: Any):
+        self.set(key, value)
+
+    def __delitem__(self, key: str):
+        if not self.delete(key):
+            raise KeyError(key)
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+class MemorySessionStore(SessionStore):
+    """
+    Thread-safe in-process LRU of sessions with an idle TTL
+
+    Each set() restarts the entry's TTL; reads only refresh its LRU position.
+    """
+
+    def __init__(self, namespace: str, ttl_seconds: float, max_entries: int = SESSION_MAX_ENTRIES,
+                 tick_seconds: float = 1.0, clock: Callable[[], float] = time.monotonic):
+        self.namespace = namespace
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._clock = clock
+        self._wheel = TimerWheel(tick_seconds, now=clock())
+        # key -> [value, deadline, wheel tick]
+        self._entries: "OrderedDict[str, list]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.expired = 0
+        self.evicted = 0
+
+    def _expire(self, now: float):
+        for key in self._wheel.advance(now, lambda k: k not in self._entries or self._entries[k][1] <= now):
+            if self._entries.pop(key, None) is not None:
+                self.expired += 1
+
+    def expire(self) -> int:
+        """Drop every session whose TTL has passed; returns how many were dropped"""
+        with self._lock:
+            before = self.expired
+            self._expire(self._clock())
+            return self.expired - before
+
+    def get(self, key: str, default: Any = None) -> Any:
+        now = self._clock()
+        with self._lock:
+            self._expire(now)
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= now:
+                return default
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None):
+        now = self._clock()
+        deadline = now + (self.ttl_seconds if ttl_seconds is None else ttl_seconds)
+        with self._lock:
+            self._expire(now)
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._wheel.cancel(key, entry[2])
+            self._entries[key] = [value, deadline, self._wheel.schedule(key, deadline)]
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                old_key, old_entry = self._entries.popitem(last=False)
+                self._wheel.cancel(old_key, old_entry[2])
+                self.evicted += 1
+
+    def delete(self, key: str) -> bool:
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return False
+            self._wheel.cancel(key, entry[2])
+            return True
+
+    def values(self) -> List[Any]:
+        with self._lock:
+            return [entry[0] for entry in self._entries.values()]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "memory",
+            "namespace": self.namespace,
+            "sessions": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "expired": self.expired,
+            "evicted": self.evicted
+        }
+
+def _encode(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"__datetime__": value.isoformat()}
+    if isinstance(value, date):
+        return {"__date__": value.isoformat()}
+    if isinstance(value, (set, tuple, deque)):
+        return list(value)
+    raise TypeError(f"Cannot store {type(value).__name__} in a session")
+
+def _decode(obj: Dict[str, Any]) -> Any:
+    if "__datetime__" in obj:
+        return datetime.fromisoformat(obj["__datetime__"])
+    if "__date__" in obj:
+        return date.fromisoformat(obj["__date__"])
+    return obj
+
+def dumps_session(value: Any) -> str:
+    return json.dumps(value, default=_encode, separators=(",", ":"))
+
+def loads_session(raw: str) -> Any:
+    return json.loads(raw, object_hook=_decode)
+
+class RedisSessionStore(SessionStore):
+    """Sessions as JSON strings with a native Redis TTL"""
+
+    in_process = False
+
+    def __init__(self, client, namespace: str, ttl_seconds: float):
+        self.client = client
+        self.namespace = namespace
+        self.ttl_seconds = ttl_seconds
+        self._prefix = f"{REDIS_KEY_PREFIX}{namespace}:"
+        self.errors = 0
+
+    def _key(self, key: str) -> str:
+        return self._prefix + key
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            raw = self.client.get(self._key(key))
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Session store read failed ({self.namespace}): {e}")
+            return default
+        return default if raw is None else loads_session(raw)
+
+    def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None):
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        try:
+            self.client.set(self._key(key), dumps_session(value), ex=max(1, int(ttl)))
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Session store write failed ({self.namespace}): {e}")
+
+    def delete(self, key: str) -> bool:
+        try:
+            return bool(self.client.delete(self._key(key)))
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Session store delete failed ({self.namespace}): {e}")
+            return False
+
+    async def aget(self, key: str, default: Any = None) -> Any:
+        return await asyncio.to_thread(self.get, key, default)
+
+    async def aset(self, key: str, value: Any, ttl_seconds: Optional[float] = None):
+        await asyncio.to_thread(self.set, key, value, ttl_seconds)
+
+    async def adelete(self, key: str) -> bool:
+        return await asyncio.to_thread(self.delete, key)
+
+    def _keys(self) -> Iterable[str]:
+        return self.client.scan_iter(match=self._prefix + "*", count=500)
+
+    def values(self) -> List[Any]:
+        """All sessions in this namespace (SCAN; diagnostics only)"""
+        keys = list(self._keys())
+        if not keys:
+            return []
+        return [loads_session(raw) for raw in self.client.mget(keys) if raw is not None]
+
+    def sample(self, limit: int) -> List[Any]:
+        """Up to ``limit`` sessions from at most SAMPLE_MAX_PAGES SCAN pages and one MGET"""
+        keys: List[str] = []
+        cursor = 0
+        for _ in range(SAMPLE_MAX_PAGES):
+            cursor, page = self.client.scan(cursor, match=self._prefix + "*", count=limit)
+            keys.extend(page)
+            if not cursor or len(keys) >= limit:
+                break
+        keys = keys[:limit]
+        if not keys:
+            return []
+        return [loads_session(raw) for raw in self.client.mget(keys) if raw is not None]
+
+    def __len__(self) -> int:
+        try:
+            return sum(1 for _ in self._keys())
+        except Exception:
+            return 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Configuration and error count; counting sessions would SCAN the namespace"""
+        return {
+            "backend": "redis",
+            "namespace": self.namespace,
+            "ttl_seconds": self.ttl_seconds,
+            "errors": self.errors
+        }
+
+_redis_client = _MISSING
+_redis_lock = threading.Lock()
+
+def get_shared_redis_client():
+    """One Redis client for every store and lock in the process (None when unavailable)"""
+    global _redis_client
+    with _redis_lock:
+        if _redis_client is _MISSING:
+            try:
+                from .redis_config import RedisConfig
+                _redis_client = RedisConfig.get_redis_client()
+            except ImportError:
+                logger.warning("redis package not installed - sessions kept in memory")
+                _redis_client = None
+        return _redis_client
+
+def create_session_store(namespace: str, ttl_seconds: float,
+                         max_entries: int = SESSION_MAX_ENTRIES,
+                         backend: Optional[str] = None) -> SessionStore:
+    """Session store for one engine, backed by Redis when configured"""
+    backend = backend or SESSION_STORE_BACKEND
+    if backend in ("auto", "redis"):
+        client = get_shared_redis_client()
+        if client is not None:
+            return RedisSessionStore(client, namespace, ttl_seconds)
+        if backend == "redis":
+            logger.warning(f"SESSION_STORE=redis but Redis is unavailable - "
+                           f"'{namespace}' sessions are per-process")
+    return MemorySessionStore(namespace, ttl_seconds, max_entries)
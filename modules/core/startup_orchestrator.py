@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Startup orchestrator
+Runs independent warm-up phases (database pool, Redis, OpenAI key,
+templates, translations, validation) concurrently in the background, each
+with a deadline and async exponential backoff, so the app serves liveness
+checks immediately and reports ready once the required phases succeed.
+
+Every phase records when it started (relative to startup), how long it
+took and how many attempts it needed; report() is the startup timing report.
+"""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from .retry import retry_async
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class StartupPhase:
+    """One warm-up step and its timing"""
+    name: str
+    func: Callable[[], Awaitable[Any]]
+    required: bool = True
+    timeout: float = 30.0
+    attempts: int = 1
+    depends_on: Tuple[str, ...] = ()
+    status: str = "pending"  # pending, running, ok, failed, timeout, skipped
+    result: Any = None
+    error: Optional[str] = None
+    started_ms: Optional[int] = None
+    duration_ms: Optional[int] = None
+    attempts_used: int = 0
+
+class StartupOrchestrator:
+    """Concurrent startup phases with readiness gating"""
+
+    def __init__(self):
+        self._phases: Dict[str, StartupPhase] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._started_at: Optional[float] = None
+        self.total_ms: Optional[int] = None
+        self.finished = False
+
+    def add(self, name: str, func: Callable[[], Awaitable[Any]], required: bool = True,
+            timeout: float = 30.0, attempts: int = 1, depends_on: Tuple[str, ...] = ()) -> StartupPhase:
+        """
+        Register a phase; required phases gate readiness, optional ones are
+        only reported. A phase starts once everything in ``depends_on`` succeeded.
+        """
+        phase = StartupPhase(name, func, required, timeout, attempts, tuple(depends_on))
+        self._phases[name] = phase
+        return phase
+
+    def _elapsed_ms(self) -> int:
+        return int((time.monotonic() - self._started_at) * 1000)
+
+    async def _run_phase(self, phase: StartupPhase):
+        for dependency in phase.depends_on:
+            await asyncio.shield(self._tasks[dependency])
+            if self._phases[dependency].status != "ok":
+                phase.status = "skipped"
+                phase.error = f"{dependency} did not succeed"
+                return
+
+        async def attempt():
+            phase.attempts_used += 1
+            return await phase.func()
+
+        phase.status = "running"
+        phase.started_ms = self._elapsed_ms()
+        start = time.monotonic()
+        try:
+            phase.result = await asyncio.wait_for(retry_async(attempt, phase.attempts), phase.timeout)
+            phase.status = "ok"
+        except asyncio.TimeoutError:
+            phase.status = "timeout"
+            phase.error = f"Not finished within {phase.timeout:g}s"
+        except Exception as e:
+            phase.status = "failed"
+            phase.error = str(e)
+        phase.duration_ms = int((time.monotonic() - start) * 1000)
+        log = logger.info if phase.status == "ok" else logger.warning
+        log(f"Startup phase {phase.name}: {phase.status} in {phase.duration_ms}ms"
+            + (f" ({phase.error})" if phase.error else ""))
+
+    async def run(self) -> Dict[str, Any]:
+        """Run every phase concurrently and return the timing report"""
+        self._started_at = time.monotonic()
+        for name, phase in self._phases.items():
+            unknown = [d for d in phase.depends_on if d not in self._phases]
+            if unknown:
+                raise ValueError(f"Startup phase {name} depends on unknown phases {unknown}")
+        self._tasks = {name: asyncio.ensure_future(self._run_phase(phase)) for name, phase in self._phases.items()}
+        await asyncio.gather(*self._tasks.values())
+        self.total_ms = self._elapsed_ms()
+        self.finished = True
+        logger.info(f"Startup finished in {self.total_ms}ms - ready: {self.ready}")
+        return self.report()
+
+    def phase(self, name: str) -> StartupPhase:
+        return self._phases[name]
+
+    @property
+    def ready(self) -> bool:
+        """True once every required phase succeeded"""
+        return all(phase.status == "ok" for phase in self._phases.values() if phase.required)
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "finished": self.finished,
+            "total_ms": self.total_ms,
+            "phases": {
+                phase.name: {
+                    "status": phase.status,
+                    "required": phase.required,
+                    "started_ms": phase.started_ms,
+                    "duration_ms": phase.duration_ms,
+                    "attempts": phase.attempts_used,
+                    **({"result": phase.result} if isinstance(phase.result, dict) else {}),
+                    **({"error": phase.error} if phase.error else {})
+                }
+                for phase in self._phases.values()
+            }
+        }
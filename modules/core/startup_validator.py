@@ -7,7 +7,6 @@ from modules.core.database_manager import DatabaseManager
 from datetime import datetime
 from typing import Dict
 import openai
-import asyncio
 import json
 import os
 import logging
@@ -152,6 +151,13 @@ class StartupValidator:
         
         validation_report["system_ready"] = all(critical_checks)
         
+        # Seed the canary's cached key validity, so its liveness checks need no API call
+        try:
+            from modules.core.canary import get_canary
+            get_canary().key_valid = validation_report["checks"].get("openai_connection")
+        except Exception as e:
+            logger.warning(f"Could not update canary key status: {e}")
+        
         # Save validation report
         try:
             async with db_manager.get_connection_async() as conn:
@@ -223,37 +229,11 @@ class StartupValidator:
     
     @staticmethod
     async def continuous_health_check():
-        """Run health checks every 5 minutes"""
-        while True:
-            await asyncio.sleep(300)  # 5 minutes
-            
-            try:
-                # Quick health check
-                if not os.getenv("OPENAI_API_KEY"):
-                    print("⚠️ API key lost - attempting recovery...")
-                    await APIKeyManager.ensure_api_key()
-                
-                # Test chat functionality
-                from modules.api.chat_routes import chat_endpoint, ChatRequest
-                test_request = ChatRequest(
-                    wa_phone_number="+385HEALTH_CHECK",
-                    message="System health check"
-                )
-                
-                try:
-                    response = await chat_endpoint(test_request)
-                    
-                    if response.model_used == "unavailable":
-                        print("⚠️ Chat unavailable - attempting recovery...")
-                        await StartupValidator.validate_and_fix()
-                except:
-                    # If chat fails, try to fix
-                    await StartupValidator.validate_and_fix()
-                    
-            except Exception as e:
-                logger.error(f"Health check error: {e}")
-                # Try to recover anyway
-                try:
-                    await StartupValidator.validate_and_fix()
-                except:
-                    pass
\ No newline at end of file
+        """
+        Background health monitoring
+        Cheap liveness checks in every process and a sampled, read-only deep
+        probe on one elected task (see modules.core.canary); the full
+        validate_and_fix only runs when that deep probe fails.
+        """
+        from modules.core.canary import get_canary
+        await get_canary().run()
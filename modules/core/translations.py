@@ -3,6 +3,8 @@
 Translation system for AVA OLO
 Provides UI translations for all supported languages
 """
+from types import MappingProxyType
+from typing import Dict, Tuple
 
 TRANSLATIONS = {
     'en': {
@@ -384,13 +386,38 @@ TRANSLATIONS = {
     }
 }
 
+FALLBACK_LANGUAGE = 'en'
+
 class TranslationDict:
-    """Wrapper to allow both dict and attribute access to translations"""
-    def __init__(self, translations):
-        self._translations = translations
-    
+    """
+    Immutable translations of one language, with attribute (t.key) and
+    dict (t['key']) access. Built once per language by compile_translations:
+    keys the language lacks already hold the fallback text, so a lookup is a
+    single dict hit; only keys unknown to every language render as '[key]'.
+    """
+    __slots__ = ('language_code', '_translations')
+
+    def __init__(self, translations, language_code: str = FALLBACK_LANGUAGE):
+        object.__setattr__(self, 'language_code', language_code)
+        object.__setattr__(self, '_translations', MappingProxyType(dict(translations)))
+
+    def __setattr__(self, key, value):
+        raise AttributeError("TranslationDict is immutable")
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        return (TranslationDict, (dict(self._translations), self.language_code))
+
     def __getattr__(self, key):
         """Allow attribute-style access (t.key)"""
+        # Dunder probes (copy, pickle, Jinja's __html__) are not translation keys
+        if key.startswith('__'):
+            raise AttributeError(key)
         return self._translations.get(key, f'[{key}]')
     
     def __getitem__(self, key):
@@ -400,15 +427,44 @@ class TranslationDict:
     def get(self, key, default=None):
         """Dict-like get method"""
         return self._translations.get(key, default)
+
+    def __contains__(self, key):
+        return key in self._translations
+
+    def __len__(self):
+        return len(self._translations)
     
     def __bool__(self):
         """Return True if translations exist"""
         return bool(self._translations)
     
     def __repr__(self):
-        return f"TranslationDict({list(self._translations.keys())[:5]}...)"
+        return f"TranslationDict({self.language_code}: {list(self._translations.keys())[:5]}...)"
+
+def fallback_chain(language_code: str) -> Tuple[str, ...]:
+    """Languages consulted for a key, most specific first: sl-SI -> sl -> en"""
+    chain = []
+    code = (language_code or FALLBACK_LANGUAGE).replace('_', '-').lower()
+    for candidate in (code, code.split('-')[0], FALLBACK_LANGUAGE):
+        if candidate in TRANSLATIONS and candidate not in chain:
+            chain.append(candidate)
+    return tuple(chain)
+
+def compile_translations() -> Dict[str, TranslationDict]:
+    """One TranslationDict per language with its fallback chain already applied"""
+    compiled = {}
+    for code in TRANSLATIONS:
+        merged = {}
+        for language in reversed(fallback_chain(code)):
+            merged.update(TRANSLATIONS[language])
+        compiled[code] = TranslationDict(merged, code)
+    return compiled
+
+COMPILED_TRANSLATIONS = compile_translations()
 
 def get_translations(language_code: str = 'en'):
     """Get translations for a specific language"""
-    trans_dict = TRANSLATIONS.get(language_code, TRANSLATIONS['en'])
-    return TranslationDict(trans_dict)
\ No newline at end of file
+    compiled = COMPILED_TRANSLATIONS.get(language_code)
+    if compiled is None:
+        compiled = COMPILED_TRANSLATIONS[fallback_chain(language_code)[0]]
+    return compiled
@@ -1,79 +1,17 @@
 """
 Universal Version Badge Middleware
 Automatically injects version badge on ALL HTML pages
-"""
-from fastapi import Request
-from fastapi.responses import Response
-import json
-from datetime import datetime
 
-class VersionBadgeMiddleware:
-    """Middleware to inject version badge on all HTML responses"""
-    
-    def __init__(self, app):
-        self.app = app
-        self.version = "v3.5.38"
-        
-    async def __call__(self, scope, receive, send):
-        if scope["type"] != "http":
-            await self.app(scope, receive, send)
-            return
-            
-        # Capture the response
-        send_wrapper = SendWrapper(send, self.version)
-        await self.app(scope, receive, send_wrapper)
+The badge is spliced into the body while it streams: chunks are forwarded
+as they arrive and only the last few bytes are held back, in case </body>
+is split across two chunks, so pages are never buffered in full.
+"""
 
+BODY_CLOSE = b"</body>"
 
-class SendWrapper:
-    """Wrapper to intercept and modify response body"""
-    
-    def __init__(self, send, version):
-        self.send = send
-        self.version = version
-        self.body_parts = []
-        self.headers = {}
-        
-    async def __call__(self, message):
-        if message["type"] == "http.response.start":
-            # Capture headers
-            self.headers = dict(message.get("headers", []))
-            # Remove content-length header as we'll modify the body
-            message["headers"] = [
-                (name, value) for name, value in message.get("headers", [])
-                if name.lower() != b"content-length"
-            ]
-            await self.send(message)
-            
-        elif message["type"] == "http.response.body":
-            # Check if this is HTML content
-            content_type = self.headers.get(b"content-type", b"").decode()
-            
-            if "text/html" in content_type:
-                # Accumulate body parts
-                body = message.get("body", b"")
-                more_body = message.get("more_body", False)
-                
-                self.body_parts.append(body)
-                
-                if not more_body:
-                    # This is the last chunk, inject badge
-                    full_body = b"".join(self.body_parts)
-                    modified_body = self.inject_version_badge(full_body)
-                    
-                    # Send modified body
-                    await self.send({
-                        "type": "http.response.body",
-                        "body": modified_body,
-                        "more_body": False
-                    })
-                # If more_body is True, wait for next chunk
-            else:
-                # Not HTML, pass through unchanged
-                await self.send(message)
-                
-    def inject_version_badge(self, html_body):
-        """Inject version badge into HTML body"""
-        version_badge = f'''
+def render_version_badge(version):
+    """Badge markup for ``version``"""
+    return f'''
         <!-- AVA OLO Version Badge -->
         <div id="ava-olo-version-badge" style="
             position: fixed;
@@ -93,7 +31,7 @@ class SendWrapper:
             cursor: pointer;
             transition: all 0.3s ease;
         " onclick="this.style.opacity = this.style.opacity == '0.3' ? '1' : '0.3';">
-            <span id="version-text">{self.version}</span>
+            <span id="version-text">{version}</span>
             <span id="deploy-status" style="
                 display: inline-block;
                 width: 10px;
@@ -123,7 +61,7 @@ class SendWrapper:
                     const versionEl = document.getElementById('version-text');
                     const statusEl = document.getElementById('deploy-status');
                     
-                    if (versionEl) versionEl.textContent = data.version || '{self.version}';
+                    if (versionEl) versionEl.textContent = data.version || '{version}';
                     
                     if (statusEl) {{
                         if (data.fully_deployed) {{
@@ -147,10 +85,100 @@ class SendWrapper:
         }})();
         </script>
         '''.encode()
+
+
+class VersionBadgeMiddleware:
+    """Middleware to inject version badge on all HTML responses"""
+    
+    def __init__(self, app):
+        self.app = app
+        self.version = "v3.5.38"
+        self.badge = render_version_badge(self.version)
+        
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope.get("method") == "HEAD":
+            await self.app(scope, receive, send)
+            return
+            
+        # Rewrite the response as it streams through
+        send_wrapper = SendWrapper(send, self.badge)
+        await self.app(scope, receive, send_wrapper)
+
+
+class BadgeInjector:
+    """
+    Streaming transformer that inserts the badge before the first </body>,
+    or at the end when there is none; holds back at most len(BODY_CLOSE) - 1 bytes
+    """
+    
+    def __init__(self, badge):
+        self.badge = badge
+        self.carry = b""
+        self.injected = False
         
-        # Try to inject before </body>
-        if b'</body>' in html_body:
-            return html_body.replace(b'</body>', version_badge + b'</body>')
-        # If no </body>, append at end
+    def feed(self, chunk):
+        """The part of the rewritten body that can be sent now"""
+        if self.injected:
+            return chunk
+        data = self.carry + chunk
+        index = data.find(BODY_CLOSE)
+        if index >= 0:
+            self.carry = b""
+            self.injected = True
+            return data[:index] + self.badge + data[index:]
+        # Hold back a tail that could be the start of a split </body>
+        keep = min(len(data), len(BODY_CLOSE) - 1)
+        self.carry = data[len(data) - keep:]
+        return data[:len(data) - keep]
+        
+    def finish(self):
+        """Whatever is still owed once the body has ended"""
+        if self.injected:
+            return b""
+        self.injected = True
+        tail, self.carry = self.carry, b""
+        return tail + self.badge
+
+
+class SendWrapper:
+    """Wrapper to intercept and modify response body"""
+    
+    def __init__(self, send, badge):
+        self.send = send
+        self.badge = badge
+        self.injector = None
+        
+    async def __call__(self, message):
+        if message["type"] == "http.response.start":
+            headers = message.get("headers", [])
+            content_type = b""
+            encoded = False
+            for name, value in headers:
+                if name.lower() == b"content-type":
+                    content_type = value
+                elif name.lower() == b"content-encoding":
+                    encoded = True
+            # Compressed bodies cannot be spliced, so they pass through untouched
+            if b"text/html" in content_type and not encoded:
+                self.injector = BadgeInjector(self.badge)
+                # Remove content-length header as we'll modify the body
+                message["headers"] = [
+                    (name, value) for name, value in headers
+                    if name.lower() != b"content-length"
+                ]
+            await self.send(message)
+            
+        elif message["type"] == "http.response.body" and self.injector is not None:
+            more_body = message.get("more_body", False)
+            body = self.injector.feed(message.get("body", b""))
+            if not more_body:
+                body += self.injector.finish()
+            await self.send({
+                "type": "http.response.body",
+                "body": body,
+                "more_body": more_body
+            })
+            
         else:
-            return html_body + version_badge
\ No newline at end of file
+            # Not HTML, pass through unchanged
+            await self.send(message)
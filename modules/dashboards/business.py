@@ -6,11 +6,13 @@ from fastapi import APIRouter, Request
 from fastapi.responses import HTMLResponse, JSONResponse
 from fastapi.templating import Jinja2Templates
 from typing import List, Dict, Any, Optional
+import asyncio
 import json
 from datetime import datetime, timedelta
 import logging
 from modules.core.database_manager import get_db_manager
 from modules.core.config import config
+from modules.dashboards.business_rollups import fetch_dashboard_bundle
 
 logger = logging.getLogger(__name__)
 
@@ -24,6 +26,18 @@ async def business_dashboard(request: Request):
         "request": request
     })
 
+@router.get("/api/dashboard-bundle", response_class=JSONResponse)
+async def get_dashboard_bundle(days: int = 30):
+    """All business dashboard widgets in one response, read from the rollup tables"""
+    try:
+        return await asyncio.to_thread(fetch_dashboard_bundle, days)
+    except Exception as e:
+        logger.error(f"Error fetching dashboard bundle: {str(e)}")
+        return {
+            "success": False,
+            "error": str(e)
+        }
+
 @router.get("/api/overview", response_class=JSONResponse)
 async def get_business_overview():
     """Get database overview metrics"""
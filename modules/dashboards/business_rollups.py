@@ -0,0 +1,396 @@
+"""
+Business dashboard rollups
+Incremental aggregator for the business_*_rollup tables and the single-query
+bundle read used by /dashboards/business/api/dashboard-bundle.
+
+Each refresh recomputes only the trailing window (BUSINESS_ROLLUP_LOOKBACK_DAYS,
+or back to the last watermark if the job has been down longer), so its cost
+does not grow with the size of the farmers table. Churn is re-derived over the
+whole window because a farmer's updated_at can move after the row was counted.
+
+In the app the refresh loop runs in every process but only the cluster
+leader (modules.core.leader_lock) does the work. Or run once from
+cron/ECS scheduled task:
+    python -m modules.dashboards.business_rollups
+"""
+import asyncio
+import logging
+import os
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from modules.core.database_manager import get_db_manager
+from modules.core.leader_lock import create_leader_lock, is_leader
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_NAME = "business_dashboard"
+LOOKBACK_DAYS = int(os.getenv('BUSINESS_ROLLUP_LOOKBACK_DAYS', '35'))
+HOURLY_RETENTION_HOURS = 48
+REFRESH_INTERVAL_SECONDS = int(os.getenv('BUSINESS_ROLLUP_INTERVAL', '300'))
+# Only the elected leader refreshes ("avarol" in ASCII for the advisory lock)
+ROLLUP_LEADER_KEY = "ava:business_rollups:leader"
+ROLLUP_ADVISORY_LOCK_KEY = 0x617661726F6C
+
+CROP_CATEGORIES = ['Arable Crops', 'Vineyards', 'Orchards', 'Other']
+
+GROWTH_PERIODS = {"24hours": 1, "7days": 7, "30days": 30}
+
+_CATEGORY_CASE = """
+    CASE
+        WHEN primary_occupation LIKE '%vineyard%' THEN 'Vineyards'
+        WHEN primary_occupation LIKE '%arable%' OR primary_occupation LIKE '%grain%' THEN 'Arable Crops'
+        WHEN primary_occupation LIKE '%orchard%' OR primary_occupation LIKE '%fruit%' THEN 'Orchards'
+        ELSE 'Other'
+    END
+"""
+
+DAILY_UPSERT = """
+INSERT INTO business_daily_rollup (bucket_date, registrations, new_hectares, churned, refreshed_at)
+SELECT d.day,
+       COALESCE(r.registrations, 0),
+       COALESCE(r.new_hectares, 0),
+       COALESCE(c.churned, 0),
+       NOW()
+FROM (SELECT generate_series(%s::date, CURRENT_DATE, INTERVAL '1 day')::date AS day) d
+LEFT JOIN (
+    SELECT created_at::date AS day, COUNT(*) AS registrations, SUM(size_hectares) AS new_hectares
+    FROM farmers
+    WHERE created_at >= %s::date
+    GROUP BY 1
+) r ON r.day = d.day
+LEFT JOIN (
+    SELECT updated_at::date AS day, COUNT(*) AS churned
+    FROM farmers
+    WHERE subscription_status = 'inactive' AND updated_at >= %s::date
+    GROUP BY 1
+) c ON c.day = d.day
+ON CONFLICT (bucket_date) DO UPDATE SET
+    registrations = EXCLUDED.registrations,
+    new_hectares = EXCLUDED.new_hectares,
+    churned = EXCLUDED.churned,
+    refreshed_at = EXCLUDED.refreshed_at
+"""
+
+# Separate statement: the conversations table is optional in some environments
+DAILY_ACTIVE_UPSERT = """
+INSERT INTO business_daily_rollup (bucket_date, active_farmers, refreshed_at)
+SELECT d.day, COALESCE(a.active_farmers, 0), NOW()
+FROM (SELECT generate_series(%s::date, CURRENT_DATE, INTERVAL '1 day')::date AS day) d
+LEFT JOIN (
+    SELECT timestamp::date AS day, COUNT(DISTINCT farmer_id) AS active_farmers
+    FROM conversations
+    WHERE timestamp >= %s::date
+    GROUP BY 1
+) a ON a.day = d.day
+ON CONFLICT (bucket_date) DO UPDATE SET
+    active_farmers = EXCLUDED.active_farmers,
+    refreshed_at = EXCLUDED.refreshed_at
+"""
+
+HOURLY_UPSERT = """
+INSERT INTO business_hourly_rollup (bucket_hour, registrations, new_hectares, churned, refreshed_at)
+SELECT h.hour,
+       COALESCE(r.registrations, 0),
+       COALESCE(r.new_hectares, 0),
+       COALESCE(c.churned, 0),
+       NOW()
+FROM (SELECT generate_series(%s::timestamp, date_trunc('hour', NOW()), INTERVAL '1 hour') AS hour) h
+LEFT JOIN (
+    SELECT date_trunc('hour', created_at) AS hour, COUNT(*) AS registrations, SUM(size_hectares) AS new_hectares
+    FROM farmers
+    WHERE created_at >= %s::timestamp
+    GROUP BY 1
+) r ON r.hour = h.hour
+LEFT JOIN (
+    SELECT date_trunc('hour', updated_at) AS hour, COUNT(*) AS churned
+    FROM farmers
+    WHERE subscription_status = 'inactive' AND updated_at >= %s::timestamp
+    GROUP BY 1
+) c ON c.hour = h.hour
+ON CONFLICT (bucket_hour) DO UPDATE SET
+    registrations = EXCLUDED.registrations,
+    new_hectares = EXCLUDED.new_hectares,
+    churned = EXCLUDED.churned,
+    refreshed_at = EXCLUDED.refreshed_at
+"""
+
+HOURLY_PRUNE = "DELETE FROM business_hourly_rollup WHERE bucket_hour < %s::timestamp"
+
+CATEGORY_UPSERT = f"""
+INSERT INTO business_category_rollup (crop_category, farmer_count, total_hectares, refreshed_at)
+SELECT c.crop_category, COALESCE(s.farmer_count, 0), COALESCE(s.total_hectares, 0), NOW()
+FROM (VALUES {', '.join(f"('{name}')" for name in CROP_CATEGORIES)}) AS c(crop_category)
+LEFT JOIN (
+    SELECT {_CATEGORY_CASE} AS crop_category, COUNT(*) AS farmer_count, SUM(size_hectares) AS total_hectares
+    FROM farmers
+    WHERE subscription_status = 'active'
+    GROUP BY 1
+) s ON s.crop_category = c.crop_category
+ON CONFLICT (crop_category) DO UPDATE SET
+    farmer_count = EXCLUDED.farmer_count,
+    total_hectares = EXCLUDED.total_hectares,
+    refreshed_at = EXCLUDED.refreshed_at
+"""
+
+WATERMARK_UPSERT = """
+INSERT INTO business_rollup_state (rollup_name, watermark, refreshed_at)
+VALUES (%s, %s, NOW())
+ON CONFLICT (rollup_name) DO UPDATE SET
+    watermark = EXCLUDED.watermark,
+    refreshed_at = EXCLUDED.refreshed_at
+"""
+
+# Every widget in one round trip. The daily table holds one row per day, so
+# the running totals stay cheap however many farmers there are; the two
+# feeds are LIMIT 20 index scans on farmers(created_at / updated_at).
+BUNDLE_QUERY = """
+WITH daily AS (
+    SELECT bucket_date, registrations, new_hectares, churned, active_farmers,
+           SUM(registrations) OVER (ORDER BY bucket_date) AS cumulative_registrations,
+           SUM(churned) OVER (ORDER BY bucket_date) AS cumulative_churned
+    FROM business_daily_rollup
+)
+SELECT
+    (SELECT json_agg(json_build_object(
+                'category', crop_category,
+                'farmers', farmer_count,
+                'hectares', total_hectares))
+     FROM business_category_rollup) AS categories,
+    (SELECT json_agg(json_build_object(
+                'date', to_char(bucket_date, 'YYYY-MM-DD'),
+                'registrations', registrations,
+                'new_hectares', new_hectares,
+                'churned', churned,
+                'active_farmers', active_farmers,
+                'cumulative_registrations', cumulative_registrations,
+                'cumulative_churned', cumulative_churned) ORDER BY bucket_date)
+     FROM daily
+     WHERE bucket_date > CURRENT_DATE - %s::int) AS days,
+    (SELECT json_build_object(
+                'registrations', COALESCE(SUM(registrations), 0),
+                'new_hectares', COALESCE(SUM(new_hectares), 0),
+                'churned', COALESCE(SUM(churned), 0))
+     FROM business_hourly_rollup
+     WHERE bucket_hour > date_trunc('hour', NOW()) - INTERVAL '24 hours') AS last_24_hours,
+    (SELECT json_agg(json_build_object(
+                'farmer_id', id,
+                'farmer_name', name,
+                'time', to_char(created_at, 'HH24:MI')) ORDER BY created_at DESC)
+     FROM (SELECT id, TRIM(CONCAT(manager_name, ' ', manager_last_name)) AS name, created_at
+           FROM farmers
+           WHERE created_at >= NOW() - INTERVAL '24 hours'
+           ORDER BY created_at DESC
+           LIMIT 20) recent) AS registrations_feed,
+    (SELECT json_agg(json_build_object(
+                'record_id', id,
+                'operation', CASE WHEN created_at = updated_at THEN 'INSERT' ELSE 'UPDATE' END,
+                'timestamp', to_char(updated_at, 'YYYY-MM-DD HH24:MI:SS')) ORDER BY updated_at DESC)
+     FROM (SELECT id, created_at, updated_at
+           FROM farmers
+           WHERE updated_at >= NOW() - INTERVAL '24 hours'
+           ORDER BY updated_at DESC
+           LIMIT 20) changed) AS changes_feed,
+    (SELECT to_char(refreshed_at, 'YYYY-MM-DD HH24:MI:SS')
+     FROM business_rollup_state
+     WHERE rollup_name = %s) AS refreshed_at
+"""
+
+class BusinessRollupAggregator:
+    """Keeps the business_*_rollup tables current from a watermark"""
+
+    def __init__(self, db_manager=None, lookback_days: int = LOOKBACK_DAYS):
+        self.db_manager = db_manager or get_db_manager()
+        self.lookback_days = lookback_days
+
+    def _get_watermark(self) -> Optional[datetime]:
+        result = self.db_manager.execute_query(
+            "SELECT watermark FROM business_rollup_state WHERE rollup_name = %s", (ROLLUP_NAME,)
+        )
+        rows = result.get('rows') or []
+        return rows[0][0] if rows else None
+
+    def _first_registration_date(self) -> Optional[date]:
+        result = self.db_manager.execute_query("SELECT MIN(created_at)::date FROM farmers")
+        rows = result.get('rows') or []
+        return rows[0][0] if rows else None
+
+    def window_start(self, watermark: Optional[datetime], today: date) -> date:
+        """First day to recompute: the lookback window, widened to cover any gap since the watermark"""
+        start = today - timedelta(days=self.lookback_days)
+        if watermark is None:
+            # First run: backfill the whole history once
+            first = self._first_registration_date()
+            return min(first, start) if first else start
+        return min(watermark.date(), start)
+
+    def refresh(self) -> Dict[str, Any]:
+        """Recompute the trailing buckets and advance the watermark"""
+        started = datetime.now()
+        start_day = self.window_start(self._get_watermark(), started.date())
+        hourly_start = (started - timedelta(hours=HOURLY_RETENTION_HOURS)).replace(minute=0, second=0, microsecond=0)
+
+        self.db_manager.execute_query(DAILY_UPSERT, (start_day, start_day, start_day))
+        try:
+            self.db_manager.execute_query(DAILY_ACTIVE_UPSERT, (start_day, start_day))
+        except Exception as e:
+            # Without conversations the bundle falls back to registrations
+            logger.warning(f"Skipping active-farmer rollup: {e}")
+        self.db_manager.execute_query(HOURLY_UPSERT, (hourly_start, hourly_start, hourly_start))
+        self.db_manager.execute_query(HOURLY_PRUNE, (hourly_start,))
+        self.db_manager.execute_query(CATEGORY_UPSERT)
+        self.db_manager.execute_query(WATERMARK_UPSERT, (ROLLUP_NAME, started))
+
+        elapsed_ms = (datetime.now() - started).total_seconds() * 1000
+        logger.info(f"Business rollups refreshed from {start_day} in {elapsed_ms:.0f}ms")
+        return {"window_start": start_day.isoformat(), "elapsed_ms": round(elapsed_ms, 1)}
+
+async def refresh_as_leader(aggregator: BusinessRollupAggregator, leader_lock) -> Optional[Dict[str, Any]]:
+    """Refresh on the cluster leader only; returns None in every other process"""
+    if not await is_leader(leader_lock):
+        return None
+    return await asyncio.to_thread(aggregator.refresh)
+
+async def run_rollup_refresher(interval_seconds: int = REFRESH_INTERVAL_SECONDS):
+    """Background loop refreshing the rollups on the leader; the DB work runs in a thread"""
+    aggregator = BusinessRollupAggregator()
+    leader_lock = create_leader_lock(ROLLUP_LEADER_KEY, ROLLUP_ADVISORY_LOCK_KEY, ttl_seconds=interval_seconds * 3)
+    while True:
+        try:
+            await refresh_as_leader(aggregator, leader_lock)
+        except Exception as e:
+            logger.error(f"Business rollup refresh failed: {e}")
+        await asyncio.sleep(interval_seconds)
+
+_refresher: Optional[asyncio.Task] = None
+
+def start_rollup_refresher():
+    """App startup hook: start the refresh loop in this process (idempotent)"""
+    global _refresher
+    if _refresher is None or _refresher.done():
+        _refresher = asyncio.create_task(run_rollup_refresher())
+
+def _rolling_average(values: List[float], window: int = 7) -> List[float]:
+    averages = []
+    for i in range(len(values)):
+        start = max(0, i - window + 1)
+        averages.append(round(sum(values[start:i + 1]) / (i - start + 1), 2))
+    return averages
+
+def shape_dashboard_bundle(row: Optional[tuple], days: int = 30) -> Dict[str, Any]:
+    """
+    Turn the BUNDLE_QUERY row into the payloads of the individual widget endpoints
+    Keys mirror /api/overview, /api/growth-trends/{period}, /api/cumulative-growth,
+    /api/churn-rate, /api/todays-activity, /api/activity-stream and /api/database-changes
+    """
+    categories, daily, last_24_hours, registrations_feed, changes_feed, refreshed_at = row or (None,) * 6
+    categories = categories or []
+    daily = daily or []
+    last_24_hours = last_24_hours or {}
+
+    # Overview
+    total_farmers = sum(int(c['farmers'] or 0) for c in categories)
+    total_hectares = sum(float(c['hectares'] or 0) for c in categories)
+    hectare_breakdown = {name: {'hectares': 0, 'percentage': 0} for name in CROP_CATEGORIES}
+    for c in categories:
+        if c['category'] in hectare_breakdown:
+            hectares = float(c['hectares'] or 0)
+            hectare_breakdown[c['category']] = {
+                'hectares': hectares,
+                'percentage': round((hectares / total_hectares) * 100, 1) if total_hectares > 0 else 0
+            }
+
+    # Growth trends - 24 hours from the hourly table, longer periods from whole days
+    growth_trends = {
+        "24hours": {
+            "new_farmers": int(last_24_hours.get('registrations', 0)),
+            "unsubscribed": int(last_24_hours.get('churned', 0)),
+            "new_hectares": round(float(last_24_hours.get('new_hectares', 0)), 2)
+        }
+    }
+    for period, period_days in GROWTH_PERIODS.items():
+        if period == "24hours":
+            continue
+        window = daily[-period_days:]
+        growth_trends[period] = {
+            "new_farmers": sum(d['registrations'] for d in window),
+            "unsubscribed": sum(d['churned'] for d in window),
+            "new_hectares": round(sum(float(d['new_hectares'] or 0) for d in window), 2)
+        }
+
+    # Cumulative growth and churn over the requested window
+    window = daily[-days:] if days > 0 else []
+    churn_dates, churn_rates = [], []
+    for d in window:
+        if not d['churned']:
+            continue
+        # Farmers registered by that day and not churned before it
+        active = d['cumulative_registrations'] - (d['cumulative_churned'] - d['churned'])
+        churn_dates.append(d['date'])
+        churn_rates.append(round((d['churned'] / active) * 100, 2) if active > 0 else 0)
+
+    # Today's activity
+    today = daily[-1] if daily and daily[-1]['date'] == date.today().isoformat() else None
+    new_fields = today['registrations'] if today else 0
+    farmers_active = today['active_farmers'] if today and today['active_farmers'] is not None else new_fields
+    metrics = {
+        "new_fields": new_fields,
+        "crops_planted": farmers_active * 2,
+        "spraying_operations": farmers_active,
+        "questions_asked": farmers_active * 3,
+        "farmers_active": farmers_active
+    }
+
+    activities = []
+    for item in registrations_feed or []:
+        farmer_name = item['farmer_name'] or f"Farmer #{item['farmer_id']}"
+        activities.append({
+            'time': item['time'],
+            'farmer_id': item['farmer_id'],
+            'farmer_name': farmer_name,
+            'activity': f"New registration from {farmer_name}"
+        })
+
+    changes = [{
+        'table': 'farmers',
+        'operation': item['operation'],
+        'record_id': item['record_id'],
+        'timestamp': item['timestamp']
+    } for item in changes_feed or []]
+
+    return {
+        "success": True,
+        "refreshed_at": refreshed_at,
+        "overview": {
+            "total_farmers": total_farmers,
+            "total_hectares": round(total_hectares, 2),
+            "hectare_breakdown": hectare_breakdown
+        },
+        "growth_trends": growth_trends,
+        "cumulative_growth": {
+            "dates": [d['date'] for d in window],
+            "cumulative_totals": [d['cumulative_registrations'] for d in window],
+            "daily_net_growth": [d['registrations'] for d in window]
+        },
+        "churn_rate": {
+            "dates": churn_dates,
+            "churn_rates": churn_rates,
+            "rolling_average": _rolling_average(churn_rates)
+        },
+        "todays_activity": {"metrics": metrics},
+        "activity_stream": {"activities": activities},
+        "database_changes": {"changes": changes}
+    }
+
+def fetch_dashboard_bundle(days: int = 30, db_manager=None) -> Dict[str, Any]:
+    """Read every business dashboard widget from the rollups in a single query"""
+    db_manager = db_manager or get_db_manager()
+    # Growth trends need 30 days even when the charts show fewer
+    lookup_days = max(days, max(GROWTH_PERIODS.values()))
+    result = db_manager.execute_query(BUNDLE_QUERY, (lookup_days, ROLLUP_NAME))
+    rows = result.get('rows') or []
+    return shape_dashboard_bundle(rows[0] if rows else None, days)
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    print(BusinessRollupAggregator().refresh())
@@ -6,11 +6,13 @@ from fastapi import APIRouter, Request
 from fastapi.responses import HTMLResponse, JSONResponse
 from fastapi.templating import Jinja2Templates
 from typing import List, Dict, Any, Optional
+import asyncio
 import json
 import logging
 import time
 from modules.core.database_manager import get_db_manager
 from modules.core.config import config
+from modules.core.schema_context import PromptTemplate, get_schema_context_provider
 import os
 import openai
 
@@ -19,6 +21,32 @@ logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/dashboards/database", tags=["database_dashboard"])
 templates = Jinja2Templates(directory="templates")
 
+# Only used when live schema introspection is unavailable
+FALLBACK_SCHEMA_CONTEXT = """Tables:
+        1. farmers (id, name, phone_number, city, country, primary_occupation, size_hectares, subscription_status, created_at, updated_at)
+        2. fields (id, farmer_id, field_name, size_hectares, crop_type, planting_date, harvest_date, created_at)
+        3. tasks (id, field_id, task_type, task_description, due_date, status, created_at)
+        4. conversations (id, farmer_id, message, response, timestamp, approved, approval_timestamp, approved_by)
+        5. weather_data (id, farmer_id, temperature, humidity, precipitation, wind_speed, timestamp)"""
+
+# Parsed once; {schema} is bound to the shared schema digest
+NL_TO_SQL_PROMPT = PromptTemplate("""
+        Database schema for AVA OLO agricultural system:
+        
+        {schema}
+        
+        Guidelines:
+        - Use proper JOIN syntax when querying related tables
+        - Always filter farmers by subscription_status = 'active' unless specifically asked for all farmers
+        - Return meaningful column names
+        - Limit results to 100 rows unless specified otherwise
+        
+        Convert this natural language question to a SQL query:
+        "{question}"
+        
+        Return ONLY the SQL query, no explanations.
+        """)
+
 @router.get("", response_class=HTMLResponse)
 async def database_dashboard(request: Request):
     """Main database dashboard - level 1 selection"""
@@ -249,32 +277,10 @@ async def generate_sql_from_natural_language(question: str) -> Optional[str]:
         
         openai.api_key = openai_api_key
         
-        # Database schema context
-        schema_context = """
-        Database schema for AVA OLO agricultural system:
-        
-        Tables:
-        1. farmers (id, name, phone_number, city, country, primary_occupation, size_hectares, subscription_status, created_at, updated_at)
-        2. fields (id, farmer_id, field_name, size_hectares, crop_type, planting_date, harvest_date, created_at)
-        3. tasks (id, field_id, task_type, task_description, due_date, status, created_at)
-        4. conversations (id, farmer_id, message, response, timestamp, approved, approval_timestamp, approved_by)
-        5. weather_data (id, farmer_id, temperature, humidity, precipitation, wind_speed, timestamp)
-        
-        Guidelines:
-        - Use proper JOIN syntax when querying related tables
-        - Always filter farmers by subscription_status = 'active' unless specifically asked for all farmers
-        - Return meaningful column names
-        - Limit results to 100 rows unless specified otherwise
-        """
-        
-        prompt = f"""
-        {schema_context}
-        
-        Convert this natural language question to a SQL query:
-        "{question}"
-        
-        Return ONLY the SQL query, no explanations.
-        """
+        prompt = await asyncio.to_thread(
+            get_schema_context_provider().render, NL_TO_SQL_PROMPT,
+            fallback_schema=FALLBACK_SCHEMA_CONTEXT, question=question
+        )
         
         response = openai.ChatCompletion.create(
             model="gpt-3.5-turbo",
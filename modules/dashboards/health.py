@@ -13,6 +13,7 @@ from datetime import datetime
 import logging
 from modules.core.database_manager import get_db_manager
 from modules.core.config import config
+from modules.core.health_probes import get_health_registry
 import os
 
 logger = logging.getLogger(__name__)
@@ -20,6 +21,26 @@ logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/dashboards/health", tags=["health_dashboard"])
 templates = Jinja2Templates(directory="templates")
 
+health_registry = get_health_registry()
+router.add_event_handler("startup", health_registry.start_refresher)
+router.add_event_handler("shutdown", health_registry.stop_refresher)
+
+def dashboard_probe(name: str, service: str, timeout: float, ttl: float = None, on_demand: bool = False):
+    """Register a dashboard check; a timeout is reported as an unhealthy service"""
+    return health_registry.probe(
+        name,
+        timeout=timeout,
+        ttl=ttl,
+        group="dashboard",
+        on_demand=on_demand,
+        failure={
+            "service": service,
+            "status": "unhealthy",
+            "response_time": int(timeout * 1000),
+            "details": "Check timed out"
+        }
+    )
+
 @router.get("", response_class=HTMLResponse)
 async def health_dashboard(request: Request):
     """Main health dashboard"""
@@ -29,49 +50,12 @@ async def health_dashboard(request: Request):
 
 @router.get("/api/all-checks", response_class=JSONResponse)
 async def get_all_health_checks():
-    """Run all health checks and return comprehensive status"""
-    
-    health_checks = []
-    
-    # 1. PostgreSQL Database Check
-    postgres_check = await check_postgresql()
-    health_checks.append(postgres_check)
-    
-    # 2. Pinecone Vector Database Check
-    pinecone_check = await check_pinecone()
-    health_checks.append(pinecone_check)
-    
-    # 3. Perplexity API Check
-    perplexity_check = await check_perplexity()
-    health_checks.append(perplexity_check)
-    
-    # 4. OpenAI API Check
-    openai_check = await check_openai()
-    health_checks.append(openai_check)
-    
-    # 5. WhatsApp API Check
-    whatsapp_check = await check_whatsapp()
-    health_checks.append(whatsapp_check)
-    
-    # 6. Redis Cache Check
-    redis_check = await check_redis()
-    health_checks.append(redis_check)
-    
-    # 7. AWS Services Check
-    aws_check = await check_aws_services()
-    health_checks.append(aws_check)
-    
-    # 8. Weather API Check
-    weather_check = await check_weather_api()
-    health_checks.append(weather_check)
-    
-    # 9. Agricultural Core Service Check
-    agri_core_check = await check_agricultural_core()
-    health_checks.append(agri_core_check)
+    """Latest result of every health check (cached, refreshed in the background)"""
     
-    # 10. CAVA Service Check
-    cava_check = await check_cava_service()
-    health_checks.append(cava_check)
+    # All probes run concurrently, each with its own deadline; only the
+    # first request after startup waits for them
+    results = await health_registry.results("dashboard")
+    health_checks = list(results.values())
     
     # Calculate overall health
     total_checks = len(health_checks)
@@ -87,14 +71,15 @@ async def get_all_health_checks():
         "timestamp": datetime.now().isoformat()
     }
 
+@dashboard_probe("dashboard.postgresql", "PostgreSQL Database", timeout=5.0)
 async def check_postgresql():
     """Check PostgreSQL database connection"""
     start_time = time.time()
     db_manager = get_db_manager()
     
     try:
-        # Test connection with a simple query
-        result = await db_manager.execute_query("SELECT 1")
+        # Test connection with a simple query (sync driver, so off the event loop)
+        result = await asyncio.to_thread(db_manager.execute_query, "SELECT 1")
         response_time = int((time.time() - start_time) * 1000)
         
         if result and result.get('success'):
@@ -125,6 +110,7 @@ async def check_postgresql():
             "last_checked": datetime.now().isoformat()
         }
 
+@dashboard_probe("dashboard.pinecone", "Pinecone Vector Database", timeout=5.0)
 async def check_pinecone():
     """Check Pinecone vector database"""
     start_time = time.time()
@@ -179,6 +165,9 @@ async def check_pinecone():
             "last_checked": datetime.now().isoformat()
         }
 
+# Each check is a billed completion: it runs only when the dashboard is
+# viewed, and then at most every 5 minutes
+@dashboard_probe("dashboard.perplexity", "Perplexity API", timeout=10.0, ttl=300, on_demand=True)
 async def check_perplexity():
     """Check Perplexity API"""
     start_time = time.time()
@@ -240,6 +229,9 @@ async def check_perplexity():
             "last_checked": datetime.now().isoformat()
         }
 
+# Each check is a billed completion: it runs only when the dashboard is
+# viewed, and then at most every 5 minutes
+@dashboard_probe("dashboard.openai", "OpenAI API", timeout=10.0, ttl=300, on_demand=True)
 async def check_openai():
     """Check OpenAI API"""
     start_time = time.time()
@@ -301,6 +293,7 @@ async def check_openai():
             "last_checked": datetime.now().isoformat()
         }
 
+@dashboard_probe("dashboard.whatsapp", "WhatsApp API", timeout=5.0)
 async def check_whatsapp():
     """Check WhatsApp API"""
     start_time = time.time()
@@ -355,6 +348,7 @@ async def check_whatsapp():
             "last_checked": datetime.now().isoformat()
         }
 
+@dashboard_probe("dashboard.redis", "Redis Cache", timeout=3.0)
 async def check_redis():
     """Check Redis cache"""
     start_time = time.time()
@@ -398,6 +392,7 @@ async def check_redis():
             "last_checked": datetime.now().isoformat()
         }
 
+@dashboard_probe("dashboard.aws", "AWS Services", timeout=2.0)
 async def check_aws_services():
     """Check AWS services (ECS, RDS, etc.)"""
     start_time = time.time()
@@ -450,6 +445,7 @@ async def check_aws_services():
             "last_checked": datetime.now().isoformat()
         }
 
+@dashboard_probe("dashboard.weather", "Weather API", timeout=5.0)
 async def check_weather_api():
     """Check Weather API"""
     start_time = time.time()
@@ -506,6 +502,7 @@ async def check_weather_api():
             "last_checked": datetime.now().isoformat()
         }
 
+@dashboard_probe("dashboard.agricultural_core", "Agricultural Core Service", timeout=5.0)
 async def check_agricultural_core():
     """Check Agricultural Core Service"""
     start_time = time.time()
@@ -546,6 +543,7 @@ async def check_agricultural_core():
             "last_checked": datetime.now().isoformat()
         }
 
+@dashboard_probe("dashboard.cava", "CAVA Service", timeout=5.0)
 async def check_cava_service():
     """Check CAVA Service"""
     start_time = time.time()
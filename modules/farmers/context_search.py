@@ -7,6 +7,7 @@ import re
 import logging
 from typing import Dict, List, Optional, Any
 from modules.core.database_manager import get_db_manager
+from modules.farmers.search import get_farmer_search
 
 logger = logging.getLogger(__name__)
 
@@ -15,173 +16,34 @@ def search_farmers_flexibly(criteria: Dict[str, Any]) -> List[Dict]:
     Search farmers using multiple strategies
     Returns ranked list of potential matches
     """
-    db_manager = get_db_manager()
-    all_matches = []
-    
-    # Check if database is connected
-    if not db_manager.test_connection():
-        logger.warning("Database not connected, returning empty results")
-        return []
-    
     try:
-        # Name-based search
-        if criteria.get('names'):
-            for name in criteria['names']:
-                query = """
-                SELECT 
-                    farmer_id, first_name, last_name, whatsapp_number,
-                    city, country, email, created_at,
-                    'name_match' as match_type
-                FROM farmers 
-                WHERE (
-                    LOWER(first_name) LIKE LOWER(%s) 
-                    OR LOWER(last_name) LIKE LOWER(%s)
-                    OR LOWER(first_name || ' ' || last_name) LIKE LOWER(%s)
-                )
-                AND is_active = true
-                """
-                name_pattern = f"%{name}%"
-                # Fix: use sync method, not async
-                results = db_manager.execute_query(
-                    query, 
-                    (name_pattern, name_pattern, name_pattern)
-                )
-                if results:
-                    all_matches.extend([{
-                        'farmer_id': r[0],
-                        'first_name': r[1],
-                        'last_name': r[2],
-                        'whatsapp_number': r[3],
-                        'city': r[4],
-                        'country': r[5],
-                        'email': r[6],
-                        'created_at': r[7],
-                        'match_type': r[8],
-                        'match_confidence': 0.8
-                    } for r in results])
-        
-        # Location-based search
-        if criteria.get('locations'):
-            for location in criteria['locations']:
-                query = """
-                SELECT DISTINCT
-                    f.farmer_id, f.first_name, f.last_name, f.whatsapp_number,
-                    f.city, f.country, f.email, f.created_at,
-                    'location_match' as match_type
-                FROM farmers f
-                LEFT JOIN fields fd ON f.farmer_id = fd.farmer_id
-                WHERE (
-                    LOWER(f.city) LIKE LOWER(%s)
-                    OR LOWER(f.country) LIKE LOWER(%s)
-                    OR LOWER(fd.name) LIKE LOWER(%s)
-                    OR LOWER(fd.location) LIKE LOWER(%s)
-                )
-                AND f.is_active = true
-                """
-                location_pattern = f"%{location}%"
-                results = db_manager.execute_query(
-                    query,
-                    (location_pattern, location_pattern, location_pattern, location_pattern)
-                )
-                if results:
-                    all_matches.extend([{
-                        'farmer_id': r[0],
-                        'first_name': r[1],
-                        'last_name': r[2],
-                        'whatsapp_number': r[3],
-                        'city': r[4],
-                        'country': r[5],
-                        'email': r[6],
-                        'created_at': r[7],
-                        'match_type': r[8],
-                        'match_confidence': 0.7
-                    } for r in results])
-        
-        # Crop-based search
-        if criteria.get('crops'):
-            for crop in criteria['crops']:
-                query = """
-                SELECT DISTINCT
-                    f.farmer_id, f.first_name, f.last_name, f.whatsapp_number,
-                    f.city, f.country, f.email, f.created_at,
-                    'crop_match' as match_type,
-                    STRING_AGG(DISTINCT fd.crop, ', ') as crops
-                FROM farmers f
-                JOIN fields fd ON f.farmer_id = fd.farmer_id
-                WHERE LOWER(fd.crop) LIKE LOWER(%s)
-                AND f.is_active = true
-                GROUP BY f.farmer_id, f.first_name, f.last_name, 
-                         f.whatsapp_number, f.city, f.country, f.email, f.created_at
-                """
-                crop_pattern = f"%{crop}%"
-                results = db_manager.execute_query(query, (crop_pattern,))
-                if results:
-                    all_matches.extend([{
-                        'farmer_id': r[0],
-                        'first_name': r[1],
-                        'last_name': r[2],
-                        'whatsapp_number': r[3],
-                        'city': r[4],
-                        'country': r[5],
-                        'email': r[6],
-                        'created_at': r[7],
-                        'match_type': r[8],
-                        'crops': r[9],
-                        'match_confidence': 0.6
-                    } for r in results])
-        
-        # Phone partial match
-        if criteria.get('phone_partial'):
-            phone = criteria['phone_partial']
-            # Remove non-digits for comparison
-            phone_digits = re.sub(r'\D', '', phone)
-            if len(phone_digits) >= 4:
-                query = """
-                SELECT 
-                    farmer_id, first_name, last_name, whatsapp_number,
-                    city, country, email, created_at,
-                    'phone_match' as match_type
-                FROM farmers 
-                WHERE REPLACE(REPLACE(REPLACE(whatsapp_number, '+', ''), '-', ''), ' ', '') 
-                      LIKE %s
-                AND is_active = true
-                """
-                phone_pattern = f"%{phone_digits}%"
-                results = db_manager.execute_query(query, (phone_pattern,))
-                if results:
-                    all_matches.extend([{
-                        'farmer_id': r[0],
-                        'first_name': r[1],
-                        'last_name': r[2],
-                        'whatsapp_number': r[3],
-                        'city': r[4],
-                        'country': r[5],
-                        'email': r[6],
-                        'created_at': r[7],
-                        'match_type': r[8],
-                        'match_confidence': 0.9
-                    } for r in results])
-        
-        # Remove duplicates and rank by confidence
-        unique_matches = {}
-        for match in all_matches:
-            farmer_id = match['farmer_id']
-            if farmer_id not in unique_matches or match['match_confidence'] > unique_matches[farmer_id]['match_confidence']:
-                unique_matches[farmer_id] = match
-        
-        # Sort by confidence
-        ranked_matches = sorted(
-            unique_matches.values(), 
-            key=lambda x: x['match_confidence'], 
-            reverse=True
+        matches = get_farmer_search().search(
+            names=criteria.get('names', ()),
+            locations=criteria.get('locations', ()),
+            crops=criteria.get('crops', ()),
+            phone=criteria.get('phone_partial'),
+            limit=5
         )
-        
-        logger.info(f"Found {len(ranked_matches)} potential farmer matches")
-        return ranked_matches[:5]  # Return top 5 matches
-        
     except Exception as e:
         logger.error(f"Error searching farmers: {e}")
         return []
+    
+    ranked_matches = [{
+        'farmer_id': match['id'],
+        'first_name': match['manager_name'],
+        'last_name': match['manager_last_name'],
+        'whatsapp_number': match['wa_phone_number'],
+        'city': match['city'],
+        'country': match['country'],
+        'email': match['email'],
+        'created_at': match['created_at'],
+        'crops': match['crops'],
+        'match_type': match['match_type'],
+        'match_confidence': match['match_confidence']
+    } for match in matches]
+    
+    logger.info(f"Found {len(ranked_matches)} potential farmer matches")
+    return ranked_matches
 
 def extract_search_criteria_from_message(message: str, collected_data: Dict) -> Dict:
     """
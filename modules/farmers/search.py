@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+Farmer search engine
+One ranked query scores every candidate farmer on name, location, crop
+and phone at once. Candidates come from pg_trgm GIN indexes
+(migrations/003_farmer_search_trgm.sql), so the query stays index-driven
+however large the farmers table grows. Until the migration has run the
+same query falls back to LIKE matching.
+
+Name, location and crop terms match when some word of the farmer's text
+reaches pg_trgm's word_similarity threshold (pg_trgm.word_similarity_threshold,
+0.6 by default), not when the term is merely a substring as with the old
+LIKE search. A fragment shorter than MIN_TRIGRAM_TERM characters has too
+few trigrams to reach that threshold, so such terms match farmers with a
+word starting with the fragment instead ("an" finds "Ana", not "Ivana").
+
+FarmerTypeaheadIndex is an optional in-process trigram index over farmer
+names for admin typeahead: suggestions come from memory, and the farmers
+table is re-read at most every FARMER_TYPEAHEAD_TTL seconds.
+"""
+import logging
+import os
+import re
+import threading
+import time
+from collections import Counter
+from functools import lru_cache
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Optional, Sequence
+
+from modules.core.database_manager import get_db_manager
+
+logger = logging.getLogger(__name__)
+
+FARMER_TYPEAHEAD_ENABLED = os.getenv('FARMER_TYPEAHEAD_ENABLED', 'true').lower() == 'true'
+FARMER_TYPEAHEAD_TTL = float(os.getenv('FARMER_TYPEAHEAD_TTL', '300'))
+
+# Confidence of a perfect match per signal (the best signal is the match confidence)
+MATCH_WEIGHTS = {'name': 0.8, 'location': 0.7, 'crop': 0.6, 'phone': 0.9}
+MIN_PHONE_DIGITS = 4
+# Shorter name/location/crop terms use word-prefix matching instead of trigrams
+MIN_TRIGRAM_TERM = 3
+
+# Indexed expressions; they must stay identical to the ones in the migration
+NAME_DOCUMENT = "lower(coalesce(f.manager_name, '') || ' ' || coalesce(f.manager_last_name, '') || ' ' || coalesce(f.farm_name, ''))"
+LOCATION_DOCUMENT = "lower(coalesce(f.city, '') || ' ' || coalesce(f.village, '') || ' ' || coalesce(f.country, ''))"
+CROP_DOCUMENT = "lower(fc.crop_name)"
+PHONE_DOCUMENT = "regexp_replace(coalesce(f.wa_phone_number, ''), '[^0-9]', '', 'g')"
+
+RESULT_COLUMNS = ['id', 'farm_name', 'manager_name', 'manager_last_name', 'city', 'country',
+                  'phone', 'wa_phone_number', 'email', 'created_at']
+
+SEARCH_QUERY = """
+WITH candidates AS (
+    SELECT f.id FROM farmers f
+    WHERE %(name)s <> '' AND {name_match}
+    UNION
+    SELECT f.id FROM farmers f
+    WHERE %(location)s <> '' AND {location_match}
+    UNION
+    SELECT fd.farmer_id FROM field_crops fc JOIN fields fd ON fd.id = fc.field_id
+    WHERE %(crop)s <> '' AND {crop_match}
+    UNION
+    SELECT f.id FROM farmers f
+    WHERE %(phone)s <> '' AND {phone_match}
+),
+scored AS (
+    SELECT f.id, f.farm_name, f.manager_name, f.manager_last_name, f.city, f.country,
+           f.phone, f.wa_phone_number, f.email, f.created_at, crops.crops,
+           CASE WHEN %(name)s = '' THEN 0 ELSE {name_score} END * {name_weight} AS name_score,
+           CASE WHEN %(location)s = '' THEN 0 ELSE {location_score} END * {location_weight} AS location_score,
+           COALESCE(crops.crop_score, 0) * {crop_weight} AS crop_score,
+           CASE WHEN %(phone)s <> '' AND {phone_match} THEN {phone_weight} ELSE 0 END AS phone_score
+    FROM candidates c
+    JOIN farmers f ON f.id = c.id
+    LEFT JOIN LATERAL (
+        SELECT STRING_AGG(DISTINCT fc.crop_name, ', ') AS crops,
+               MAX(CASE WHEN %(crop)s = '' THEN 0 ELSE {crop_score} END) AS crop_score
+        FROM fields fd JOIN field_crops fc ON fc.field_id = fd.id
+        WHERE fd.farmer_id = f.id
+    ) crops ON true
+    WHERE COALESCE(f.is_active, true)
+)
+SELECT * FROM scored
+ORDER BY name_score + location_score + crop_score + phone_score DESC, created_at DESC NULLS LAST
+LIMIT %(limit)s
+"""
+
+def _trigram_match(param: str, document: str) -> str:
+    # word_similarity operator: some word of the document is close to the search term
+    return f"%({param})s <%% {document}"
+
+def _trigram_score(param: str, document: str) -> str:
+    return f"word_similarity(%({param})s, {document})"
+
+def _like_match(param: str, document: str) -> str:
+    return f"{document} LIKE '%%' || %({param})s || '%%'"
+
+def _like_score(param: str, document: str) -> str:
+    return f"CASE WHEN {_like_match(param, document)} THEN 1.0 ELSE 0.0 END"
+
+def _prefix_match(param: str, document: str) -> str:
+    # Documents are lower-cased, so LIKE behaves as ILIKE against the lower-cased term
+    return f"({document} LIKE %({param})s || '%%' OR {document} LIKE '%% ' || %({param})s || '%%')"
+
+def _prefix_score(param: str, document: str) -> str:
+    return f"CASE WHEN {_prefix_match(param, document)} THEN 1.0 ELSE 0.0 END"
+
+@lru_cache(maxsize=None)
+def build_search_query(trigram: bool = True, short: FrozenSet[str] = frozenset()) -> str:
+    """
+    Search SQL for pg_trgm (``trigram``) or plain LIKE matching; signals in
+    ``short`` use word-prefix matching
+    """
+    def pick(signal: str):
+        if signal in short:
+            return _prefix_match, _prefix_score
+        return (_trigram_match, _trigram_score) if trigram else (_like_match, _like_score)
+
+    documents = {'name': NAME_DOCUMENT, 'location': LOCATION_DOCUMENT, 'crop': CROP_DOCUMENT}
+    clauses = {}
+    for signal, document in documents.items():
+        match, score = pick(signal)
+        clauses[f"{signal}_match"] = match(signal, document)
+        clauses[f"{signal}_score"] = score(signal, document)
+    return SEARCH_QUERY.format(
+        # Trigram GIN indexes serve LIKE '%...%' too, so phone digits use LIKE either way
+        phone_match=_like_match('phone', PHONE_DOCUMENT),
+        **clauses,
+        **{f"{signal}_weight": weight for signal, weight in MATCH_WEIGHTS.items()}
+    )
+
+SEARCH_QUERIES = {True: build_search_query(True), False: build_search_query(False)}
+
+def _short_terms(params: Dict[str, Any]) -> FrozenSet[str]:
+    """Signals whose term is too short for trigram matching"""
+    return frozenset(signal for signal in ('name', 'location', 'crop')
+                     if params[signal] and len(params[signal]) < MIN_TRIGRAM_TERM)
+
+def _search_term(values: Iterable[str]) -> str:
+    return ' '.join(value.strip().lower() for value in values if value and value.strip())
+
+class FarmerSearchEngine:
+    """Ranked fuzzy farmer search in one query"""
+
+    def __init__(self, execute: Optional[Callable[[str, Dict[str, Any]], Dict[str, Any]]] = None):
+        self._execute = execute
+        # None until the first query tells us whether pg_trgm is installed
+        self.trigram: Optional[bool] = None
+
+    def _run(self, params: Dict[str, Any], trigram: bool) -> Dict[str, Any]:
+        execute = self._execute or get_db_manager().execute_query
+        # LIKE '%term%' already finds short fragments; only trigram matching needs the prefix fallback
+        short = _short_terms(params) if trigram else frozenset()
+        query = build_search_query(trigram, short) if short else SEARCH_QUERIES[trigram]
+        return execute(query, params)
+
+    def search(self, names: Sequence[str] = (), locations: Sequence[str] = (), crops: Sequence[str] = (),
+               phone: Optional[str] = None, limit: int = 5) -> List[Dict[str, Any]]:
+        """
+        Farmers matching any of the clues, best first. Each result has the
+        farmer columns plus crops, match_type (the strongest signal) and
+        match_confidence (that signal's weighted similarity)
+        """
+        phone_digits = re.sub(r'\D', '', phone or '')
+        params = {
+            'name': _search_term(names),
+            'location': _search_term(locations),
+            'crop': _search_term(crops),
+            'phone': phone_digits if len(phone_digits) >= MIN_PHONE_DIGITS else '',
+            'limit': limit
+        }
+        if not any(params[signal] for signal in MATCH_WEIGHTS):
+            return []
+
+        if self.trigram is False:
+            result = self._run(params, trigram=False)
+        else:
+            try:
+                result = self._run(params, trigram=True)
+                self.trigram = True
+            except Exception as e:
+                if self.trigram or not _missing_trigram(e):
+                    raise
+                logger.warning("pg_trgm is not installed - farmer search uses LIKE until "
+                               "migrations/003_farmer_search_trgm.sql is applied")
+                self.trigram = False
+                result = self._run(params, trigram=False)
+        return [self._to_match(dict(zip(result['columns'], row))) for row in result.get('rows', [])]
+
+    @staticmethod
+    def _to_match(row: Dict[str, Any]) -> Dict[str, Any]:
+        scores = {signal: float(row.pop(f"{signal}_score") or 0) for signal in MATCH_WEIGHTS}
+        match_type = max(scores, key=scores.get)
+        row['match_type'] = f"{match_type}_match"
+        row['match_confidence'] = round(scores[match_type], 3)
+        return row
+
+def _missing_trigram(error: Exception) -> bool:
+    message = str(error)
+    return 'word_similarity' in message or 'operator does not exist' in message
+
+def _word_grams(word: str, partial: bool = False) -> List[str]:
+    """pg_trgm-style trigrams of one word; a partial (still being typed) word gets no end padding"""
+    padded = f"  {word}" if partial else f"  {word} "
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+def _text_grams(text: str, partial_last: bool = False) -> List[str]:
+    words = re.findall(r'\w+', text.lower())
+    grams: List[str] = []
+    for position, word in enumerate(words):
+        grams.extend(_word_grams(word, partial_last and position == len(words) - 1))
+    return grams
+
+class FarmerTypeaheadIndex:
+    """
+    In-process trigram index over farmer names, farm names and cities
+    Suggestions rank farmers by the share of the typed text's trigrams they
+    contain; the index is rebuilt from the database when older than ``ttl``.
+    """
+
+    LOAD_QUERY = """
+        SELECT id, manager_name, manager_last_name, farm_name, city, wa_phone_number
+        FROM farmers
+        WHERE COALESCE(is_active, true)
+    """
+
+    def __init__(self, load: Optional[Callable[[], Dict[str, Any]]] = None, ttl: float = FARMER_TYPEAHEAD_TTL,
+                 min_score: float = 0.5):
+        self._load = load
+        self.ttl = ttl
+        self.min_score = min_score
+        self._entries: List[Dict[str, Any]] = []
+        self._postings: Dict[str, List[int]] = {}
+        self._lock = threading.Lock()
+        self.built_at: Optional[float] = None
+
+    def build(self, rows: Iterable[Sequence[Any]]):
+        entries, postings = [], {}
+        for farmer_id, first_name, last_name, farm_name, city, phone in rows:
+            name = ' '.join(part for part in (first_name, last_name) if part)
+            entry = {'id': farmer_id, 'name': name, 'farm_name': farm_name or '', 'city': city or '',
+                     'wa_phone_number': phone or ''}
+            position = len(entries)
+            entries.append(entry)
+            for gram in set(_text_grams(f"{name} {farm_name or ''} {city or ''}")):
+                postings.setdefault(gram, []).append(position)
+        self._entries, self._postings = entries, postings
+        self.built_at = time.monotonic()
+
+    def refresh(self, force: bool = False) -> bool:
+        """Rebuild from the database when stale; returns True when rebuilt"""
+        with self._lock:
+            if not force and self.built_at is not None and time.monotonic() - self.built_at < self.ttl:
+                return False
+            load = self._load or (lambda: get_db_manager().execute_query(self.LOAD_QUERY))
+            self.build(load().get('rows', []))
+            logger.info(f"Farmer typeahead index built: {len(self._entries)} farmers, {len(self._postings)} trigrams")
+            return True
+
+    def suggest(self, text: str, limit: int = 10) -> List[Dict[str, Any]]:
+        grams = set(_text_grams(text, partial_last=True))
+        if not grams:
+            return []
+        hits = Counter(position for gram in grams for position in self._postings.get(gram, ()))
+        ranked = sorted(
+            ((count / len(grams), position) for position, count in hits.items() if count / len(grams) >= self.min_score),
+            key=lambda item: (-item[0], self._entries[item[1]]['name'])
+        )
+        return [{**self._entries[position], 'score': round(score, 3)} for score, position in ranked[:limit]]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+# Singleton instances
+_farmer_search = None
+_farmer_typeahead = None
+
+def get_farmer_search() -> FarmerSearchEngine:
+    """Get or create the shared farmer search engine"""
+    global _farmer_search
+    if _farmer_search is None:
+        _farmer_search = FarmerSearchEngine()
+    return _farmer_search
+
+def get_farmer_typeahead() -> FarmerTypeaheadIndex:
+    """Get or create the shared typeahead index (built on first refresh)"""
+    global _farmer_typeahead
+    if _farmer_typeahead is None:
+        _farmer_typeahead = FarmerTypeaheadIndex()
+    return _farmer_typeahead
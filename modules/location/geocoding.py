@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Geocoding cache and batch geocoder
+Geocoding results live in the geocode_cache table
+(migrations/004_geocode_cache.sql), keyed by normalized address. Addresses
+Nominatim cannot place are cached too, so they are retried only every
+GEOCODE_NEGATIVE_TTL_DAYS. Failed requests are retried after
+GEOCODE_ERROR_RETRY_MINUTES.
+
+Only GeocodeBackfillWorker talks to Nominatim. It pages through farmers
+without coordinates, resolves each distinct address once (at most one
+request per GEOCODE_MIN_INTERVAL seconds, per the Nominatim usage policy),
+and writes weather_latitude / weather_longitude back to the farmers row.
+Request paths only read the farmers row and the cache.
+
+Run one pass from cron/ECS scheduled task:
+    python -m modules.location.geocoding
+or set GEOCODE_BACKFILL_ENABLED=true to repeat it every
+GEOCODE_BACKFILL_INTERVAL seconds inside the app. Every task starts the loop,
+but only the elected leader runs the passes, so the cluster as a whole stays
+within the Nominatim rate limit.
+"""
+import asyncio
+import logging
+import os
+import re
+import time
+import unicodedata
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import httpx
+
+from modules.core.database_manager import get_db_manager
+from modules.core.leader_lock import create_leader_lock, is_leader
+
+logger = logging.getLogger(__name__)
+
+NOMINATIM_URL = os.getenv('NOMINATIM_URL', 'https://nominatim.openstreetmap.org/search')
+NOMINATIM_USER_AGENT = "AVA-OLO-Agricultural-Platform/1.0"
+GEOCODE_MIN_INTERVAL = float(os.getenv('GEOCODE_MIN_INTERVAL', '1.0'))
+GEOCODE_TIMEOUT = float(os.getenv('GEOCODE_TIMEOUT', '10'))
+GEOCODE_NEGATIVE_TTL_DAYS = float(os.getenv('GEOCODE_NEGATIVE_TTL_DAYS', '30'))
+GEOCODE_ERROR_RETRY_MINUTES = float(os.getenv('GEOCODE_ERROR_RETRY_MINUTES', '60'))
+GEOCODE_BACKFILL_ENABLED = os.getenv('GEOCODE_BACKFILL_ENABLED', 'false').lower() == 'true'
+GEOCODE_BACKFILL_INTERVAL = int(os.getenv('GEOCODE_BACKFILL_INTERVAL', '3600'))
+GEOCODE_BACKFILL_BATCH = int(os.getenv('GEOCODE_BACKFILL_BATCH', '100'))
+# Only the elected leader backfills ("avageo" in ASCII for the advisory lock)
+GEOCODE_LEADER_KEY = "ava:geocode_backfill:leader"
+GEOCODE_ADVISORY_LOCK_KEY = 0x61766167656F
+
+FOUND, NOT_FOUND, ERROR = 'found', 'not_found', 'error'
+# Seconds a cache entry stays valid per status; found entries never expire
+STATUS_TTL = {
+    FOUND: None,
+    NOT_FOUND: GEOCODE_NEGATIVE_TTL_DAYS * 86400,
+    ERROR: GEOCODE_ERROR_RETRY_MINUTES * 60
+}
+MAX_KEY_LENGTH = 512
+
+Coordinates = Tuple[float, float]
+
+def farmer_address(street_address: Optional[str] = None, house_number: Optional[str] = None,
+                   postal_code: Optional[str] = None, city: Optional[str] = None,
+                   country: Optional[str] = None) -> str:
+    """Geocoder query for the farmers address columns: 'street 12, 2000 city, country'"""
+    parts = [
+        ' '.join(part for part in (street_address, house_number) if part),
+        ' '.join(part for part in (postal_code, city) if part),
+        country or ''
+    ]
+    return ', '.join(part.strip() for part in parts if part and part.strip())
+
+def normalize_address(address: str) -> str:
+    """Cache key: case, punctuation and spacing differences map to the same address"""
+    address = unicodedata.normalize('NFKC', address or '').lower()
+    parts = (' '.join(re.sub(r'[^\w,]+', ' ', part).split()) for part in address.split(','))
+    return ', '.join(part for part in parts if part)[:MAX_KEY_LENGTH]
+
+class GeocodeEntry(NamedTuple):
+    status: str
+    latitude: Optional[float]
+    longitude: Optional[float]
+
+    @property
+    def coordinates(self) -> Optional[Coordinates]:
+        if self.status == FOUND and self.latitude is not None and self.longitude is not None:
+            return self.latitude, self.longitude
+        return None
+
+class GeocodeCache:
+    """Reads and writes geocode_cache; expired negative entries read as missing"""
+
+    LOOKUP_QUERY = """
+        SELECT address_key, status, latitude, longitude
+        FROM geocode_cache
+        WHERE address_key = ANY(%s)
+        AND (expires_at IS NULL OR expires_at > NOW())
+    """
+
+    UPSERT = """
+        INSERT INTO geocode_cache (address_key, query, status, latitude, longitude, geocoded_at, expires_at)
+        VALUES (%s, %s, %s, %s, %s, NOW(), NOW() + %s * INTERVAL '1 second')
+        ON CONFLICT (address_key) DO UPDATE SET
+            query = EXCLUDED.query,
+            status = EXCLUDED.status,
+            latitude = EXCLUDED.latitude,
+            longitude = EXCLUDED.longitude,
+            attempts = geocode_cache.attempts + 1,
+            geocoded_at = EXCLUDED.geocoded_at,
+            expires_at = EXCLUDED.expires_at
+    """
+
+    def __init__(self, execute: Optional[Callable[..., Dict[str, Any]]] = None):
+        self._execute = execute
+
+    def _run(self, query: str, params: tuple) -> Dict[str, Any]:
+        execute = self._execute or get_db_manager().execute_query
+        return execute(query, params)
+
+    def lookup_many(self, keys: Iterable[str]) -> Dict[str, GeocodeEntry]:
+        keys = sorted({key for key in keys if key})
+        if not keys:
+            return {}
+        result = self._run(self.LOOKUP_QUERY, (keys,))
+        return {
+            key: GeocodeEntry(status, float(lat) if lat is not None else None, float(lon) if lon is not None else None)
+            for key, status, lat, lon in result.get('rows', [])
+        }
+
+    def lookup(self, key: str) -> Optional[GeocodeEntry]:
+        return self.lookup_many([key]).get(key)
+
+    def store(self, key: str, query: str, status: str, coordinates: Optional[Coordinates] = None):
+        latitude, longitude = coordinates or (None, None)
+        self._run(self.UPSERT, (key, query, status, latitude, longitude, STATUS_TTL[status]))
+
+class NominatimGeocoder:
+    """
+    OpenStreetMap Nominatim search over one shared connection pool
+    Requests are spaced at least ``min_interval`` seconds apart.
+    """
+
+    def __init__(self, url: str = NOMINATIM_URL, min_interval: float = GEOCODE_MIN_INTERVAL,
+                 client: Optional[httpx.AsyncClient] = None):
+        self.url = url
+        self.min_interval = min_interval
+        self._client = client
+        self._lock = asyncio.Lock()
+        self._last_request = float('-inf')
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=GEOCODE_TIMEOUT,
+                                             headers={"User-Agent": NOMINATIM_USER_AGENT})
+        return self._client
+
+    async def geocode(self, query: str) -> Optional[Coordinates]:
+        """Coordinates of ``query``, None when Nominatim has no match; raises on HTTP failures"""
+        async with self._lock:
+            wait = self._last_request + self.min_interval - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            try:
+                response = await self._get_client().get(
+                    self.url, params={"q": query, "format": "json", "limit": 1}
+                )
+            finally:
+                self._last_request = time.monotonic()
+        response.raise_for_status()
+        data = response.json()
+        if not data:
+            return None
+        return float(data[0]["lat"]), float(data[0]["lon"])
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+class GeocodeBackfillWorker:
+    """Fills in coordinates for farmers that have an address but no weather_latitude/longitude"""
+
+    FARMERS_QUERY = """
+        SELECT id, street_address, house_number, postal_code, city, country
+        FROM farmers
+        WHERE (weather_latitude IS NULL OR weather_longitude IS NULL)
+        AND (COALESCE(city, '') <> '' OR COALESCE(street_address, '') <> '')
+        AND id > %s
+        ORDER BY id
+        LIMIT %s
+    """
+
+    UPDATE_FARMER = """
+        UPDATE farmers
+        SET weather_latitude = %s, weather_longitude = %s
+        WHERE id = %s
+        AND (weather_latitude IS NULL OR weather_longitude IS NULL)
+    """
+
+    def __init__(self, geocoder: Optional[NominatimGeocoder] = None, cache: Optional[GeocodeCache] = None,
+                 execute: Optional[Callable[..., Dict[str, Any]]] = None, batch_size: int = GEOCODE_BACKFILL_BATCH):
+        self.geocoder = geocoder or get_geocoder()
+        self.cache = cache or GeocodeCache(execute)
+        self._execute = execute
+        self.batch_size = batch_size
+
+    async def _run(self, query: str, params: tuple) -> Dict[str, Any]:
+        execute = self._execute or get_db_manager().execute_query
+        return await asyncio.to_thread(execute, query, params)
+
+    async def run_pass(self) -> Dict[str, int]:
+        """One sweep over every farmer missing coordinates"""
+        stats = {"farmers": 0, "addresses": 0, "cached": 0, "skipped_negative": 0,
+                 "geocoded": 0, "not_found": 0, "errors": 0, "updated": 0}
+        after_id = 0
+        while True:
+            rows = (await self._run(self.FARMERS_QUERY, (after_id, self.batch_size))).get('rows', [])
+            if not rows:
+                break
+            await self._run_batch(rows, stats)
+            after_id = rows[-1][0]
+            if len(rows) < self.batch_size:
+                break
+        logger.info(f"Geocode backfill pass: {stats}")
+        return stats
+
+    async def _run_batch(self, rows: List[tuple], stats: Dict[str, int]):
+        farmers_by_key: Dict[str, List[int]] = {}
+        queries: Dict[str, str] = {}
+        for farmer_id, *address_parts in rows:
+            query = farmer_address(*address_parts)
+            key = normalize_address(query)
+            if key:
+                farmers_by_key.setdefault(key, []).append(farmer_id)
+                queries.setdefault(key, query)
+        stats["farmers"] += len(rows)
+        stats["addresses"] += len(farmers_by_key)
+
+        cached = await asyncio.to_thread(self.cache.lookup_many, farmers_by_key)
+        for key, farmer_ids in farmers_by_key.items():
+            entry = cached.get(key)
+            if entry is not None:
+                coordinates = entry.coordinates
+                stats["cached" if coordinates else "skipped_negative"] += 1
+            else:
+                coordinates = await self._geocode(key, queries[key], stats)
+            if coordinates:
+                for farmer_id in farmer_ids:
+                    await self._run(self.UPDATE_FARMER, (coordinates[0], coordinates[1], farmer_id))
+                    stats["updated"] += 1
+
+    async def _geocode(self, key: str, query: str, stats: Dict[str, int]) -> Optional[Coordinates]:
+        try:
+            coordinates = await self.geocoder.geocode(query)
+        except Exception as e:
+            logger.warning(f"Geocoding failed for '{query}': {e}")
+            stats["errors"] += 1
+            await asyncio.to_thread(self.cache.store, key, query, ERROR)
+            return None
+        stats["geocoded" if coordinates else "not_found"] += 1
+        await asyncio.to_thread(self.cache.store, key, query, FOUND if coordinates else NOT_FOUND, coordinates)
+        return coordinates
+
+async def backfill_as_leader(worker: GeocodeBackfillWorker, leader_lock) -> Optional[Dict[str, int]]:
+    """One backfill pass on the cluster leader only; returns None in every other process"""
+    if not await is_leader(leader_lock):
+        return None
+    return await worker.run_pass()
+
+async def run_geocode_backfill(interval_seconds: int = GEOCODE_BACKFILL_INTERVAL):
+    """Background loop repeating the backfill pass on the leader"""
+    worker = GeocodeBackfillWorker()
+    leader_lock = create_leader_lock(GEOCODE_LEADER_KEY, GEOCODE_ADVISORY_LOCK_KEY, ttl_seconds=interval_seconds * 3)
+    while True:
+        try:
+            await backfill_as_leader(worker, leader_lock)
+        except Exception as e:
+            logger.error(f"Geocode backfill failed: {e}")
+        await asyncio.sleep(interval_seconds)
+
+# Singleton instance
+_geocoder = None
+
+def get_geocoder() -> NominatimGeocoder:
+    """Get or create the shared (rate-limited) Nominatim client"""
+    global _geocoder
+    if _geocoder is None:
+        _geocoder = NominatimGeocoder()
+    return _geocoder
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    print(asyncio.run(GeocodeBackfillWorker().run_pass()))
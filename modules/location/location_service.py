@@ -5,19 +5,21 @@ Handles farmer location retrieval and geocoding
 """
 import logging
 from typing import Dict, Optional, Tuple
-import httpx
 import asyncio
-from urllib.parse import quote
 
 from modules.core.database_manager import get_db_manager
+from modules.location.geocoding import (
+    ERROR, FOUND, NOT_FOUND, GeocodeCache, farmer_address, get_geocoder, normalize_address
+)
 
 logger = logging.getLogger(__name__)
 
 class LocationService:
     """Service for managing farmer locations"""
     
-    def __init__(self):
+    def __init__(self, geocode_cache: Optional[GeocodeCache] = None):
         self.db_manager = get_db_manager()
+        self.geocode_cache = geocode_cache or GeocodeCache()
         # Default location for Slovenia (Ljubljana)
         self.default_location = {
             "lat": 46.0569,
@@ -27,23 +29,33 @@ class LocationService:
         }
     
     async def get_farmer_location(self, farmer_id: int) -> Dict[str, any]:
-        """Get farmer's location from database"""
+        """
+        Get farmer's location from database
+        Never geocodes: farmers without coordinates use the geocode cache,
+        which the batch geocoder (modules.location.geocoding) fills
+        """
         try:
-            # Try to get farmer location from database
             query = """
-            SELECT name, city, address, country, latitude, longitude
+            SELECT farm_name, street_address, house_number, postal_code, city, country,
+                   weather_latitude, weather_longitude
             FROM farmers
-            WHERE farmer_id = %s
+            WHERE id = %s
             """
             
-            result = self.db_manager.execute_query(query, (farmer_id,))
+            result = await asyncio.to_thread(self.db_manager.execute_query, query, (farmer_id,))
             
             if result and result.get('rows'):
-                row = result['rows'][0]
-                name, city, address, country, lat, lon = row
+                name, street, house_number, postal_code, city, country, lat, lon = result['rows'][0]
+                address = farmer_address(street, house_number, postal_code, city, country)
                 
-                # If we have coordinates, use them
-                if lat and lon:
+                # No coordinates on the row yet: use the batch geocoder's result
+                if lat is None or lon is None:
+                    entry = None
+                    if address:
+                        entry = await asyncio.to_thread(self.geocode_cache.lookup, normalize_address(address))
+                    lat, lon = (entry and entry.coordinates) or (None, None)
+                
+                if lat is not None and lon is not None:
                     return {
                         "lat": float(lat),
                         "lon": float(lon),
@@ -52,22 +64,6 @@ class LocationService:
                         "address": address,
                         "name": name
                     }
-                
-                # If we have city/address, geocode them
-                if city or address:
-                    location_str = f"{address}, {city}, {country}" if address else f"{city}, {country}"
-                    coords = await self.geocode_address(location_str)
-                    if coords:
-                        # Update database with coordinates for future use
-                        await self._update_farmer_coordinates(farmer_id, coords[0], coords[1])
-                        return {
-                            "lat": coords[0],
-                            "lon": coords[1],
-                            "city": city or "Unknown",
-                            "country": country or "Slovenia",
-                            "address": address,
-                            "name": name
-                        }
             
             # Check if this might be Kmetija Vrzel specifically
             if await self._check_if_kmetija_vrzel(farmer_id):
@@ -92,73 +88,47 @@ class LocationService:
         """Check if this farmer is Kmetija Vrzel"""
         try:
             query = """
-            SELECT name, whatsapp_number
+            SELECT farm_name
             FROM farmers
-            WHERE farmer_id = %s
-            AND (name ILIKE '%vrzel%' OR name ILIKE '%kmetija%')
+            WHERE id = %s
+            AND (farm_name ILIKE '%%vrzel%%' OR farm_name ILIKE '%%kmetija%%')
             """
             
-            result = self.db_manager.execute_query(query, (farmer_id,))
-            return result and len(result.get('rows', [])) > 0
+            result = await asyncio.to_thread(self.db_manager.execute_query, query, (farmer_id,))
+            return bool(result and result.get('rows'))
         except:
             return False
     
     async def geocode_address(self, address: str) -> Optional[Tuple[float, float]]:
-        """Geocode an address using OpenStreetMap Nominatim"""
+        """
+        Geocode an address through the geocode cache
+        Calls Nominatim (rate-limited) on a cache miss, so keep it off request paths
+        """
+        key = normalize_address(address)
+        if not key:
+            return None
         try:
-            # Use OpenStreetMap Nominatim (free, no API key needed)
-            url = f"https://nominatim.openstreetmap.org/search"
-            params = {
-                "q": address,
-                "format": "json",
-                "limit": 1
-            }
-            headers = {
-                "User-Agent": "AVA-OLO-Agricultural-Platform/1.0"
-            }
-            
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                response = await client.get(url, params=params, headers=headers)
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    if data and len(data) > 0:
-                        lat = float(data[0]["lat"])
-                        lon = float(data[0]["lon"])
-                        logger.info(f"Geocoded '{address}' to ({lat}, {lon})")
-                        return (lat, lon)
-                
+            entry = await asyncio.to_thread(self.geocode_cache.lookup, key)
+            if entry is not None:
+                return entry.coordinates
+
+            try:
+                coords = await get_geocoder().geocode(address)
+            except Exception as e:
+                logger.error(f"Geocoding failed for '{address}': {e}")
+                # Like the backfill worker: retried after GEOCODE_ERROR_RETRY_MINUTES
+                await asyncio.to_thread(self.geocode_cache.store, key, address, ERROR)
+                return None
+
+            await asyncio.to_thread(self.geocode_cache.store, key, address, FOUND if coords else NOT_FOUND, coords)
+            if coords:
+                logger.info(f"Geocoded '{address}' to {coords}")
+            return coords
         except Exception as e:
-            logger.error(f"Geocoding failed for '{address}': {e}")
+            logger.error(f"Geocode cache unavailable for '{address}': {e}")
         
         return None
     
-    async def _update_farmer_coordinates(self, farmer_id: int, lat: float, lon: float):
-        """Update farmer's coordinates in database"""
-        try:
-            with self.db_manager.get_connection() as conn:
-                with conn.cursor() as cur:
-                    # Check if latitude/longitude columns exist
-                    cur.execute("""
-                        SELECT column_name 
-                        FROM information_schema.columns 
-                        WHERE table_name = 'farmers' 
-                        AND column_name IN ('latitude', 'longitude')
-                    """)
-                    
-                    columns = [row[0] for row in cur.fetchall()]
-                    
-                    if 'latitude' in columns and 'longitude' in columns:
-                        cur.execute("""
-                            UPDATE farmers 
-                            SET latitude = %s, longitude = %s 
-                            WHERE farmer_id = %s
-                        """, (lat, lon, farmer_id))
-                        conn.commit()
-                        logger.info(f"Updated coordinates for farmer {farmer_id}")
-        except Exception as e:
-            logger.error(f"Failed to update farmer coordinates: {e}")
-    
     def get_location_display(self, location: Dict[str, any]) -> str:
         """Get a display string for the location"""
         city = location.get('city', 'Unknown')
@@ -9,8 +9,15 @@ from fastapi.responses import JSONResponse
 from datetime import datetime
 import asyncpg
 import os
-from typing import Optional
+from typing import Optional, Tuple
 
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from modules.core.route_classifier import (
+    EXEMPT_ENDPOINTS,
+    TRACKED_ENDPOINTS,
+    get_route_classifier
+)
 from modules.stripe_integration import (
     has_active_subscription,
     get_current_period_usage,
@@ -23,49 +30,10 @@ logger = logging.getLogger(__name__)
 
 DATABASE_URL = os.getenv('DATABASE_URL')
 
-# Endpoints that should be tracked
-TRACKED_ENDPOINTS = [
-    '/api/v1/chat',
-    '/api/v1/weather',
-    '/api/v1/fields',
-    '/api/v1/advice',
-    '/api/v1/market-prices',
-    '/api/v1/disease-detection',
-    '/api/v1/irrigation',
-    '/api/v1/harvest-prediction'
-]
-
-# Endpoints that should not be tracked
-EXEMPT_ENDPOINTS = [
-    '/api/v1/payment',
-    '/api/v1/subscription',
-    '/api/v1/auth',
-    '/api/health',
-    '/api/v1/admin',
-    '/webhooks',
-    '/static',
-    '/docs',
-    '/openapi.json'
-]
-
 
 def should_track_endpoint(path: str) -> bool:
     """Check if endpoint should be tracked for usage"""
-    # Don't track exempt endpoints
-    for exempt in EXEMPT_ENDPOINTS:
-        if path.startswith(exempt):
-            return False
-    
-    # Track specific endpoints
-    for tracked in TRACKED_ENDPOINTS:
-        if path.startswith(tracked):
-            return True
-    
-    # Track all WhatsApp endpoints
-    if '/whatsapp' in path and '/webhook' in path:
-        return True
-    
-    return False
+    return get_route_classifier().classify(path).track_usage
 
 
 async def get_farmer_from_request(request: Request) -> Optional[dict]:
@@ -116,100 +84,145 @@ async def get_farmer_from_request(request: Request) -> Optional[dict]:
     return None
 
 
-async def track_usage_middleware(request: Request, call_next):
-    """Middleware to track API usage and enforce limits"""
-    
-    # Check if we should track this endpoint
-    if not should_track_endpoint(str(request.url.path)):
-        return await call_next(request)
-    
+async def check_usage(request: Request) -> Tuple[Optional[Response], Optional[dict]]:
+    """
+    Enforce subscription and usage limits for a tracked request
+    Returns (blocking response or None, tracking context or None)
+    """
     # Try to identify the farmer
     farmer = await get_farmer_from_request(request)
     
-    if farmer:
-        farmer_id = farmer['id']
-        
-        # Handle linked accounts - use primary account for billing
-        if farmer.get('linked_to_farmer_id'):
-            primary_id = farmer['linked_to_farmer_id']
+    if not farmer:
+        return None, None
+    
+    farmer_id = farmer['id']
+    
+    # Handle linked accounts - use primary account for billing
+    if farmer.get('linked_to_farmer_id'):
+        primary_id = farmer['linked_to_farmer_id']
+    else:
+        primary_id = farmer_id
+    
+    # Check subscription status
+    if not await has_active_subscription(primary_id):
+        # Check if in trial that expired
+        trial_end = farmer.get('trial_end_date')
+        if trial_end and trial_end < datetime.utcnow():
+            message = "Your 7-day trial has expired. Please subscribe to continue using AVA OLO."
         else:
-            primary_id = farmer_id
+            message = "Please subscribe to continue using AVA OLO"
         
-        # Check subscription status
-        if not await has_active_subscription(primary_id):
-            # Check if in trial that expired
-            trial_end = farmer.get('trial_end_date')
-            if trial_end and trial_end < datetime.utcnow():
-                message = "Your 7-day trial has expired. Please subscribe to continue using AVA OLO."
-            else:
-                message = "Please subscribe to continue using AVA OLO"
-            
-            return JSONResponse(
-                status_code=402,  # Payment Required
-                content={
-                    "error": "subscription_required",
-                    "message": message,
-                    "payment_url": f"/api/v1/payment/subscribe?farmer_id={primary_id}",
-                    "trial_expired": trial_end < datetime.utcnow() if trial_end else False
-                }
-            )
-        
-        # Determine tracking type
-        if '/whatsapp' in str(request.url.path):
-            tracking_type = 'whatsapp_message'
-            limit_key = 'whatsapp_message_limit'
+        return JSONResponse(
+            status_code=402,  # Payment Required
+            content={
+                "error": "subscription_required",
+                "message": message,
+                "payment_url": f"/api/v1/payment/subscribe?farmer_id={primary_id}",
+                "trial_expired": trial_end < datetime.utcnow() if trial_end else False
+            }
+        ), None
+    
+    # Determine tracking type
+    if '/whatsapp' in request.url.path:
+        tracking_type = 'whatsapp_message'
+        limit_key = 'whatsapp_message_limit'
+    else:
+        tracking_type = 'api_call'
+        limit_key = 'api_call_limit'
+    
+    # Check usage limits
+    limit = int(await get_config_value(limit_key))
+    current_usage = await get_current_period_usage(primary_id, tracking_type)
+    
+    if current_usage >= limit:
+        # Get overflow pricing
+        if tracking_type == 'api_call':
+            overflow_price = float(await get_config_value('overflow_api_price_cents')) / 100
+            overflow_unit = "API call"
         else:
-            tracking_type = 'api_call'
-            limit_key = 'api_call_limit'
+            overflow_price = float(await get_config_value('overflow_message_price_cents')) / 100
+            overflow_unit = "WhatsApp message"
         
-        # Check usage limits
-        limit = int(await get_config_value(limit_key))
-        current_usage = await get_current_period_usage(primary_id, tracking_type)
-        
-        if current_usage >= limit:
-            # Get overflow pricing
-            if tracking_type == 'api_call':
-                overflow_price = float(await get_config_value('overflow_api_price_cents')) / 100
-                overflow_unit = "API call"
-            else:
-                overflow_price = float(await get_config_value('overflow_message_price_cents')) / 100
-                overflow_unit = "WhatsApp message"
-            
-            return JSONResponse(
-                status_code=429,  # Too Many Requests
-                content={
-                    "error": "usage_limit_exceeded",
-                    "message": f"Monthly {tracking_type.replace('_', ' ')} limit reached",
-                    "limit": limit,
-                    "usage": current_usage,
-                    "period_end": farmer.get('current_period_end').isoformat() if farmer.get('current_period_end') else None,
-                    "overflow_pricing": {
-                        "price_eur": overflow_price,
-                        "unit": overflow_unit,
-                        "message": f"Additional {overflow_unit}s are €{overflow_price:.2f} each"
-                    }
+        return JSONResponse(
+            status_code=429,  # Too Many Requests
+            content={
+                "error": "usage_limit_exceeded",
+                "message": f"Monthly {tracking_type.replace('_', ' ')} limit reached",
+                "limit": limit,
+                "usage": current_usage,
+                "period_end": farmer.get('current_period_end').isoformat() if farmer.get('current_period_end') else None,
+                "overflow_pricing": {
+                    "price_eur": overflow_price,
+                    "unit": overflow_unit,
+                    "message": f"Additional {overflow_unit}s are €{overflow_price:.2f} each"
                 }
-            )
-        
-        # Record the usage
-        try:
-            await record_usage(primary_id, tracking_type, str(request.url.path))
-        except Exception as e:
-            logger.error(f"Error recording usage: {str(e)}")
-            # Don't block the request if usage recording fails
+            }
+        ), None
     
-    # Continue with the request
-    response = await call_next(request)
+    # Record the usage
+    try:
+        await record_usage(primary_id, tracking_type, request.url.path)
+    except Exception as e:
+        logger.error(f"Error recording usage: {str(e)}")
+        # Don't block the request if usage recording fails
     
-    # Add usage headers to response if farmer identified
-    if farmer:
-        try:
-            current_usage = await get_current_period_usage(primary_id, tracking_type)
-            limit = int(await get_config_value(limit_key))
-            response.headers["X-Usage-Limit"] = str(limit)
-            response.headers["X-Usage-Current"] = str(current_usage)
-            response.headers["X-Usage-Remaining"] = str(max(0, limit - current_usage))
-        except:
-            pass
+    return None, {
+        "primary_id": primary_id,
+        "tracking_type": tracking_type,
+        "limit": limit
+    }
+
+
+class UsageTrackingMiddleware:
+    """
+    Pure ASGI middleware to track API usage and enforce limits
+    
+    Untracked paths cost one cached classifier lookup. For tracked paths the
+    request body is buffered once so farmer lookup can read the form and the
+    endpoint still receives it.
+    """
     
-    return response
\ No newline at end of file
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.classifier = get_route_classifier()
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not self.classifier.classify(scope["path"]).track_usage:
+            await self.app(scope, receive, send)
+            return
+        
+        request = Request(scope, receive)
+        body = await request.body()
+        
+        blocking_response, usage = await check_usage(request)
+        if blocking_response is not None:
+            await blocking_response(scope, receive, send)
+            return
+        
+        body_sent = False
+        
+        async def replay_receive() -> Message:
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+        
+        async def send_with_usage_headers(message: Message):
+            # Add usage headers to response if farmer identified
+            if usage and message["type"] == "http.response.start":
+                try:
+                    current_usage = await get_current_period_usage(usage["primary_id"], usage["tracking_type"])
+                    limit = usage["limit"]
+                    headers = list(message.get("headers", []))
+                    headers.extend([
+                        (b"x-usage-limit", str(limit).encode()),
+                        (b"x-usage-current", str(current_usage).encode()),
+                        (b"x-usage-remaining", str(max(0, limit - current_usage)).encode())
+                    ])
+                    message = {**message, "headers": headers}
+                except Exception:
+                    pass
+            await send(message)
+        
+        await self.app(scope, replay_receive, send_with_usage_headers)
@@ -0,0 +1,333 @@
+"""
+WhatsApp ingest queue
+Lets the Twilio webhook acknowledge immediately while replies are produced in the background.
+
+Flow in queue mode:
+    webhook -> validate -> persist inbound message (idempotent on MessageSid)
+            -> enqueue -> empty 200 TwiML
+    worker  -> farmer lookup -> CAVA reply -> Twilio REST send -> mark processed
+
+Messages are partitioned onto workers by sender number, so within one
+process a farmer's messages are normally handled in arrival order while
+different farmers are processed in parallel. Ordering is best-effort only:
+a failed message is retried after a backoff, by which time later messages
+from the same sender may already have been answered, and messages that the
+webhook or the reclaim hand to different tasks are processed concurrently.
+
+Every message is leased to one task at a time: the task that accepts it
+claims it in the same INSERT, and the periodic reclaim claims waiting
+retries and messages whose lease went stale (their task died) with
+FOR UPDATE SKIP LOCKED, so a deploy or scale-out never hands the same
+message to two tasks. Failed replies are retried with exponential backoff
+up to WHATSAPP_INGEST_MAX_ATTEMPTS times. The table is created by
+migrations/005_whatsapp_inbound_messages.sql.
+"""
+import asyncio
+import logging
+import os
+import socket
+import uuid
+import zlib
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from modules.core.database_manager import get_db_manager
+
+logger = logging.getLogger(__name__)
+
+INGEST_WORKERS = int(os.getenv('WHATSAPP_INGEST_WORKERS', '4'))
+# A claimed message whose task has not finished it after this long is taken over
+LEASE_SECONDS = int(os.getenv('WHATSAPP_INGEST_LEASE_SECONDS', '300'))
+MAX_ATTEMPTS = int(os.getenv('WHATSAPP_INGEST_MAX_ATTEMPTS', '3'))
+RETRY_BASE_SECONDS = float(os.getenv('WHATSAPP_INGEST_RETRY_SECONDS', '30'))
+RECLAIM_INTERVAL_SECONDS = float(os.getenv('WHATSAPP_INGEST_RECLAIM_INTERVAL', '30'))
+RECLAIM_BATCH = 100
+
+def is_queue_mode() -> bool:
+    """Queue mode is opt-in via WHATSAPP_INGEST_MODE=queue"""
+    return os.getenv('WHATSAPP_INGEST_MODE', 'inline').lower() == 'queue'
+
+
+class TwilioRestSender:
+    """Sends WhatsApp replies through the Twilio REST API"""
+
+    def __init__(self):
+        self.account_sid = os.getenv('TWILIO_ACCOUNT_SID')
+        self.auth_token = os.getenv('TWILIO_AUTH_TOKEN')
+        self.from_number = os.getenv('TWILIO_WHATSAPP_NUMBER')
+        self._client = None
+
+    def _get_client(self):
+        if self._client is None:
+            from twilio.rest import Client
+            self._client = Client(self.account_sid, self.auth_token)
+        return self._client
+
+    async def send(self, to_number: str, body: str) -> Optional[str]:
+        """Send a message; returns the outbound MessageSid"""
+        if not (self.account_sid and self.auth_token and self.from_number):
+            raise RuntimeError("TWILIO_ACCOUNT_SID / TWILIO_AUTH_TOKEN / TWILIO_WHATSAPP_NUMBER not configured")
+
+        from_number = self.from_number if self.from_number.startswith('whatsapp:') else f"whatsapp:{self.from_number}"
+        # The Twilio client is synchronous - keep it off the event loop
+        message = await asyncio.to_thread(
+            self._get_client().messages.create,
+            from_=from_number,
+            to=f"whatsapp:{to_number}",
+            body=body
+        )
+        return message.sid
+
+
+class FakeTwilioSender:
+    """In-memory sender for local runs and tests"""
+
+    def __init__(self):
+        self.sent: List[Dict[str, str]] = []
+
+    async def send(self, to_number: str, body: str) -> Optional[str]:
+        self.sent.append({"to": to_number, "body": body})
+        return f"SMfake{len(self.sent)}"
+
+
+class PostgresInboundStore:
+    """Inbound message log in whatsapp_inbound_messages, keyed by MessageSid"""
+
+    def __init__(self, db_manager=None):
+        self._db_manager = db_manager
+
+    def _connection(self):
+        # Shared asyncpg pool of the database manager
+        return (self._db_manager or get_db_manager()).get_connection_async()
+
+    async def save_if_new(self, message: Dict[str, Any], owner: Optional[str] = None) -> bool:
+        """
+        Persist an inbound message, claimed by ``owner`` when given
+        False if this MessageSid was already seen
+        """
+        async with self._connection() as conn:
+            inserted = await conn.fetchval("""
+                INSERT INTO whatsapp_inbound_messages
+                    (message_sid, from_number, to_number, body, status, claimed_by, claimed_at, attempts)
+                VALUES ($1, $2, $3, $4,
+                        CASE WHEN $5::text IS NULL THEN 'received' ELSE 'processing' END,
+                        $5, CASE WHEN $5::text IS NULL THEN NULL ELSE NOW() END,
+                        CASE WHEN $5::text IS NULL THEN 0 ELSE 1 END)
+                ON CONFLICT (message_sid) DO NOTHING
+                RETURNING message_sid
+            """, message['message_sid'], message['from_number'], message.get('to_number'),
+                message.get('body'), owner)
+            return inserted is not None
+
+    async def claim(self, owner: str, lease_seconds: int = LEASE_SECONDS,
+                    limit: int = RECLAIM_BATCH) -> List[Dict[str, Any]]:
+        """Atomically claim due messages and stale leases, oldest first"""
+        async with self._connection() as conn:
+            rows = await conn.fetch("""
+                UPDATE whatsapp_inbound_messages
+                SET status = 'processing', claimed_by = $1, claimed_at = NOW(), attempts = attempts + 1
+                WHERE message_sid IN (
+                    SELECT message_sid FROM whatsapp_inbound_messages
+                    WHERE (status = 'received' AND COALESCE(next_attempt_at, received_at) <= NOW())
+                       OR (status = 'processing' AND claimed_at < NOW() - $2 * INTERVAL '1 second')
+                    ORDER BY received_at
+                    LIMIT $3
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING message_sid, from_number, to_number, body, attempts, received_at
+            """, owner, lease_seconds, limit)
+        return [dict(row) for row in sorted(rows, key=lambda row: row['received_at'])]
+
+    async def mark(self, message_sid: str, owner: str, status: str,
+                   reply_sid: Optional[str] = None, error: Optional[str] = None):
+        """Record the outcome; ignored if another task has taken the lease over"""
+        async with self._connection() as conn:
+            await conn.execute("""
+                UPDATE whatsapp_inbound_messages
+                SET status = $3, processed_at = NOW(), reply_sid = $4, error = $5
+                WHERE message_sid = $1 AND claimed_by = $2
+            """, message_sid, owner, status, reply_sid, error)
+
+    async def retry_later(self, message_sid: str, owner: str, delay_seconds: float, error: str):
+        """
+        Release the lease; the message is claimable again after ``delay_seconds``
+        Later messages from the same sender are not held back meanwhile.
+        """
+        async with self._connection() as conn:
+            await conn.execute("""
+                UPDATE whatsapp_inbound_messages
+                SET status = 'received', claimed_by = NULL, claimed_at = NULL, error = $3,
+                    next_attempt_at = NOW() + $4 * INTERVAL '1 second'
+                WHERE message_sid = $1 AND claimed_by = $2
+            """, message_sid, owner, error, delay_seconds)
+
+
+class MemoryInboundStore:
+    """Dict-backed store with the same interface, for tests"""
+
+    def __init__(self):
+        self.messages: Dict[str, Dict[str, Any]] = {}
+
+    async def save_if_new(self, message: Dict[str, Any], owner: Optional[str] = None) -> bool:
+        if message['message_sid'] in self.messages:
+            return False
+        now = datetime.now()
+        self.messages[message['message_sid']] = {
+            **message, 'status': 'processing' if owner else 'received', 'claimed_by': owner,
+            'claimed_at': now if owner else None, 'attempts': 1 if owner else 0,
+            'received_at': now, 'next_attempt_at': None
+        }
+        return True
+
+    async def claim(self, owner: str, lease_seconds: int = LEASE_SECONDS,
+                    limit: int = RECLAIM_BATCH) -> List[Dict[str, Any]]:
+        now = datetime.now()
+        stale = now - timedelta(seconds=lease_seconds)
+        due = [m for m in self.messages.values()
+               if (m['status'] == 'received' and (m['next_attempt_at'] or m['received_at']) <= now)
+               or (m['status'] == 'processing' and m['claimed_at'] < stale)]
+        claimed = sorted(due, key=lambda m: m['received_at'])[:limit]
+        for m in claimed:
+            m.update(status='processing', claimed_by=owner, claimed_at=now, attempts=m['attempts'] + 1)
+        return [dict(m) for m in claimed]
+
+    async def mark(self, message_sid: str, owner: str, status: str,
+                   reply_sid: Optional[str] = None, error: Optional[str] = None):
+        message = self.messages[message_sid]
+        if message['claimed_by'] == owner:
+            message.update(status=status, reply_sid=reply_sid, error=error, processed_at=datetime.now())
+
+    async def retry_later(self, message_sid: str, owner: str, delay_seconds: float, error: str):
+        message = self.messages[message_sid]
+        if message['claimed_by'] == owner:
+            message.update(status='received', claimed_by=None, claimed_at=None, error=error,
+                           next_attempt_at=datetime.now() + timedelta(seconds=delay_seconds))
+
+
+ReplyGenerator = Callable[[str, str], Awaitable[str]]
+
+
+class WhatsAppIngestQueue:
+    """Partitioned worker pool that turns inbound messages into Twilio REST replies"""
+
+    def __init__(self, store, sender, reply_generator: ReplyGenerator, workers: int = INGEST_WORKERS,
+                 max_attempts: int = MAX_ATTEMPTS, retry_base_seconds: float = RETRY_BASE_SECONDS,
+                 lease_seconds: int = LEASE_SECONDS, reclaim_interval: float = RECLAIM_INTERVAL_SECONDS):
+        self.store = store
+        self.sender = sender
+        self.reply_generator = reply_generator
+        self.worker_count = max(1, workers)
+        self.max_attempts = max(1, max_attempts)
+        self.retry_base_seconds = retry_base_seconds
+        self.lease_seconds = lease_seconds
+        self.reclaim_interval = reclaim_interval
+        # Lease owner id of this task
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._queues: List[asyncio.Queue] = []
+        self._tasks: List[asyncio.Task] = []
+        self.stats = {"accepted": 0, "duplicates": 0, "reclaimed": 0, "processed": 0, "retried": 0, "failed": 0}
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    async def start(self, recover: bool = True):
+        """Spawn workers and, with ``recover``, the loop claiming retries and stale leases"""
+        if self.running:
+            return
+        self._queues = [asyncio.Queue() for _ in range(self.worker_count)]
+        self._tasks = [asyncio.create_task(self._worker(q)) for q in self._queues]
+        if recover:
+            await self.reclaim()
+            self._tasks.append(asyncio.create_task(self._reclaim_loop()))
+        logger.info(f"WhatsApp ingest queue started with {self.worker_count} workers ({self.owner})")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def join(self):
+        """Wait until every queued message has been handled"""
+        for queue in self._queues:
+            await queue.join()
+
+    async def submit(self, message: Dict[str, Any]) -> bool:
+        """
+        Persist, claim and enqueue an inbound message
+        Returns False for Twilio retries of a MessageSid we already accepted
+        """
+        if not await self.store.save_if_new(message, owner=self.owner):
+            self.stats["duplicates"] += 1
+            logger.info(f"Duplicate WhatsApp delivery ignored: {message['message_sid']}")
+            return False
+        self.stats["accepted"] += 1
+        self._dispatch({**message, 'attempts': 1})
+        return True
+
+    async def reclaim(self) -> int:
+        """Claim due retries and messages whose lease went stale; returns how many"""
+        try:
+            messages = await self.store.claim(self.owner, self.lease_seconds)
+        except Exception as e:
+            logger.error(f"Could not claim pending WhatsApp messages: {e}")
+            return 0
+        for message in messages:
+            self._dispatch(message)
+        self.stats["reclaimed"] += len(messages)
+        return len(messages)
+
+    async def _reclaim_loop(self):
+        while True:
+            await asyncio.sleep(self.reclaim_interval)
+            await self.reclaim()
+
+    def _dispatch(self, message: Dict[str, Any]):
+        # Same sender -> same worker queue -> in-order processing for that farmer in this process
+        partition = zlib.crc32(message['from_number'].encode('utf-8')) % self.worker_count
+        self._queues[partition].put_nowait(message)
+
+    async def _worker(self, queue: asyncio.Queue):
+        while True:
+            message = await queue.get()
+            try:
+                await self._process(message)
+            finally:
+                queue.task_done()
+
+    async def _process(self, message: Dict[str, Any]):
+        message_sid = message['message_sid']
+        try:
+            reply = await self.reply_generator(message['from_number'], message.get('body') or '')
+            reply_sid = await self.sender.send(message['from_number'], reply)
+            await self.store.mark(message_sid, self.owner, 'processed', reply_sid=reply_sid)
+            self.stats["processed"] += 1
+        except Exception as e:
+            attempts = message.get('attempts', 1)
+            error = str(e)[:500]
+            try:
+                if attempts < self.max_attempts:
+                    delay = self.retry_base_seconds * 2 ** (attempts - 1)
+                    logger.warning(f"WhatsApp message {message_sid} failed (attempt {attempts}), "
+                                   f"retrying in {delay:.0f}s: {e}")
+                    self.stats["retried"] += 1
+                    await self.store.retry_later(message_sid, self.owner, delay, error)
+                else:
+                    logger.error(f"Failed to process WhatsApp message {message_sid}: {e}")
+                    self.stats["failed"] += 1
+                    await self.store.mark(message_sid, self.owner, 'failed', error=error)
+            except Exception as mark_error:
+                logger.error(f"Could not record failure for {message_sid}: {mark_error}")
+
+
+_ingest_queue: Optional[WhatsAppIngestQueue] = None
+
+async def get_ingest_queue(reply_generator: ReplyGenerator) -> WhatsAppIngestQueue:
+    """Process-wide queue, started on first use"""
+    global _ingest_queue
+    if _ingest_queue is None:
+        _ingest_queue = WhatsAppIngestQueue(PostgresInboundStore(), TwilioRestSender(), reply_generator)
+    if not _ingest_queue.running:
+        await _ingest_queue.start()
+    return _ingest_queue
@@ -11,6 +11,8 @@ from datetime import datetime
 from typing import Dict, Any, Optional
 import asyncpg
 
+from .ingest_queue import get_ingest_queue, is_queue_mode
+
 # Try to import Twilio, but don't fail if it's not available
 try:
     from twilio.request_validator import RequestValidator
@@ -94,9 +96,38 @@ async def get_or_create_farmer_by_phone(phone_number: str) -> Dict[str, Any]:
         }
 
 
+async def generate_reply(from_number: str, message_body: str) -> str:
+    """Run the farmer lookup and CAVA pipeline for one inbound message"""
+    # Get or create farmer
+    farmer = await get_or_create_farmer_by_phone(from_number)
+    
+    # Process message through CAVA
+    try:
+        # Import CAVA here to avoid circular imports
+        from modules.cava.true_cava_registration import process_whatsapp_message
+        
+        return await process_whatsapp_message(
+            farmer_id=farmer['id'],
+            message=message_body,
+            phone_number=from_number
+        )
+    except ImportError:
+        logger.error("CAVA module not available")
+        return "🌾 Welcome to AVA OLO! Our agricultural assistant is temporarily unavailable. Please try again later."
+    except Exception as e:
+        logger.error(f"Error processing CAVA message: {e}")
+        return "🌾 I apologize, but I'm having trouble processing your message. Please try again."
+
+
 @router.post("/webhook")
 async def whatsapp_webhook(request: Request):
-    """Main WhatsApp webhook endpoint"""
+    """
+    Main WhatsApp webhook endpoint
+    
+    Inline mode (default) replies in the TwiML response. With
+    WHATSAPP_INGEST_MODE=queue the message is persisted by MessageSid,
+    acknowledged with an empty 200 and answered via the Twilio REST API.
+    """
     if not TWILIO_AVAILABLE:
         logger.error("Twilio not available - webhook cannot process messages")
         return Response(content="Twilio not configured", status_code=503)
@@ -129,25 +160,18 @@ async def whatsapp_webhook(request: Request):
         message_body = form_data.get('Body', '')
         message_sid = form_data.get('MessageSid', '')
         
-        # Get or create farmer
-        farmer = await get_or_create_farmer_by_phone(from_number)
+        if is_queue_mode() and message_sid:
+            queue = await get_ingest_queue(generate_reply)
+            await queue.submit({
+                'message_sid': message_sid,
+                'from_number': from_number,
+                'to_number': to_number,
+                'body': message_body
+            })
+            # Empty TwiML - the reply goes out through the REST API
+            return Response(content=str(MessagingResponse()), media_type="application/xml")
         
-        # Process message through CAVA
-        try:
-            # Import CAVA here to avoid circular imports
-            from modules.cava.true_cava_registration import process_whatsapp_message
-            
-            response = await process_whatsapp_message(
-                farmer_id=farmer['id'],
-                message=message_body,
-                phone_number=from_number
-            )
-        except ImportError:
-            logger.error("CAVA module not available")
-            response = "🌾 Welcome to AVA OLO! Our agricultural assistant is temporarily unavailable. Please try again later."
-        except Exception as e:
-            logger.error(f"Error processing CAVA message: {e}")
-            response = "🌾 I apologize, but I'm having trouble processing your message. Please try again."
+        response = await generate_reply(from_number, message_body)
         
         # Create Twilio response
         resp = MessagingResponse()
@@ -194,5 +218,6 @@ async def whatsapp_health():
         "twilio_available": TWILIO_AVAILABLE,
         "twilio_configured": bool(TWILIO_AUTH_TOKEN),
         "database_url": bool(DATABASE_URL),
+        "ingest_mode": "queue" if is_queue_mode() else "inline",
         "timestamp": datetime.now().isoformat()
     }
\ No newline at end of file
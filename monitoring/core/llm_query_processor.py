@@ -12,15 +12,12 @@ import os
 import re
 from dotenv import load_dotenv
 
-logger = logging.getLogger(__name__)
+from modules.core.schema_context import PromptTemplate, get_schema_context_provider
 
+logger = logging.getLogger(__name__)
 
-class LLMQueryProcessor:
-    """Process natural language queries using LLM intelligence only"""
-    
-    def __init__(self):
-        # Constitutional: Configuration over hardcoding
-        self.schema_context = """
+# Used when neither an explicit schema nor live introspection is available
+DEFAULT_SCHEMA_CONTEXT = """
         Database schema (farmer_crm):
         - farmers: id, name, email, phone, language, location, created_at
         - fields: id, farmer_id, name, area_hectares, location, soil_type
@@ -28,28 +25,11 @@ class LLMQueryProcessor:
         - tasks: id, field_id, task_type, description, due_date, status, priority
         - incoming_messages: id, farmer_id, message_text, timestamp, language
         """
-        
-    def set_schema_context(self, schema: str):
-        """Set database schema for LLM context"""
-        if schema:
-            self.schema_context = schema
-        
-    def process_natural_query(self, user_query: str, user_language_preference: str = "auto") -> Dict[str, Any]:
-        """
-        Constitutional compliance: LLM-FIRST approach
-        NO hardcoded patterns - AI handles everything
-        
-        Args:
-            user_query: Natural language query in ANY language
-            user_language_preference: Language hint or "auto" for detection
-            
-        Returns:
-            Dict with sql, explanation, detected language
-        """
-        
-        constitutional_prompt = f"""You are an expert agricultural database query assistant following AVA OLO Constitutional principles.
 
-{self.schema_context}
+# Parsed once at import; {schema} is bound to the shared digest per fingerprint
+NATURAL_QUERY_PROMPT = PromptTemplate("""You are an expert agricultural database query assistant following AVA OLO Constitutional principles.
+
+{schema}
 
 CONSTITUTIONAL REQUIREMENTS:
 - Handle ANY language automatically (Bulgarian, Slovenian, English, etc.)
@@ -75,27 +55,11 @@ For "which farmers" or "show farmers" use: SELECT name, email, location FROM far
 For "how many farmers" use: SELECT COUNT(*) as farmer_count FROM farmers;
 For crop queries, search field_crops table.
 For task queries, search tasks table.
-"""
+""")
 
-        try:
-            # Try to use actual LLM if available
-            result = self._call_llm(constitutional_prompt)
-            if result:
-                return result
-        except Exception as e:
-            logger.warning(f"LLM call failed: {e}")
-        
-        # Constitutional: Error isolation - always provide response
-        # Fallback uses simple intelligence instead of hardcoded patterns
-        return self._intelligent_fallback(user_query)
-    
-    def process_modification_query(self, user_query: str, user_language_preference: str = "auto") -> Dict[str, Any]:
-        """
-        Process INSERT/UPDATE/DELETE queries with same LLM approach
-        """
-        constitutional_prompt = f"""You are an expert agricultural database modification assistant following AVA OLO Constitutional principles.
+MODIFICATION_QUERY_PROMPT = PromptTemplate("""You are an expert agricultural database modification assistant following AVA OLO Constitutional principles.
 
-{self.schema_context}
+{schema}
 
 CONSTITUTIONAL REQUIREMENTS:
 - Handle ANY language automatically
@@ -120,7 +84,61 @@ Examples:
 - "Add field Big Garden to farmer John" -> INSERT INTO fields
 - "Update harvest date for mango crop" -> UPDATE field_crops
 - "Delete completed tasks" -> DELETE FROM tasks WHERE status = 'completed'
-"""
+""")
+
+
+class LLMQueryProcessor:
+    """Process natural language queries using LLM intelligence only"""
+    
+    def __init__(self):
+        # Constitutional: Configuration over hardcoding
+        # None means "use the shared schema digest"
+        self.schema_context = None
+        
+    def set_schema_context(self, schema: str):
+        """Set database schema for LLM context (overrides the shared digest)"""
+        if schema:
+            self.schema_context = schema
+
+    def _render_prompt(self, template: PromptTemplate, user_query: str) -> str:
+        if self.schema_context:
+            return template.render(schema=self.schema_context, user_query=user_query)
+        return get_schema_context_provider().render(
+            template, fallback_schema=DEFAULT_SCHEMA_CONTEXT, user_query=user_query
+        )
+        
+    def process_natural_query(self, user_query: str, user_language_preference: str = "auto") -> Dict[str, Any]:
+        """
+        Constitutional compliance: LLM-FIRST approach
+        NO hardcoded patterns - AI handles everything
+        
+        Args:
+            user_query: Natural language query in ANY language
+            user_language_preference: Language hint or "auto" for detection
+            
+        Returns:
+            Dict with sql, explanation, detected language
+        """
+        
+        constitutional_prompt = self._render_prompt(NATURAL_QUERY_PROMPT, user_query)
+
+        try:
+            # Try to use actual LLM if available
+            result = self._call_llm(constitutional_prompt)
+            if result:
+                return result
+        except Exception as e:
+            logger.warning(f"LLM call failed: {e}")
+        
+        # Constitutional: Error isolation - always provide response
+        # Fallback uses simple intelligence instead of hardcoded patterns
+        return self._intelligent_fallback(user_query)
+    
+    def process_modification_query(self, user_query: str, user_language_preference: str = "auto") -> Dict[str, Any]:
+        """
+        Process INSERT/UPDATE/DELETE queries with same LLM approach
+        """
+        constitutional_prompt = self._render_prompt(MODIFICATION_QUERY_PROMPT, user_query)
 
         try:
             result = self._call_llm(constitutional_prompt)
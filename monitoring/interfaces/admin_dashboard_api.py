@@ -6,12 +6,14 @@ Clean API interface for database administration
 from fastapi import FastAPI, HTTPException, Query, Form
 from fastapi.responses import JSONResponse
 from typing import Optional, Dict, Any
+import asyncio
 import logging
 import traceback
 
 from monitoring.core.llm_query_processor import LLMQueryProcessor
 from monitoring.core.response_formatter import ResponseFormatter
 from database_operations import DatabaseOperations
+from modules.core.schema_context import get_schema_context_provider
 
 logger = logging.getLogger(__name__)
 
@@ -30,22 +32,12 @@ db_ops = DatabaseOperations()
 
 @app.on_event("startup")
 async def startup_event():
-    """Initialize LLM processor with database schema"""
+    """Warm the shared schema digest used by the LLM processor"""
     try:
-        # Get database schema for LLM context
-        with db_ops.get_session() as session:
-            from sqlalchemy import inspect
-            inspector = inspect(session.bind)
-            
-            schema_info = []
-            for table_name in inspector.get_table_names():
-                columns = []
-                for col in inspector.get_columns(table_name):
-                    columns.append(f"{col['name']} ({str(col['type'])})")
-                schema_info.append(f"{table_name}: {', '.join(columns[:5])}")
-            
-            schema_context = "\n".join(schema_info)
-            llm_processor.set_schema_context(schema_context)
+        # One catalog query; later NL queries reuse it until the DDL changes
+        digest = await asyncio.to_thread(get_schema_context_provider().get_digest)
+        if digest:
+            logger.info(f"Schema context ready: {len(digest.tables)} tables, ~{digest.tokens} tokens")
             
     except Exception as e:
         logger.error(f"Failed to load schema: {e}")
@@ -64,7 +56,8 @@ async def process_natural_query(
     """
     try:
         # Process with LLM intelligence
-        result = llm_processor.process_natural_query(query, language)
+        # Schema digest refresh and the LLM call block; keep them off the event loop
+        result = await asyncio.to_thread(llm_processor.process_natural_query, query, language)
         
         # Execute SQL if valid
         if result.get('sql') and not result['sql'].startswith('--'):
@@ -128,7 +121,8 @@ async def modify_data(
     """
     try:
         # Process modification query
-        result = llm_processor.process_modification_query(query, language)
+        # Schema digest refresh and the LLM call block; keep them off the event loop
+        result = await asyncio.to_thread(llm_processor.process_modification_query, query, language)
         
         if result.get('sql') and not result['sql'].startswith('--'):
             with db_ops.get_session() as session:
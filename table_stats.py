@@ -0,0 +1,217 @@
+"""
+Table statistics for the Database Explorer
+Approximate row counts from the planner statistics, index-backed recent
+windows, and a reflected-schema cache that is invalidated when the table's
+DDL changes.
+
+Exact COUNT(*) is only run when explicitly requested, or when the table is
+small enough that the count is cheap anyway.
+"""
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import inspect, text
+
+from modules.core.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Below this estimate an exact COUNT(*) is cheaper than explaining an estimate
+EXACT_COUNT_THRESHOLD = int(os.getenv('EXPLORER_EXACT_COUNT_THRESHOLD', '10000'))
+STATS_CACHE_TTL = float(os.getenv('EXPLORER_STATS_CACHE_TTL', '60'))
+
+# Candidate columns for the 24h / 7d / 30d windows, in order of preference
+WINDOW_COLUMNS = ["created_at", "timestamp", "date", "sent_at", "updated_at"]
+WINDOWS = [("24h", 1), ("7d", 7), ("30d", 30)]
+
+# Index types that serve a "col >= :start" range scan
+RANGE_INDEX_METHODS = ("btree", "brin")
+
+# One catalog round trip: quoted name, DDL fingerprint and planner statistics.
+# pg_class / pg_attribute / pg_index rows get a new xmin on ALTER TABLE,
+# column add/drop/rename/retype and CREATE/DROP INDEX, so the fingerprint
+# changes whenever the reflected schema could have.
+TABLE_CATALOG_QUERY = """
+SELECT c.oid::regclass::text AS qualified_name,
+       c.xmin::text
+           || ':' || COALESCE((SELECT string_agg(a.xmin::text, ',' ORDER BY a.attnum)
+                               FROM pg_attribute a
+                               WHERE a.attrelid = c.oid AND a.attnum > 0), '')
+           || ':' || COALESCE((SELECT string_agg(i.indexrelid::text, ',' ORDER BY i.indexrelid)
+                               FROM pg_index i
+                               WHERE i.indrelid = c.oid), '') AS ddl_version,
+       c.reltuples::bigint AS reltuples,
+       s.n_live_tup,
+       GREATEST(s.last_analyze, s.last_autoanalyze) AS last_analyzed
+FROM pg_class c
+LEFT JOIN pg_stat_user_tables s ON s.relid = c.oid
+WHERE c.oid = to_regclass(:table_name)
+"""
+
+# Leading column and access method of every index on the table
+LEADING_INDEX_QUERY = """
+SELECT a.attname, am.amname
+FROM pg_index i
+JOIN pg_class ic ON ic.oid = i.indexrelid
+JOIN pg_am am ON am.oid = ic.relam
+JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = i.indkey[0]
+WHERE i.indrelid = to_regclass(:table_name)
+"""
+
+def quote_identifier(name: str) -> str:
+    """Quote a column name for interpolation into SQL"""
+    return '"' + name.replace('"', '""') + '"'
+
+def estimate_row_count(reltuples: Optional[int], n_live_tup: Optional[int]) -> Optional[int]:
+    """
+    Planner estimate for the table size
+    reltuples is -1 (PG14+) or 0 for a table that has never been analyzed;
+    fall back to the stats collector's live tuple count in that case.
+    """
+    if reltuples is not None and reltuples > 0:
+        return int(reltuples)
+    if n_live_tup is not None and n_live_tup > 0:
+        return int(n_live_tup)
+    if reltuples == 0 or n_live_tup == 0:
+        return 0
+    return None
+
+def choose_window_column(column_names: List[str], indexed_columns: Dict[str, str]) -> Optional[str]:
+    """Prefer a date column with a btree/BRIN index, otherwise the first date column present"""
+    lowered = {name.lower(): name for name in column_names}
+    present = [lowered[c] for c in WINDOW_COLUMNS if c in lowered]
+    for name in present:
+        if indexed_columns.get(name) in RANGE_INDEX_METHODS:
+            return name
+    return present[0] if present else None
+
+class TableSchema:
+    """Reflected table shape, valid for one DDL fingerprint"""
+
+    def __init__(self, qualified_name: str, ddl_version: str, columns: List[Dict[str, str]],
+                 indexed_columns: Dict[str, str]):
+        self.qualified_name = qualified_name
+        self.ddl_version = ddl_version
+        self.columns = columns
+        self.indexed_columns = indexed_columns
+        self.window_column = choose_window_column([c["name"] for c in columns], indexed_columns)
+
+    @property
+    def window_column_indexed(self) -> bool:
+        return self.indexed_columns.get(self.window_column) in RANGE_INDEX_METHODS
+
+class TableStatsService:
+    """Cached schema reflection and cheap table statistics"""
+
+    def __init__(self, db_ops, stats_ttl: float = STATS_CACHE_TTL):
+        self.db_ops = db_ops
+        self._schemas: Dict[str, TableSchema] = {}
+        self._stats = TTLCache(max_size=256, ttl_seconds=stats_ttl)
+
+    def invalidate(self, table_name: Optional[str] = None):
+        """Drop cached schema/stats for one table, or all of them after arbitrary DDL"""
+        if table_name is None:
+            self._schemas.clear()
+            self._stats.clear()
+        else:
+            self._schemas.pop(table_name, None)
+            for exact in (False, True):
+                self._stats.invalidate((table_name, exact))
+
+    def _catalog_row(self, session, table_name: str):
+        row = session.execute(text(TABLE_CATALOG_QUERY), {"table_name": table_name}).fetchone()
+        if row is None:
+            raise LookupError(f'relation "{table_name}" does not exist')
+        return row
+
+    def _reflect(self, session, table_name: str):
+        """Columns via SQLAlchemy reflection plus the leading column of each index"""
+        inspector = inspect(session.bind)
+        columns = [{"name": col["name"], "type": str(col["type"])}
+                   for col in inspector.get_columns(table_name)]
+        indexed_columns: Dict[str, str] = {}
+        for attname, amname in session.execute(text(LEADING_INDEX_QUERY), {"table_name": table_name}):
+            # A btree wins over a BRIN on the same column
+            if indexed_columns.get(attname) != "btree":
+                indexed_columns[attname] = amname
+        return columns, indexed_columns
+
+    def _schema_for(self, session, table_name: str, catalog_row) -> TableSchema:
+        cached = self._schemas.get(table_name)
+        if cached is not None and cached.ddl_version == catalog_row.ddl_version:
+            return cached
+
+        columns, indexed_columns = self._reflect(session, table_name)
+        schema = TableSchema(catalog_row.qualified_name, catalog_row.ddl_version, columns, indexed_columns)
+        self._schemas[table_name] = schema
+        logger.info(f"Reflected schema for {table_name} ({len(columns)} columns)")
+        return schema
+
+    def get_schema(self, session, table_name: str) -> TableSchema:
+        """Reflected schema, re-read only when the table's DDL fingerprint changes"""
+        return self._schema_for(session, table_name, self._catalog_row(session, table_name))
+
+    def get_columns(self, session, table_name: str) -> List[Dict[str, str]]:
+        return self.get_schema(session, table_name).columns
+
+    def get_table_stats(self, session, table_name: str, exact: bool = False) -> Dict[str, Any]:
+        """
+        Row count and recent-window counts for a table
+
+        total_records is the planner estimate unless ``exact`` is set or the
+        table is small; recent_counts are only computed when a btree/BRIN index
+        backs the window column (or the table is small, or ``exact`` is set),
+        otherwise they are None.
+        """
+        cached = self._stats.get((table_name, exact))
+        if cached is not None:
+            return cached
+
+        catalog_row = self._catalog_row(session, table_name)
+        schema = self._schema_for(session, table_name, catalog_row)
+
+        estimate = estimate_row_count(catalog_row.reltuples, catalog_row.n_live_tup)
+        small = estimate is not None and estimate < EXACT_COUNT_THRESHOLD
+        count_exactly = exact or small or estimate is None
+
+        if count_exactly:
+            total = session.execute(text(f"SELECT COUNT(*) FROM {schema.qualified_name}")).scalar() or 0
+        else:
+            total = estimate
+
+        recent_counts: Dict[str, Optional[int]] = {name: None for name, _ in WINDOWS}
+        window_source = None
+        if schema.window_column and (schema.window_column_indexed or count_exactly):
+            recent_counts = self._window_counts(session, schema)
+            window_source = "index" if schema.window_column_indexed else "scan"
+
+        stats = {
+            "total_records": total,
+            "total_records_exact": count_exactly,
+            "recent_counts": recent_counts,
+            "window_column": schema.window_column,
+            "window_source": window_source,
+            "last_analyzed": catalog_row.last_analyzed.isoformat() if catalog_row.last_analyzed else None
+        }
+        self._stats.set((table_name, exact), stats)
+        return stats
+
+    def _window_counts(self, session, schema: TableSchema) -> Dict[str, int]:
+        """All three windows from a single range scan of the widest window"""
+        column = quote_identifier(schema.window_column)
+        now = datetime.now()
+        params = {f"since_{name}": now - timedelta(days=days) for name, days in WINDOWS}
+        filters = ", ".join(f"COUNT(*) FILTER (WHERE {column} >= :since_{name})" for name, _ in WINDOWS)
+        widest = max(WINDOWS, key=lambda w: w[1])[0]
+        try:
+            row = session.execute(
+                text(f"SELECT {filters} FROM {schema.qualified_name} WHERE {column} >= :since_{widest}"),
+                params
+            ).fetchone()
+        except Exception as e:
+            logger.warning(f"Window counts failed for {schema.qualified_name}: {e}")
+            session.rollback()
+            return {name: None for name, _ in WINDOWS}
+        return {name: int(value or 0) for (name, _), value in zip(WINDOWS, row)}
@@ -129,7 +129,7 @@ async def test_session_timeout():
     
     # Create a session
     session_id = "timeout_test_123"
-    session = cava.get_or_create_session(session_id)
+    session = await cava.get_or_create_session(session_id)
     
     # Manually set last activity to 6 minutes ago
     session["last_activity"] = datetime.utcnow() - timedelta(minutes=6)
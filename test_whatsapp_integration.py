@@ -158,7 +158,7 @@ async def test_natural_registration_integration():
         
         # Test session creation
         session_id = "+359888123456"  # Bulgarian farmer phone
-        session = registration.get_or_create_session(session_id)
+        session = await registration.get_or_create_session(session_id)
         
         logger.info(f"📋 Created session for {session_id}")
         logger.info(f"   Required fields: {list(registration.required_fields.keys())}")
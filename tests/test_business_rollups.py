@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Test business dashboard rollup window and bundle shaping
+"""
+import asyncio
+import sys
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from modules.dashboards.business_rollups import (
+    BusinessRollupAggregator, fetch_dashboard_bundle, refresh_as_leader, shape_dashboard_bundle
+)
+
+class RecordingDB:
+    """Returns canned rows and records every statement"""
+
+    def __init__(self, rows=None):
+        self.rows = rows or []
+        self.queries = []
+
+    def execute_query(self, query, params=None):
+        self.queries.append((query, params))
+        return {'columns': [], 'rows': self.rows}
+
+def _day(offset, registrations, churned, cumulative_registrations, cumulative_churned, active=None):
+    return {
+        'date': (date.today() - timedelta(days=offset)).isoformat(),
+        'registrations': registrations,
+        'new_hectares': registrations * 2.5,
+        'churned': churned,
+        'active_farmers': active,
+        'cumulative_registrations': cumulative_registrations,
+        'cumulative_churned': cumulative_churned
+    }
+
+BUNDLE_ROW = (
+    [{'category': 'Vineyards', 'farmers': 3, 'hectares': 30},
+     {'category': 'Other', 'farmers': 1, 'hectares': 10}],
+    [_day(2, 4, 0, 10, 0), _day(1, 2, 2, 12, 2), _day(0, 1, 0, 13, 2, active=5)],
+    {'registrations': 1, 'new_hectares': 2.5, 'churned': 0},
+    [{'farmer_id': 7, 'farmer_name': '', 'time': '09:15'}],
+    [{'record_id': 7, 'operation': 'INSERT', 'timestamp': '2024-05-01 09:15:00'}],
+    '2024-05-01 09:20:00'
+)
+
+def test_window_covers_lookback_and_gap_since_watermark():
+    """Refresh recomputes the lookback window, widened when the job has been down"""
+    aggregator = BusinessRollupAggregator(db_manager=RecordingDB(), lookback_days=35)
+    today = date(2024, 5, 31)
+    assert aggregator.window_start(datetime(2024, 5, 31, 8), today) == date(2024, 4, 26)
+    assert aggregator.window_start(datetime(2024, 3, 1, 8), today) == date(2024, 3, 1)
+
+def test_first_refresh_backfills_from_first_registration():
+    """Without a watermark the whole history is aggregated once"""
+    aggregator = BusinessRollupAggregator(db_manager=RecordingDB(rows=[(date(2023, 1, 15),)]))
+    assert aggregator.window_start(None, date(2024, 5, 31)) == date(2023, 1, 15)
+
+def test_bundle_shapes_every_widget():
+    """One rollup row yields the payload of every widget endpoint"""
+    bundle = shape_dashboard_bundle(BUNDLE_ROW, days=30)
+
+    assert bundle['overview']['total_farmers'] == 4
+    assert bundle['overview']['hectare_breakdown']['Vineyards'] == {'hectares': 30.0, 'percentage': 75.0}
+    assert bundle['growth_trends']['24hours']['new_farmers'] == 1
+    assert bundle['growth_trends']['7days'] == {'new_farmers': 7, 'unsubscribed': 2, 'new_hectares': 17.5}
+    assert bundle['cumulative_growth']['cumulative_totals'] == [10, 12, 13]
+    # 2 churned out of the 12 farmers registered and not yet churned that day
+    assert bundle['churn_rate']['churn_rates'] == [round(2 / 12 * 100, 2)]
+    assert bundle['todays_activity']['metrics']['farmers_active'] == 5
+    assert bundle['activity_stream']['activities'][0]['farmer_name'] == 'Farmer #7'
+    assert bundle['database_changes']['changes'][0]['table'] == 'farmers'
+
+def test_empty_rollups_return_zeroed_bundle():
+    """Before the first refresh the bundle is empty rather than an error"""
+    bundle = fetch_dashboard_bundle(days=30, db_manager=RecordingDB())
+    assert bundle['success'] is True
+    assert bundle['overview']['total_farmers'] == 0
+    assert bundle['cumulative_growth']['dates'] == []
+    assert bundle['todays_activity']['metrics']['new_fields'] == 0
+
+class FixedLock:
+    def __init__(self, leader):
+        self.leader = leader
+
+    async def acquire(self):
+        if self.leader is None:
+            raise ConnectionError("redis down")
+        return self.leader
+
+class CountingAggregator:
+    def __init__(self):
+        self.refreshes = 0
+
+    def refresh(self):
+        self.refreshes += 1
+        return {"refreshed": True}
+
+def test_only_the_leader_refreshes():
+    """Followers and processes that cannot reach the lock backend skip the refresh"""
+    aggregator = CountingAggregator()
+
+    async def scenario():
+        return [await refresh_as_leader(aggregator, FixedLock(leader)) for leader in (True, False, None)]
+
+    assert asyncio.run(scenario()) == [{"refreshed": True}, None, None]
+    assert aggregator.refreshes == 1
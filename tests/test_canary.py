@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Test the tiered canary: leader election and deep-probe scheduling
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from modules.core import leader_lock
+from modules.core.canary import Canary
+from modules.core.leader_lock import AdvisoryLeaderLock, RedisLeaderLock
+
+class FakeRedis:
+    """Just enough of redis.Redis for the lease: SET NX and the two scripts"""
+
+    def __init__(self):
+        self.data = {}
+
+    def set(self, key, value, nx=False, px=None):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    def eval(self, script, numkeys, key, token, *args):
+        if self.data.get(key) != token:
+            return 0
+        if script == leader_lock._RELEASE_SCRIPT:
+            del self.data[key]
+        return 1
+
+class FakeConnection:
+    held = set()
+
+    def __init__(self):
+        self.closed = False
+
+    async def fetchval(self, query, key):
+        if key in FakeConnection.held:
+            return False
+        FakeConnection.held.add(key)
+        return True
+
+    async def execute(self, query, key):
+        FakeConnection.held.discard(key)
+
+    async def close(self):
+        self.closed = True
+
+    def is_closed(self):
+        return self.closed
+
+class FakeLock:
+    backend = "fake"
+
+    def __init__(self, leader):
+        self.leader = leader
+
+    async def acquire(self):
+        return self.leader
+
+    async def release(self):
+        pass
+
+class FixedRandom:
+    def __init__(self, value):
+        self.value = value
+
+    def random(self):
+        return self.value
+
+class OfflineCanary(Canary):
+    """Probes that touch nothing; the deep probe only counts"""
+
+    async def _ping_pool(self):
+        return {"ok": True}
+
+    async def _check_key(self):
+        return {"ok": True}
+
+    async def deep_probe(self):
+        self.counters["deep_runs"] += 1
+        self.deep = {"ok": True}
+        return self.deep
+
+def test_redis_lease_has_one_holder_until_released():
+    """The first task leads and keeps renewing; others wait for release"""
+    client = FakeRedis()
+    first, second = RedisLeaderLock(client, "ava:test:leader", 60), RedisLeaderLock(client, "ava:test:leader", 60)
+
+    async def scenario():
+        results = [await first.acquire(), await second.acquire(), await first.acquire()]
+        await first.release()
+        results.append(await second.acquire())
+        return results
+
+    assert asyncio.run(scenario()) == [True, False, True, True]
+
+def test_advisory_lock_leader_keeps_its_connection():
+    """The loser's connection is closed; the leader holds the lock until release"""
+    FakeConnection.held.clear()
+    connections = []
+
+    async def connect():
+        connections.append(FakeConnection())
+        return connections[-1]
+
+    leader, follower = AdvisoryLeaderLock(connect, key=7), AdvisoryLeaderLock(connect, key=7)
+
+    async def scenario():
+        results = [await leader.acquire(), await follower.acquire(), await leader.acquire()]
+        await leader.release()
+        results.append(await follower.acquire())
+        return results
+
+    assert asyncio.run(scenario()) == [True, False, True, True]
+    assert len(connections) == 3
+    assert connections[1].is_closed() and not connections[2].is_closed()
+
+def test_deep_probe_runs_once_per_interval_on_leader_only():
+    """Liveness runs every tick; the deep probe only when due, sampled and leading"""
+    leader = OfflineCanary(FakeLock(True), deep_interval=100, rng=FixedRandom(0.0))
+    follower = OfflineCanary(FakeLock(False), deep_interval=100, rng=FixedRandom(0.0))
+
+    async def scenario(canary):
+        for now in (0, 10, 50, 100, 150):
+            await canary.tick(now)
+
+    asyncio.run(scenario(leader))
+    asyncio.run(scenario(follower))
+
+    assert leader.counters["liveness_runs"] == 5
+    assert leader.counters["deep_runs"] == 2
+    assert follower.counters["deep_runs"] == 0
+    assert follower.counters["deep_skipped"] == 2
+    assert follower.status()["leader"] is False
+
+def test_deep_probe_sampling():
+    """With a sample rate below the draw the deep probe is skipped"""
+    canary = OfflineCanary(FakeLock(True), sample_rate=0.25, rng=FixedRandom(0.5))
+
+    status = asyncio.run(canary.tick(0))
+
+    assert status["deep_runs"] == 0
+    assert status["deep_skipped"] == 1
+    assert status["liveness"]["ok"] is True
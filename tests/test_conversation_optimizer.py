@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Test the single-pass WhatsApp rewriter and the streaming sentence splitter
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from modules.cava.conversation_optimizer import SentenceSplitter, WhatsAppOptimizer
+
+LONG_REPLY = (
+    "It appears that your vineyard has early signs of downy mildew. In order to protect the "
+    "grapes, implement a copper spray within 48 hours. Additionally, remove infected leaves and "
+    "improve air circulation. Subsequent to spraying, check the leaves every 3 days. Therefore, "
+    "the 4 hectares in the valley plot should be picked first."
+)
+
+class FixedRandom:
+    def __init__(self, value):
+        self.value = value
+
+    def random(self):
+        return self.value
+
+def test_phrases_and_units_rewritten_in_one_pass():
+    """Formal phrases match case-insensitively, unit abbreviations case-sensitively"""
+    optimizer = WhatsAppOptimizer()
+    text = ("HOWEVER, it is recommended that you spray at 18 degrees Celsius on 4 hectares, "
+            "not 5 Hectares. Furthermore apply 120 kilograms per hectare.")
+
+    assert optimizer._make_conversational(text) == (
+        "But, You should you spray at 18°C on 4ha, not 5 Hectares. Also apply 120 kg/ha."
+    )
+
+def test_rewrite_when_lowercasing_changes_length():
+    """Text whose lower() is longer than itself is still rewritten at the right offsets"""
+    optimizer = WhatsAppOptimizer()
+    assert optimizer._make_conversational("İzmir: However, wait 10 millimeters.") == "İzmir: But, wait 10mm."
+
+def test_dotted_capital_i_starts_a_formal_phrase():
+    """A phrase beginning with 'İ' is rewritten, as the IGNORECASE re.sub loop did"""
+    assert WhatsAppOptimizer(FixedRandom(1.0)).optimize_response("İN ORDER TO water") == ["To water"]
+
+def test_emojis_follow_rule_priority_and_cap():
+    """At most two emojis, placed after the first keyword of the highest-priority rules"""
+    always = WhatsAppOptimizer(FixedRandom(0.0))
+    text = "Water the mango trees before rain. Water again when dry."
+
+    assert always._add_natural_emojis(text) == "Water 💧 the mango trees before rain 🌧️. Water again when dry."
+
+    # Only the mango rule fires with probability 1.0
+    never = WhatsAppOptimizer(FixedRandom(0.999))
+    assert never._add_natural_emojis(text) == "Water the mango 🥭 trees before rain. Water again when dry."
+
+def test_splitter_handles_chunk_boundaries():
+    """Sentences complete only once whitespace follows the terminator"""
+    splitter = SentenceSplitter()
+    chunks = ["Apply 2", ".5 kg/ha now", ". Then wa", "it!", "\nTips", "\n\nCheck", " daily"]
+
+    sentences = [s for chunk in chunks for s in splitter.feed(chunk)]
+    sentences.append(splitter.flush())
+
+    assert sentences == ["Apply 2.5 kg/ha now.", "Then wait!", "Tips", "Check daily"]
+    assert splitter.flush() is None
+
+def test_stream_matches_batch_messages():
+    """Token-by-token optimization yields the same messages as the batch path"""
+    optimizer = WhatsAppOptimizer(FixedRandom(0.999))
+    batch = optimizer.optimize_response(LONG_REPLY)
+    tokens = [LONG_REPLY[i:i + 3] for i in range(0, len(LONG_REPLY), 3)]
+
+    streamed = list(optimizer.optimize_stream(tokens))
+
+    assert len(batch) > 1
+    assert streamed == batch
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Test the tiered fact extractor: local rules first, LLM only when unresolved
+"""
+import asyncio
+import json
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from modules.cava.fact_extractor import FactExtractor
+
+PROFILE = {
+    'crops': ['Mango'],
+    'fields': [{'name': 'North Field'}, {'name': 'North Field 2'}, {'name': 'Hill Plot'}]
+}
+
+class FakeCompletions:
+    def __init__(self, content):
+        self.content = content
+        self.calls = 0
+
+    def create(self, **kwargs):
+        self.calls += 1
+        message = SimpleNamespace(content=self.content)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+def make_extractor(llm_facts):
+    extractor = FactExtractor(min_confidence=0.8)
+    completions = FakeCompletions(json.dumps(llm_facts))
+    extractor.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    return extractor, completions
+
+def test_small_talk_never_reaches_llm():
+    """'ok thanks' is not agricultural: no facts and no LLM call"""
+    extractor, completions = make_extractor({'crops': ['wrong']})
+
+    assert asyncio.run(extractor.extract_facts("ok thanks")) == {}
+    assert completions.calls == 0
+    assert extractor.get_stats()['non_agricultural'] == 1
+
+def test_profile_fields_and_crops_resolved_locally():
+    """Field names and crops from the farmer profile are matched without the LLM"""
+    extractor, completions = make_extractor({})
+
+    facts = asyncio.run(extractor.extract_facts(
+        "Moje mango na North Field 2 ima plesen, 3 ha", "", PROFILE
+    ))
+
+    assert facts['crops'] == ['mango']
+    assert facts['field_names'] == ['North Field 2']
+    assert facts['problems'] == ['mildew']
+    assert facts['quantities'] == {'area': {'value': 3.0, 'unit': 'ha'}}
+    assert completions.calls == 0
+
+def test_unknown_product_falls_back_to_llm_and_merges():
+    """An unrecognised brand name is resolved by the LLM; local facts are kept"""
+    extractor, completions = make_extractor({'chemicals_used': ['Bravo 720'], 'crops': ['tomato']})
+
+    local = extractor.extract_facts_locally("I sprayed Bravo 720 on the tomatoes")
+    assert local.unresolved == ['unknown product Bravo']
+
+    facts = asyncio.run(extractor.extract_facts("I sprayed Bravo 720 on the tomatoes"))
+
+    assert completions.calls == 1
+    assert facts['chemicals_used'] == ['spray', 'Bravo 720']
+    assert facts['crops'] == ['tomato', 'tomatoes']
+
+def test_stats_report_saved_llm_calls():
+    """The saved rate counts every message that did not need the LLM"""
+    extractor, _ = make_extractor({})
+    for message in ["ok thanks", "When should I plant corn?", "I have 10 ha", "Leaves are yellow"]:
+        asyncio.run(extractor.extract_facts(message))
+
+    stats = extractor.get_stats()
+
+    assert stats['messages'] == 4
+    assert stats['resolved_locally'] == 1
+    assert stats['llm_calls'] == 2
+    assert stats['llm_calls_saved'] == 2
+    assert stats['saved_rate'] == 0.5
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Test ranked farmer search, its LIKE fallback and the typeahead index
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pytest
+
+from modules.farmers import context_search, search
+from modules.farmers.search import SEARCH_QUERIES, FarmerSearchEngine, FarmerTypeaheadIndex
+
+COLUMNS = search.RESULT_COLUMNS + ['crops', 'name_score', 'location_score', 'crop_score', 'phone_score']
+
+def farmer_row(farmer_id, first, last, name_score=0.0, location_score=0.0, crop_score=0.0, phone_score=0.0):
+    return [farmer_id, f"{last} farm", first, last, 'Ljubljana', 'Slovenia', None, '+38640111222',
+            None, None, 'maize', name_score, location_score, crop_score, phone_score]
+
+class FakeDatabase:
+    def __init__(self, rows=(), trigram=True):
+        self.rows = list(rows)
+        self.trigram = trigram
+        self.calls = []
+
+    def __call__(self, query, params):
+        self.calls.append((query, params))
+        if not self.trigram and 'word_similarity' in query:
+            raise RuntimeError("function word_similarity(unknown, text) does not exist")
+        return {'columns': COLUMNS, 'rows': self.rows}
+
+def test_search_reports_strongest_signal():
+    """All clues go into one query; each result carries its best signal"""
+    database = FakeDatabase([farmer_row(7, 'Ana', 'Novak', name_score=0.72, crop_score=0.6),
+                             farmer_row(9, 'Marko', 'Kos', phone_score=0.9)])
+    engine = FarmerSearchEngine(database)
+
+    matches = engine.search(names=[' Ana ', 'Novak'], crops=['Maize'], phone='+386 40-11', limit=5)
+
+    assert len(database.calls) == 1
+    query, params = database.calls[0]
+    assert query is SEARCH_QUERIES[True]
+    assert params == {'name': 'ana novak', 'location': '', 'crop': 'maize', 'phone': '3864011', 'limit': 5}
+    assert [(m['id'], m['match_type'], m['match_confidence']) for m in matches] == \
+        [(7, 'name_match', 0.72), (9, 'phone_match', 0.9)]
+    assert 'name_score' not in matches[0]
+
+def test_short_terms_fall_back_to_prefix_matching():
+    """Terms too short for word_similarity match word prefixes; longer ones keep trigrams"""
+    database = FakeDatabase([farmer_row(7, 'Ana', 'Novak', name_score=0.8)])
+    engine = FarmerSearchEngine(database)
+
+    engine.search(names=['An'], crops=['maize'])
+    engine.search(names=['An'], crops=['maize'])
+
+    query, params = database.calls[0]
+    assert params['name'] == 'an'
+    assert query is database.calls[1][0] and query is not SEARCH_QUERIES[True]
+    assert "LIKE %(name)s || '%%'" in query and "%(name)s <%%" not in query
+    assert "%(crop)s <%%" in query
+
+def test_search_without_clues_skips_the_database():
+    database = FakeDatabase()
+
+    assert FarmerSearchEngine(database).search(names=['  '], phone='12') == []
+    assert database.calls == []
+
+def test_search_falls_back_to_like_without_pg_trgm():
+    """A missing pg_trgm switches the engine to LIKE once; other errors propagate"""
+    database = FakeDatabase([farmer_row(7, 'Ana', 'Novak', location_score=0.7)], trigram=False)
+    engine = FarmerSearchEngine(database)
+
+    assert engine.search(locations=['Ljubljana'])[0]['match_type'] == 'location_match'
+    assert engine.search(locations=['Maribor'])
+    assert engine.trigram is False
+    assert [query for query, _ in database.calls] == [SEARCH_QUERIES[True], SEARCH_QUERIES[False], SEARCH_QUERIES[False]]
+    assert "LIKE" in SEARCH_QUERIES[False] and "<%" in SEARCH_QUERIES[True]
+
+    def broken(query, params):
+        raise RuntimeError("connection refused")
+
+    with pytest.raises(RuntimeError):
+        FarmerSearchEngine(broken).search(names=['Ana'])
+
+def test_context_search_keeps_legacy_keys(monkeypatch):
+    database = FakeDatabase([farmer_row(7, 'Ana', 'Novak', crop_score=0.54)])
+    monkeypatch.setattr(context_search, 'get_farmer_search', lambda: FarmerSearchEngine(database))
+
+    [match] = context_search.search_farmers_flexibly({'names': [], 'crops': ['maize'], 'phone_partial': None})
+
+    assert match['farmer_id'] == 7
+    assert (match['first_name'], match['last_name'], match['whatsapp_number']) == ('Ana', 'Novak', '+38640111222')
+    assert (match['crops'], match['match_type'], match['match_confidence']) == ('maize', 'crop_match', 0.54)
+
+def test_typeahead_suggests_while_typing():
+    """Partial last words match; the index reloads only when stale"""
+    loads = []
+
+    def load():
+        loads.append(1)
+        return {'rows': [(1, 'Ana', 'Novak', 'Novak Vineyards', 'Ptuj', '+38640111222'),
+                         (2, 'Anton', 'Horvat', None, 'Maribor', None),
+                         (3, 'Marko', 'Novakovic', 'Kmetija Marko', 'Celje', None)]}
+
+    index = FarmerTypeaheadIndex(load, ttl=60)
+    assert index.refresh() is True
+    assert index.refresh() is False
+    assert len(loads) == 1 and len(index) == 3
+
+    assert [s['id'] for s in index.suggest('nova')] == [1, 3]
+    assert [s['id'] for s in index.suggest('ana nov')][0] == 1
+    assert index.suggest('anton')[0]['name'] == 'Anton Horvat'
+    assert index.suggest('zzzz') == []
+    assert index.suggest('') == []
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Test the geocode cache, batch geocoder and read-only farmer locations
+"""
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import httpx
+import pytest
+
+from modules.location import geocoding, location_service
+from modules.location.geocoding import (
+    ERROR, FOUND, NOT_FOUND, GeocodeBackfillWorker, GeocodeEntry, NominatimGeocoder,
+    backfill_as_leader, farmer_address, normalize_address
+)
+from modules.location.location_service import LocationService
+
+class FakeCache:
+    """In-memory stand-in for the geocode_cache table"""
+
+    def __init__(self, entries=None):
+        self.entries = dict(entries or {})
+        self.stored = []
+
+    def lookup_many(self, keys):
+        return {key: self.entries[key] for key in keys if key in self.entries}
+
+    def lookup(self, key):
+        return self.entries.get(key)
+
+    def store(self, key, query, status, coordinates=None):
+        self.stored.append((key, status))
+        self.entries[key] = GeocodeEntry(status, *(coordinates or (None, None)))
+
+class FakeGeocoder:
+    def __init__(self, answers):
+        self.answers = answers
+        self.queries = []
+
+    async def geocode(self, query):
+        self.queries.append(query)
+        answer = self.answers[query]
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+class FakeDatabase:
+    """Serves the farmers page by id and records coordinate updates"""
+
+    def __init__(self, farmers):
+        self.farmers = farmers
+        self.updates = []
+
+    def __call__(self, query, params):
+        if query.strip().startswith('UPDATE'):
+            self.updates.append(params)
+            return {'affected_rows': 1}
+        after_id, limit = params
+        return {'columns': [], 'rows': [row for row in self.farmers if row[0] > after_id][:limit]}
+
+def test_address_normalization():
+    assert farmer_address('Glavna ulica', '12', '2000', 'Maribor', 'Slovenia') == 'Glavna ulica 12, 2000 Maribor, Slovenia'
+    assert farmer_address(None, None, None, 'Ptuj', None) == 'Ptuj'
+    assert normalize_address('  Glavna   Ulica 12 ,2000 MARIBOR,, Slovenia. ') == 'glavna ulica 12, 2000 maribor, slovenia'
+    assert normalize_address('Šentjur, Slovenija') == 'šentjur, slovenija'
+    assert normalize_address(' , ') == ''
+
+def test_backfill_geocodes_each_uncached_address_once():
+    """Shared addresses are geocoded once; negative entries are cached and skipped"""
+    cache = FakeCache({
+        'ptuj, slovenia': GeocodeEntry(FOUND, 46.42, 15.87),
+        'nowhere, slovenia': GeocodeEntry(NOT_FOUND, None, None)
+    })
+    geocoder = FakeGeocoder({
+        'Maribor, Slovenia': (46.55, 15.64),
+        'Atlantis, Slovenia': None,
+        'Celje, Slovenia': httpx.ConnectTimeout("timeout")
+    })
+    database = FakeDatabase([
+        (1, None, None, None, 'Maribor', 'Slovenia'),
+        (2, None, None, None, 'MARIBOR', 'Slovenia'),
+        (3, None, None, None, 'Ptuj', 'Slovenia'),
+        (4, None, None, None, 'Nowhere', 'Slovenia'),
+        (5, None, None, None, 'Atlantis', 'Slovenia'),
+        (6, None, None, None, 'Celje', 'Slovenia'),
+    ])
+    worker = GeocodeBackfillWorker(geocoder, cache, execute=database, batch_size=4)
+
+    stats = asyncio.run(worker.run_pass())
+
+    assert geocoder.queries == ['Maribor, Slovenia', 'Atlantis, Slovenia', 'Celje, Slovenia']
+    assert sorted(database.updates) == [(46.42, 15.87, 3), (46.55, 15.64, 1), (46.55, 15.64, 2)]
+    assert cache.stored == [('maribor, slovenia', FOUND), ('atlantis, slovenia', NOT_FOUND), ('celje, slovenia', ERROR)]
+    assert stats == {"farmers": 6, "addresses": 5, "cached": 1, "skipped_negative": 1,
+                     "geocoded": 1, "not_found": 1, "errors": 1, "updated": 3}
+
+class FixedLock:
+    def __init__(self, leader):
+        self.leader = leader
+
+    async def acquire(self):
+        if self.leader is None:
+            raise ConnectionError("redis down")
+        return self.leader
+
+def test_only_the_leader_backfills():
+    """Followers and tasks whose lock backend fails skip the pass"""
+    geocoder = FakeGeocoder({'Maribor, Slovenia': (46.55, 15.64)})
+    database = FakeDatabase([(1, None, None, None, 'Maribor', 'Slovenia')])
+    worker = GeocodeBackfillWorker(geocoder, FakeCache(), execute=database)
+
+    async def scenario():
+        return [await backfill_as_leader(worker, FixedLock(leader)) for leader in (False, None, True)]
+
+    follower, broken, leader = asyncio.run(scenario())
+
+    assert follower is None and broken is None
+    assert leader["updated"] == 1
+    assert geocoder.queries == ['Maribor, Slovenia']
+
+def test_geocode_address_caches_failed_requests(monkeypatch):
+    """A failed request is cached as an error, so it is not retried on every call"""
+    geocoder = FakeGeocoder({'Celje, Slovenia': httpx.ConnectTimeout("timeout")})
+    monkeypatch.setattr(location_service, 'get_geocoder', lambda: geocoder)
+    cache = FakeCache()
+    service = LocationService(geocode_cache=cache)
+
+    first = asyncio.run(service.geocode_address('Celje, Slovenia'))
+    second = asyncio.run(service.geocode_address('Celje, Slovenia'))
+
+    assert first is None and second is None
+    assert cache.stored == [('celje, slovenia', ERROR)]
+    assert geocoder.queries == ['Celje, Slovenia']
+
+def test_nominatim_requests_are_spaced():
+    """One request per min_interval; empty answers are None and HTTP errors raise"""
+    def handler(request):
+        query = request.url.params["q"]
+        if query == "broken":
+            return httpx.Response(503)
+        return httpx.Response(200, json=[{"lat": "46.05", "lon": "14.50"}] if query == "Ljubljana" else [])
+
+    async def scenario():
+        geocoder = NominatimGeocoder("https://nominatim.test/search", min_interval=0.05,
+                                     client=httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+        started = time.monotonic()
+        answers = [await geocoder.geocode("Ljubljana"), await geocoder.geocode("Atlantis")]
+        with pytest.raises(httpx.HTTPStatusError):
+            await geocoder.geocode("broken")
+        elapsed = time.monotonic() - started
+        await geocoder.aclose()
+        return answers, elapsed
+
+    answers, elapsed = asyncio.run(scenario())
+
+    assert answers == [(46.05, 14.50), None]
+    assert elapsed >= 0.1
+
+class FarmerRowDB:
+    def __init__(self, row):
+        self.row = row
+
+    def execute_query(self, query, params=None):
+        return {'columns': [], 'rows': [self.row] if 'weather_latitude' in query else []}
+
+def test_farmer_location_reads_cache_and_never_geocodes(monkeypatch):
+    def no_network():
+        raise AssertionError("request path must not geocode")
+
+    monkeypatch.setattr(location_service, 'get_geocoder', no_network)
+    monkeypatch.setattr(geocoding, 'get_geocoder', no_network)
+    cache = FakeCache({'glavna 3, 2000 maribor, slovenia': GeocodeEntry(FOUND, 46.55, 15.64)})
+    service = LocationService(geocode_cache=cache)
+
+    service.db_manager = FarmerRowDB(('Farm', 'Glavna', '3', '2000', 'Maribor', 'Slovenia', None, None))
+    cached = asyncio.run(service.get_farmer_location(7))
+    service.db_manager = FarmerRowDB(('Farm', None, None, None, 'Kranj', 'Slovenia', None, None))
+    missing = asyncio.run(service.get_farmer_location(8))
+    service.db_manager = FarmerRowDB(('Farm', None, None, None, 'Kranj', 'Slovenia', 46.24, 14.36))
+    stored = asyncio.run(service.get_farmer_location(9))
+
+    assert (cached['lat'], cached['lon'], cached['address']) == (46.55, 15.64, 'Glavna 3, 2000 Maribor, Slovenia')
+    assert missing == service.default_location
+    assert (stored['lat'], stored['lon']) == (46.24, 14.36)
+    assert cache.stored == []
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Test local GeoIP resolution and IP-based language detection
+"""
+import asyncio
+import ipaddress
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from modules.core.geoip import GeoIPResolver, IPRangeDatabase
+from modules.core.language_service import LanguageService
+
+RANGE_CSV = """\
+"ip_from","ip_to","country_code"
+31.15.128.0,31.15.255.255,SI
+"1347440640","1347440895","BG"
+93.34.0.0,93.34.255.255,IT
+100.0.0.0,100.0.0.255,-
+2a00:1a28::,2a00:1a28:ffff:ffff:ffff:ffff:ffff:ffff,SI
+"""
+
+GEOLITE_BLOCKS = """\
+network,geoname_id,registered_country_geoname_id,represented_country_geoname_id,is_anonymous_proxy,is_satellite_provider
+46.122.0.0/16,3190538,3190538,,0,0
+77.0.0.0/24,,2921044,,0,0
+"""
+
+GEOLITE_LOCATIONS = """\
+geoname_id,locale_code,continent_code,continent_name,country_iso_code,country_name,is_in_european_union
+3190538,en,EU,Europe,SI,Slovenia,1
+2921044,en,EU,Europe,DE,Germany,1
+"""
+
+class FakeRemote:
+    def __init__(self, answers):
+        self.answers = answers
+        self.calls = []
+
+    async def __call__(self, ip_address):
+        self.calls.append(ip_address)
+        answer = self.answers[ip_address]
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+def test_range_csv_lookup(tmp_path):
+    """Dotted, integer and IPv6 ranges are found; headers and '-' rows are skipped"""
+    path = tmp_path / "ip-to-country.csv"
+    path.write_text(RANGE_CSV)
+    database = IPRangeDatabase.from_csv([str(path)])
+    resolver = GeoIPResolver(database)
+
+    assert len(database) == 4
+    assert resolver.country_for("31.15.200.7") == "SI"
+    assert resolver.country_for("80.80.80.80") == "BG"
+    assert resolver.country_for("::ffff:93.34.1.2") == "IT"
+    assert resolver.country_for("2a00:1a28:1:2::9") == "SI"
+    assert resolver.country_for("31.16.0.1") is None
+    assert resolver.country_for("100.0.0.1") is None
+
+def test_geolite2_csv_lookup(tmp_path):
+    """GeoLite2 blocks use the Locations file; registered country is the fallback"""
+    (tmp_path / "GeoLite2-Country-Blocks-IPv4.csv").write_text(GEOLITE_BLOCKS)
+    (tmp_path / "GeoLite2-Country-Locations-en.csv").write_text(GEOLITE_LOCATIONS)
+    resolver = GeoIPResolver()
+
+    assert resolver.load(f"{tmp_path / 'missing.csv'},{tmp_path / 'GeoLite2-Country-Blocks-IPv4.csv'}") == 2
+    assert resolver.country_for("46.122.33.4") == "SI"
+    assert resolver.country_for("77.0.0.200") == "DE"
+
+def test_unknown_ip_resolved_remotely_in_background():
+    """The first request gets no country at once; later ones the cached remote answer"""
+    remote = FakeRemote({"8.8.8.8": "US", "9.9.9.9": RuntimeError("timeout")})
+    resolver = GeoIPResolver(remote_lookup=remote)
+
+    async def scenario():
+        first = [resolver.country_for("8.8.8.8"), resolver.country_for("8.8.8.8"), resolver.country_for("9.9.9.9")]
+        await resolver.wait_pending()
+        return first, [resolver.country_for("8.8.8.8"), resolver.country_for("9.9.9.9")]
+
+    first, later = asyncio.run(scenario())
+
+    assert first == [None, None, None]
+    assert later == ["US", None]
+    assert remote.calls == ["8.8.8.8", "9.9.9.9"]
+    assert resolver.stats()["remote_failures"] == 1
+
+def test_language_detection_never_waits_on_the_network():
+    """Private and malformed addresses never go remote; known countries map to languages"""
+    database = IPRangeDatabase([(ipaddress.ip_address("31.15.128.0"), ipaddress.ip_address("31.15.255.255"), "SI")])
+    remote = FakeRemote({})
+    service = LanguageService(GeoIPResolver(database, remote_lookup=remote))
+
+    async def detect(*addresses):
+        return [await service.detect_language_from_ip(address) for address in addresses]
+
+    assert asyncio.run(detect("31.15.130.1", "10.0.0.4", "192.168.1.1", "127.0.0.1", "localhost")) == \
+        ["sl", "en", "en", "en", "en"]
+    assert remote.calls == []
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Test the health probe registry: concurrency, deadlines and cached results
+"""
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from modules.core.health_probes import HealthProbeRegistry
+
+class CountingProbe:
+    def __init__(self, delay, status="healthy"):
+        self.delay = delay
+        self.status = status
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return {"status": self.status, "call": self.calls}
+
+def test_probes_run_concurrently_with_own_deadlines():
+    """Total latency is the slowest probe within its deadline, not the sum"""
+    registry = HealthProbeRegistry()
+    for name in ("a", "b", "c"):
+        registry.register(name, CountingProbe(0.1), timeout=1.0)
+    registry.register("hung", CountingProbe(10), timeout=0.2, failure={"status": "unhealthy"})
+
+    start = time.monotonic()
+    results = asyncio.run(registry.results())
+    elapsed = time.monotonic() - start
+
+    assert elapsed < 0.5
+    assert list(results) == ["a", "b", "c", "hung"]
+    assert results["a"]["status"] == "healthy"
+    assert results["hung"]["status"] == "unhealthy"
+    assert "0.2s" in results["hung"]["error"]
+    assert registry.timeouts == 1
+
+def test_cached_results_within_ttl_and_single_flight():
+    """Concurrent readers share one run; later reads hit the cache"""
+    registry = HealthProbeRegistry()
+    probe = CountingProbe(0.05)
+    registry.register("db", probe, ttl=60, group="system")
+    registry.register("other", CountingProbe(0), group="dashboard")
+
+    async def scenario():
+        first = await asyncio.gather(*(registry.results("system") for _ in range(5)))
+        again = await registry.results("system")
+        return first, again
+
+    first, again = asyncio.run(scenario())
+
+    assert probe.calls == 1
+    assert all(result["db"]["call"] == 1 for result in first)
+    assert list(again) == ["db"]
+    assert again["db"]["cache_age_seconds"] >= 0
+
+def test_stale_results_served_while_refreshing():
+    """An expired result is returned at once and refreshed in the background"""
+    registry = HealthProbeRegistry()
+    probe = CountingProbe(0.05)
+    registry.register("weather", probe, ttl=0)
+
+    async def scenario():
+        await registry.results()
+        stale = await registry.results()
+        await asyncio.sleep(0.1)
+        fresh = await registry.results()
+        return stale, fresh
+
+    stale, fresh = asyncio.run(scenario())
+
+    assert stale["weather"]["call"] == 1
+    assert fresh["weather"]["call"] == 2
+
+def test_refresher_keeps_cache_warm():
+    """The background refresher runs probes before any reader asks"""
+    registry = HealthProbeRegistry(refresh_interval=0.05)
+    probe = CountingProbe(0)
+    registry.register("redis", probe, ttl=0.1)
+
+    async def scenario():
+        registry.start_refresher()
+        await asyncio.sleep(0.3)
+        stats = registry.stats()
+        await registry.stop_refresher()
+        return stats
+
+    stats = asyncio.run(scenario())
+
+    assert probe.calls >= 3
+    assert stats["refresher_running"] is True
+    assert stats["probes"]["redis"]["status"] == "healthy"
+
+def test_refresher_skips_on_demand_probes():
+    """Billed probes run only when read, never from the background loop"""
+    registry = HealthProbeRegistry(refresh_interval=0.05)
+    free, paid = CountingProbe(0), CountingProbe(0)
+    registry.register("redis", free, ttl=0.1)
+    registry.register("openai", paid, ttl=0.1, on_demand=True)
+
+    async def scenario():
+        registry.start_refresher()
+        await asyncio.sleep(0.2)
+        calls_before_read = paid.calls
+        result = await registry.results()
+        await registry.stop_refresher()
+        return calls_before_read, result
+
+    calls_before_read, result = asyncio.run(scenario())
+
+    assert free.calls >= 2
+    assert calls_before_read == 0
+    assert paid.calls == 1 and result["openai"]["status"] == "healthy"
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Test the shared multi-keyword matcher and the extractors built on it
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from modules.core.keyword_matcher import KeywordMatcher
+from modules.cava.agricultural_vocabulary import get_agricultural_matcher
+from modules.cava.fact_extractor import FactExtractor
+from modules.cava.memory_enforcer import MemoryEnforcer
+
+def test_overlapping_keywords_keep_substring_semantics():
+    """Prefixes, overlaps and repeated keywords are all reported, like `in` checks"""
+    matcher = KeywordMatcher({
+        'crop': ['tomato', 'tomatoes', 'grain'],
+        'weather': ['rain', 'rainfall'],
+        'problem': ['pest']
+    })
+
+    hits = matcher.scan("Heavy RAINFALL on the grain; tomatoes need a pesticide")
+
+    assert hits == {
+        'weather': ('rain', 'rainfall'),
+        'crop': ('grain', 'tomato', 'tomatoes'),
+        'problem': ('pest',)
+    }
+    assert matcher.scan("") == {}
+
+def test_translations_report_canonical_terms():
+    """Slovenian, Croatian and Bulgarian stems map to one English name"""
+    hits = get_agricultural_matcher().scan("Koruza in pšenica, kukuruz, царевицата и доматите")
+
+    assert hits['crop'] == ('corn', 'wheat', 'tomato')
+
+def test_dotted_capital_i_does_not_break_the_scan():
+    """'İ' lower-cases to two code points; the scan still reports plain keywords"""
+    hits = get_agricultural_matcher().scan("İrrigation for the İZMİR tomatoes")
+
+    assert hits['intent:irrigation'] == ('irrigation',)
+    assert 'tomato' in hits['crop']
+    assert FactExtractor().extract_facts_locally("İrrigation tomorrow?") is not None
+
+def test_scan_results_are_cached_per_text():
+    """Re-scanning the same message is a cache hit and returns an independent dict"""
+    matcher = KeywordMatcher({'crop': ['mango']})
+    first = matcher.scan("mango")
+    first['crop'] = ()
+
+    assert matcher.scan("mango") == {'crop': ('mango',)}
+    assert matcher.stats()['cache_hits'] == 1
+
+def test_fact_extractor_intent_and_dates():
+    """Intent priority and date references come from one vocabulary scan"""
+    extractor = FactExtractor()
+
+    assert extractor.identify_agricultural_intent("When harvest? Also some pest issues") == 'harvest_timing'
+    assert extractor.identify_agricultural_intent("Kdaj naj škropim?") == 'pest_control'
+    assert extractor.identify_agricultural_intent("ok thanks") is None
+
+    dates = extractor.extract_dates("Sprayed today, will check in September or march")
+    assert dates['month_mentioned'] == 'march'
+    assert 'reference_date' in dates
+
+def test_time_is_not_weather():
+    """'vreme'/'vrijeme' also means "time" in SR/HR/BS; only weather phrases count"""
+    extractor = FactExtractor()
+
+    assert extractor.identify_agricultural_intent("Nemam vremena danas") is None
+    assert extractor.identify_agricultural_intent("Vrijeme je za prskanje") == 'pest_control'
+    assert extractor.identify_agricultural_intent("Kakvo je vrijeme sutra?") == 'weather'
+    assert extractor.identify_agricultural_intent("Kakšno bo vreme jutri?") == 'weather'
+    assert extractor.identify_agricultural_intent("Kakva je vremenska prognoza?") == 'weather'
+
+def test_memory_enforcer_uses_matcher_for_unusual_crops():
+    """Mango in Bulgaria (in either language) is flagged as unusual"""
+    context = {'messages': [
+        {'role': 'user', 'content': "My name is Ivan, I grow 10 ha of манго in България"}
+    ]}
+
+    facts = MemoryEnforcer.extract_critical_facts(context)
+
+    assert facts['farmer_name'] == 'Ivan'
+    assert facts['quantities'] == {'10_ha': '10 ha'}
+    assert facts['unusual_aspects'] == ["tropical fruit in temperate climate"]
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Test keyset pagination cursors and predicates
+"""
+import sys
+from datetime import date, datetime
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from modules.core.pagination import (
+    InvalidCursorError, build_page, clamp_page_size, decode_cursor,
+    encode_cursor, keyset_predicate
+)
+
+def test_cursor_round_trip_preserves_types():
+    """Dates, datetimes and NULL sort values survive encoding"""
+    for value in (date(2024, 5, 1), datetime(2024, 5, 1, 12, 30, 5), None, 42):
+        assert decode_cursor(encode_cursor(value, 17)) == (value, 17)
+
+def test_malformed_cursor_rejected():
+    """Garbage cursors raise InvalidCursorError"""
+    with pytest.raises(InvalidCursorError):
+        decode_cursor("not-a-cursor")
+
+def test_keyset_predicate_for_dated_and_null_cursor():
+    """Dated cursors compare on (sort, id); NULL cursors stay in the NULL group first"""
+    assert keyset_predicate("t.planned_date", "t.id", None) == ("", ())
+    
+    sql, params = keyset_predicate("t.planned_date", "t.id", encode_cursor(date(2024, 1, 2), 9))
+    assert sql == "(t.planned_date < %s OR (t.planned_date = %s AND t.id < %s))"
+    assert params == (date(2024, 1, 2), date(2024, 1, 2), 9)
+    
+    sql, params = keyset_predicate("t.planned_date", "t.id", encode_cursor(None, 9))
+    assert "t.planned_date IS NULL AND t.id < %s" in sql
+    assert params == (9,)
+
+def test_build_page_emits_cursor_only_when_more_rows():
+    """LIMIT n+1 results yield a cursor at the last row of the page"""
+    rows = [(date(2024, 1, 3 - i), 10 - i) for i in range(3)]
+    page, cursor = build_page(rows, 2, sort_index=0, id_index=1)
+    assert page == rows[:2]
+    assert decode_cursor(cursor) == (date(2024, 1, 2), 9)
+    
+    page, cursor = build_page(rows, 3, sort_index=0, id_index=1)
+    assert page == rows and cursor is None
+
+def test_clamp_page_size():
+    assert clamp_page_size(None) == 50
+    assert clamp_page_size(0, default=100) == 100
+    assert clamp_page_size(10_000) == 200
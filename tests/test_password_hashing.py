@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Test versioned password hashing and rehash-on-login
+"""
+import asyncio
+import hashlib
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from modules.auth.password_hashing import (
+    check_password, hash_password, needs_rehash, verify_password_async
+)
+
+def _legacy_hash(password: str, salt: str = "abcd") -> str:
+    key = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt.encode('utf-8'), 100000)
+    return f"pbkdf2_sha256${salt}${key.hex()}"
+
+def test_new_hash_is_versioned_and_verifies():
+    hashed = hash_password("Semillon2024")
+    assert hashed.split('$')[0] == 'pbkdf2_sha256' and len(hashed.split('$')) == 4
+    assert check_password("Semillon2024", hashed)
+    assert not check_password("wrong", hashed)
+    assert not needs_rehash(hashed)
+
+def test_legacy_hash_verifies_and_is_upgraded():
+    """Existing three-part hashes still log in and come back in the versioned format"""
+    legacy = _legacy_hash("Vitovska!")
+    assert needs_rehash(legacy)
+    
+    valid, new_hash = asyncio.run(verify_password_async("Vitovska!", legacy))
+    assert valid
+    assert new_hash and check_password("Vitovska!", new_hash)
+    
+    valid, new_hash = asyncio.run(verify_password_async("nope", legacy))
+    assert not valid and new_hash is None
+
+def test_unknown_format_rejected():
+    assert not check_password("x", "md5$abc")
+    assert not check_password("x", "")
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Test the shared E.164 prefix trie and the callers built on it
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from modules.core.language_service import LanguageService
+from modules.core.phone_prefixes import DialingCode, PhonePrefixTrie, normalize_number, resolve_phone_number
+from modules.utils.phone_country_detector import detect_country_from_phone
+
+def test_numbers_are_normalized_once():
+    """Spaces, dashes, a missing '+' and the 00 international prefix all give E.164"""
+    assert normalize_number("+386 40-123 456") == "+38640123456"
+    assert normalize_number("00386 40 123 456") == "+38640123456"
+    assert normalize_number("38640123456") == "+38640123456"
+    assert normalize_number("(+359) 888 123") == "+359888123"
+    assert normalize_number("") == ""
+
+def test_longest_calling_code_wins():
+    """+1 and +7 do not swallow longer codes; 4-digit prefixes are walked in one pass"""
+    trie = PhonePrefixTrie([DialingCode('+1', 'United States/Canada', 'US', 'en'),
+                            DialingCode('+1876', 'Jamaica', 'JM', 'en'),
+                            DialingCode('+35', 'Nowhere', 'ZZ', None),
+                            DialingCode('+359', 'Bulgaria', 'BG', 'bg')])
+
+    assert trie.resolve("+1 876 555 0101").dialing_code.country == "Jamaica"
+    assert trie.resolve("+1 555 0101").dialing_code.country == "United States/Canada"
+    assert trie.resolve("+359 888").dialing_code.iso_code == "BG"
+    assert trie.resolve("+358 40").dialing_code.code == "+35"
+    assert trie.resolve("+44 20").dialing_code is None
+
+def test_repeat_senders_are_memoized():
+    trie = PhonePrefixTrie()
+    for _ in range(3):
+        trie.resolve("+38640123456")
+
+    assert trie.stats() == {"cache_hits": 2, "cache_misses": 1, "cached_numbers": 1}
+
+def test_callers_share_the_table():
+    """Language, country name and registration country come from one resolution"""
+    service = LanguageService()
+
+    assert resolve_phone_number("+38640123456").dialing_code.code == "+386"
+    assert service.detect_language_from_whatsapp("+385 91 234 5678") == "hr"
+    assert service.detect_language_from_whatsapp("+86 10 1234 5678") == "en"
+    assert service.get_whatsapp_country_from_number("+43 660 123") == "Austria"
+    assert service.get_whatsapp_country_from_number("+999 1") is None
+    assert detect_country_from_phone("359 888 123 456") == "Bulgaria"
+    assert detect_country_from_phone("") == ""
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Test streaming query export encoding, caps and cursor handling
+"""
+import json
+import sys
+from datetime import datetime
+from decimal import Decimal
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from modules.core.query_export import ExportLimits, open_export, stream_export
+
+COLUMNS = ["id", "name", "created_at"]
+
+def _rows(count):
+    for i in range(count):
+        yield (i, f"farmer, {i}", datetime(2024, 5, 1, 12, 0))
+
+class FakeCursor:
+    def __init__(self, rows):
+        self.rows = list(rows)
+        self.description = None
+        self.itersize = None
+        self.closed = False
+        self.executed = []
+
+    def execute(self, query, params=None):
+        self.query = query
+        self.executed.append(query)
+
+    def fetchone(self):
+        self.description = [(name,) for name in COLUMNS]
+        return self.rows.pop(0) if self.rows else None
+
+    def __iter__(self):
+        while self.rows:
+            yield self.rows.pop(0)
+
+    def close(self):
+        self.closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class FakeConnection:
+    def __init__(self, rows):
+        self.named = FakeCursor(rows)
+        self.setup = FakeCursor([])
+        self.rolled_back = self.closed = False
+
+    def cursor(self, name=None):
+        return self.named if name else self.setup
+
+    def rollback(self):
+        self.rolled_back = True
+
+    def close(self):
+        self.closed = True
+
+def test_csv_export_quotes_values_and_chunks():
+    """CSV output has a header, proper quoting, and is emitted in chunks"""
+    chunks = list(stream_export(COLUMNS, _rows(1000), "csv", chunk_size=1024))
+    body = b"".join(chunks).decode()
+
+    assert len(chunks) > 1
+    assert body.splitlines()[0] == "id,name,created_at"
+    assert body.splitlines()[1] == '0,"farmer, 0",2024-05-01T12:00:00'
+    assert len(body.splitlines()) == 1001
+
+def test_row_cap_truncates_with_marker():
+    """Exports stop at max_rows and say so in-band"""
+    lines = b"".join(stream_export(COLUMNS, _rows(50), "ndjson", ExportLimits(max_rows=10))).splitlines()
+
+    assert len(lines) == 11
+    assert json.loads(lines[0]) == {"id": 0, "name": "farmer, 0", "created_at": "2024-05-01T12:00:00"}
+    assert json.loads(lines[-1])["_truncated"] is True
+
+def test_byte_cap_truncates_csv():
+    """The byte cap bounds the response size"""
+    body = b"".join(stream_export(COLUMNS, _rows(1000), "csv", ExportLimits(max_bytes=2000)))
+    assert len(body) < 2100
+    assert body.decode().rstrip().splitlines()[-1].startswith("# export truncated")
+
+def test_ndjson_handles_decimal_and_null():
+    """Numeric and NULL values survive JSON encoding"""
+    line = b"".join(stream_export(["total", "note"], iter([(Decimal("12.50"), None)]), "ndjson"))
+    assert json.loads(line) == {"total": 12.5, "note": None}
+
+def test_server_side_cursor_released_on_early_stop():
+    """Stopping the stream early closes the named cursor and connection"""
+    conn = FakeConnection(_rows(100))
+    columns, rows = open_export("SELECT * FROM farmers", connection_factory=lambda: conn)
+
+    assert columns == COLUMNS
+    assert conn.named.itersize == ExportLimits().fetch_size
+    list(stream_export(columns, rows, "csv", ExportLimits(max_rows=5)))
+
+    assert conn.named.closed and conn.rolled_back and conn.closed
+
+def test_export_runs_read_only_under_statement_timeout():
+    conn = FakeConnection(_rows(1))
+    open_export("SELECT * FROM farmers", limits=ExportLimits(statement_timeout_ms=1500),
+                connection_factory=lambda: conn)
+
+    assert conn.setup.executed == ["SET TRANSACTION READ ONLY", "SET LOCAL statement_timeout = 1500"]
+    assert conn.named.executed == ["SELECT * FROM farmers"]
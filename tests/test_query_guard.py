@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Test the EXPLAIN-based guard for LLM-generated SQL
+"""
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from modules.core.query_guard import (
+    GuardLimits, QueryRejected, guard_query, guard_query_async, open_guarded_export, parse_plan,
+    run_guarded_select
+)
+
+LIMITS = GuardLimits(max_cost=1000, max_rows=500, auto_limit=100, on_exceed='limit', statement_timeout_ms=2000)
+
+def _plan(cost, rows, node="Seq Scan", children=()):
+    plan = {"Node Type": node, "Total Cost": cost, "Plan Rows": rows, "Plans": list(children)}
+    if node == "Seq Scan":
+        plan["Relation Name"] = "fields"
+    return [{"Plan": plan}]
+
+class FakeExplain:
+    """Returns a plan per statement: the first for the raw query, the second after LIMIT"""
+
+    def __init__(self, *plans):
+        self.plans = list(plans)
+        self.statements = []
+
+    def __call__(self, statement):
+        self.statements.append(statement)
+        return (self.plans.pop(0),)
+
+def test_parse_plan_collects_seq_scans():
+    """Both the psycopg2 row and asyncpg JSON text are understood"""
+    raw = _plan(50.0, 10, "Hash Join", [_plan(10, 5)[0]["Plan"], _plan(20, 5, "Index Scan")[0]["Plan"]])
+    stats = parse_plan((raw,))
+
+    assert stats.node_type == "Hash Join"
+    assert stats.seq_scans == ("fields",)
+    assert parse_plan(json.dumps(raw)) == stats
+
+def test_cheap_query_runs_unchanged():
+    explain = FakeExplain(_plan(12.5, 40))
+    guarded = guard_query("SELECT * FROM fields;", explain, LIMITS)
+
+    assert guarded.sql == "SELECT * FROM fields"
+    assert not guarded.limited
+    assert explain.statements == ["EXPLAIN (FORMAT JSON) SELECT * FROM fields"]
+
+def test_large_result_is_auto_limited():
+    """Too many estimated rows: wrapped in a LIMIT and planned again"""
+    explain = FakeExplain(_plan(900, 50000), _plan(2.0, 100, "Limit"))
+    guarded = guard_query("SELECT * FROM chat_messages", explain, LIMITS)
+
+    assert guarded.limited
+    assert guarded.sql == "SELECT * FROM (SELECT * FROM chat_messages) AS guarded_query LIMIT 100"
+    assert guarded.stats.plan_rows == 100
+
+def test_blocking_plan_rejected_even_with_limit():
+    """A cross join with a sort stays expensive under LIMIT and is rejected"""
+    explain = FakeExplain(_plan(5e7, 1e9, "Sort"), _plan(4.9e7, 100, "Limit"))
+    with pytest.raises(QueryRejected) as exc:
+        guard_query("SELECT * FROM fields, tasks ORDER BY 1", explain, LIMITS)
+    assert exc.value.stats.total_cost == 4.9e7
+
+def test_reject_mode_and_writes_never_limited():
+    explain = FakeExplain(_plan(5000, 10))
+    with pytest.raises(QueryRejected):
+        guard_query("SELECT * FROM fields", explain, LIMITS._replace(on_exceed='reject'))
+
+    explain = FakeExplain(_plan(5000, 10, "ModifyTable"))
+    with pytest.raises(QueryRejected):
+        guard_query("DELETE FROM tasks WHERE status = 'done'", explain, LIMITS)
+
+def test_async_guard_matches_sync():
+    async def fetchval(statement):
+        return json.dumps(_plan(3.0, 1))
+
+    guarded = asyncio.run(guard_query_async("SELECT 1", fetchval, LIMITS))
+    assert guarded.sql == "SELECT 1" and guarded.stats.total_cost == 3.0
+
+class FakeCursor:
+    def __init__(self, plans):
+        self.plans = list(plans)
+        self.statements = []
+        self.description = [("id",)]
+
+    def execute(self, statement, params=None):
+        self.statements.append(statement)
+
+    def fetchone(self):
+        return (self.plans.pop(0),)
+
+    def fetchall(self):
+        return [(1,), (2,)]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+class FakeConnection:
+    def __init__(self, plans):
+        self.cur = FakeCursor(plans)
+        self.rolled_back = self.closed = False
+
+    def cursor(self):
+        return self.cur
+
+    def rollback(self):
+        self.rolled_back = True
+
+    def close(self):
+        self.closed = True
+
+def test_run_guarded_select_is_read_only_with_timeout():
+    conn = FakeConnection([_plan(10, 2)])
+    result = run_guarded_select("SELECT id FROM farmers", limits=LIMITS, connection_factory=lambda: conn)
+
+    assert result["success"] and result["rows"] == [(1,), (2,)]
+    assert result["plan"]["total_cost"] == 10
+    assert conn.cur.statements[:2] == ["SET TRANSACTION READ ONLY", "SET LOCAL statement_timeout = 2000"]
+    assert conn.rolled_back and conn.closed
+
+def test_run_guarded_select_reports_rejection():
+    conn = FakeConnection([_plan(5e7, 10, "Sort"), _plan(5e7, 10, "Limit")])
+    result = run_guarded_select("SELECT * FROM a, b ORDER BY 1", limits=LIMITS, connection_factory=lambda: conn)
+
+    assert not result["success"] and result["rejected"]
+    assert "cost" in result["error"]
+    assert len(conn.cur.statements) == 4  # no execution after the two EXPLAINs
+
+class FakeAsyncConnection:
+    """asyncpg-style connection recording executed statements"""
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.statements = []
+        self.open_transaction = False
+
+    async def execute(self, statement):
+        self.statements.append(statement)
+        if statement.startswith("BEGIN"):
+            if self.fail:
+                self.open_transaction = True
+                raise RuntimeError("canceling statement due to statement timeout")
+            self.open_transaction = "COMMIT" not in statement
+        elif statement == "ROLLBACK":
+            self.open_transaction = False
+        return "COMMIT"
+
+    def is_in_transaction(self):
+        return self.open_transaction
+
+def test_transaction_scripts_are_bounded():
+    """BEGIN ... COMMIT scripts run under a session timeout and keep the WHERE check"""
+    from llm_integration import execute_llm_generated_query
+
+    script = "BEGIN;\nINSERT INTO tasks (task_type) VALUES ('spray');\nCOMMIT;"
+    conn = FakeAsyncConnection()
+    result = asyncio.run(execute_llm_generated_query(script, conn))
+
+    assert result["status"] == "success"
+    assert conn.statements[0].startswith("SET statement_timeout = ")
+    assert conn.statements[1:] == [script, "RESET statement_timeout"]
+
+    failing = FakeAsyncConnection(fail=True)
+    result = asyncio.run(execute_llm_generated_query(script, failing))
+    assert result["status"] == "error"
+    assert failing.statements[-2:] == ["ROLLBACK", "RESET statement_timeout"]
+
+    unbounded = FakeAsyncConnection()
+    result = asyncio.run(execute_llm_generated_query("BEGIN;\n-- wipe\nDELETE FROM tasks;\nCOMMIT;", unbounded))
+    assert result["requires_confirmation"] and "DELETE" in result["error"]
+    assert unbounded.statements == []
+
+class ExportCursor(FakeCursor):
+    """Server-side cursor side of an export"""
+
+    itersize = None
+
+    def fetchone(self):
+        return (1,)
+
+    def __iter__(self):
+        return iter([(2,), (3,)])
+
+    def close(self):
+        pass
+
+class ExportConnection(FakeConnection):
+    def __init__(self, plans):
+        super().__init__(plans)
+        self.named = ExportCursor([])
+
+    def cursor(self, name=None):
+        return self.named if name else self.cur
+
+def test_export_is_planned_and_limited_in_its_transaction():
+    """Generated SQL exports get the guard's timeout and auto-LIMIT before streaming"""
+    conn = ExportConnection([_plan(900, 50000), _plan(2.0, 100, "Limit")])
+    columns, rows = open_guarded_export("SELECT id FROM chat_messages", limits=LIMITS,
+                                        connection_factory=lambda: conn)
+
+    assert columns == ["id"] and list(rows) == [(1,), (2,), (3,)]
+    assert conn.cur.statements[:2] == ["SET TRANSACTION READ ONLY", "SET LOCAL statement_timeout = 2000"]
+    assert conn.named.statements == ["SELECT * FROM (SELECT id FROM chat_messages) AS guarded_query LIMIT 100"]
+    assert conn.rolled_back and conn.closed
+
+def test_export_rejected_before_streaming():
+    conn = ExportConnection([_plan(5e7, 10, "Sort"), _plan(5e7, 10, "Limit")])
+    with pytest.raises(QueryRejected):
+        open_guarded_export("SELECT * FROM a, b ORDER BY 1", limits=LIMITS, connection_factory=lambda: conn)
+
+    assert conn.named.statements == []
+    assert conn.rolled_back and conn.closed
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Test the compiled route classifier against the original loop-based checks
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from modules.core.global_auth import PUBLIC_PATHS
+from modules.core.route_classifier import (
+    EXEMPT_ENDPOINTS, TRACKED_ENDPOINTS, RouteClassifier
+)
+
+PATHS = [
+    "/", "//", "/auth/signin", "/auth/signin/", "/auth/signinx", "/static", "/static/css/app.css",
+    "/staticfoo", "/farmer/dashboard", "/farmer/api/fields", "/farmer/other", "/health",
+    "/healthz", "/dashboards/database/llm/query", "/api/v1/chat", "/api/v1/chatbot",
+    "/api/v1/payment/subscribe", "/api/v1/whatsapp/webhook", "/whatsapp/webhook/status",
+    "/webhooks/stripe", "/docs", "/api/v1/weather/current", "/admin", "",
+]
+
+def legacy_is_public(path):
+    return any(path == p or path.startswith(p + "/") for p in PUBLIC_PATHS)
+
+def legacy_should_track(path):
+    if any(path.startswith(e) for e in EXEMPT_ENDPOINTS):
+        return False
+    if any(path.startswith(t) for t in TRACKED_ENDPOINTS):
+        return True
+    return '/whatsapp' in path and '/webhook' in path
+
+def test_classifier_matches_legacy_semantics():
+    classifier = RouteClassifier(PUBLIC_PATHS, EXEMPT_ENDPOINTS, TRACKED_ENDPOINTS)
+    for path in PATHS:
+        verdict = classifier.classify(path)
+        assert verdict.is_public == legacy_is_public(path), path
+        assert verdict.track_usage == legacy_should_track(path), path
+
+def test_verdicts_are_cached():
+    classifier = RouteClassifier(PUBLIC_PATHS, EXEMPT_ENDPOINTS, TRACKED_ENDPOINTS)
+    classifier.classify("/farmer/dashboard")
+    classifier.classify("/farmer/dashboard")
+    assert classifier.cache_info().hits == 1
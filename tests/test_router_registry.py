@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Test the router registry: profiles, lazy feature groups and path matching
+"""
+import sys
+import types
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+
+from modules.core.router_registry import LazyRouterMiddleware, RouterRegistry, RouterSpec
+
+def fake_router_module(name, path):
+    """Register an importable module whose ``router`` serves ``path``"""
+    router = APIRouter()
+
+    @router.get(path)
+    async def endpoint():
+        return {"module": name}
+
+    module = types.ModuleType(name)
+    module.router = router
+    sys.modules[name] = module
+    return name
+
+def build_app():
+    app = FastAPI()
+    registry = RouterRegistry(app, profiles={"production": ["core"], "diagnostics": ["core", "debug"]})
+    registry.add_group("core", [RouterSpec(fake_router_module("fake_core_routes", "/api/v1/farmers"))])
+    registry.add_group("debug", [
+        RouterSpec(fake_router_module("fake_debug_routes", "/debug/env")),
+        RouterSpec(fake_router_module("fake_prefixed_routes", "/check"), prefix="/api/debug")
+    ], paths=("/debug", "/api/debug"))
+    app.add_middleware(LazyRouterMiddleware, registry=registry)
+    return app, registry
+
+def test_profile_loads_only_its_groups():
+    """Production includes core only; unknown profiles fall back to production"""
+    app, registry = build_app()
+
+    assert registry.load_profile("staging") == ["core"]
+    paths = {route.path for route in app.routes}
+    assert "/api/v1/farmers" in paths
+    assert "/debug/env" not in paths
+    assert registry.stats()["groups"]["debug"]["loaded"] is False
+
+def test_lazy_group_loads_on_first_matching_request():
+    """The first request under a group's prefix includes the group, then is served"""
+    app, registry = build_app()
+    registry.load_profile("production")
+    client = TestClient(app)
+
+    assert client.get("/api/v1/farmers").json() == {"module": "fake_core_routes"}
+    assert registry.groups["debug"].loaded is False
+
+    assert client.get("/api/debug/check").json() == {"module": "fake_prefixed_routes"}
+    assert client.get("/debug/env").status_code == 200
+    assert registry.routers_included == 3
+    assert "/debug/env" in client.get("/openapi.json").json()["paths"]
+
+def test_pending_group_matches_whole_path_segments():
+    """"/debugger" is not under "/debug"; loaded groups are never pending"""
+    app, registry = build_app()
+
+    assert registry.pending_group_for("/debug") == "debug"
+    assert registry.pending_group_for("/debug/env") == "debug"
+    assert registry.pending_group_for("/debugger") is None
+
+    registry.load("debug")
+    assert registry.pending_group_for("/debug/env") is None
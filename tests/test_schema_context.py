@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Test the shared schema digest, precompiled prompt templates and provider caching
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from modules.core.schema_context import (
+    FINGERPRINT_QUERY, PromptTemplate, SchemaContextProvider, build_digest
+)
+
+ROWS = [
+    ("audit_log", "id", "integer", True, None, 900000),
+    ("audit_log", "payload", "jsonb", False, None, 900000),
+    ("farmers", "id", "integer", True, None, 4),
+    ("farmers", "manager_name", "character varying(100)", False, None, 4),
+    ("fields", "id", "integer", True, None, 53),
+    ("fields", "farmer_id", "integer", False, "farmers", 53),
+    ("business_rollup_state", "name", "text", True, None, 1),
+]
+
+class FakeCursor:
+    def __init__(self, db):
+        self.db = db
+
+    def execute(self, query):
+        if self.db.fail:
+            raise RuntimeError("connection refused")
+        self.result = [(self.db.fingerprint,)] if query == FINGERPRINT_QUERY else self.db.rows
+
+    def fetchall(self):
+        return self.result
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+class FakeDatabase:
+    def __init__(self):
+        self.fingerprint = "v1"
+        self.rows = ROWS
+        self.fail = False
+
+    def connect(self):
+        return self
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def close(self):
+        pass
+
+def test_digest_is_compact_and_marks_keys():
+    """Priority tables first, PK/FK markers, bookkeeping tables excluded"""
+    digest = build_digest(ROWS, "v1")
+    lines = digest.text.splitlines()
+
+    assert lines[0] == "farmers(id int PK, manager_name varchar) ~4 rows"
+    assert lines[1] == "fields(id int PK, farmer_id int→farmers) ~53 rows"
+    assert "business_rollup_state" not in digest.text
+    assert digest.tables == ("farmers", "fields", "audit_log")
+
+def test_digest_respects_token_budget():
+    """Tables past the budget are named but their columns are omitted"""
+    digest = build_digest(ROWS, "v1", token_budget=30)
+
+    assert digest.omitted_tables == ("audit_log",)
+    assert digest.text.splitlines()[-1] == "Other tables (columns omitted): audit_log"
+
+def test_template_binds_schema_once_per_fingerprint():
+    """Literal braces survive and {schema} is rebound only when the digest changes"""
+    template = PromptTemplate('Schema:\n{schema}\nQ: {question}\nJSON: {{"sql": "..."}}')
+    first = build_digest(ROWS, "v1")
+
+    rendered = template.render(first, question="how many farmers?")
+    assert rendered == f'Schema:\n{first.text}\nQ: how many farmers?\nJSON: {{"sql": "..."}}'
+    bound = template._bound_segments
+    template.render(first, question="again")
+    assert template._bound_segments is bound
+
+    second = build_digest(ROWS[:4], "v2")
+    assert "fields(" not in template.render(second, question="x")
+    assert template.render(None, schema="fallback", question="x").startswith("Schema:\nfallback\n")
+
+def test_provider_introspects_only_after_ddl_change():
+    """Fingerprint checks are throttled; introspection repeats only when the fingerprint changes"""
+    db = FakeDatabase()
+    provider = SchemaContextProvider(connection_factory=db.connect, check_interval=0)
+
+    provider.get_digest()
+    provider.get_digest()
+    assert provider.stats["fingerprint_checks"] == 2
+    assert provider.stats["introspections"] == 1
+
+    db.fingerprint = "v2"
+    assert provider.get_digest().fingerprint == "v2"
+    assert provider.stats["introspections"] == 2
+
+    throttled = SchemaContextProvider(connection_factory=db.connect, check_interval=3600)
+    throttled.get_digest()
+    throttled.get_digest()
+    assert throttled.stats == {"fingerprint_checks": 1, "introspections": 1, "cache_hits": 1}
+
+def test_fingerprint_covers_table_and_column_names():
+    """A RENAME COLUMN/TABLE must change the fingerprint, not just added or dropped columns"""
+    assert "a.attname" in FINGERPRINT_QUERY
+    assert "c.relname" in FINGERPRINT_QUERY
+
+def test_provider_keeps_last_digest_when_database_fails():
+    """A failing catalog query never breaks prompt rendering"""
+    db = FakeDatabase()
+    provider = SchemaContextProvider(connection_factory=db.connect, check_interval=0)
+    template = PromptTemplate("{schema}|{q}")
+
+    assert provider.render(template, fallback_schema="static", q=1).startswith("farmers(")
+    db.fail = True
+    assert provider.render(template, fallback_schema="static", q=1).startswith("farmers(")
+
+    cold = SchemaContextProvider(connection_factory=db.connect, check_interval=0)
+    assert cold.render(template, fallback_schema="static", q=1) == "static|1"
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Test the pluggable session store and its use by the registration flow
+"""
+import asyncio
+import fnmatch
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from modules.core.session_store import (
+    MemorySessionStore, RedisSessionStore, SessionStore, TimerWheel, dumps_session, loads_session
+)
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+class FakeRedis:
+    """Just the commands RedisSessionStore uses; TTLs are recorded, not enforced"""
+
+    def __init__(self):
+        self.data = {}
+        self.ttls = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value
+        self.ttls[key] = ex
+
+    def delete(self, key):
+        return 1 if self.data.pop(key, None) is not None else 0
+
+    def scan_iter(self, match, count=None):
+        return [key for key in list(self.data) if fnmatch.fnmatch(key, match)]
+
+    def mget(self, keys):
+        return [self.data.get(key) for key in keys]
+
+    def scan(self, cursor, match, count=None):
+        """Pages of ``count`` keys; the cursor is the offset of the next page"""
+        keys = [key for key in list(self.data) if fnmatch.fnmatch(key, match)]
+        page = keys[cursor:cursor + count]
+        next_cursor = cursor + count if cursor + count < len(keys) else 0
+        return next_cursor, page
+
+def test_idle_sessions_expire():
+    clock = FakeClock()
+    store = MemorySessionStore("test", ttl_seconds=300, clock=clock)
+    store.set("a", {"n": 1})
+    store.set("b", {"n": 2}, ttl_seconds=3600)
+
+    clock.now += 299
+    assert store.get("a") == {"n": 1}
+    clock.now += 2
+    assert store.get("a") is None
+    assert "b" in store
+    assert store.stats()["expired"] == 1
+
+def test_set_restarts_ttl():
+    clock = FakeClock()
+    store = MemorySessionStore("test", ttl_seconds=300, clock=clock)
+    store.set("a", {})
+    clock.now += 200
+    store.set("a", {"touched": True})
+    clock.now += 200
+    assert store.get("a") == {"touched": True}
+
+def test_expiry_only_visits_due_buckets():
+    """Expiring a handful of sessions does not inspect the long-lived ones"""
+    wheel = TimerWheel(tick_seconds=1.0, slots=64, now=0.0)
+    for i in range(1000):
+        wheel.schedule(f"long{i}", 50.0)
+    wheel.schedule("short", 5.0)
+
+    checked = []
+
+    def is_expired(key):
+        checked.append(key)
+        return True
+
+    assert wheel.advance(10.0, is_expired) == ["short"]
+    assert checked == ["short"]
+
+def test_lru_bound():
+    store = MemorySessionStore("test", ttl_seconds=300, max_entries=2, clock=FakeClock())
+    store.set("a", 1)
+    store.set("b", 2)
+    store.get("a")
+    store.set("c", 3)
+
+    assert "a" in store and "c" in store and "b" not in store
+    assert store.stats()["evicted"] == 1
+
+def test_incomplete_backend_fails_on_creation():
+    """A backend missing part of the interface cannot be instantiated"""
+    class GetOnlyStore(SessionStore):
+        def get(self, key, default=None):
+            return default
+
+    with pytest.raises(TypeError):
+        GetOnlyStore()
+
+def test_serialisation_round_trips_datetimes():
+    session = {"created_at": datetime(2025, 3, 1, 8, 30), "history": [{"message": "hi"}]}
+    assert loads_session(dumps_session(session)) == session
+
+def test_registration_survives_a_different_worker():
+    """Two RegistrationFlow instances sharing Redis behave like one process"""
+    from modules.cava.registration_flow import RegistrationFlow
+
+    redis = FakeRedis()
+    worker_a, worker_b = RegistrationFlow(), RegistrationFlow()
+    worker_a.sessions = RedisSessionStore(redis, "registration_flow", 300)
+    worker_b.sessions = RedisSessionStore(redis, "registration_flow", 300)
+
+    async def conversation():
+        assert (await worker_a.process_message("farmer-1", ""))["stage"] == "name"
+        assert (await worker_b.process_message("farmer-1", "Test Farmer"))["stage"] == "whatsapp"
+        assert (await worker_a.process_message("farmer-1", "+359123456789"))["stage"] == "email"
+
+    asyncio.run(conversation())
+    assert asyncio.run(worker_b.get_session_data("farmer-1"))["name"] == "Test Farmer"
+    assert redis.ttls["ava:session:registration_flow:farmer-1"] == 300
+    assert len(worker_a.sessions) == 1
+
+def test_registration_never_stores_the_password_and_drops_finished_sessions():
+    from modules.cava.registration_flow import RegistrationFlow
+
+    redis = FakeRedis()
+    flow = RegistrationFlow()
+    flow.sessions = RedisSessionStore(redis, "registration_flow", 300)
+    key = "ava:session:registration_flow:farmer-1"
+    stored = []
+
+    async def conversation():
+        for message in ["", "Test Farmer", "+359123456789", "farmer@example.com", "s3cret-pass"]:
+            await flow.process_message("farmer-1", message)
+            stored.append(redis.data[key])
+        mismatch = await flow.process_message("farmer-1", "other-pass")
+        stored.append(redis.data[key])
+        done = await flow.process_message("farmer-1", "s3cret-pass")
+        return mismatch, done
+
+    mismatch, done = asyncio.run(conversation())
+
+    assert mismatch["error"] and mismatch["stage"] == "confirm_password"
+    assert done["registration_complete"]
+    assert not any("s3cret-pass" in raw or "other-pass" in raw for raw in stored)
+    assert "password_hash" in loads_session(stored[-1])["data"]
+    assert key not in redis.data
+
+def test_cava_engine_hashes_passwords_and_saves_under_the_real_session_id():
+    from modules.cava.cava_registration_engine import CAVARegistrationEngine, new_registration_session
+
+    engine = CAVARegistrationEngine()
+    engine.sessions = MemorySessionStore("cava_registration", ttl_seconds=300, clock=FakeClock())
+    session = new_registration_session()
+    session['conversation_history'].append({'role': 'user', 'content': 'my password is s3cret-pass'})
+
+    async def scenario():
+        await engine._update_session_data(session, {'extracted_data': {
+            'first_name': 'Ana', 'password': 's3cret-pass', 'password_confirmation': 's3cret-pass'
+        }})
+        return await engine._fallback_response("session-7", session, "hello")
+
+    result = asyncio.run(scenario())
+
+    assert 's3cret-pass' not in dumps_session(session)
+    assert session['password_confirmed'] is True
+    assert result['collected_fields']['password_confirmed']
+    assert engine.sessions.get("session-7") is session
+    assert "fallback" not in engine.sessions
+
+def test_conversation_history_is_a_bounded_ring_buffer():
+    from modules.core.conversation_history import ConversationHistory
+
+    history = ConversationHistory("chat", max_messages=4,
+                                  store=MemorySessionStore("chat", ttl_seconds=60, clock=FakeClock()))
+    for i in range(10):
+        history.append("s1", {"role": "user", "content": f"q{i}"}, {"role": "assistant", "content": f"a{i}"})
+
+    assert [m["content"] for m in history.get("s1")] == ["q8", "a8", "q9", "a9"]
+    stats = history.stats()
+    assert stats["sessions"] == 1 and stats["messages"] == 4
+    assert stats["approx_bytes"] > 0
+
+def test_conversation_history_through_redis_stays_bounded():
+    from modules.core.conversation_history import ConversationHistory
+
+    history = ConversationHistory("chat", max_messages=3, store=RedisSessionStore(FakeRedis(), "chat", 60))
+    for i in range(5):
+        history.append("s1", {"role": "user", "content": str(i)})
+
+    assert [m["content"] for m in history.get("s1")] == ["2", "3", "4"]
+
+def test_redis_history_stats_read_a_bounded_sample():
+    from modules.core import conversation_history
+    from modules.core.conversation_history import ConversationHistory
+
+    redis = FakeRedis()
+    history = ConversationHistory("chat", max_messages=3, store=RedisSessionStore(redis, "chat", 60))
+    for i in range(12):
+        history.append(f"s{i}", {"role": "user", "content": "hi"}, {"role": "assistant", "content": "hello"})
+    redis.scan_iter = None  # stats must not walk the whole namespace
+    redis.mget_calls = []
+    mget = redis.mget
+    redis.mget = lambda keys: redis.mget_calls.append(len(keys)) or mget(keys)
+
+    original = conversation_history.HISTORY_STATS_SAMPLE
+    conversation_history.HISTORY_STATS_SAMPLE = 5
+    try:
+        stats = history.stats()
+    finally:
+        conversation_history.HISTORY_STATS_SAMPLE = original
+
+    assert stats["sampled"] and stats["sessions"] is None
+    assert stats["sample_sessions"] == 5 and redis.mget_calls == [5]
+    assert stats["avg_messages_per_session"] == 2
+    assert stats["appended_by_this_process"] == 24
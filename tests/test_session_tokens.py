@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Test signed farmer session tokens
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from modules.auth.routes import get_current_farmer
+from modules.auth.session_tokens import issue_session_token, verify_session_token
+
+class FakeRequest:
+    def __init__(self, cookies):
+        self.cookies = cookies
+
+def test_token_round_trip_carries_claims():
+    """A fresh token verifies and exposes the farmer claims"""
+    token = issue_session_token(42, "Edi Kante", "+38640123456")
+    farmer = verify_session_token(token)
+    assert farmer["farmer_id"] == 42
+    assert farmer["name"] == "Edi Kante"
+    assert "language" not in farmer
+    assert farmer["whatsapp_number"] == "+38640123456"
+
+def test_tampered_token_rejected():
+    """Changing the payload invalidates the signature"""
+    token = issue_session_token(42, "Edi Kante", "+38640123456")
+    payload, signature = token.split(".")
+    forged = issue_session_token(1, "Admin", None).split(".")[0]
+    assert verify_session_token(f"{forged}.{signature}") is None
+    assert verify_session_token(payload) is None
+    assert verify_session_token(None) is None
+
+def test_expired_token_rejected():
+    token = issue_session_token(42, "Edi Kante", ttl_seconds=-1)
+    assert verify_session_token(token) is None
+
+def test_legacy_cookies_no_longer_authenticate():
+    """Unsigned farmer_id/farmer_name cookies are ignored; only the signed token counts"""
+    forged = FakeRequest({"farmer_id": "1", "farmer_name": "Admin"})
+    signed = FakeRequest({"ava_session": issue_session_token(42, "Edi Kante", "+38640123456")})
+    assert asyncio.run(get_current_farmer(forged)) is None
+    assert asyncio.run(get_current_farmer(signed))["farmer_id"] == 42
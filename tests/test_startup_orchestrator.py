@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Test the concurrent startup orchestrator and its readiness gating
+"""
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from modules.core.retry import retry_async
+from modules.core.startup_orchestrator import StartupOrchestrator
+
+def sleeper(delay, result=None):
+    async def phase():
+        await asyncio.sleep(delay)
+        return result
+    return phase
+
+async def failing():
+    raise RuntimeError("boom")
+
+def test_phases_run_concurrently_and_are_timed():
+    """Total startup time is the slowest phase, and each phase reports its timing"""
+    startup = StartupOrchestrator()
+    startup.add("database", sleeper(0.2))
+    startup.add("templates", sleeper(0.2, {"loaded": 3}), required=False)
+    startup.add("translations", sleeper(0.2))
+
+    start = time.monotonic()
+    report = asyncio.run(startup.run())
+
+    assert time.monotonic() - start < 0.35
+    assert report["ready"] is True
+    assert report["phases"]["templates"]["result"] == {"loaded": 3}
+    assert all(phase["duration_ms"] >= 200 for phase in report["phases"].values())
+    assert all(phase["started_ms"] < 50 for phase in report["phases"].values())
+
+def test_optional_failures_do_not_block_readiness():
+    """Only required phases gate readiness; dependants of a failed phase are skipped"""
+    startup = StartupOrchestrator()
+    startup.add("database", sleeper(0))
+    startup.add("openai_key", failing, required=False)
+    startup.add("validation", sleeper(0), required=False, depends_on=("database", "openai_key"))
+    startup.add("slow", sleeper(1), required=False, timeout=0.05)
+
+    report = asyncio.run(startup.run())
+
+    assert startup.ready is True
+    assert report["phases"]["openai_key"] == {
+        "status": "failed", "required": False, "started_ms": 0, "duration_ms": 0,
+        "attempts": 1, "error": "boom"
+    }
+    assert report["phases"]["validation"]["status"] == "skipped"
+    assert report["phases"]["slow"]["status"] == "timeout"
+
+    startup = StartupOrchestrator()
+    startup.add("database", failing)
+    assert asyncio.run(startup.run())["ready"] is False
+
+def test_retry_async_backs_off_without_blocking():
+    """Failed attempts are retried; other coroutines keep running meanwhile"""
+    calls = []
+    ticks = []
+
+    async def flaky():
+        calls.append(time.monotonic())
+        if len(calls) < 3:
+            raise ConnectionError("not yet")
+        return "connected"
+
+    async def ticker():
+        for _ in range(5):
+            ticks.append(1)
+            await asyncio.sleep(0.01)
+
+    async def scenario():
+        result, _ = await asyncio.gather(retry_async(flaky, attempts=5, base_delay=0.02), ticker())
+        return result
+
+    assert asyncio.run(scenario()) == "connected"
+    assert len(calls) == 3
+    assert len(ticks) == 5
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Test Database Explorer table statistics and schema caching
+"""
+import sys
+from collections import namedtuple
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from table_stats import TableStatsService, choose_window_column, estimate_row_count
+
+CatalogRow = namedtuple("CatalogRow", "qualified_name ddl_version reltuples n_live_tup last_analyzed")
+
+class FakeResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def scalar(self):
+        return self.rows[0][0] if self.rows else None
+
+    def __iter__(self):
+        return iter(self.rows)
+
+class FakeSession:
+    """Answers the catalog, index and count queries issued by TableStatsService"""
+
+    def __init__(self, catalog_row, indexes=()):
+        self.catalog_row = catalog_row
+        self.indexes = list(indexes)
+        self.statements = []
+
+    def execute(self, statement, params=None):
+        sql = str(statement)
+        self.statements.append(sql)
+        if "pg_stat_user_tables" in sql:
+            return FakeResult([self.catalog_row])
+        if "FILTER" in sql:
+            return FakeResult([(1, 5, 20)])
+        if "COUNT(*)" in sql:
+            return FakeResult([(123,)])
+        return FakeResult([])
+
+    def rollback(self):
+        pass
+
+COLUMNS = [{"name": "id", "type": "INTEGER"}, {"name": "timestamp", "type": "TIMESTAMP"},
+           {"name": "created_at", "type": "TIMESTAMP"}]
+
+def _service(monkeypatch):
+    reflections = []
+
+    def fake_reflect(self, session, table_name):
+        reflections.append(table_name)
+        return COLUMNS, dict(session.indexes)
+
+    monkeypatch.setattr(TableStatsService, "_reflect", fake_reflect)
+    return TableStatsService(db_ops=None, stats_ttl=0.0), reflections
+
+def test_estimate_prefers_reltuples_then_live_tuples():
+    """Never-analyzed tables fall back to n_live_tup, unknown stays None"""
+    assert estimate_row_count(50000, 48000) == 50000
+    assert estimate_row_count(-1, 48000) == 48000
+    assert estimate_row_count(-1, None) is None
+
+def test_window_column_prefers_indexed_date_column():
+    """An indexed date column beats an unindexed one earlier in preference order"""
+    names = ["id", "timestamp", "created_at"]
+    assert choose_window_column(names, {}) == "created_at"
+    assert choose_window_column(names, {"timestamp": "brin"}) == "timestamp"
+    assert choose_window_column(["id", "name"], {}) is None
+
+def test_large_table_uses_estimate_and_skips_unindexed_windows(monkeypatch):
+    """No COUNT(*) for a large table unless an index backs the window column"""
+    service, _ = _service(monkeypatch)
+    session = FakeSession(CatalogRow('"chat_messages"', "1:2", 2_000_000, 1_990_000, None))
+
+    stats = service.get_table_stats(session, "chat_messages")
+
+    assert stats["total_records"] == 2_000_000
+    assert stats["total_records_exact"] is False
+    assert stats["recent_counts"] == {"24h": None, "7d": None, "30d": None}
+    assert not any("COUNT(*)" in sql for sql in session.statements)
+
+def test_indexed_window_counts_in_one_scan(monkeypatch):
+    """With a btree on the window column all three windows come from one query"""
+    service, _ = _service(monkeypatch)
+    session = FakeSession(CatalogRow('"chat_messages"', "1:2", 2_000_000, None, None),
+                          indexes=[("timestamp", "btree")])
+
+    stats = service.get_table_stats(session, "chat_messages")
+
+    assert stats["recent_counts"] == {"24h": 1, "7d": 5, "30d": 20}
+    assert stats["window_source"] == "index"
+    assert sum("FILTER" in sql for sql in session.statements) == 1
+
+def test_exact_count_on_request(monkeypatch):
+    """exact=True runs COUNT(*) even for a large table"""
+    service, _ = _service(monkeypatch)
+    session = FakeSession(CatalogRow('"tasks"', "1:2", 2_000_000, None, None))
+
+    stats = service.get_table_stats(session, "tasks", exact=True)
+
+    assert stats["total_records"] == 123
+    assert stats["total_records_exact"] is True
+
+def test_schema_reflected_again_only_after_ddl(monkeypatch):
+    """The reflected schema is reused until the DDL fingerprint changes"""
+    service, reflections = _service(monkeypatch)
+    session = FakeSession(CatalogRow('"farmers"', "1:2", 10, None, None))
+
+    service.get_columns(session, "farmers")
+    service.get_columns(session, "farmers")
+    assert reflections == ["farmers"]
+
+    session.catalog_row = CatalogRow('"farmers"', "7:2,9", 10, None, None)
+    service.get_columns(session, "farmers")
+    assert reflections == ["farmers", "farmers"]
@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+Test precompiled translations
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pytest
+
+from modules.core.translations import TRANSLATIONS, TranslationDict, fallback_chain, get_translations
+
+def test_missing_keys_fall_back_to_english():
+    """Bulgarian lacks the dashboard keys; they resolve to English ahead of time"""
+    bg = get_translations('bg')
+
+    assert 'dashboard_tasks' not in TRANSLATIONS['bg']
+    assert bg.dashboard_tasks == TRANSLATIONS['en']['dashboard_tasks']
+    assert bg['sign_in_title'] == TRANSLATIONS['bg']['sign_in_title']
+    assert bg.no_such_key == '[no_such_key]'
+    assert bg.get('no_such_key') is None
+
+def test_lookups_share_one_immutable_object_per_language():
+    """Regional and unknown codes resolve along the chain; tables cannot be modified"""
+    assert get_translations('sl') is get_translations('sl')
+    assert get_translations('sl-SI') is get_translations('sl')
+    assert get_translations('xx').language_code == 'en'
+    assert fallback_chain('de_AT') == ('de', 'en')
+
+    with pytest.raises(AttributeError):
+        get_translations('en').welcome = 'Hi'
+    assert not hasattr(get_translations('en'), '__html__')
+    assert isinstance(get_translations('it'), TranslationDict)
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Test streaming version-badge injection
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from modules.core.version_badge_middleware import BadgeInjector, VersionBadgeMiddleware
+
+def streaming_app(chunks, content_type=b"text/html; charset=utf-8", extra_headers=()):
+    """ASGI app sending ``chunks`` as separate body messages"""
+    async def app(scope, receive, send):
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b"content-type", content_type),
+                        (b"content-length", str(sum(map(len, chunks))).encode()), *extra_headers]
+        })
+        for index, chunk in enumerate(chunks):
+            await send({"type": "http.response.body", "body": chunk, "more_body": index < len(chunks) - 1})
+    return app
+
+def run(app, method="GET"):
+    """Send one request through the middleware and collect the messages it emits"""
+    middleware = VersionBadgeMiddleware(app)
+    middleware.badge = b"<BADGE>"
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(middleware({"type": "http", "method": method}, None, send))
+    return messages
+
+def test_injects_before_body_split_across_chunks():
+    """</body> split over three chunks is still found; the badge goes in once"""
+    chunks = [b"<html><body>hello</bo", b"d", b"y></html>"]
+    messages = run(streaming_app(chunks))
+
+    body = b"".join(m["body"] for m in messages[1:])
+    assert body == b"<html><body>hello<BADGE></body></html>"
+    assert b"content-length" not in dict(messages[0]["headers"])
+    assert [m["more_body"] for m in messages[1:]] == [True, True, False]
+
+def test_chunks_are_forwarded_as_they_arrive():
+    """Only a short tail is held back, so the first chunk is sent straight away"""
+    injector = BadgeInjector(b"<BADGE>")
+    first = b"<html><head></head><body>" + b"x" * 10000
+
+    sent = injector.feed(first)
+
+    assert sent == first[:-6]
+    assert len(injector.carry) == 6
+    assert injector.feed(b"</body></html>") == b"x" * 6 + b"<BADGE></body></html>"
+    assert injector.finish() == b""
+
+def test_badge_appended_without_body_tag():
+    """Fragments without </body> get the badge at the end, tiny chunks included"""
+    messages = run(streaming_app([b"<p>", b"hi", b"</p>"]))
+
+    assert b"".join(m["body"] for m in messages[1:]) == b"<p>hi</p><BADGE>"
+
+def test_non_html_and_compressed_responses_untouched():
+    """JSON keeps its content-length; gzip-encoded HTML is not spliced"""
+    json_messages = run(streaming_app([b'{"ok": true}'], content_type=b"application/json"))
+    assert dict(json_messages[0]["headers"])[b"content-length"] == b"12"
+    assert json_messages[1]["body"] == b'{"ok": true}'
+
+    gzip_messages = run(streaming_app([b"\x1f\x8b..."], extra_headers=[(b"content-encoding", b"gzip")]))
+    assert gzip_messages[1]["body"] == b"\x1f\x8b..."
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Test the WhatsApp ingest queue with the in-memory store and fake Twilio sender
+"""
+import asyncio
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from modules.whatsapp.ingest_queue import (
+    FakeTwilioSender, MemoryInboundStore, WhatsAppIngestQueue
+)
+
+def _message(sid, phone, body):
+    return {'message_sid': sid, 'from_number': phone, 'to_number': '+14155238886', 'body': body}
+
+def test_duplicate_message_sid_processed_once():
+    async def scenario():
+        sender = FakeTwilioSender()
+        store = MemoryInboundStore()
+        
+        async def reply(phone, body):
+            return f"echo: {body}"
+        
+        queue = WhatsAppIngestQueue(store, sender, reply, workers=2)
+        await queue.start()
+        assert await queue.submit(_message('SM1', '+38640111222', 'hello'))
+        assert not await queue.submit(_message('SM1', '+38640111222', 'hello'))
+        await queue.join()
+        await queue.stop()
+        return sender, store, queue
+    
+    sender, store, queue = asyncio.run(scenario())
+    assert sender.sent == [{'to': '+38640111222', 'body': 'echo: hello'}]
+    assert store.messages['SM1']['status'] == 'processed'
+    assert queue.stats['duplicates'] == 1
+
+def test_per_farmer_ordering_with_slow_replies():
+    """A slow first reply must not let the same farmer's second message overtake it"""
+    async def scenario():
+        sender = FakeTwilioSender()
+        
+        async def reply(phone, body):
+            await asyncio.sleep(0.05 if body == 'first' else 0)
+            return body
+        
+        queue = WhatsAppIngestQueue(MemoryInboundStore(), sender, reply, workers=4)
+        await queue.start()
+        await queue.submit(_message('SM1', '+38640111222', 'first'))
+        await queue.submit(_message('SM2', '+38640111222', 'second'))
+        await queue.submit(_message('SM3', '+359888000111', 'other farmer'))
+        await queue.join()
+        await queue.stop()
+        return sender
+    
+    sender = asyncio.run(scenario())
+    farmer_bodies = [m['body'] for m in sender.sent if m['to'] == '+38640111222']
+    assert farmer_bodies == ['first', 'second']
+    assert len(sender.sent) == 3
+
+def test_failed_reply_retried_then_marked_failed():
+    """Failures go back to the store with backoff; the last attempt marks the message failed"""
+    async def scenario():
+        store = MemoryInboundStore()
+        calls = []
+
+        async def reply(phone, body):
+            calls.append(body)
+            raise RuntimeError("LLM down")
+
+        queue = WhatsAppIngestQueue(store, FakeTwilioSender(), reply, workers=1,
+                                    max_attempts=2, retry_base_seconds=0)
+        await queue.start()
+        await queue.submit(_message('SM9', '+38640111222', 'hello'))
+        await queue.join()
+        assert store.messages['SM9']['status'] == 'received'
+        await queue.reclaim()
+        await queue.join()
+        await queue.stop()
+        return store, queue, calls
+
+    store, queue, calls = asyncio.run(scenario())
+    assert calls == ['hello', 'hello']
+    assert store.messages['SM9']['status'] == 'failed'
+    assert store.messages['SM9']['attempts'] == 2
+    assert 'LLM down' in store.messages['SM9']['error']
+    assert (queue.stats['retried'], queue.stats['failed']) == (1, 1)
+
+def test_leftovers_claimed_by_one_task_only():
+    """Two tasks starting together split the backlog; live leases are left alone"""
+    async def scenario():
+        store = MemoryInboundStore()
+        await store.save_if_new(_message('SM1', '+38640111222', 'left over'))
+        await store.save_if_new(_message('SM2', '+38640111333', 'in flight'), owner='other-task')
+        await store.save_if_new(_message('SM3', '+38640111444', 'orphaned'), owner='dead-task')
+        store.messages['SM3']['claimed_at'] = datetime.now() - timedelta(seconds=600)
+        sender = FakeTwilioSender()
+
+        async def reply(phone, body):
+            return body
+
+        queues = [WhatsAppIngestQueue(store, sender, reply, workers=2, lease_seconds=300) for _ in range(2)]
+        for queue in queues:
+            await queue.start()
+        for queue in queues:
+            await queue.join()
+            await queue.stop()
+        return store, sender
+
+    store, sender = asyncio.run(scenario())
+    assert sorted(m['body'] for m in sender.sent) == ['left over', 'orphaned']
+    assert store.messages['SM2']['status'] == 'processing'
+    assert store.messages['SM3']['status'] == 'processed'